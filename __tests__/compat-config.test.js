@@ -112,6 +112,70 @@ describe('compat-config direct install validation', () => {
     const wizardMain = document.querySelector('.wizard-main');
     expect(wizardMain.firstElementChild).toBe(container);
   });
+
+  describe('with a compatibility index', () => {
+    const compatIndex = {
+      version: 1,
+      module_keys: [],
+      bases: {},
+      configs: {
+        'ceiling-usb': {
+          stable: { build: 3, version: '1.2.0', config_string: 'Ceiling-USB' },
+          beta: { build: 4, version: '1.3.0-beta', config_string: 'Ceiling-USB' }
+        }
+      },
+      manifest: { name: 'Sense360', version: '1.3.0' },
+      shards: { 'ceiling-usb': 'firmware/builds/ceiling-usb.json' },
+      legacy_builds: 0
+    };
+    const shard = {
+      version: 1,
+      config: 'ceiling-usb',
+      builds: [
+        { build: 3, config_string: 'Ceiling-USB', channel: 'stable', version: '1.2.0', parts: [{ path: 'firmware/stable.bin' }] },
+        { build: 4, config_string: 'Ceiling-USB', channel: 'beta', version: '1.3.0-beta', parts: [{ path: 'firmware/beta.bin' }] }
+      ]
+    };
+
+    beforeEach(() => {
+      document.head.innerHTML = '<meta name="webflash-compat-index" content="compat-index.json">';
+      const files = { 'compat-index.json': compatIndex, 'firmware/builds/ceiling-usb.json': shard };
+      global.fetch.mockImplementation(async (url) => ({
+        ok: url in files,
+        status: url in files ? 200 : 404,
+        json: async () => files[url]
+      }));
+    });
+
+    afterEach(() => {
+      document.head.innerHTML = '';
+    });
+
+    test('installs from the index and one build shard without fetching manifest.json', async () => {
+      window.history.replaceState(null, '', '?core=core&mount=ceiling&power=usb&channel=beta');
+
+      const module = await import('../scripts/compat-config.js');
+      await module.initializeCompatInstall();
+
+      expect(global.fetch.mock.calls.map(([url]) => url)).toEqual([
+        'compat-index.json',
+        'firmware/builds/ceiling-usb.json'
+      ]);
+      const container = document.getElementById('compat-config-installer');
+      expect(container.textContent).toContain('Install Firmware');
+      expect(container.querySelector('.firmware-name').textContent).toBe('beta.bin');
+    });
+
+    test('reports a miss without falling back to manifest.json', async () => {
+      window.history.replaceState(null, '', '?core=core&mount=ceiling&power=poe');
+
+      const module = await import('../scripts/compat-config.js');
+      await module.initializeCompatInstall();
+
+      expect(global.fetch.mock.calls.map(([url]) => url)).toEqual(['compat-index.json']);
+      expect(document.getElementById('compat-config-installer').querySelector('.firmware-item')).toBeNull();
+    });
+  });
 });
 
 
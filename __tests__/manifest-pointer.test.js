@@ -0,0 +1,77 @@
+import { jest } from '@jest/globals';
+
+const pointer = {
+    version: 1,
+    manifest: 'manifests/manifest.0123456789abcdef.json',
+    digests: 'manifests/digests.fedcba9876543210.json'
+};
+
+const digests = {
+    version: 1,
+    files: {
+        'manifest.json': { path: pointer.manifest, size: 2, etag: '"0123"' },
+        'firmware-3.json': { path: 'manifests/firmware-3.1111111111111111.json', size: 2, etag: '"1111"' },
+        'compat-index.json': { path: 'manifests/compat-index.2222222222222222.json', size: 2, etag: '"2222"' }
+    }
+};
+
+function serveFiles(files) {
+    global.fetch = jest.fn(url => Promise.resolve({
+        ok: url in files,
+        status: url in files ? 200 : 404,
+        json: () => Promise.resolve(files[url])
+    }));
+}
+
+describe('manifest pointer', () => {
+    beforeEach(() => {
+        jest.resetModules();
+        document.head.innerHTML = '<meta name="webflash-manifest-pointer" content="manifest-pointer.json">';
+        serveFiles({
+            'manifest-pointer.json': pointer,
+            [pointer.digests]: digests,
+            [pointer.manifest]: { builds: [] },
+            'manifests/compat-index.2222222222222222.json': { bases: {} },
+            'manifest.json': { builds: [], plain: true }
+        });
+    });
+
+    afterEach(() => {
+        document.head.innerHTML = '';
+    });
+
+    test('fetches the hashed manifest named by the pointer', async () => {
+        const { fetchManifestResponse, resolveManifestAsset } = await import('../scripts/utils/manifest-pointer.js');
+
+        const response = await fetchManifestResponse('manifest.json');
+
+        expect(await response.json()).toEqual({ builds: [] });
+        expect(global.fetch).toHaveBeenCalledWith('manifest-pointer.json', { cache: 'no-store' });
+        expect(global.fetch).toHaveBeenCalledWith(pointer.manifest);
+        expect(resolveManifestAsset('./firmware-3.json')).toBe('manifests/firmware-3.1111111111111111.json');
+        expect(resolveManifestAsset('firmware-9.json')).toBe('firmware-9.json');
+    });
+
+    test('resolves assets through the digest map before the manifest is loaded', async () => {
+        const { fetchManifestAsset } = await import('../scripts/utils/manifest-pointer.js');
+
+        const response = await fetchManifestAsset('compat-index.json');
+
+        expect(await response.json()).toEqual({ bases: {} });
+        expect(global.fetch.mock.calls.map(([url]) => url)).toEqual([
+            'manifest-pointer.json',
+            pointer.digests,
+            'manifests/compat-index.2222222222222222.json'
+        ]);
+    });
+
+    test('falls back to manifest.json without a pointer', async () => {
+        serveFiles({ 'manifest.json': { builds: [], plain: true } });
+        const { fetchManifestResponse, resolveManifestAsset } = await import('../scripts/utils/manifest-pointer.js');
+
+        const response = await fetchManifestResponse('manifest.json');
+
+        expect(await response.json()).toEqual({ builds: [], plain: true });
+        expect(resolveManifestAsset('firmware-3.json')).toBe('firmware-3.json');
+    });
+});
@@ -0,0 +1,58 @@
+import { jest } from '@jest/globals';
+
+const latestFeed = {
+    version: 1,
+    builds: {
+        'Ceiling-POE-AirIQ': {
+            stable: { version: '1.1.0', sha256: 'aa', size: 4096, path: 'firmware/a.bin' },
+            beta: { version: '1.2.0-beta', sha256: 'bb', size: 4096, path: 'firmware/b.bin' }
+        },
+        'Ceiling-USB': {
+            stable: { version: '1.3.0', sha256: 'cc', size: 4096, path: 'firmware/c.bin' }
+        }
+    }
+};
+
+const manifest = {
+    builds: [
+        { config_string: 'Ceiling-POE-AirIQ', channel: 'stable', version: '1.0.0' },
+        { config_string: 'Ceiling-POE-AirIQ', channel: 'stable', version: '1.0.5' }
+    ]
+};
+
+function serveFiles(files) {
+    global.fetch = jest.fn(url => Promise.resolve({
+        ok: url in files,
+        status: url in files ? 200 : 404,
+        json: () => Promise.resolve(files[url])
+    }));
+}
+
+describe('update checker', () => {
+    beforeEach(() => {
+        jest.resetModules();
+    });
+
+    test('reads latest.json without downloading the manifest', async () => {
+        serveFiles({ './latest.json': latestFeed, './manifest.json': manifest });
+        const { checkForUpdates } = await import('../scripts/services/update-checker.js');
+
+        const result = await checkForUpdates({ firmwareVersion: '1.0.0' }, 'ceiling-poe-airiq');
+
+        expect(global.fetch.mock.calls.map(([url]) => url)).toEqual(['./latest.json']);
+        expect(result.availableVersions).toEqual(['1.2.0-beta', '1.1.0']);
+        expect(result.latestStableVersion).toBe('1.3.0');
+        expect(result.updateAvailable).toBe(true);
+    });
+
+    test('falls back to the manifest when the feed is not published', async () => {
+        serveFiles({ './manifest.json': manifest });
+        const { checkForUpdates } = await import('../scripts/services/update-checker.js');
+
+        const result = await checkForUpdates({ firmwareVersion: '1.0.5' }, 'Ceiling-POE-AirIQ');
+
+        expect(global.fetch.mock.calls.map(([url]) => url)).toEqual(['./latest.json', './manifest.json']);
+        expect(result.latestStableVersion).toBe('1.0.5');
+        expect(result.updateAvailable).toBe(false);
+    });
+});
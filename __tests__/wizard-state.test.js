@@ -155,6 +155,162 @@ describe('wizard state module', () => {
         expect(global.fetch).toHaveBeenCalledTimes(1);
     });
 
+    describe('with a compatibility index', () => {
+        const compatIndex = {
+            version: 1,
+            module_keys: ['voice', 'led', 'roomiq', 'airiq', 'fan', 'ventiq'],
+            bases: {
+                'wall|usb': {
+                    modules: { voice: ['none'], led: ['none'], roomiq: ['none'], airiq: ['none'], fan: ['none'], ventiq: ['none'] },
+                    combos: {}
+                }
+            },
+            configs: { 'wall-usb': { stable: { build: 7, version: '1.0.0', config_string: 'Wall-USB' } } },
+            manifest: { name: 'Sense360', version: '1.0.0', release_notes_indexed: true },
+            shards: { 'wall-usb': 'firmware/builds/wall-usb.json' },
+            legacy_builds: 0
+        };
+        const shard = {
+            version: 1,
+            config: 'wall-usb',
+            builds: [{
+                build: 7,
+                config_string: 'Wall-USB',
+                channel: 'stable',
+                version: '1.0.0',
+                chipFamily: 'ESP32-S3',
+                parts: [{ path: 'firmware/configurations/Sense360-Wall-USB-v1.0.0-stable.bin', offset: 0 }]
+            }]
+        };
+
+        function serveFiles(files) {
+            global.fetch = jest.fn(url => Promise.resolve({
+                ok: url in files,
+                status: url in files ? 200 : 404,
+                json: () => Promise.resolve(files[url])
+            }));
+        }
+
+        function selectWallUsb() {
+            const mounting = document.querySelector('input[name="mounting"][value="wall"]');
+            const power = document.querySelector('input[name="power"][value="usb"]');
+            mounting.checked = true;
+            power.checked = true;
+            mounting.dispatchEvent(new Event('change', { bubbles: true }));
+            power.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+
+        beforeEach(() => {
+            document.head.innerHTML = '<meta name="webflash-compat-index" content="compat-index.json">';
+        });
+
+        afterEach(() => {
+            document.head.innerHTML = '';
+        });
+
+        test('loads the index from its fixed path instead of manifest.json', async () => {
+            serveFiles({ 'compat-index.json': compatIndex, 'firmware/builds/wall-usb.json': shard });
+            const { __testHooks } = await import('../scripts/state.js');
+
+            document.dispatchEvent(new Event('DOMContentLoaded'));
+            const manifest = await __testHooks.loadManifestData();
+
+            expect(manifest).toEqual(compatIndex.manifest);
+            expect(global.fetch.mock.calls.map(([url]) => url)).toEqual(['compat-index.json']);
+        });
+
+        test('fetches one build shard per configuration on demand', async () => {
+            serveFiles({ 'compat-index.json': compatIndex, 'firmware/builds/wall-usb.json': shard });
+            const { __testHooks } = await import('../scripts/state.js');
+
+            document.dispatchEvent(new Event('DOMContentLoaded'));
+            await __testHooks.loadManifestData();
+            selectWallUsb();
+            await __testHooks.findCompatibleFirmware();
+            await __testHooks.findCompatibleFirmware();
+
+            expect(global.fetch.mock.calls.map(([url]) => url)).toEqual([
+                'compat-index.json',
+                'firmware/builds/wall-usb.json'
+            ]);
+            const options = Array.from(document.querySelectorAll('#firmware-version-select option'));
+            expect(options.map(option => option.value)).toContain('firmware-7');
+        });
+
+        test('falls back to manifest.json when the index lists legacy builds', async () => {
+            serveFiles({
+                'compat-index.json': { ...compatIndex, legacy_builds: 1 },
+                'manifest.json': minimalManifest
+            });
+            const { __testHooks } = await import('../scripts/state.js');
+
+            document.dispatchEvent(new Event('DOMContentLoaded'));
+            const manifest = await __testHooks.loadManifestData();
+            selectWallUsb();
+            await __testHooks.findCompatibleFirmware();
+
+            expect(manifest).toEqual(minimalManifest);
+            expect(global.fetch.mock.calls.map(([url]) => url)).toEqual(['compat-index.json', 'manifest.json']);
+        });
+    });
+
+    test('older versions are fetched only when the history list is opened', async () => {
+        const manifest = {
+            release_notes_indexed: true,
+            history: { 'Wall-USB': { path: 'firmware/history/Wall-USB.json', builds: 1 } },
+            builds: [{
+                config_string: 'Wall-USB',
+                channel: 'stable',
+                version: '1.1.0',
+                chipFamily: 'ESP32-S3',
+                parts: [{ path: 'firmware/configurations/Sense360-Wall-USB-v1.1.0-stable.bin', offset: 0 }]
+            }]
+        };
+        const shard = {
+            version: 1,
+            name: 'Wall-USB',
+            builds: [{
+                config_string: 'Wall-USB',
+                channel: 'stable',
+                version: '1.0.0',
+                manifest: 'firmware/history/Sense360-Wall-USB-v1.0.0-stable.json'
+            }]
+        };
+        const files = { 'manifest.json': manifest, 'firmware/history/Wall-USB.json': shard };
+        global.fetch = jest.fn(url => Promise.resolve({
+            ok: url in files,
+            status: url in files ? 200 : 404,
+            json: () => Promise.resolve(files[url])
+        }));
+        const { __testHooks } = await import('../scripts/state.js');
+
+        document.dispatchEvent(new Event('DOMContentLoaded'));
+        await __testHooks.loadManifestData();
+        const mounting = document.querySelector('input[name="mounting"][value="wall"]');
+        const power = document.querySelector('input[name="power"][value="usb"]');
+        mounting.checked = true;
+        power.checked = true;
+        mounting.dispatchEvent(new Event('change', { bubbles: true }));
+        power.dispatchEvent(new Event('change', { bubbles: true }));
+        await __testHooks.findCompatibleFirmware();
+        // Let the background integrity check re-render the card first.
+        await new Promise(resolve => setTimeout(resolve, 0));
+
+        const link = document.querySelector('.build-history-link');
+        expect(link).not.toBeNull();
+        expect(link.textContent).toContain('Older Versions (1)');
+        expect(global.fetch.mock.calls.map(([url]) => url)).toEqual(['manifest.json']);
+
+        await window.toggleBuildHistory({ preventDefault() {}, currentTarget: link });
+
+        expect(global.fetch.mock.calls.map(([url]) => url)).toEqual([
+            'manifest.json',
+            'firmware/history/Wall-USB.json'
+        ]);
+        const button = document.querySelector('.build-history-list esp-web-install-button');
+        expect(button.getAttribute('manifest')).toBe('firmware/history/Sense360-Wall-USB-v1.0.0-stable.json');
+    });
+
     test('mounting and power inputs receive a single change listener', async () => {
         const mountingInputs = Array.from(document.querySelectorAll('input[name="mounting"]'));
         const powerInputs = Array.from(document.querySelectorAll('input[name="power"]'));
@@ -460,4 +616,25 @@ describe('wizard state module', () => {
 
         expect(stateModule.getState().voice).toBe('none');
     });
+
+    test('formatFlashEstimate reads whole milliseconds at the page baud rate', async () => {
+        const { __testHooks } = await import('../scripts/state.js');
+        const firmware = {
+            flash_estimate: {
+                transfer_bytes: 1152000,
+                serial_ms: { 115200: 100000, 921600: 12500 }
+            }
+        };
+
+        expect(__testHooks.formatFlashEstimate(firmware)).toBe('~2 min to flash');
+
+        document.head.innerHTML = '<meta name="webflash-flash-baud" content="921600">';
+        expect(__testHooks.formatFlashEstimate(firmware)).toBe('~13 s to flash');
+
+        document.head.innerHTML = '<meta name="webflash-flash-baud" content="230400">';
+        expect(__testHooks.formatFlashEstimate(firmware)).toBe('~50 s to flash');
+
+        document.head.innerHTML = '';
+        expect(__testHooks.formatFlashEstimate({})).toBe('');
+    });
 });
@@ -1,5 +1,7 @@
 import { DEFAULT_CHANNEL_KEY, normalizeChannelKey } from './utils/channel-alias.js';
 import { parseConfigParams, REQUIRED_CONFIG_PARAMS } from './utils/url-config.js';
+import { fetchManifestResponse } from './utils/manifest-pointer.js';
+import { loadCompatIndex, loadConfigBuilds } from './utils/compat-index.js';
 
 const DEFAULT_VALIDATION_ERROR = {
   title: 'Direct Install Link Incomplete',
@@ -640,13 +642,46 @@ function renderInstall(container, manifestData, build, lookup) {
 }
 
 async function loadManifest() {
-  const response = await fetch('./manifest.json', { cache: 'no-store' });
+  const response = await fetchManifestResponse('./manifest.json');
   if (!response.ok) {
     throw new Error(`HTTP ${response.status}`);
   }
   return response.json();
 }
 
+function selectCompatIndexEntry(index, configKey, requestedChannel) {
+  const channels = index?.configs?.[configKey];
+  if (!channels || typeof channels !== 'object') {
+    return null;
+  }
+
+  if (requestedChannel) {
+    const normalizedRequestedChannel = normalizeManifestChannel(requestedChannel);
+    return Object.entries(channels)
+      .find(([channel]) => normalizeManifestChannel(channel) === normalizedRequestedChannel)?.[1] || null;
+  }
+
+  let selected = null;
+  let bestPriority = Number.POSITIVE_INFINITY;
+  Object.entries(channels).forEach(([channel, entry]) => {
+    const priority = getChannelPriority(channel);
+    if (priority < bestPriority) {
+      bestPriority = priority;
+      selected = entry;
+    }
+  });
+  return selected;
+}
+
+async function loadBuildFromCompatIndex(index, configKey, requestedChannel) {
+  const selected = selectCompatIndexEntry(index, configKey, requestedChannel);
+  if (!selected || !Number.isInteger(selected.build)) {
+    return null;
+  }
+  const builds = await loadConfigBuilds(index, configKey);
+  return builds.find((build) => build.build === selected.build) || null;
+}
+
 async function initializeCompatInstall() {
   const { lookup, channel: requestedChannel, validationError, hasInstallParams } = readInstallQueryParams();
 
@@ -664,9 +699,23 @@ async function initializeCompatInstall() {
   renderStatus(container, 'Looking up firmware build…');
 
   try {
+    const normalizedConfigKey = lookup.key.toLowerCase();
+
+    // The index covers every config build, so a miss there is a real miss.
+    const compatIndex = await loadCompatIndex();
+    if (compatIndex) {
+      const indexedBuild = await loadBuildFromCompatIndex(compatIndex, normalizedConfigKey, requestedChannel);
+      if (indexedBuild) {
+        renderInstall(container, compatIndex.manifest, indexedBuild, lookup);
+      } else {
+        renderNoMatch(container, lookup, requestedChannel || undefined);
+      }
+      return;
+    }
+
     const manifest = await loadManifest();
     const builds = Array.isArray(manifest.builds) ? manifest.builds : [];
-    const normalizedConfigKey = lookup.key.toLowerCase();
+
     const matchingBuilds = builds.filter((build) => {
       if (!build || typeof build.config_string !== 'string') {
         return false;
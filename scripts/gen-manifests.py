@@ -8,27 +8,48 @@ and regenerates the numbered firmware-*.json files consumed by ESP Web Tools.
 Usage (from repository root):
     python scripts/gen-manifests.py --summary
     python scripts/gen-manifests.py --dry-run   # preview without writing files
+    python scripts/gen-manifests.py query --catalog .cache/catalog.sqlite --power POE --channel beta
+    python scripts/gen-manifests.py verify --cache-dir .cache/gen-manifests
 """
 
 from __future__ import annotations
 
 import argparse
 import base64
+import filecmp
 import hashlib
+import itertools
 import json
+import mmap
 import os
 import re
+import sqlite3
+import struct
+import subprocess
 import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence, Tuple
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
 try:
     from packaging.version import Version as _PackagingVersion
 except Exception:  # pragma: no cover - packaging is optional
     _PackagingVersion = None  # type: ignore
 
+try:
+    import numpy as _np
+except Exception:  # pragma: no cover - numpy is optional
+    _np = None  # type: ignore
+
+try:
+    import orjson as _orjson
+except Exception:  # pragma: no cover - orjson is optional
+    _orjson = None  # type: ignore
+
 DEFAULT_CHANNEL = "stable"
 DEFAULT_DEVICE_TYPE = "Core Module"
 
@@ -446,6 +467,39 @@ class FirmwareArtifact:
     signature: str
     file_size: int
     build_date: str
+    deltas: List[Dict[str, object]] = field(default_factory=list)
+    compressed: Optional[Dict[str, object]] = None
+    image: Optional[Dict[str, object]] = None
+    known_issues: List[str] = field(default_factory=list)
+    changelog: List[str] = field(default_factory=list)
+    release_notes: Optional[Dict[str, object]] = None
+    parts: List[Dict[str, object]] = field(default_factory=list)
+    chunks: Optional[Dict[str, object]] = None
+    flash_estimate: Optional[Dict[str, object]] = None
+    # Epoch seconds the release asset was last updated, set by
+    # sync-from-releases.py for binaries it downloads.
+    source_date: Optional[int] = None
+
+    def part_entry(self) -> Dict[str, object]:
+        part: Dict[str, object] = {
+            "path": self.relative_path,
+            "offset": 0,
+            "md5": self.md5,
+            "sha256": self.sha256,
+            "signature": self.signature,
+        }
+        if self.compressed:
+            part["compressed"] = dict(self.compressed)
+        if self.chunks:
+            part["chunks"] = dict(self.chunks)
+        return part
+
+    def part_entries(self) -> List[Dict[str, object]]:
+        """Flash parts at their offsets: split parts if set, else the whole image."""
+
+        if self.parts:
+            return [dict(part) for part in self.parts]
+        return [self.part_entry()]
 
     def manifest_entry(self) -> Dict[str, object]:
         entry: Dict[str, object] = {
@@ -454,15 +508,7 @@ class FirmwareArtifact:
             "channel": self.metadata.channel,
             "description": self.metadata.description or "",
             "chipFamily": self.chip_family,
-            "parts": [
-                {
-                    "path": self.relative_path,
-                    "offset": 0,
-                    "md5": self.md5,
-                    "sha256": self.sha256,
-                    "signature": self.signature,
-                }
-            ],
+            "parts": self.part_entries(),
             "build_date": self.build_date,
             "file_size": self.file_size,
             "improv": self.metadata.improv,
@@ -471,8 +517,8 @@ class FirmwareArtifact:
             "signature": self.signature,
             "features": list(self.metadata.features),
             "hardware_requirements": list(self.metadata.hardware_requirements),
-            "known_issues": [],
-            "changelog": [],
+            "known_issues": list(self.known_issues),
+            "changelog": list(self.changelog),
         }
         if self.metadata.is_configuration:
             entry.update(
@@ -492,25 +538,723 @@ class FirmwareArtifact:
                     "sensor_addon": self.metadata.sensor_addon,
                 }
             )
+        if self.release_notes:
+            entry["release_notes"] = dict(self.release_notes)
+        if self.deltas:
+            entry["deltas"] = [dict(delta) for delta in self.deltas]
+        if self.flash_estimate:
+            entry["flash_estimate"] = dict(self.flash_estimate)
         return entry
 
 
 SIGNATURE_SALT = b"Sense360 Firmware Signing Salt v1"
 
 
-def compute_digests(path: Path) -> Tuple[str, str, str]:
-    md5_digest = hashlib.md5()
-    sha_digest = hashlib.sha256()
-    signature_digest = hashlib.sha256()
+DEFAULT_CHUNK_SIZE = 64 * 1024
+FLASH_SECTOR_SIZE = 0x1000
+CHUNK_TABLE_VERSION = 1
+
+
+def merkle_root(leaves: Sequence[bytes]) -> bytes:
+    """SHA-256 Merkle root over chunk digests.
+
+    Leaves are the chunk SHA-256 digests; a parent is SHA-256 of ``0x01``
+    followed by its two children, an unpaired node is carried up unchanged and
+    an empty part hashes like an empty chunk.
+    """
+
+    if not leaves:
+        return hashlib.sha256(b"").digest()
+    level = list(leaves)
+    while len(level) > 1:
+        parents = [
+            hashlib.sha256(b"\x01" + level[index] + level[index + 1]).digest()
+            for index in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+    return level[0]
+
+
+class DigestAccumulator:
+    """Incremental form of :func:`compute_digests` for data arriving in chunks.
+
+    With ``chunk_size`` it also records the SHA-256 of every ``chunk_size``
+    block, independent of how the data is sliced when fed in. With
+    ``inspect_image`` the data is also parsed as an ESP image on the way
+    through (see :class:`EspImageStream`): :meth:`image` returns the header
+    details :func:`inspect_firmware_image` would, after checking the segment
+    checksum and appended SHA-256, so nothing needs a second read.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, *, inspect_image: bool = False) -> None:
+        self._md5 = hashlib.md5()
+        self._sha = hashlib.sha256()
+        self._signature = hashlib.sha256()
+        self.chunk_size = chunk_size
+        self._chunks: List[bytes] = []
+        self._chunk = hashlib.sha256()
+        self._chunk_fill = 0
+        self._position = 0
+        self._image = EspImageStream() if inspect_image else None
+
+    def update(self, chunk: bytes) -> None:
+        view = memoryview(chunk)
+        self._md5.update(view)
+        self._signature.update(view)
+        boundary = None
+        if self._image is not None:
+            self._image.feed(view)
+            boundary = self._image.digest_boundary()
+        if boundary is not None and self._position < boundary <= self._position + len(view):
+            # An image at offset 0 signs a prefix of the file: snapshot the
+            # whole-file SHA-256 there instead of hashing the prefix twice.
+            split = boundary - self._position
+            self._sha.update(view[:split])
+            self._image.prefix_digest(self._sha.digest())  # type: ignore[union-attr]
+            self._sha.update(view[split:])
+        else:
+            self._sha.update(view)
+        self._position += len(view)
+        if self.chunk_size:
+            self._update_chunks(view)
+
+    def _update_chunks(self, data: memoryview) -> None:
+        assert self.chunk_size
+        while data:
+            take = min(len(data), self.chunk_size - self._chunk_fill)
+            self._chunk.update(data[:take])
+            self._chunk_fill += take
+            data = data[take:]
+            if self._chunk_fill == self.chunk_size:
+                self._chunks.append(self._chunk.digest())
+                self._chunk = hashlib.sha256()
+                self._chunk_fill = 0
+
+    def chunk_table(self) -> Optional[Dict[str, object]]:
+        """Per-chunk SHA-256 digests and their :func:`merkle_root`, if chunking."""
+
+        if not self.chunk_size:
+            return None
+        leaves = list(self._chunks)
+        if self._chunk_fill:
+            leaves.append(self._chunk.digest())
+        return {
+            "size": self.chunk_size,
+            "root": merkle_root(leaves).hex(),
+            "sha256": [leaf.hex() for leaf in leaves],
+        }
+
+    def image(self) -> Optional[Dict[str, object]]:
+        """ESP image details of the data fed so far (requires ``inspect_image``).
+
+        Raises :class:`EspImageError` for truncated or corrupt images.
+        """
+
+        assert self._image is not None
+        return self._image.result()
+
+    def result(self) -> Tuple[str, str, str]:
+        signature_digest = self._signature.copy()
+        signature_digest.update(SIGNATURE_SALT)
+        signature_blob = base64.b64encode(signature_digest.digest()).decode("ascii")
+        return self._md5.hexdigest(), self._sha.hexdigest(), signature_blob
+
+
+def hash_file(
+    path: Path, *, chunk_size: Optional[int] = None, inspect_image: bool = False
+) -> DigestAccumulator:
+    accumulator = DigestAccumulator(chunk_size, inspect_image=inspect_image)
     with path.open("rb") as handle:
         for chunk in iter(lambda: handle.read(65536), b""):
-            md5_digest.update(chunk)
-            sha_digest.update(chunk)
-            signature_digest.update(chunk)
-    signature_digest.update(SIGNATURE_SALT)
-    signature_bytes = signature_digest.digest()
-    signature_blob = base64.b64encode(signature_bytes).decode("ascii")
-    return md5_digest.hexdigest(), sha_digest.hexdigest(), signature_blob
+            accumulator.update(chunk)
+    return accumulator
+
+
+def compute_digests(path: Path) -> Tuple[str, str, str]:
+    return hash_file(path).result()
+
+
+# ESP-IDF image layout: a 24-byte header (magic 0xE9, segment count, entry
+# point, chip id, hash-appended flag), then segments of <load_addr, length,
+# data>, padding up to a checksum byte at offset 15 mod 16 (XOR of all segment
+# data seeded with 0xEF) and, optionally, a SHA-256 of everything before it.
+ESP_IMAGE_MAGIC = 0xE9
+ESP_CHECKSUM_SEED = 0xEF
+ESP_IMAGE_HEADER = struct.Struct("<BBBBIB3sHBHH4sB")
+ESP_SEGMENT_HEADER = struct.Struct("<II")
+ESP_APP_DESC = struct.Struct("<II8s32s32s16s16s32s32s")
+ESP_APP_DESC_MAGIC = 0xABCD5432
+ESP_MAX_SEGMENTS = 16
+# Merged factory images: ESP32 places the bootloader at 0x1000, every chip
+# places the first app partition at 0x10000 by default.
+ESP32_BOOTLOADER_OFFSET = 0x1000
+ESP_APP_OFFSET = 0x10000
+ESP_CHIP_IDS = {
+    0: "ESP32",
+    2: "ESP32-S2",
+    5: "ESP32-C3",
+    9: "ESP32-S3",
+    12: "ESP32-C2",
+    13: "ESP32-C6",
+    16: "ESP32-H2",
+    18: "ESP32-P4",
+}
+
+
+class EspImageError(ValueError):
+    """Raised when a binary has an ESP image header but is truncated or corrupt."""
+
+
+def _xor_bytes(data: memoryview) -> int:
+    if _np is not None:
+        array = _np.frombuffer(data, dtype=_np.uint8)
+        return int(_np.bitwise_xor.reduce(array)) if array.size else 0
+    # Fold the buffer onto itself as one big integer; every step runs in C.
+    value = int.from_bytes(data, "little")
+    width = len(data)
+    while width > 1:
+        half = (width + 1) // 2
+        value = (value & ((1 << (half * 8)) - 1)) ^ (value >> (half * 8))
+        width = half
+    return value
+
+
+def _c_string(raw: bytes) -> str:
+    return raw.split(b"\x00", 1)[0].decode("utf-8", "replace")
+
+
+def parse_app_descriptor(buffer: memoryview, offset: int) -> Optional[Dict[str, str]]:
+    if offset + ESP_APP_DESC.size > len(buffer):
+        return None
+    fields = ESP_APP_DESC.unpack_from(buffer, offset)
+    if fields[0] != ESP_APP_DESC_MAGIC:
+        return None
+    _, _, _, version, project, compile_time, compile_date, idf_version, elf_sha = fields
+    return {
+        "version": _c_string(version),
+        "project_name": _c_string(project),
+        "compile_time": _c_string(compile_time),
+        "compile_date": _c_string(compile_date),
+        "idf_version": _c_string(idf_version),
+        "elf_sha256": elf_sha.hex(),
+    }
+
+
+def parse_esp_image(buffer: memoryview, offset: int = 0) -> Dict[str, object]:
+    """Parse the header and segment table of one ESP image starting at ``offset``.
+
+    Structural problems (truncation, absurd segment tables) raise
+    :class:`EspImageError`. Segment data is never read, so the XOR checksum
+    and appended SHA-256 are not checked here; :class:`EspImageStream`
+    verifies them while a binary is hashed.
+    """
+
+    total = len(buffer)
+    if offset + ESP_IMAGE_HEADER.size > total:
+        raise EspImageError("truncated image header")
+    header = ESP_IMAGE_HEADER.unpack_from(buffer, offset)
+    magic, segment_count, entry_point, chip_id, hash_appended = (
+        header[0],
+        header[1],
+        header[4],
+        header[7],
+        header[12],
+    )
+    if magic != ESP_IMAGE_MAGIC:
+        raise EspImageError(f"bad image magic 0x{magic:02x} at 0x{offset:x}")
+    if not 0 < segment_count <= ESP_MAX_SEGMENTS:
+        raise EspImageError(f"implausible segment count {segment_count}")
+    position = offset + ESP_IMAGE_HEADER.size
+    segments: List[Tuple[int, int]] = []
+    for _ in range(segment_count):
+        if position + ESP_SEGMENT_HEADER.size > total:
+            raise EspImageError("truncated segment header")
+        _, length = ESP_SEGMENT_HEADER.unpack_from(buffer, position)
+        position += ESP_SEGMENT_HEADER.size
+        if position + length > total:
+            raise EspImageError(f"segment at 0x{position:x} runs past the end of the file")
+        segments.append((position, length))
+        position += length
+    checksum_offset = position + 15 - ((position - offset) % 16)
+    end = checksum_offset + 1 + (32 if hash_appended == 1 else 0)
+    if end > total:
+        raise EspImageError("image is truncated before its checksum")
+    return {
+        "offset": offset,
+        "end": end,
+        "chip_id": chip_id,
+        "chip_family": ESP_CHIP_IDS.get(chip_id),
+        "entry_point": entry_point,
+        "segment_count": segment_count,
+        "appended_sha256": (
+            bytes(buffer[checksum_offset + 1 : end]).hex() if hash_appended == 1 else None
+        ),
+        "app": parse_app_descriptor(buffer, segments[0][0]),
+    }
+
+
+def _inspect_buffer(view: memoryview) -> Optional[Dict[str, object]]:
+    start = 0
+    if view[0] != ESP_IMAGE_MAGIC:
+        if (
+            view[0] == 0xFF
+            and len(view) > ESP32_BOOTLOADER_OFFSET
+            and view[ESP32_BOOTLOADER_OFFSET] == ESP_IMAGE_MAGIC
+        ):
+            start = ESP32_BOOTLOADER_OFFSET
+        else:
+            return None
+    image = parse_esp_image(view, start)
+    image["whole_file"] = start == 0 and image["end"] == len(view)
+    if image["app"] is None and len(view) > ESP_APP_OFFSET and view[ESP_APP_OFFSET] == ESP_IMAGE_MAGIC:
+        image["app"] = parse_esp_image(view, ESP_APP_OFFSET)["app"]
+    return image
+
+
+def inspect_firmware_image(path: Path) -> Optional[Dict[str, object]]:
+    """Return header details for an ESP image, or ``None`` for non-image files.
+
+    The file is memory-mapped so only the header and segment table pages are
+    ever touched; nothing is verified.
+    """
+
+    if path.stat().st_size < ESP_IMAGE_HEADER.size:
+        return None
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            return _inspect_buffer(view)
+        finally:
+            view.release()
+
+
+class _EspImageReader:
+    """Sequential parse of one ESP image that starts ``offset`` bytes into a stream.
+
+    Walks the same header and segment table as :func:`parse_esp_image`, and
+    is the only place images are verified: the XOR checksum is folded in as
+    segment data passes and the appended SHA-256 is checked against a running
+    digest (or, for an image at offset 0, a digest supplied through
+    :meth:`EspImageStream.prefix_digest`).
+    """
+
+    HEADER, SEGMENT_HEADER, SEGMENT, PADDING, CHECKSUM, DIGEST, DONE = range(7)
+
+    def __init__(self, offset: int, *, own_digest: bool) -> None:
+        self.offset = offset
+        self.position = offset
+        self.state = self.HEADER
+        self.not_image = False
+        self.error: Optional[str] = None
+        self.mismatch: Optional[str] = None
+        self.header: Optional[Tuple[object, ...]] = None
+        self.segments: List[Tuple[int, int]] = []
+        self.checksum_offset: Optional[int] = None
+        self.prefix_digest: Optional[bytes] = None
+        self.appended: Optional[bytes] = None
+        self.app_start: Optional[int] = None
+        self.app_bytes = bytearray()
+        self._sha = hashlib.sha256() if own_digest else None
+        self._pending = bytearray()
+        self._segments_left = 0
+        self._remaining = 0
+        self._checksum = ESP_CHECKSUM_SEED
+
+    @property
+    def active(self) -> bool:
+        return self.state != self.DONE and not self.not_image and self.error is None
+
+    def _take(self, data: memoryview, count: int) -> memoryview:
+        taken = data[:count]
+        if self._sha is not None and self.state != self.DIGEST:
+            self._sha.update(taken)
+        self.position += len(taken)
+        return taken
+
+    def _collect(self, data: memoryview, size: int) -> Tuple[Optional[bytes], int]:
+        taken = self._take(data, size - len(self._pending))
+        self._pending += taken
+        if len(self._pending) < size:
+            return None, len(taken)
+        collected = bytes(self._pending)
+        self._pending.clear()
+        return collected, len(taken)
+
+    def _end_segment(self) -> None:
+        self._segments_left -= 1
+        if self._segments_left:
+            self.state = self.SEGMENT_HEADER
+            return
+        self.checksum_offset = self.position + 15 - ((self.position - self.offset) % 16)
+        self.state = self.PADDING if self.position < self.checksum_offset else self.CHECKSUM
+
+    def consume(self, data: memoryview) -> None:
+        """Consume bytes starting at :attr:`position`."""
+
+        while data and self.active:
+            if self.state == self.HEADER:
+                if not self._pending and data[0] != ESP_IMAGE_MAGIC:
+                    self.not_image = True
+                    break
+                raw, used = self._collect(data, ESP_IMAGE_HEADER.size)
+                if raw is not None:
+                    self.header = ESP_IMAGE_HEADER.unpack(raw)
+                    if not 0 < self.header[1] <= ESP_MAX_SEGMENTS:
+                        self.error = f"implausible segment count {self.header[1]}"
+                    else:
+                        self._segments_left = int(self.header[1])  # type: ignore[arg-type]
+                        self.state = self.SEGMENT_HEADER
+            elif self.state == self.SEGMENT_HEADER:
+                raw, used = self._collect(data, ESP_SEGMENT_HEADER.size)
+                if raw is not None:
+                    _, self._remaining = ESP_SEGMENT_HEADER.unpack(raw)
+                    self.segments.append((self.position, self._remaining))
+                    if self.app_start is None:
+                        self.app_start = self.position
+                    self.state = self.SEGMENT
+                    if not self._remaining:
+                        self._end_segment()
+            elif self.state == self.SEGMENT:
+                taken = self._take(data, self._remaining)
+                used = len(taken)
+                self._checksum ^= _xor_bytes(taken)
+                self._remaining -= used
+                if not self._remaining:
+                    self._end_segment()
+            elif self.state == self.PADDING:
+                assert self.checksum_offset is not None
+                used = len(self._take(data, self.checksum_offset - self.position))
+                if self.position == self.checksum_offset:
+                    self.state = self.CHECKSUM
+            elif self.state == self.CHECKSUM:
+                used = len(self._take(data, 1))
+                expected = data[0]
+                if self._checksum != expected:
+                    self.mismatch = (
+                        f"segment checksum mismatch (expected 0x{expected:02x}, "
+                        f"computed 0x{self._checksum:02x})"
+                    )
+                self.state = self.DIGEST if self._hash_appended else self.DONE
+            else:
+                raw, used = self._collect(data, 32)
+                if raw is not None:
+                    self.appended = raw
+                    self.state = self.DONE
+            data = data[used:]
+
+    @property
+    def _hash_appended(self) -> bool:
+        return self.header is not None and self.header[12] == 1
+
+    def finish(self) -> Dict[str, object]:
+        if self.error:
+            raise EspImageError(self.error)
+        if self.state != self.DONE:
+            if self.state == self.HEADER:
+                raise EspImageError("truncated image header")
+            if self.state == self.SEGMENT_HEADER:
+                raise EspImageError("truncated segment header")
+            if self.state == self.SEGMENT:
+                raise EspImageError(
+                    f"segment at 0x{self.segments[-1][0]:x} runs past the end of the file"
+                )
+            raise EspImageError("image is truncated before its checksum")
+        if self.mismatch:
+            raise EspImageError(self.mismatch)
+        assert self.header is not None
+        appended = self.appended
+        if appended is not None:
+            digest = self._sha.digest() if self._sha is not None else self.prefix_digest
+            if digest != appended:
+                raise EspImageError("appended SHA-256 does not match the image")
+        chip_id = int(self.header[7])  # type: ignore[arg-type]
+        return {
+            "offset": self.offset,
+            "end": self.position,
+            "chip_id": chip_id,
+            "chip_family": ESP_CHIP_IDS.get(chip_id),
+            "entry_point": self.header[4],
+            "segment_count": self.header[1],
+            "appended_sha256": appended.hex() if appended is not None else None,
+            "app": self.app_descriptor(),
+        }
+
+    def prefix_boundary(self) -> Optional[int]:
+        """End of the signed range while a supplied prefix digest is still due."""
+
+        if (
+            self._sha is not None
+            or self.checksum_offset is None
+            or self.prefix_digest is not None
+            or not self._hash_appended
+        ):
+            return None
+        return self.checksum_offset + 1
+
+    def app_descriptor(self) -> Optional[Dict[str, str]]:
+        if len(self.app_bytes) < ESP_APP_DESC.size:
+            return None
+        return parse_app_descriptor(memoryview(bytes(self.app_bytes)), 0)
+
+
+class EspImageStream:
+    """Sequential form of :func:`inspect_firmware_image` for data fed in order.
+
+    Finds images the same way (at offset 0, or a merged image's bootloader at
+    ``0x1000`` and app at ``0x10000``) and verifies them as the bytes arrive,
+    so hashing and verifying a binary take one read.
+    """
+
+    def __init__(self) -> None:
+        self.position = 0
+        self._primary: Optional[_EspImageReader] = None
+        self._app: Optional[_EspImageReader] = None
+
+    def _readers(self) -> List[_EspImageReader]:
+        return [reader for reader in (self._primary, self._app) if reader is not None]
+
+    def feed(self, data: memoryview) -> None:
+        start = self.position
+        if start == 0 and data:
+            if data[0] == ESP_IMAGE_MAGIC:
+                self._primary = _EspImageReader(0, own_digest=False)
+            elif data[0] == 0xFF:
+                self._primary = _EspImageReader(ESP32_BOOTLOADER_OFFSET, own_digest=True)
+        end = start + len(data)
+        for reader in self._readers():
+            self._dispatch(reader, data, start, end)
+        primary = self._primary
+        if (
+            primary is not None
+            and self._app is None
+            and start <= ESP_APP_OFFSET < end
+            and primary.app_descriptor() is None
+        ):
+            # Only consulted when the primary image has no app descriptor.
+            self._app = _EspImageReader(ESP_APP_OFFSET, own_digest=True)
+            self._dispatch(self._app, data, start, end)
+        self.position = end
+
+    @staticmethod
+    def _dispatch(reader: _EspImageReader, data: memoryview, start: int, end: int) -> None:
+        if reader.active and start <= reader.position < end:
+            reader.consume(data[reader.position - start :])
+        if reader.app_start is not None and len(reader.app_bytes) < ESP_APP_DESC.size:
+            window = reader.app_start + len(reader.app_bytes)
+            if start <= window < end:
+                needed = ESP_APP_DESC.size - len(reader.app_bytes)
+                reader.app_bytes += data[window - start : window - start + needed]
+
+    def digest_boundary(self) -> Optional[int]:
+        """Stream offset whose whole-stream SHA-256 the primary image needs, if pending."""
+
+        return self._primary.prefix_boundary() if self._primary is not None else None
+
+    def prefix_digest(self, digest: bytes) -> None:
+        assert self._primary is not None
+        self._primary.prefix_digest = digest
+
+    def result(self) -> Optional[Dict[str, object]]:
+        primary = self._primary
+        if self.position < ESP_IMAGE_HEADER.size or primary is None:
+            return None
+        if primary.offset and self.position <= primary.offset:
+            return None
+        if primary.not_image:
+            return None
+        image = primary.finish()
+        image["whole_file"] = primary.offset == 0 and image["end"] == self.position
+        app = self._app
+        if image["app"] is None and app is not None and not app.not_image:
+            image["app"] = app.finish()["app"]
+        return image
+
+
+def _load_json_cache(path: Optional[Path], version: int) -> Dict[str, object]:
+    """Return the ``entries`` of a versioned JSON cache file, or an empty dict."""
+
+    if path is None or not path.exists():
+        return {}
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("version") != version:
+        return {}
+    entries = payload.get("entries")
+    return entries if isinstance(entries, dict) else {}
+
+
+def _save_json_cache(path: Path, version: int, entries: Dict[str, object]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"version": version, "entries": entries}
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(payload, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def compute_digest_record(path: Path, *, chunk_size: Optional[int] = None) -> Dict[str, object]:
+    """Hash and inspect ``path`` from scratch, as a :class:`DigestCache` miss does.
+
+    The digests, chunk table and ESP image checks all come from one read.
+    Touches no shared state, so misses can be computed on worker threads and
+    handed to :meth:`DigestCache.store` afterwards.
+    """
+
+    accumulator = hash_file(path, chunk_size=chunk_size, inspect_image=True)
+    md5, sha256, signature = accumulator.result()
+    record: Dict[str, object] = {
+        "md5": md5,
+        "sha256": sha256,
+        "signature": signature,
+        "image": accumulator.image(),
+    }
+    if chunk_size:
+        record["chunks"] = accumulator.chunk_table()
+    return record
+
+
+DIGEST_CACHE_VERSION = 2
+DIGEST_CACHE_FILENAME = "digests.json"
+
+
+class DigestCache:
+    """Memoise firmware digests per inode within a run and per file across runs.
+
+    Hardlinked binaries share an inode, so they are hashed once per run. When a
+    cache directory is configured the digests are also persisted and reused as
+    long as the file size and mtime are unchanged.
+
+    With ``trust_embedded_digest`` a single-image binary whose appended SHA-256
+    matches a cached record is not re-read at all, even if its mtime changed
+    (for example after a fresh checkout). It cannot help a cold cache: the
+    MD5 and signature cover the whole file, so a binary with no matching
+    record is always read once.
+
+    With ``chunk_size`` every record also carries a chunk table (see
+    :meth:`DigestAccumulator.chunk_table`) computed in the same read; cached
+    records without a table for that size count as misses.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        *,
+        trust_embedded_digest: bool = False,
+        chunk_size: Optional[int] = None,
+    ) -> None:
+        self.path = path
+        self.trust_embedded_digest = trust_embedded_digest
+        self.chunk_size = chunk_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Dict[str, object]] = {}
+        self._by_inode: Dict[Tuple[int, int], Dict[str, object]] = {}
+        self._by_embedded: Dict[Tuple[str, int], Dict[str, object]] = {}
+        self._dirty = False
+        self._entries = _load_json_cache(path, DIGEST_CACHE_VERSION)  # type: ignore[assignment]
+        for record in self._entries.values():
+            self._index_embedded(record)
+
+    def _index_embedded(self, record: Dict[str, object]) -> None:
+        image = record.get("image")
+        if isinstance(image, dict) and image.get("whole_file") and image.get("appended_sha256"):
+            self._by_embedded[(str(image["appended_sha256"]), int(record["size"]))] = record
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return path.resolve().as_posix()
+
+    @staticmethod
+    def _is_fresh(record: Optional[Dict[str, object]], stat: os.stat_result) -> bool:
+        return (
+            record is not None
+            and record.get("size") == stat.st_size
+            and record.get("mtime_ns") == stat.st_mtime_ns
+        )
+
+    def _has_chunks(self, record: Dict[str, object]) -> bool:
+        if self.chunk_size is None:
+            return True
+        chunks = record.get("chunks")
+        return isinstance(chunks, dict) and chunks.get("size") == self.chunk_size
+
+    def lookup(self, path: Path, stat: Optional[os.stat_result] = None) -> Optional[Dict[str, object]]:
+        stat = stat or path.stat()
+        record = self._by_inode.get((stat.st_dev, stat.st_ino))
+        if not self._is_fresh(record, stat):
+            record = self._entries.get(self._key(path))
+        if not self._is_fresh(record, stat) or not self._has_chunks(record):
+            return None
+        return record
+
+    def store(self, path: Path, stat: os.stat_result, record: Dict[str, object]) -> Dict[str, object]:
+        record = dict(record, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        self._entries[self._key(path)] = record
+        self._by_inode[(stat.st_dev, stat.st_ino)] = record
+        self._index_embedded(record)
+        self._dirty = True
+        return record
+
+    def _embedded_match(self, path: Path, stat: os.stat_result) -> Optional[Dict[str, object]]:
+        # Structural parse only: truncated images are still rejected, but no
+        # segment data is read.
+        image = inspect_firmware_image(path)
+        if not image or not image.get("whole_file") or not image.get("appended_sha256"):
+            return None
+        return self._by_embedded.get((str(image["appended_sha256"]), stat.st_size))
+
+    def record(self, path: Path) -> Dict[str, object]:
+        stat = path.stat()
+        cached = self.lookup(path, stat)
+        if cached is not None:
+            self.hits += 1
+            self._by_inode[(stat.st_dev, stat.st_ino)] = cached
+            # Re-key under this path so hardlinked siblings persist too.
+            key = self._key(path)
+            if self._entries.get(key) is not cached:
+                self._entries[key] = cached
+                self._dirty = True
+            return cached
+        if self.trust_embedded_digest:
+            trusted = self._embedded_match(path, stat)
+            if trusted is not None and self._has_chunks(trusted):
+                self.hits += 1
+                return self.store(path, stat, trusted)
+        self.misses += 1
+        return self.store(path, stat, compute_digest_record(path, chunk_size=self.chunk_size))
+
+    def record_streamed(self, path: Path, accumulator: DigestAccumulator) -> Dict[str, object]:
+        """Store what ``accumulator`` computed while ``path`` was being written.
+
+        The accumulator must have been created with ``inspect_image`` (and this
+        cache's ``chunk_size``), so the file is not read again.
+        """
+        stat = path.stat()
+        md5, sha256, signature = accumulator.result()
+        self.misses += 1
+        record = {
+            "md5": md5,
+            "sha256": sha256,
+            "signature": signature,
+            "image": accumulator.image(),
+        }
+        chunks = accumulator.chunk_table()
+        if chunks is not None:
+            record["chunks"] = chunks
+        return self.store(path, stat, record)
+
+    def digests(self, path: Path) -> Tuple[str, str, str]:
+        record = self.record(path)
+        return str(record["md5"]), str(record["sha256"]), str(record["signature"])
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        _save_json_cache(self.path, DIGEST_CACHE_VERSION, self._entries)  # type: ignore[arg-type]
+        self._dirty = False
 
 
 def detect_chip_family(metadata: FirmwareMetadata, path: Path) -> str:
@@ -555,84 +1299,253 @@ def _version_sort_key(version: str) -> Tuple[Tuple[int, ...], int, str]:
     return (neg_parts, -stability, suffix)
 
 
+def parse_binary_metadata(
+    bin_path: Path,
+    firmware_dir: Path,
+    *,
+    default_channel: str = DEFAULT_CHANNEL,
+) -> FirmwareMetadata:
+    try:
+        rel_parts = bin_path.relative_to(firmware_dir).parts
+    except ValueError:
+        rel_parts = ()
+    force_config = bool(rel_parts) and rel_parts[0] == "configurations"
+    try:
+        return parse_firmware_metadata(
+            bin_path,
+            default_channel=default_channel,
+            force_configuration=force_config,
+        )
+    except ValueError as exc:  # pragma: no cover - fatal validation
+        raise SystemExit(f"Unable to parse metadata from {bin_path}: {exc}") from exc
+
+
+def build_artifact(
+    bin_path: Path,
+    firmware_dir: Path,
+    repo_root: Path,
+    *,
+    dry_run: bool = False,
+    default_channel: str = DEFAULT_CHANNEL,
+    digest_cache: DigestCache,
+) -> FirmwareArtifact:
+    """Parse, normalise the location of and digest one firmware binary."""
+
+    metadata = parse_binary_metadata(bin_path, firmware_dir, default_channel=default_channel)
+    target_path = metadata.target_path(firmware_dir)
+    source_path = bin_path
+    if bin_path.resolve() != target_path.resolve():
+        if dry_run:
+            print(f"[dry-run] Would move {bin_path} -> {target_path}")
+        else:
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            if target_path.exists():
+                target_path.unlink()
+            bin_path.replace(target_path)
+            print(f"Normalised firmware path: {bin_path} → {target_path}")
+            source_path = target_path
+    else:
+        source_path = bin_path
+    try:
+        record = digest_cache.record(source_path)
+    except EspImageError as exc:
+        raise SystemExit(f"Invalid ESP image {bin_path}: {exc}") from exc
+    image = record.get("image") or {}
+    chip_family = (
+        image.get("chip_family")
+        or metadata.chip_family
+        or detect_chip_family(metadata, target_path)
+    )
+    md5, sha256, signature = (
+        str(record["md5"]),
+        str(record["sha256"]),
+        str(record["signature"]),
+    )
+    stat = source_path.stat()
+    build_date = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()
+    rel_path = Path(os.path.relpath(target_path, repo_root)).as_posix()
+    return FirmwareArtifact(
+        path=target_path,
+        metadata=metadata,
+        relative_path=rel_path,
+        chip_family=chip_family,
+        md5=md5,
+        sha256=sha256,
+        signature=signature,
+        file_size=stat.st_size,
+        build_date=build_date,
+        image=record.get("image"),
+    )
+
+
 def collect_firmware(
     firmware_dir: Path,
     repo_root: Path,
     *,
     dry_run: bool = False,
     default_channel: str = DEFAULT_CHANNEL,
+    digest_cache: Optional[DigestCache] = None,
+    exclude: Optional[Set[Path]] = None,
+    skip_dirs: Sequence[Path] = (),
+    scope: Optional[Callable[[Optional[str], str], bool]] = None,
 ) -> List[FirmwareArtifact]:
+    """Build an artifact for every binary under ``firmware_dir``.
+
+    With ``scope`` (see :func:`build_scope`) only binaries whose filename
+    config string and channel it accepts are moved and hashed.
+    """
     artifacts: List[FirmwareArtifact] = []
     if not firmware_dir.exists():
         return artifacts
+    if digest_cache is None:
+        digest_cache = DigestCache()
     for bin_path in sorted(firmware_dir.rglob("*.bin")):
-        try:
-            rel_parts = bin_path.relative_to(firmware_dir).parts
-        except ValueError:
-            rel_parts = ()
-        force_config = rel_parts and rel_parts[0] == "configurations"
-        try:
-            metadata = parse_firmware_metadata(
+        if exclude and bin_path.resolve() in exclude:
+            continue
+        if any(bin_path.is_relative_to(skip_dir) for skip_dir in skip_dirs):
+            continue
+        if scope:
+            meta = parse_binary_metadata(bin_path, firmware_dir, default_channel=default_channel)
+            if not scope(meta.config_string if meta.is_configuration else None, meta.channel):
+                continue
+        artifacts.append(
+            build_artifact(
                 bin_path,
+                firmware_dir,
+                repo_root,
+                dry_run=dry_run,
                 default_channel=default_channel,
-                force_configuration=force_config,
-            )
-        except ValueError as exc:  # pragma: no cover - fatal validation
-            raise SystemExit(f"Unable to parse metadata from {bin_path}: {exc}") from exc
-        target_path = metadata.target_path(firmware_dir)
-        source_path = bin_path
-        if bin_path.resolve() != target_path.resolve():
-            if dry_run:
-                print(f"[dry-run] Would move {bin_path} -> {target_path}")
-            else:
-                target_path.parent.mkdir(parents=True, exist_ok=True)
-                if target_path.exists():
-                    target_path.unlink()
-                bin_path.replace(target_path)
-                print(f"Normalised firmware path: {bin_path} → {target_path}")
-                source_path = target_path
-        else:
-            source_path = bin_path
-        chip_family = metadata.chip_family or detect_chip_family(metadata, target_path)
-        md5, sha256, signature = compute_digests(source_path)
-        stat = source_path.stat()
-        build_date = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()
-        rel_path = Path(os.path.relpath(target_path, repo_root)).as_posix()
-        artifacts.append(
-            FirmwareArtifact(
-                path=target_path,
-                metadata=metadata,
-                relative_path=rel_path,
-                chip_family=chip_family,
-                md5=md5,
-                sha256=sha256,
-                signature=signature,
-                file_size=stat.st_size,
-                build_date=build_date,
+                digest_cache=digest_cache,
             )
         )
     return artifacts
 
 
+def _format_build_date(timestamp: float) -> str:
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).isoformat()
+
+
+def descriptor_build_date(image: Optional[Dict[str, object]]) -> Optional[str]:
+    """Build date from the app descriptor's __DATE__/__TIME__ strings, as UTC."""
+
+    app = (image or {}).get("app")
+    if not isinstance(app, dict):
+        return None
+    compile_date = " ".join(str(app.get("compile_date") or "").split())
+    compile_time = str(app.get("compile_time") or "").strip()
+    if not compile_date or not compile_time:
+        return None
+    try:
+        parsed = datetime.strptime(f"{compile_date} {compile_time}", "%b %d %Y %H:%M:%S")
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc).isoformat()
+
+
+def git_commit_times(paths: Sequence[Path], repo_root: Path) -> Dict[Path, int]:
+    """Committer time of the last commit touching each path, from one ``git log``."""
+
+    def _git(*command: str) -> Optional[str]:
+        try:
+            result = subprocess.run(
+                ["git", "-c", "core.quotePath=false", "-C", str(repo_root), *command],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return result.stdout
+
+    top_level = _git("rev-parse", "--show-toplevel")
+    if not top_level or not paths:
+        return {}
+    git_root = Path(top_level.strip()).resolve()
+    wanted = {path.resolve() for path in paths}
+    pathspecs = sorted({os.path.relpath(path.parent, repo_root) for path in wanted})
+    output = _git("log", "--format=@%ct", "--name-only", "--", *pathspecs)
+    times: Dict[Path, int] = {}
+    current: Optional[int] = None
+    for line in (output or "").splitlines():
+        if line.startswith("@"):
+            current = int(line[1:])
+            continue
+        if not line or current is None:
+            continue
+        candidate = (git_root / line).resolve()
+        if candidate in wanted and candidate not in times:
+            times[candidate] = current
+    return times
+
+
+def apply_reproducible_build_dates(
+    artifacts: Sequence[FirmwareArtifact],
+    repo_root: Path,
+    *,
+    source_date_epoch: Optional[str] = None,
+) -> None:
+    """Replace mtime-based ``build_date`` values with reproducible ones.
+
+    Sources, in order: the embedded app descriptor's compile date, the commit
+    time of the last git commit touching the binary, the release asset's
+    ``updated_at`` (``source_date``, for binaries synced from a release), then
+    ``SOURCE_DATE_EPOCH``. A binary with none of these aborts the run.
+    """
+    epoch: Optional[int] = None
+    if source_date_epoch:
+        try:
+            epoch = int(source_date_epoch)
+        except ValueError as exc:
+            raise SystemExit(f"SOURCE_DATE_EPOCH must be an integer: {source_date_epoch!r}") from exc
+    commit_times = git_commit_times([artifact.path for artifact in artifacts], repo_root)
+    for artifact in artifacts:
+        build_date = descriptor_build_date(artifact.image)
+        if build_date is None and artifact.path.resolve() in commit_times:
+            build_date = _format_build_date(commit_times[artifact.path.resolve()])
+        if build_date is None and artifact.source_date is not None:
+            build_date = _format_build_date(artifact.source_date)
+        if build_date is None and epoch is not None:
+            build_date = _format_build_date(epoch)
+        if build_date is None:
+            raise SystemExit(
+                f"No reproducible build date for {artifact.relative_path}: it has no app "
+                "descriptor, is not committed, and SOURCE_DATE_EPOCH is not set."
+            )
+        artifact.build_date = build_date
+
+
+def build_group_key(metadata: FirmwareMetadata) -> Tuple[object, ...]:
+    """Key shared by every version of one configuration (or legacy model) and channel."""
+
+    if metadata.is_configuration:
+        return ("config", metadata.config_string, metadata.channel)
+    return (
+        "legacy",
+        metadata.model,
+        metadata.variant,
+        metadata.sensor_addon,
+        metadata.channel,
+    )
+
+
 def select_latest_builds(
     artifacts: Sequence[FirmwareArtifact],
-) -> Tuple[List[FirmwareArtifact], List[Tuple[FirmwareArtifact, FirmwareArtifact]]]:
-    """Identify newer builds without discarding older versions."""
+) -> Tuple[
+    List[FirmwareArtifact],
+    List[Tuple[FirmwareArtifact, FirmwareArtifact]],
+    Dict[Tuple[object, ...], FirmwareArtifact],
+]:
+    """Identify newer builds without discarding older versions.
+
+    Returns every artifact, the (older, newer) superseded pairs, and the
+    newest artifact per :func:`build_group_key`.
+    """
 
     best: Dict[Tuple[object, ...], FirmwareArtifact] = {}
     superseded: List[Tuple[FirmwareArtifact, FirmwareArtifact]] = []
     for artifact in artifacts:
         meta = artifact.metadata
-        if meta.is_configuration:
-            key = ("config", meta.config_string, meta.channel)
-        else:
-            key = (
-                "legacy",
-                meta.model,
-                meta.variant,
-                meta.sensor_addon,
-                meta.channel,
-            )
+        key = build_group_key(meta)
         current = best.get(key)
         if current is None:
             best[key] = artifact
@@ -642,405 +1555,3211 @@ def select_latest_builds(
             best[key] = artifact
         elif version_is_newer(current.metadata.version, meta.version):
             superseded.append((artifact, current))
-    return list(artifacts), superseded
+    return list(artifacts), superseded, best
 
 
-def sort_artifacts(artifacts: Sequence[FirmwareArtifact]) -> List[FirmwareArtifact]:
-    config_builds = [a for a in artifacts if a.metadata.is_configuration]
-    legacy_builds = [a for a in artifacts if not a.metadata.is_configuration]
-    config_builds.sort(key=lambda art: _version_sort_key(art.metadata.version))
-    config_builds.sort(
-        key=lambda art: (
-            (art.metadata.config_string or "").lower(),
-            CHANNEL_ORDER.get(art.metadata.channel, 99),
-        )
+def _build_sort_key(
+    is_configuration: bool,
+    names: Sequence[Optional[str]],
+    channel: str,
+    version: str,
+) -> Tuple[object, ...]:
+    # Configurations first, then legacy builds; each grouped by name and
+    # channel, newest version first.
+    return (
+        0 if is_configuration else 1,
+        tuple((name or "").lower() for name in names),
+        CHANNEL_ORDER.get(channel, 99),
+        _version_sort_key(version),
     )
-    legacy_builds.sort(key=lambda art: _version_sort_key(art.metadata.version))
-    legacy_builds.sort(
-        key=lambda art: (
-            (art.metadata.model or "").lower(),
-            (art.metadata.variant or "").lower(),
-            (art.metadata.sensor_addon or "").lower(),
-            CHANNEL_ORDER.get(art.metadata.channel, 99),
-        )
+
+
+def artifact_sort_key(artifact: FirmwareArtifact) -> Tuple[object, ...]:
+    meta = artifact.metadata
+    if meta.is_configuration:
+        return _build_sort_key(True, [meta.config_string], meta.channel, meta.version)
+    return _build_sort_key(
+        False, [meta.model, meta.variant, meta.sensor_addon], meta.channel, meta.version
     )
-    return config_builds + legacy_builds
 
 
-def determine_manifest_version(artifacts: Sequence[FirmwareArtifact]) -> str:
-    stable_versions = []
-    beta_versions = []
-    fallback_versions = []
-    for artifact in artifacts:
-        channel = canonical_channel(artifact.metadata.channel, DEFAULT_CHANNEL)
-        if channel == "stable":
-            stable_versions.append(artifact.metadata.version)
-        elif channel == "beta":
-            beta_versions.append(artifact.metadata.version)
-        else:
-            fallback_versions.append(artifact.metadata.version)
-    candidates = stable_versions or beta_versions or fallback_versions
-    if not candidates:
-        return "0.0.0"
-    best_version = candidates[0]
-    for candidate in candidates[1:]:
-        if version_is_newer(candidate, best_version):
-            best_version = candidate
-    return best_version
+def entry_sort_key(entry: Dict[str, object]) -> Tuple[object, ...]:
+    """:func:`artifact_sort_key` for a build entry read back from manifest.json."""
 
+    channel, version = str(entry.get("channel", "")), str(entry.get("version", ""))
+    if "config_string" in entry:
+        return _build_sort_key(True, [entry.get("config_string")], channel, version)  # type: ignore[list-item]
+    names = [entry.get(key) for key in ("model", "variant", "sensor_addon")]
+    return _build_sort_key(False, names, channel, version)  # type: ignore[arg-type]
 
-def build_manifest(artifacts: Sequence[FirmwareArtifact]) -> Dict[str, object]:
-    return {
-        "name": "Sense360 Modular Platform Firmware",
-        "version": determine_manifest_version(artifacts),
-        "home_assistant_domain": "esphome",
-        "funding_url": "https://sense360store.com/support",
-        "new_install_prompt_erase": True,
-        "new_install_improv_wait_time": 15,
-        "builds": [artifact.manifest_entry() for artifact in artifacts],
-    }
 
+def sort_artifacts(artifacts: Sequence[FirmwareArtifact]) -> List[FirmwareArtifact]:
+    return sorted(artifacts, key=artifact_sort_key)
 
-def _collect_deprecated_module_hits(values: Sequence[str]) -> List[str]:
-    hits: List[str] = []
-    for value in values:
-        parts = [part for part in value.split("-") if part]
-        for part in parts:
-            if part.lower() in DEPRECATED_MODULE_TOKENS:
-                hits.append(part)
-    return hits
 
+def _parse_build_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
 
-def validate_no_deprecated_modules(artifacts: Sequence[FirmwareArtifact]) -> None:
-    for artifact in artifacts:
-        meta = artifact.metadata
-        if not meta.is_configuration:
-            continue
-        deprecated_hits = _collect_deprecated_module_hits([meta.config_string or ""])
-        deprecated_hits.extend(_collect_deprecated_module_hits(meta.modules))
-        deprecated_hits.extend(_collect_deprecated_module_hits([meta.description]))
-        if deprecated_hits:
-            hits = ", ".join(sorted(set(deprecated_hits), key=str.lower))
-            raise SystemExit(
-                f"Deprecated module name(s) found in {artifact.path.name}: {hits}. "
-                "Use current module taxonomy (for example: AirIQ, VentIQ)."
-            )
 
+def parse_retain_since(value: str) -> datetime:
+    """argparse type for ``--retain-since`` (an ISO date or timestamp, UTC if naive)."""
 
+    parsed = _parse_build_date(value)
+    if parsed is None:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r} (expected YYYY-MM-DD)")
+    return parsed
 
 
-def validate_structured_config_consistency(artifacts: Sequence[FirmwareArtifact]) -> None:
-    mismatches: List[str] = []
+def apply_retention(
+    artifacts: Sequence[FirmwareArtifact],
+    *,
+    keep_versions: Optional[int] = None,
+    keep_since: Optional[datetime] = None,
+) -> Tuple[List[FirmwareArtifact], List[FirmwareArtifact]]:
+    """Split ``artifacts`` into (retained, archived), preserving their order.
+
+    A build is retained if it is among the ``keep_versions`` newest of its
+    :func:`build_group_key`, or was built at or after ``keep_since``. The
+    newest build of every group is always retained. Without either limit
+    nothing is archived.
+    """
+
+    if keep_versions is None and keep_since is None:
+        return list(artifacts), []
+    groups: Dict[Tuple[object, ...], List[FirmwareArtifact]] = {}
     for artifact in artifacts:
-        meta = artifact.metadata
-        if not meta.is_configuration or not meta.config_string:
-            continue
-        tokens = [token for token in meta.config_string.split("-") if token]
-        token_set = {token.upper() for token in tokens}
-        required_power_tokens = token_set.intersection(EXACT_POWER_TOKENS)
-        if required_power_tokens and meta.power is None:
-            mismatches.append(
-                f"{artifact.path.name}: config_string includes {sorted(required_power_tokens)} but power is null"
-            )
-            continue
-        if meta.power is not None and meta.power.upper() in EXACT_POWER_TOKENS and meta.power.upper() not in token_set:
-            mismatches.append(
-                f"{artifact.path.name}: power='{meta.power}' not present in config_string='{meta.config_string}'"
-            )
-    if mismatches:
-        joined = "\n  - "+"\n  - ".join(mismatches)
-        raise SystemExit(
-            "Structured metadata/config_string mismatch detected:" + joined
-        )
+        groups.setdefault(build_group_key(artifact.metadata), []).append(artifact)
+    archived_ids: Set[int] = set()
+    for members in groups.values():
+        members = sorted(members, key=lambda art: _version_sort_key(art.metadata.version))
+        for rank, artifact in enumerate(members):
+            if rank == 0:
+                continue
+            if keep_versions is not None and rank < keep_versions:
+                continue
+            if keep_since is not None:
+                built = _parse_build_date(artifact.build_date)
+                if built is not None and built >= keep_since:
+                    continue
+            archived_ids.add(id(artifact))
+    retained = [artifact for artifact in artifacts if id(artifact) not in archived_ids]
+    archived = [artifact for artifact in artifacts if id(artifact) in archived_ids]
+    return retained, archived
 
 
-# Minimum firmware size below which we suspect a placeholder / corrupted binary.
-# 100 KB chosen because real ESP32-S3 application partitions are ~500 KB+; anything
-# smaller than this is almost certainly a stub. The repo currently ships some 18-byte
-# placeholder binaries, so this threshold is enforced as a warning by default and
-# only fails the build when --strict-validate is passed.
-DEFAULT_MIN_FIRMWARE_SIZE_BYTES = 100 * 1024
+DEDUPE_MODES = ("off", "report", "canonical", "hardlink")
 
-# Sentinel size for the placeholder stubs already committed (18-byte files). Anything
-# at or below this is treated as "intentional placeholder" rather than a suspicious
-# size. Production firmware will not produce values this low.
-PLACEHOLDER_FIRMWARE_SIZE_BYTES = 64
 
+def find_duplicate_binaries(
+    artifacts: Sequence[FirmwareArtifact],
+) -> List[Tuple[FirmwareArtifact, List[FirmwareArtifact]]]:
+    """Group byte-identical artifacts; the first of each group is canonical."""
 
-def validate_manifest_metadata(
+    groups: Dict[str, List[FirmwareArtifact]] = {}
+    for artifact in artifacts:
+        groups.setdefault(artifact.sha256, []).append(artifact)
+    return [(members[0], members[1:]) for members in groups.values() if len(members) > 1]
+
+
+def _same_file(first: Path, second: Path) -> bool:
+    try:
+        return os.path.samefile(first, second)
+    except OSError:
+        return False
+
+
+def _hardlink_over(source: Path, target: Path) -> None:
+    staging = target.with_name(f".{target.name}.link")
+    if staging.exists():
+        staging.unlink()
+    os.link(source, staging)
+    os.replace(staging, target)
+
+
+def deduplicate_binaries(
     artifacts: Sequence[FirmwareArtifact],
     *,
-    min_firmware_size: int = DEFAULT_MIN_FIRMWARE_SIZE_BYTES,
-    strict: bool = False,
-) -> List[str]:
-    """Run trust-signal checks across the generated manifest entries.
+    mode: str,
+    dry_run: bool,
+) -> int:
+    """Report identical binaries and optionally collapse them.
 
-    Findings are returned as a list of human-readable strings. When ``strict`` is
-    set, the caller should treat a non-empty list as a build failure; otherwise
-    they're informational warnings printed to stderr.
+    ``canonical`` points every duplicate manifest entry at the canonical binary
+    path and deletes the duplicate files, so they are neither published nor
+    reported as orphans by ``verify``; ``hardlink`` replaces duplicate files on
+    disk with hardlinks to it. Returns the number of redundant bytes detected.
     """
 
-    findings: List[str] = []
+    if mode == "off":
+        return 0
+    duplicates = find_duplicate_binaries(artifacts)
+    if not duplicates:
+        return 0
+    redundant = 0
+    copies_total = 0
+    print("Detected byte-identical firmware binaries:")
+    for canonical, copies in duplicates:
+        print(f"  - {canonical.relative_path} (sha256 {canonical.sha256[:12]})")
+        for copy in copies:
+            copies_total += 1
+            linked = _same_file(canonical.path, copy.path)
+            suffix = " (already hardlinked)" if linked else ""
+            print(f"      duplicate: {copy.relative_path}{suffix}")
+            if not linked:
+                redundant += copy.file_size
+            if mode == "canonical":
+                duplicate = copy.path
+                copy.path = canonical.path
+                copy.relative_path = canonical.relative_path
+                if dry_run:
+                    print(f"[dry-run] Would remove {duplicate}")
+                    continue
+                duplicate.unlink(missing_ok=True)
+                print(f"      removed {duplicate.name}")
+            elif mode == "hardlink" and not linked:
+                if dry_run:
+                    print(f"[dry-run] Would hardlink {copy.path} -> {canonical.path}")
+                    continue
+                try:
+                    _hardlink_over(canonical.path, copy.path)
+                except OSError as exc:
+                    print(
+                        f"      Unable to hardlink {copy.path.name} ({exc}); keeping the copy.",
+                        file=sys.stderr,
+                    )
+    print(f"  {copies_total} duplicate(s), {redundant} redundant byte(s) on disk.")
+    return redundant
 
-    for artifact in artifacts:
-        meta = artifact.metadata
-        name = artifact.path.name
 
-        # 1. description should reference the config_string for configuration builds.
-        # Rescue is exempt: it ships a hand-written human description rather than
-        # the boilerplate "{Channel} firmware for Sense360 X configuration." form.
-        if meta.is_configuration and meta.config_string and meta.channel != "rescue":
-            description = (meta.description or "").lower()
-            if description and meta.config_string.lower() not in description:
-                findings.append(
-                    f"{name}: description does not reference config_string "
-                    f"'{meta.config_string}' (got: {meta.description!r})."
-                )
+# Delta packages are a small copy/add instruction stream compressed with zlib:
+#   magic "S36D\x01", varint(target_size), zlib(ops)
+# where each op is 0x00 varint(source_offset) varint(length) (copy from the
+# previous image) or 0x01 varint(length) <bytes> (literal data).
+DELTA_MAGIC = b"S36D\x01"
+DELTA_SUFFIX = ".s360delta"
+DELTA_BLOCK_SIZE = 64
+DEFAULT_DELTA_MIN_SAVINGS = 0.25
+_DELTA_COPY = 0
+_DELTA_ADD = 1
 
-        # 2. every entry in modules should appear in config_string (case-insensitive).
-        if meta.is_configuration and meta.modules and meta.config_string:
-            cs_lower = meta.config_string.lower()
-            stray = [m for m in meta.modules if m.lower() not in cs_lower]
-            if stray:
-                findings.append(
-                    f"{name}: modules {stray} not present in config_string "
-                    f"'{meta.config_string}'."
-                )
 
-        # 3. file_size sanity. Skip entries we deliberately ship as placeholders.
-        if PLACEHOLDER_FIRMWARE_SIZE_BYTES < artifact.file_size < min_firmware_size:
-            findings.append(
-                f"{name}: file_size={artifact.file_size} bytes is below the "
-                f"plausible-firmware threshold ({min_firmware_size} bytes). "
-                "Verify this isn't a truncated build."
-            )
+def _encode_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
 
-        # 4. stable channel without any release-note signal at all.
-        if meta.channel == "stable" and meta.is_configuration:
-            has_features = bool(meta.features)
-            has_hardware = bool(meta.hardware_requirements)
-            if not has_features and not has_hardware:
-                findings.append(
-                    f"{name}: stable build has no features and no hardware_requirements; "
-                    "consider adding a release-notes .md so users get context."
-                )
 
-    return findings
+def _decode_varint(data: bytes, position: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if position >= len(data):
+            raise ValueError("Truncated varint in delta package")
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
 
 
-def validate_no_placeholder_descriptions(artifacts: Sequence[FirmwareArtifact]) -> List[str]:
-    """Soft check: catch obvious description/config drift like the historical
-    'AirIQPro described as a minimal configuration with no expansion modules'.
-    Returns findings (never raises)."""
+def _match_length(source: bytes, src: int, target: bytes, dst: int) -> int:
+    limit = min(len(source) - src, len(target) - dst)
+    length = 0
+    step = 4096
+    while step:
+        while (
+            length + step <= limit
+            and source[src + length : src + length + step]
+            == target[dst + length : dst + length + step]
+        ):
+            length += step
+        step //= 2
+    return length
 
-    findings: List[str] = []
-    minimal_phrases = ("no expansion modules", "minimal configuration", "no modules")
-    for artifact in artifacts:
-        meta = artifact.metadata
-        if not meta.is_configuration or not meta.modules or not meta.description:
+
+def compute_delta(source: bytes, target: bytes, *, block_size: int = DELTA_BLOCK_SIZE) -> bytes:
+    """Encode ``target`` as copies from ``source`` plus literal runs."""
+
+    index: Dict[bytes, int] = {}
+    for offset in range(0, len(source) - block_size + 1, block_size):
+        index.setdefault(source[offset : offset + block_size], offset)
+    ops = bytearray()
+
+    def emit_literal(data: bytes) -> None:
+        ops.append(_DELTA_ADD)
+        _encode_varint(len(data), ops)
+        ops.extend(data)
+
+    literal_start = 0
+    position = 0
+    limit = len(target) - block_size
+    while position <= limit:
+        match = index.get(target[position : position + block_size])
+        if match is None:
+            position += 1
             continue
-        desc_lower = meta.description.lower()
-        for phrase in minimal_phrases:
-            if phrase in desc_lower:
-                findings.append(
-                    f"{artifact.path.name}: description claims '{phrase}' but build "
-                    f"has modules {meta.modules}."
-                )
-                break
-    return findings
+        src, dst = match, position
+        while src > 0 and dst > literal_start and source[src - 1] == target[dst - 1]:
+            src -= 1
+            dst -= 1
+        length = _match_length(source, src, target, dst)
+        if dst > literal_start:
+            emit_literal(target[literal_start:dst])
+        ops.append(_DELTA_COPY)
+        _encode_varint(src, ops)
+        _encode_varint(length, ops)
+        position = dst + length
+        literal_start = position
+    if literal_start < len(target):
+        emit_literal(target[literal_start:])
+    header = bytearray(DELTA_MAGIC)
+    _encode_varint(len(target), header)
+    return bytes(header) + zlib.compress(bytes(ops), 9)
 
 
-def write_json_file(path: Path, data: Dict[str, object], *, dry_run: bool) -> None:
-    if dry_run:
-        print(f"[dry-run] Would write {path}")
-        return
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as handle:
-        json.dump(data, handle, indent=2)
-        handle.write("\n")
+def apply_delta(source: bytes, delta: bytes) -> bytes:
+    if not delta.startswith(DELTA_MAGIC):
+        raise ValueError("Not a Sense360 delta package")
+    expected_size, position = _decode_varint(delta, len(DELTA_MAGIC))
+    ops = zlib.decompress(delta[position:])
+    output = bytearray()
+    position = 0
+    while position < len(ops):
+        kind = ops[position]
+        position += 1
+        if kind == _DELTA_COPY:
+            offset, position = _decode_varint(ops, position)
+            length, position = _decode_varint(ops, position)
+            if offset + length > len(source):
+                raise ValueError("Delta copy exceeds the source image")
+            output.extend(source[offset : offset + length])
+        elif kind == _DELTA_ADD:
+            length, position = _decode_varint(ops, position)
+            output.extend(ops[position : position + length])
+            position += length
+        else:
+            raise ValueError(f"Unknown delta opcode {kind}")
+    if len(output) != expected_size:
+        raise ValueError("Delta output size does not match its header")
+    return bytes(output)
 
 
-def write_individual_manifests(
+def consecutive_version_pairs(
     artifacts: Sequence[FirmwareArtifact],
-    prefix: Path,
+) -> List[Tuple[FirmwareArtifact, FirmwareArtifact]]:
+    """Return (previous, next) pairs per configuration and channel, oldest first."""
+
+    groups: Dict[Tuple[object, ...], List[FirmwareArtifact]] = {}
+    for artifact in artifacts:
+        groups.setdefault(build_group_key(artifact.metadata), []).append(artifact)
+    pairs: List[Tuple[FirmwareArtifact, FirmwareArtifact]] = []
+    for members in groups.values():
+        members = sorted(members, key=lambda art: _version_sort_key(art.metadata.version))
+        members.reverse()
+        pairs.extend(zip(members, members[1:]))
+    return pairs
+
+
+def generate_deltas(
+    artifacts: Sequence[FirmwareArtifact],
+    delta_dir: Path,
     repo_root: Path,
     *,
+    cache_dir: Optional[Path] = None,
+    min_savings: float = DEFAULT_DELTA_MIN_SAVINGS,
     dry_run: bool,
-) -> None:
-    base_dir = (repo_root / prefix.parent).resolve()
-    prefix_name = prefix.name
-    if base_dir.exists():
-        existing = sorted(base_dir.glob(f"{prefix_name}[0-9]*.json"))
-    else:
-        existing = []
-    for path in existing:
-        if dry_run:
-            print(f"[dry-run] Would remove {path}")
+    prune: bool = True,
+) -> int:
+    """Build delta packages between consecutive versions of each build.
+
+    Deltas are named by the source and target SHA-256 so existing files (in the
+    output directory or ``cache_dir``) are reused instead of recomputed. Deltas
+    that are not at least ``min_savings`` smaller than the full image are
+    skipped. Returns the number of deltas referenced from the manifest.
+    """
+
+    for artifact in artifacts:
+        artifact.deltas = []
+    cache_deltas = cache_dir / "deltas" if cache_dir else None
+    emitted: Set[str] = set()
+    full_bytes = 0
+    delta_bytes = 0
+    for previous, current in consecutive_version_pairs(artifacts):
+        if previous.sha256 == current.sha256:
+            continue
+        name = f"{previous.sha256[:16]}-{current.sha256[:16]}{DELTA_SUFFIX}"
+        output_path = delta_dir / name
+        cached_path = cache_deltas / name if cache_deltas else None
+        if output_path.exists():
+            delta = output_path.read_bytes()
+        elif cached_path is not None and cached_path.exists():
+            delta = cached_path.read_bytes()
+        elif dry_run and not (previous.path.exists() and current.path.exists()):
+            print(f"[dry-run] Would build delta {previous.path.name} -> {current.path.name}")
+            continue
         else:
-            path.unlink()
-    for index, artifact in enumerate(artifacts):
-        data = {
-            "name": "Sense360 ESP32 Firmware - Core Module",
-            "version": artifact.metadata.version,
-            "home_assistant_domain": "esphome",
-            "funding_url": "https://sense360store.com/support",
-            "new_install_prompt_erase": True,
-            "new_install_improv_wait_time": 15,
-            "builds": [
-                {
-                    "chipFamily": artifact.chip_family,
-                    "parts": [
-                        {
-                            "path": artifact.relative_path,
-                            "offset": 0,
-                            "md5": artifact.md5,
-                            "sha256": artifact.sha256,
-                            "signature": artifact.signature,
-                        }
-                    ],
-                    "improv": artifact.metadata.improv,
-                    "md5": artifact.md5,
-                    "sha256": artifact.sha256,
-                    "signature": artifact.signature,
-                }
-            ],
-        }
-        path = base_dir / f"{prefix_name}{index}.json"
+            source = previous.path.read_bytes()
+            target = current.path.read_bytes()
+            delta = compute_delta(source, target)
+            if apply_delta(source, delta) != target:  # pragma: no cover - encoder bug guard
+                raise SystemExit(f"Delta round-trip failed for {current.path.name}")
+            if cached_path is not None and not dry_run:
+                cached_path.parent.mkdir(parents=True, exist_ok=True)
+                cached_path.write_bytes(delta)
+        if len(delta) > current.file_size * (1 - min_savings):
+            continue
         if dry_run:
-            print(f"[dry-run] Would write {path}")
+            print(f"[dry-run] Would write {output_path}")
+        elif not output_path.exists():
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(delta)
+        emitted.add(name)
+        full_bytes += current.file_size
+        delta_bytes += len(delta)
+        current.deltas.append(
+            {
+                "from_version": previous.metadata.version,
+                "from_sha256": previous.sha256,
+                "path": Path(os.path.relpath(output_path, repo_root)).as_posix(),
+                "size": len(delta),
+                "sha256": hashlib.sha256(delta).hexdigest(),
+            }
+        )
+    if prune and delta_dir.exists():
+        for stale in sorted(delta_dir.glob(f"*{DELTA_SUFFIX}")):
+            if stale.name in emitted:
+                continue
+            if dry_run:
+                print(f"[dry-run] Would remove {stale}")
+            else:
+                stale.unlink()
+    if emitted:
+        print(
+            f"Generated {len(emitted)} delta package(s): {delta_bytes} bytes instead of "
+            f"{full_bytes} bytes of full images."
+        )
+    return len(emitted)
+
+
+# zlib-wrapped deflate: the stream esptool's compressed flash commands expect
+# and what HTTP calls "deflate".
+COMPRESSED_SUFFIX = ".deflate"
+COMPRESSION_LEVEL = 9
+
+
+def compress_parts(
+    artifacts: Sequence[FirmwareArtifact],
+    compressed_dir: Path,
+    repo_root: Path,
+    *,
+    cache_dir: Optional[Path] = None,
+    dry_run: bool,
+    prune: bool = True,
+) -> int:
+    """Emit a deflate-compressed copy of every part that actually shrinks.
+
+    Outputs are named by the part's SHA-256, so an existing file in the output
+    directory or ``cache_dir`` means the binary is never recompressed. Split
+    builds compress each of their parts rather than the merged image. Returns
+    the number of compressed parts referenced from the manifest.
+    """
+
+    cache_compressed = cache_dir / "compressed" if cache_dir else None
+    by_digest: Dict[str, Optional[Dict[str, object]]] = {}
+    raw_bytes = 0
+    packed_bytes = 0
+
+    def compress(path: Path, sha256: str, size: int) -> Optional[Dict[str, object]]:
+        nonlocal raw_bytes, packed_bytes
+        if sha256 in by_digest:
+            info = by_digest[sha256]
+            return dict(info) if info else None
+        name = f"{sha256}{COMPRESSED_SUFFIX}"
+        output_path = compressed_dir / name
+        cached_path = cache_compressed / name if cache_compressed else None
+        if output_path.exists():
+            blob = output_path.read_bytes()
+        elif cached_path is not None and cached_path.exists():
+            blob = cached_path.read_bytes()
+        elif dry_run and not path.exists():
+            print(f"[dry-run] Would compress {path.name}")
+            by_digest[sha256] = None
+            return None
         else:
-            path.parent.mkdir(parents=True, exist_ok=True)
-            with path.open("w", encoding="utf-8") as handle:
-                json.dump(data, handle, indent=2)
-                handle.write("\n")
+            blob = zlib.compress(path.read_bytes(), COMPRESSION_LEVEL)
+            if cached_path is not None and not dry_run:
+                cached_path.parent.mkdir(parents=True, exist_ok=True)
+                cached_path.write_bytes(blob)
+        if len(blob) >= size:
+            by_digest[sha256] = None
+            return None
+        if dry_run:
+            print(f"[dry-run] Would write {output_path}")
+        elif not output_path.exists():
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_bytes(blob)
+        info = {
+            "encoding": "deflate",
+            "path": Path(os.path.relpath(output_path, repo_root)).as_posix(),
+            "size": len(blob),
+            "sha256": hashlib.sha256(blob).hexdigest(),
+        }
+        by_digest[sha256] = info
+        raw_bytes += size
+        packed_bytes += len(blob)
+        return dict(info)
 
+    referenced = 0
+    for artifact in artifacts:
+        artifact.compressed = None if artifact.parts else compress(artifact.path, artifact.sha256, artifact.file_size)
+        referenced += 1 if artifact.compressed else 0
+        for part in artifact.parts:
+            part_path = repo_root / str(part["path"])
+            part_size = part_path.stat().st_size if part_path.exists() else artifact.file_size
+            info = compress(part_path, str(part["sha256"]), part_size)
+            part.pop("compressed", None)
+            if info:
+                part["compressed"] = info
+                referenced += 1
+    emitted = {f"{digest}{COMPRESSED_SUFFIX}" for digest, info in by_digest.items() if info}
+    if prune and compressed_dir.exists():
+        for stale in sorted(compressed_dir.glob(f"*{COMPRESSED_SUFFIX}")):
+            if stale.name in emitted:
+                continue
+            if dry_run:
+                print(f"[dry-run] Would remove {stale}")
+            else:
+                stale.unlink()
+    if emitted:
+        print(
+            f"Compressed {len(emitted)} unique part(s): {packed_bytes} bytes instead of "
+            f"{raw_bytes} bytes."
+        )
+    return referenced
 
-def build_summary_table(artifacts: Sequence[FirmwareArtifact]) -> str:
-    headers = ["Idx", "Device/Config", "Channel", "Version", "Path", "MD5"]
-    rows: List[List[str]] = []
-    for index, artifact in enumerate(artifacts):
+
+FLASH_BAUD_RATES = (115200, 460800, 921600)
+# UART 8N1 framing sends a start and a stop bit around every byte.
+UART_BITS_PER_BYTE = 10
+DOWNLOAD_LINK_SPEEDS = (("3g", 1_600_000), ("4g", 12_000_000), ("broadband", 50_000_000))
+SIZE_SUFFIXES = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(value: str) -> int:
+    """argparse type for byte sizes such as ``500M`` or ``2G``."""
+
+    text = value.strip().upper().removesuffix("B").removesuffix("I")
+    number, suffix = (text[:-1], text[-1]) if text[-1:] in SIZE_SUFFIXES else (text, "")
+    try:
+        size = int(float(number) * SIZE_SUFFIXES[suffix])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{value}'") from None
+    if size < 0:
+        raise argparse.ArgumentTypeError(f"invalid size '{value}'")
+    return size
+
+
+def transfer_size(artifact: FirmwareArtifact) -> int:
+    """Bytes fetched by the browser and sent over serial for one build.
+
+    esptool-js deflates images before writing them, so the compressed part
+    is the better estimate when ``--compress-parts`` produced one; otherwise
+    the raw size is an upper bound.
+    """
+
+    if artifact.compressed and not artifact.parts:
+        return int(artifact.compressed["size"])  # type: ignore[arg-type]
+    return artifact.file_size
+
+
+def flash_estimate(artifact: FirmwareArtifact) -> Dict[str, object]:
+    """Serial transfer and download times in whole milliseconds at typical rates.
+
+    Serial times cover the UART transfer only; flash erase and write add to it.
+    Times are integers so the manifest stays free of floats (see
+    :func:`render_json`).
+    """
+
+    size = transfer_size(artifact)
+    return {
+        "transfer_bytes": size,
+        "serial_ms": {
+            str(baud): _transfer_ms(size * UART_BITS_PER_BYTE, baud) for baud in FLASH_BAUD_RATES
+        },
+        "download_ms": {
+            name: _transfer_ms(size * 8, bits_per_second) for name, bits_per_second in DOWNLOAD_LINK_SPEEDS
+        },
+    }
+
+
+def _transfer_ms(bits: int, bits_per_second: int) -> int:
+    return -(-bits * 1000 // bits_per_second)
+
+
+def annotate_flash_estimates(artifacts: Sequence[FirmwareArtifact]) -> None:
+    for artifact in artifacts:
+        artifact.flash_estimate = flash_estimate(artifact)
+
+
+def newest_version_pairs(
+    artifacts: Sequence[FirmwareArtifact],
+) -> Dict[Tuple[object, ...], Tuple[Optional[FirmwareArtifact], FirmwareArtifact]]:
+    """The newest build of each configuration and channel with the version before it."""
+
+    newest: Dict[Tuple[object, ...], Tuple[Optional[FirmwareArtifact], FirmwareArtifact]] = {}
+    for artifact in artifacts:
+        key = build_group_key(artifact.metadata)
+        current = newest.get(key)
+        if current is None or version_is_newer(artifact.metadata.version, current[1].metadata.version):
+            newest[key] = (None, artifact)
+    for previous, current in consecutive_version_pairs(artifacts):
+        key = build_group_key(current.metadata)
+        if newest[key][1] is current:
+            newest[key] = (previous, current)
+    return newest
+
+
+def _size_growth(previous: FirmwareArtifact, current: FirmwareArtifact) -> Optional[float]:
+    if previous.file_size <= PLACEHOLDER_FIRMWARE_SIZE_BYTES:
+        return None
+    return (current.file_size - previous.file_size) * 100 / previous.file_size
+
+
+def size_budget_findings(
+    artifacts: Sequence[FirmwareArtifact],
+    *,
+    max_size: Optional[int] = None,
+    max_growth: Optional[float] = None,
+) -> List[str]:
+    """Check the newest build of each configuration and channel against the size budgets.
+
+    ``max_size`` caps the binary size in bytes; ``max_growth`` caps the growth
+    over the previous version in percent. Older builds are not re-checked, so
+    a regression that already shipped does not fail every later run.
+    """
+
+    findings: List[str] = []
+    for previous, current in newest_version_pairs(artifacts).values():
+        name = current.path.name
+        if max_size is not None and current.file_size > max_size:
+            findings.append(
+                f"{name}: {current.file_size} bytes exceeds the size budget of {max_size} bytes."
+            )
+        growth = _size_growth(previous, current) if previous else None
+        if max_growth is not None and growth is not None and growth > max_growth:
+            findings.append(
+                f"{name}: grew {growth:.1f}% ({current.file_size - previous.file_size:+d} bytes) "
+                f"since {previous.metadata.version}; the budget is {max_growth:g}%."
+            )
+    return findings
+
+
+SIZE_REPORT_HEADERS = (
+    "Config/Build",
+    "Channel",
+    "Version",
+    "Size",
+    "Change",
+    "Flash @115200",
+    "Flash @921600",
+    "4G",
+)
+
+
+def _format_duration(milliseconds: int) -> str:
+    seconds = milliseconds / 1000
+    if seconds < 1:
+        return f"{milliseconds} ms"
+    return f"{seconds:.0f} s" if seconds < 90 else f"{seconds / 60:.1f} min"
+
+
+def build_size_report(artifacts: Sequence[FirmwareArtifact]) -> str:
+    """Size, change since the previous version and flash/download time per build."""
+
+    previous_of = {id(current): previous for previous, current in consecutive_version_pairs(artifacts)}
+    rows = []
+    for artifact in artifacts:
         meta = artifact.metadata
-        if meta.is_configuration:
-            device = f"Sense360-{meta.config_string}"
+        previous = previous_of.get(id(artifact))
+        growth = _size_growth(previous, artifact) if previous else None
+        if previous is None:
+            change = "new"
+        elif growth is None:
+            change = "-"
         else:
-            parts = [meta.model or "Sense360"]
-            if meta.variant:
-                parts.append(meta.variant)
-            device = " ".join(part for part in parts if part).strip()
-            if meta.sensor_addon:
-                device += f" ({meta.sensor_addon})"
+            change = f"{growth:+.1f}% ({artifact.file_size - previous.file_size:+d} B)"
+        estimate = artifact.flash_estimate or flash_estimate(artifact)
+        serial = estimate["serial_ms"]
         rows.append(
             [
-                str(index),
-                device,
+                (meta.config_string if meta.is_configuration else None) or meta.name_part,
                 meta.channel,
                 meta.version,
-                artifact.relative_path,
-                artifact.md5,
+                f"{artifact.file_size / 1024:.1f} KB",
+                change,
+                _format_duration(serial["115200"]),  # type: ignore[index]
+                _format_duration(serial["921600"]),  # type: ignore[index]
+                _format_duration(estimate["download_ms"]["4g"]),  # type: ignore[index]
             ]
         )
-    data = [headers] + rows
-    widths = [max(len(row[i]) for row in data) for i in range(len(headers))]
-    lines = [
-        "  ".join(row[i].ljust(widths[i]) for i in range(len(headers))).rstrip()
-        for row in data
-    ]
-    return "\n".join(lines)
+    return _format_table(SIZE_REPORT_HEADERS, rows)
 
 
-def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
-    parser = argparse.ArgumentParser(
-        description=(
-            "Generate manifest.json and ESP Web Tools manifests from firmware binaries."
+PARTITION_TABLE_OFFSET = 0x8000
+PARTITION_TABLE_SIZE = 0xC00
+PARTITION_ENTRY = struct.Struct("<HBBII16sI")
+PARTITION_MAGIC = 0x50AA
+PARTITION_TYPE_APP = 0x00
+PARTITION_TYPE_DATA = 0x01
+PARTITION_SUBTYPE_OTA = 0x00
+
+
+def parse_partition_table(buffer: memoryview, offset: int = PARTITION_TABLE_OFFSET) -> List[Dict[str, object]]:
+    """Return the entries of an ESP partition table, or [] if there is none at ``offset``."""
+
+    entries: List[Dict[str, object]] = []
+    end = min(len(buffer), offset + PARTITION_TABLE_SIZE)
+    for position in range(offset, end - PARTITION_ENTRY.size + 1, PARTITION_ENTRY.size):
+        magic, ptype, subtype, start, size, label, _ = PARTITION_ENTRY.unpack_from(buffer, position)
+        if magic != PARTITION_MAGIC:
+            break
+        entries.append(
+            {
+                "label": _c_string(label),
+                "type": ptype,
+                "subtype": subtype,
+                "offset": start,
+                "size": size,
+            }
         )
-    )
-    parser.add_argument(
-        "--firmware-dir",
-        default="firmware",
-        help="Directory that stores firmware binaries (default: firmware)",
-    )
-    parser.add_argument(
+    return entries
+
+
+def _is_erased(data: memoryview) -> bool:
+    return len(data) == 0 or bytes(data).count(0xFF) == len(data)
+
+
+def plan_image_split(buffer: memoryview) -> Optional[List[Tuple[str, int, int]]]:
+    """Locate the parts of a merged full-flash image as (role, start, end) ranges.
+
+    Returns ``None`` unless the image has a bootloader, a partition table at
+    0x8000 and an app image, and every byte outside those parts (plus
+    otadata) is erased flash. Flashing the parts alone then matches the
+    merged image after a full chip erase; without one, the regions the
+    merged image would have blanked (NVS, SPIFFS, ota_1) keep their data.
+    """
+
+    total = len(buffer)
+    if total <= PARTITION_TABLE_OFFSET:
+        return None
+    if buffer[0] == ESP_IMAGE_MAGIC:
+        boot_start = 0
+    elif buffer[0] == 0xFF and buffer[ESP32_BOOTLOADER_OFFSET] == ESP_IMAGE_MAGIC:
+        boot_start = ESP32_BOOTLOADER_OFFSET
+    else:
+        return None
+    table = parse_partition_table(buffer)
+    if not table:
+        return None
+    boot_end = int(parse_esp_image(buffer, boot_start)["end"])
+    if boot_end > PARTITION_TABLE_OFFSET:
+        return None
+    ranges = [
+        ("bootloader", boot_start, boot_end),
+        ("partitions", PARTITION_TABLE_OFFSET, min(total, PARTITION_TABLE_OFFSET + PARTITION_TABLE_SIZE)),
+    ]
+    for entry in table:
+        start = int(entry["offset"])
+        if start >= total:
+            continue
+        if entry["type"] == PARTITION_TYPE_DATA and entry["subtype"] == PARTITION_SUBTYPE_OTA:
+            ranges.append(("otadata", start, min(total, start + int(entry["size"]))))
+        elif entry["type"] == PARTITION_TYPE_APP and buffer[start] == ESP_IMAGE_MAGIC:
+            if any(role == "app" for role, _, _ in ranges):
+                return None
+            ranges.append(("app", start, int(parse_esp_image(buffer, start)["end"])))
+    if not any(role == "app" for role, _, _ in ranges):
+        return None
+    ranges.sort(key=lambda item: item[1])
+    position = 0
+    for _, start, end in ranges:
+        if start < position or not _is_erased(buffer[position:start]):
+            return None
+        position = end
+    if not _is_erased(buffer[position:]):
+        return None
+    return ranges
+
+
+def split_multipart_images(
+    artifacts: Sequence[FirmwareArtifact],
+    parts_dir: Path,
+    repo_root: Path,
+    *,
+    dry_run: bool,
+    prune: bool = True,
+) -> int:
+    """Publish merged full-flash images as separate parts at their real offsets.
+
+    Bootloader, partition table, otadata and app are written once each to
+    ``parts_dir/<role>-<sha256>.bin``, so a bootloader or partition table
+    shared by many builds is stored and downloaded once. Images that are not
+    merged images keep their single part at offset 0. Returns the number of
+    split builds.
+    """
+
+    by_digest: Dict[str, List[Dict[str, object]]] = {}
+    emitted: Dict[str, int] = {}
+    merged_bytes = 0
+    split = 0
+    for artifact in artifacts:
+        artifact.parts = []
+        if artifact.sha256 not in by_digest:
+            by_digest[artifact.sha256] = _split_image(artifact.path, parts_dir, repo_root, emitted, dry_run=dry_run)
+        parts = by_digest[artifact.sha256]
+        if parts:
+            artifact.parts = [dict(part) for part in parts]
+            merged_bytes += artifact.file_size
+            split += 1
+    if prune and parts_dir.exists():
+        for stale in sorted(parts_dir.glob("*.bin")):
+            if stale.name in emitted:
+                continue
+            if dry_run:
+                print(f"[dry-run] Would remove {stale}")
+            else:
+                stale.unlink()
+    if split:
+        print(
+            f"Split {split} merged image(s) into {len(emitted)} unique part(s): "
+            f"{sum(emitted.values())} bytes instead of {merged_bytes} bytes."
+        )
+    return split
+
+
+def _split_image(
+    path: Path,
+    parts_dir: Path,
+    repo_root: Path,
+    emitted: Dict[str, int],
+    *,
+    dry_run: bool,
+) -> List[Dict[str, object]]:
+    if not path.exists() or path.stat().st_size <= PARTITION_TABLE_OFFSET:
+        return []
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            try:
+                ranges = plan_image_split(view)
+            except EspImageError:
+                ranges = None
+            parts: List[Dict[str, object]] = []
+            for role, start, end in ranges or []:
+                with view[start:end] as data:
+                    accumulator = DigestAccumulator()
+                    accumulator.update(data)
+                    md5, sha256, signature = accumulator.result()
+                    name = f"{role}-{sha256[:16]}.bin"
+                    target = parts_dir / name
+                    if name not in emitted and not target.exists():
+                        if dry_run:
+                            print(f"[dry-run] Would write {target}")
+                        else:
+                            target.parent.mkdir(parents=True, exist_ok=True)
+                            staging = target.with_name(target.name + ".tmp")
+                            staging.write_bytes(data)
+                            os.replace(staging, target)
+                emitted[name] = end - start
+                parts.append(
+                    {
+                        "path": Path(os.path.relpath(target, repo_root)).as_posix(),
+                        "offset": start,
+                        "md5": md5,
+                        "sha256": sha256,
+                        "signature": signature,
+                        "role": role,
+                    }
+                )
+            return parts
+        finally:
+            view.release()
+
+
+def publish_chunk_tables(
+    artifacts: Sequence[FirmwareArtifact],
+    chunk_dir: Path,
+    repo_root: Path,
+    digest_cache: DigestCache,
+    *,
+    dry_run: bool,
+    prune: bool = True,
+) -> int:
+    """Publish each part's chunk table and reference it from the part.
+
+    Tables come from the digest cache, so they were computed in the same pass
+    as the whole-file digests. Each is written once to
+    ``chunk_dir/<sha256>-<chunk size>.json`` and the part gets a ``chunks``
+    object with the chunk ``size``, ``count``, Merkle ``root`` and ``path``.
+    Split builds reference tables for their parts rather than the merged
+    image. Returns the number of tables referenced.
+    """
+
+    emitted: Set[str] = set()
+
+    def publish(path: Path, sha256: str) -> Optional[Dict[str, object]]:
+        if not path.exists():
+            return None
+        table = digest_cache.record(path).get("chunks")
+        if not isinstance(table, dict):
+            return None
+        name = f"{sha256}-{table['size']}.json"
+        target = chunk_dir / name
+        if name not in emitted:
+            emitted.add(name)
+            if not target.exists():
+                payload = {"version": CHUNK_TABLE_VERSION, "sha256": sha256, **table}
+                write_json_file(target, payload, dry_run=dry_run, compact=True)
+        return {
+            "size": table["size"],
+            "count": len(table["sha256"]),  # type: ignore[arg-type]
+            "root": table["root"],
+            "path": Path(os.path.relpath(target, repo_root)).as_posix(),
+        }
+
+    for artifact in artifacts:
+        artifact.chunks = None if artifact.parts else publish(artifact.path, artifact.sha256)
+        for part in artifact.parts:
+            reference = publish(repo_root / str(part["path"]), str(part["sha256"]))
+            part.pop("chunks", None)
+            if reference:
+                part["chunks"] = reference
+    if prune and chunk_dir.exists():
+        for stale in sorted(chunk_dir.glob("*.json")):
+            if stale.name in emitted:
+                continue
+            if dry_run:
+                print(f"[dry-run] Would remove {stale}")
+            else:
+                stale.unlink()
+    if emitted:
+        print(f"Published {len(emitted)} chunk table(s) to {chunk_dir}")
+    return len(emitted)
+
+
+RELEASE_NOTES_MODES = ("inline", "shard", "off")
+RELEASE_NOTES_CACHE_VERSION = 1
+RELEASE_NOTES_CACHE_FILENAME = "release-notes.json"
+RELEASE_NOTE_SECTIONS = {
+    "features": "features",
+    "key features": "features",
+    "new features": "features",
+    "what's new": "features",
+    "hardware requirements": "hardware_requirements",
+    "requirements": "hardware_requirements",
+    "known issues": "known_issues",
+    "changelog": "changelog",
+    "change log": "changelog",
+    "changes": "changelog",
+    "fixes": "changelog",
+    "bug fixes": "changelog",
+}
+_RELEASE_DATE_PATTERN = re.compile(r"\*\*Release Date\*\*:\s*(\d{4}-\d{2}-\d{2})")
+
+
+def release_notes_path(bin_path: Path, channel: str, firmware_dir: Path) -> Optional[Path]:
+    """Mirror ``buildReleaseNotesPathFromPart`` in scripts/state.js.
+
+    Stable notes sit next to the binary; every other channel lives under
+    ``firmware/previews`` as the publish workflow enforces.
+    """
+
+    name = bin_path.name
+    if not name.lower().endswith(".bin"):
+        return None
+    prefix, separator, _ = name[:-4].rpartition("-")
+    if not separator:
+        return None
+    filename = f"{prefix}-{channel}.md"
+    if channel == "stable":
+        return bin_path.with_name(filename)
+    return firmware_dir / "previews" / filename
+
+
+def parse_release_notes(markdown: str) -> Dict[str, object]:
+    sections: Dict[str, List[str]] = {
+        "features": [],
+        "hardware_requirements": [],
+        "known_issues": [],
+        "changelog": [],
+    }
+    release_date: Optional[str] = None
+    current: Optional[str] = None
+    for raw_line in markdown.splitlines():
+        line = raw_line.strip()
+        if line.startswith("#"):
+            current = RELEASE_NOTE_SECTIONS.get(line.lstrip("#").strip().lower())
+            continue
+        match = _RELEASE_DATE_PATTERN.search(line)
+        if match and release_date is None:
+            release_date = match.group(1)
+        if current and line[:2] in ("- ", "* "):
+            item = line[2:].strip()
+            if item:
+                sections[current].append(item)
+    return {**sections, "release_date": release_date}
+
+
+def ingest_release_notes(
+    artifacts: Sequence[FirmwareArtifact],
+    firmware_dir: Path,
+    repo_root: Path,
+    *,
+    mode: str = "inline",
+    shard_dir: Optional[Path] = None,
+    cache_dir: Optional[Path] = None,
+    dry_run: bool,
+    prune: bool = True,
+) -> int:
+    """Attach parsed release notes to each artifact that has a notes file.
+
+    Features, hardware requirements, known issues and changelog are always
+    inlined. The markdown itself is inlined (``inline``) or grouped into one
+    shard per configuration and channel (``shard``). Parsed notes are cached by
+    file hash. Returns the number of builds with notes.
+    """
+
+    if mode == "off":
+        return 0
+    cache_path = cache_dir / RELEASE_NOTES_CACHE_FILENAME if cache_dir else None
+    cache = _load_json_cache(cache_path, RELEASE_NOTES_CACHE_VERSION)
+    dirty = False
+    shards: Dict[Path, Dict[str, str]] = {}
+    found = 0
+    for artifact in artifacts:
+        artifact.release_notes = None
+        meta = artifact.metadata
+        notes_path = release_notes_path(artifact.path, meta.channel, firmware_dir)
+        if notes_path is None or not notes_path.is_file():
+            continue
+        raw = notes_path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        parsed = cache.get(digest)
+        if not isinstance(parsed, dict):
+            parsed = parse_release_notes(raw.decode("utf-8", "replace"))
+            cache[digest] = parsed
+            dirty = True
+        found += 1
+        for item in parsed["features"]:
+            if item not in meta.features:
+                meta.features.append(item)
+        for item in parsed["hardware_requirements"]:
+            if item not in meta.hardware_requirements:
+                meta.hardware_requirements.append(item)
+        artifact.known_issues = list(parsed["known_issues"])
+        artifact.changelog = list(parsed["changelog"])
+        info: Dict[str, object] = {
+            "path": Path(os.path.relpath(notes_path, repo_root)).as_posix(),
+            "sha256": digest,
+        }
+        if parsed.get("release_date"):
+            info["release_date"] = parsed["release_date"]
+        markdown = raw.decode("utf-8", "replace")
+        if mode == "shard" and shard_dir is not None:
+            group = _safe_segment(meta.config_string or meta.name_part, "Sense360")
+            shard_path = shard_dir / f"{group}-{meta.channel}.json"
+            shards.setdefault(shard_path, {})[meta.version] = markdown
+            info["shard"] = Path(os.path.relpath(shard_path, repo_root)).as_posix()
+        else:
+            info["markdown"] = markdown
+        artifact.release_notes = info
+    for shard_path, entries in shards.items():
+        write_json_file(shard_path, dict(sorted(entries.items())), dry_run=dry_run)
+    # Only shard mode owns shard_dir; inline runs leave whatever is there.
+    if prune and mode == "shard" and shard_dir is not None and shard_dir.exists():
+        for stale in sorted(shard_dir.glob("*.json")):
+            if stale in shards:
+                continue
+            if dry_run:
+                print(f"[dry-run] Would remove {stale}")
+            else:
+                stale.unlink()
+    if dirty and cache_path is not None and not dry_run:
+        _save_json_cache(cache_path, RELEASE_NOTES_CACHE_VERSION, cache)
+    return found
+
+
+def determine_manifest_version(artifacts: Sequence[FirmwareArtifact]) -> str:
+    return newest_manifest_version(
+        (artifact.metadata.channel, artifact.metadata.version) for artifact in artifacts
+    )
+
+
+def newest_manifest_version(builds: Iterable[Tuple[str, str]]) -> str:
+    """Newest stable version, else newest beta, else newest of any channel."""
+
+    stable_versions = []
+    beta_versions = []
+    fallback_versions = []
+    for build_channel, version in builds:
+        channel = canonical_channel(build_channel, DEFAULT_CHANNEL)
+        if channel == "stable":
+            stable_versions.append(version)
+        elif channel == "beta":
+            beta_versions.append(version)
+        else:
+            fallback_versions.append(version)
+    candidates = stable_versions or beta_versions or fallback_versions
+    if not candidates:
+        return "0.0.0"
+    best_version = candidates[0]
+    for candidate in candidates[1:]:
+        if version_is_newer(candidate, best_version):
+            best_version = candidate
+    return best_version
+
+
+def manifest_header(
+    artifacts: Sequence[FirmwareArtifact],
+    *,
+    release_notes_indexed: bool = False,
+    compat_index: Optional[str] = None,
+    history: Optional[Dict[str, Dict[str, object]]] = None,
+) -> Dict[str, object]:
+    """Every top-level ``manifest.json`` field except ``builds``."""
+
+    manifest: Dict[str, object] = {
+        "name": "Sense360 Modular Platform Firmware",
+        "version": determine_manifest_version(artifacts),
+        "home_assistant_domain": "esphome",
+        "funding_url": "https://sense360store.com/support",
+        "new_install_prompt_erase": True,
+        "new_install_improv_wait_time": 15,
+    }
+    if release_notes_indexed:
+        # Tells the wizard that builds without "release_notes" have no notes,
+        # so it can skip probing for a .md file.
+        manifest["release_notes_indexed"] = True
+    if compat_index:
+        manifest["compat_index"] = compat_index
+    if history:
+        # Builds dropped by the retention policy, loaded on demand per config.
+        manifest["history"] = history
+    return manifest
+
+
+def build_manifest(
+    artifacts: Sequence[FirmwareArtifact],
+    *,
+    release_notes_indexed: bool = False,
+    compat_index: Optional[str] = None,
+    history: Optional[Dict[str, Dict[str, object]]] = None,
+) -> Dict[str, object]:
+    manifest = manifest_header(
+        artifacts,
+        release_notes_indexed=release_notes_indexed,
+        compat_index=compat_index,
+        history=history,
+    )
+    manifest["builds"] = [artifact.manifest_entry() for artifact in artifacts]
+    return manifest
+
+
+LATEST_FEED_VERSION = 1
+
+
+def build_latest_feed(latest: Dict[Tuple[object, ...], FirmwareArtifact]) -> Dict[str, object]:
+    """Newest version of each build per channel, for cheap update polling.
+
+    Keys are the config string (or name part for legacy builds), then the
+    channel. Nothing time-dependent is included, so the feed only changes
+    when a newer binary is published.
+    """
+    builds: Dict[str, Dict[str, Dict[str, object]]] = {}
+    for artifact in latest.values():
+        metadata = artifact.metadata
+        name = metadata.config_string if metadata.is_configuration else metadata.name_part
+        builds.setdefault(name or metadata.name_part, {})[metadata.channel] = {
+            "version": metadata.version,
+            "sha256": artifact.sha256,
+            "size": artifact.file_size,
+            "path": artifact.relative_path,
+        }
+    return {
+        "version": LATEST_FEED_VERSION,
+        "builds": {
+            name: {
+                channel: builds[name][channel]
+                for channel in sorted(
+                    builds[name], key=lambda value: (CHANNEL_ORDER.get(value, 99), value)
+                )
+            }
+            for name in sorted(builds, key=str.lower)
+        },
+    }
+
+
+COMPAT_INDEX_VERSION = 1
+# Mirrors MODULE_KEYS and allowedOptions in scripts/state.js so the keys in the
+# index line up with buildBaseKey()/buildModuleComboKey() in the wizard.
+COMPAT_MODULE_KEYS = ("voice", "led", "roomiq", "airiq", "fan", "ventiq")
+COMPAT_MOUNTING_OPTIONS = ("ceiling",)
+COMPAT_POWER_OPTIONS = ("usb", "poe", "pwr")
+COMPAT_MODULE_OPTIONS: Dict[str, Tuple[str, ...]] = {
+    "roomiq": ("none", "roomiq"),
+    "airiq": ("none", "airiq"),
+    "ventiq": ("none", "ventiq"),
+    "fan": ("none", "relay", "pwm", "analog", "triac"),
+    "voice": ("none",),
+    "led": ("none", "led"),
+}
+
+
+def _compat_module_value(key: str, value: str) -> str:
+    allowed = COMPAT_MODULE_OPTIONS[key]
+    lowered = value.strip().lower()
+    if lowered and lowered in allowed:
+        return lowered
+    if not lowered:
+        enabled = [option for option in allowed if option != "none"]
+        if enabled:
+            return enabled[0]
+    return "none" if "none" in allowed else allowed[0]
+
+
+def wizard_config_state(config_string: Optional[str]) -> Optional[Dict[str, str]]:
+    """Return the wizard selection a config string maps to, or None.
+
+    Same rules as parseConfigStringState() in scripts/state.js; configurations
+    the wizard cannot select (rescue, unknown mountings) yield None.
+    """
+    if not config_string:
+        return None
+    segments = [segment.strip() for segment in config_string.split("-") if segment.strip()]
+    mounting_index = 1 if segments and segments[0].lower() in CORE_TOKENS else 0
+    if len(segments) < mounting_index + 2:
+        return None
+    mounting = segments[mounting_index].lower()
+    power_index = mounting_index + 1
+    if segments[power_index].lower() == "voice":
+        power_index += 1
+    if len(segments) <= power_index:
+        return None
+    power = segments[power_index].lower()
+    if mounting not in COMPAT_MOUNTING_OPTIONS or power not in COMPAT_POWER_OPTIONS:
+        return None
+    state = {key: "none" for key in COMPAT_MODULE_KEYS}
+    for segment in segments[power_index + 1 :]:
+        if segment.startswith("VentIQ"):
+            state["ventiq"] = _compat_module_value("ventiq", segment[len("VentIQ") :] or "ventiq")
+        elif segment == "Bathroom":
+            continue
+        elif segment.startswith("RoomIQ"):
+            state["roomiq"] = "roomiq"
+        elif segment.startswith("AirIQ"):
+            state["airiq"] = _compat_module_value("airiq", segment[len("AirIQ") :] or "airiq")
+        elif segment.startswith("Fan"):
+            state["fan"] = _compat_module_value("fan", segment[len("Fan") :] or "none")
+        elif segment.startswith("Voice"):
+            state["voice"] = "none"
+        elif segment.startswith("LED"):
+            state["led"] = "led"
+    return {"mounting": mounting, "power": power, **state}
+
+
+def _offer_build(
+    slot: Dict[str, Dict[str, object]],
+    channel: str,
+    entry: Dict[str, object],
+) -> None:
+    current = slot.get(channel)
+    if current is None or version_is_newer(str(entry["version"]), str(current["version"])):
+        slot[channel] = entry
+
+
+def build_compat_index(
+    artifacts: Sequence[FirmwareArtifact],
+    *,
+    header: Optional[Dict[str, object]] = None,
+    shards: Optional[Dict[str, str]] = None,
+) -> Dict[str, object]:
+    """Precompute wizard availability so clients can skip fetching manifest.json.
+
+    ``bases`` is keyed like buildBaseKey() ("mounting|power") and lists the
+    module values available for that base plus, per buildModuleComboKey(),
+    the newest build for each channel. ``configs`` maps a lower-cased config
+    string to the same per-channel entries for direct-install links. ``build``
+    is the index into manifest.json's ``builds`` array (and the N in
+    firmware-N.json).
+
+    ``manifest`` carries the manifest header and ``shards`` maps each config
+    key to the file holding its full build entries (see
+    :func:`write_compat_shards`), so the wizard can load the index from a
+    fixed path and fetch build entries per config. ``legacy_builds`` counts
+    builds without a config string, which only manifest.json lists.
+    """
+    bases: Dict[str, Dict[str, object]] = {}
+    configs: Dict[str, Dict[str, Dict[str, object]]] = {}
+    legacy_builds = 0
+    for index, artifact in enumerate(artifacts):
+        metadata = artifact.metadata
+        if not metadata.is_configuration or not metadata.config_string:
+            legacy_builds += 1
+            continue
+        channel = canonical_channel(metadata.channel, DEFAULT_CHANNEL)
+        entry: Dict[str, object] = {
+            "build": index,
+            "version": metadata.version,
+            "config_string": metadata.config_string,
+        }
+        _offer_build(configs.setdefault(metadata.config_string.lower(), {}), channel, entry)
+        state = wizard_config_state(metadata.config_string)
+        if state is None:
+            continue
+        base = bases.setdefault(
+            f"{state['mounting']}|{state['power']}",
+            {"modules": {key: set() for key in COMPAT_MODULE_KEYS}, "combos": {}},
+        )
+        for key in COMPAT_MODULE_KEYS:
+            base["modules"][key].add(state[key])
+        combo_key = "|".join(f"{key}={state[key]}" for key in COMPAT_MODULE_KEYS)
+        _offer_build(base["combos"].setdefault(combo_key, {}), channel, entry)
+
+    def _channels(slot: Dict[str, Dict[str, object]]) -> Dict[str, Dict[str, object]]:
+        ordered_channels = sorted(slot, key=lambda name: (CHANNEL_ORDER.get(name, 99), name))
+        return {name: slot[name] for name in ordered_channels}
+
+    return {
+        "version": COMPAT_INDEX_VERSION,
+        "module_keys": list(COMPAT_MODULE_KEYS),
+        "bases": {
+            base_key: {
+                "modules": {
+                    key: sorted(bases[base_key]["modules"][key]) for key in COMPAT_MODULE_KEYS
+                },
+                "combos": {
+                    combo_key: _channels(bases[base_key]["combos"][combo_key])
+                    for combo_key in sorted(bases[base_key]["combos"])
+                },
+            }
+            for base_key in sorted(bases)
+        },
+        "configs": {key: _channels(configs[key]) for key in sorted(configs)},
+        "manifest": dict(header or {}),
+        "shards": dict(sorted((shards or {}).items())),
+        "legacy_builds": legacy_builds,
+    }
+
+
+COMPAT_SHARD_VERSION = 1
+
+
+def write_compat_shards(
+    artifacts: Sequence[FirmwareArtifact],
+    shard_dir: Path,
+    repo_root: Path,
+    *,
+    dry_run: bool,
+) -> Tuple[Dict[str, str], List[Path]]:
+    """Write each configuration's manifest entries to its own build shard.
+
+    Shards are keyed like the compatibility index's ``configs`` (lower-cased
+    config string) and list the full manifest entries in manifest order, each
+    with its ``build`` index. Returns the key-to-path map for the index and
+    the shards written; stale shards in ``shard_dir`` are removed.
+    """
+
+    grouped: Dict[str, List[Dict[str, object]]] = {}
+    for index, artifact in enumerate(artifacts):
+        metadata = artifact.metadata
+        if not metadata.is_configuration or not metadata.config_string:
+            continue
+        entry = artifact.manifest_entry()
+        entry["build"] = index
+        grouped.setdefault(metadata.config_string.lower(), []).append(entry)
+    shards: Dict[str, str] = {}
+    shard_paths: List[Path] = []
+    for key, builds in sorted(grouped.items()):
+        shard_path = shard_dir / f"{_safe_segment(key, 'sense360')}.json"
+        write_json_file(
+            shard_path,
+            {"version": COMPAT_SHARD_VERSION, "config": key, "builds": builds},
+            dry_run=dry_run,
+        )
+        shard_paths.append(shard_path)
+        shards[key] = Path(os.path.relpath(shard_path, repo_root)).as_posix()
+    if shard_dir.exists():
+        written = set(shard_paths)
+        for stale in sorted(shard_dir.glob("*.json")):
+            if stale in written:
+                continue
+            if dry_run:
+                print(f"[dry-run] Would remove {stale}")
+            else:
+                stale.unlink()
+    return shards, shard_paths
+
+
+def _collect_deprecated_module_hits(values: Sequence[str]) -> List[str]:
+    hits: List[str] = []
+    for value in values:
+        parts = [part for part in value.split("-") if part]
+        for part in parts:
+            if part.lower() in DEPRECATED_MODULE_TOKENS:
+                hits.append(part)
+    return hits
+
+
+def validate_no_deprecated_modules(artifacts: Sequence[FirmwareArtifact]) -> None:
+    for artifact in artifacts:
+        meta = artifact.metadata
+        if not meta.is_configuration:
+            continue
+        deprecated_hits = _collect_deprecated_module_hits([meta.config_string or ""])
+        deprecated_hits.extend(_collect_deprecated_module_hits(meta.modules))
+        deprecated_hits.extend(_collect_deprecated_module_hits([meta.description]))
+        if deprecated_hits:
+            hits = ", ".join(sorted(set(deprecated_hits), key=str.lower))
+            raise SystemExit(
+                f"Deprecated module name(s) found in {artifact.path.name}: {hits}. "
+                "Use current module taxonomy (for example: AirIQ, VentIQ)."
+            )
+
+
+
+
+def validate_structured_config_consistency(artifacts: Sequence[FirmwareArtifact]) -> None:
+    mismatches: List[str] = []
+    for artifact in artifacts:
+        meta = artifact.metadata
+        if not meta.is_configuration or not meta.config_string:
+            continue
+        tokens = [token for token in meta.config_string.split("-") if token]
+        token_set = {token.upper() for token in tokens}
+        required_power_tokens = token_set.intersection(EXACT_POWER_TOKENS)
+        if required_power_tokens and meta.power is None:
+            mismatches.append(
+                f"{artifact.path.name}: config_string includes {sorted(required_power_tokens)} but power is null"
+            )
+            continue
+        if meta.power is not None and meta.power.upper() in EXACT_POWER_TOKENS and meta.power.upper() not in token_set:
+            mismatches.append(
+                f"{artifact.path.name}: power='{meta.power}' not present in config_string='{meta.config_string}'"
+            )
+    if mismatches:
+        joined = "\n  - "+"\n  - ".join(mismatches)
+        raise SystemExit(
+            "Structured metadata/config_string mismatch detected:" + joined
+        )
+
+
+# Minimum firmware size below which we suspect a placeholder / corrupted binary.
+# 100 KB chosen because real ESP32-S3 application partitions are ~500 KB+; anything
+# smaller than this is almost certainly a stub. The repo currently ships some 18-byte
+# placeholder binaries, so this threshold is enforced as a warning by default and
+# only fails the build when --strict-validate is passed.
+DEFAULT_MIN_FIRMWARE_SIZE_BYTES = 100 * 1024
+
+# Sentinel size for the placeholder stubs already committed (18-byte files). Anything
+# at or below this is treated as "intentional placeholder" rather than a suspicious
+# size. Production firmware will not produce values this low.
+PLACEHOLDER_FIRMWARE_SIZE_BYTES = 64
+
+
+def validate_manifest_metadata(
+    artifacts: Sequence[FirmwareArtifact],
+    *,
+    min_firmware_size: int = DEFAULT_MIN_FIRMWARE_SIZE_BYTES,
+    strict: bool = False,
+) -> List[str]:
+    """Run trust-signal checks across the generated manifest entries.
+
+    Findings are returned as a list of human-readable strings. When ``strict`` is
+    set, the caller should treat a non-empty list as a build failure; otherwise
+    they're informational warnings printed to stderr.
+    """
+
+    findings: List[str] = []
+
+    for artifact in artifacts:
+        meta = artifact.metadata
+        name = artifact.path.name
+
+        # 1. description should reference the config_string for configuration builds.
+        # Rescue is exempt: it ships a hand-written human description rather than
+        # the boilerplate "{Channel} firmware for Sense360 X configuration." form.
+        if meta.is_configuration and meta.config_string and meta.channel != "rescue":
+            description = (meta.description or "").lower()
+            if description and meta.config_string.lower() not in description:
+                findings.append(
+                    f"{name}: description does not reference config_string "
+                    f"'{meta.config_string}' (got: {meta.description!r})."
+                )
+
+        # 2. every entry in modules should appear in config_string (case-insensitive).
+        if meta.is_configuration and meta.modules and meta.config_string:
+            cs_lower = meta.config_string.lower()
+            stray = [m for m in meta.modules if m.lower() not in cs_lower]
+            if stray:
+                findings.append(
+                    f"{name}: modules {stray} not present in config_string "
+                    f"'{meta.config_string}'."
+                )
+
+        # 3. file_size sanity. Skip entries we deliberately ship as placeholders.
+        if PLACEHOLDER_FIRMWARE_SIZE_BYTES < artifact.file_size < min_firmware_size:
+            findings.append(
+                f"{name}: file_size={artifact.file_size} bytes is below the "
+                f"plausible-firmware threshold ({min_firmware_size} bytes). "
+                "Verify this isn't a truncated build."
+            )
+
+        # 4. embedded app descriptor disagrees with the filename version.
+        app = (artifact.image or {}).get("app") or {}
+        app_version = normalise_version(app.get("version")) if app.get("version") else None
+        if app_version and app_version != meta.version:
+            findings.append(
+                f"{name}: embedded app version {app.get('version')!r} does not match "
+                f"filename version {meta.version!r}."
+            )
+
+        # 5. stable channel without any release-note signal at all.
+        if meta.channel == "stable" and meta.is_configuration:
+            has_features = bool(meta.features)
+            has_hardware = bool(meta.hardware_requirements)
+            if not has_features and not has_hardware:
+                findings.append(
+                    f"{name}: stable build has no features and no hardware_requirements; "
+                    "consider adding a release-notes .md so users get context."
+                )
+
+    return findings
+
+
+def validate_no_placeholder_descriptions(artifacts: Sequence[FirmwareArtifact]) -> List[str]:
+    """Soft check: catch obvious description/config drift like the historical
+    'AirIQPro described as a minimal configuration with no expansion modules'.
+    Returns findings (never raises)."""
+
+    findings: List[str] = []
+    minimal_phrases = ("no expansion modules", "minimal configuration", "no modules")
+    for artifact in artifacts:
+        meta = artifact.metadata
+        if not meta.is_configuration or not meta.modules or not meta.description:
+            continue
+        desc_lower = meta.description.lower()
+        for phrase in minimal_phrases:
+            if phrase in desc_lower:
+                findings.append(
+                    f"{artifact.path.name}: description claims '{phrase}' but build "
+                    f"has modules {meta.modules}."
+                )
+                break
+    return findings
+
+
+JSON_ENCODERS = ("stdlib", "orjson")
+DEFAULT_JSON_ENCODER = "orjson" if _orjson is not None else "stdlib"
+
+
+def render_json(data: object, *, compact: bool = False, encoder: Optional[str] = None) -> bytes:
+    """Render ``data`` as the bytes of a JSON output file, trailing newline included.
+
+    Uses orjson when it is installed and the stdlib encoder otherwise; both give
+    byte-identical output. orjson does not escape non-ASCII characters the
+    way ``json.dumps`` does, so such documents (and anything orjson rejects)
+    fall back to the stdlib. The two encoders also format some floats
+    differently (orjson writes ``1e17`` where the stdlib writes ``1e+17``),
+    so generated documents hold integers only; durations are stored as
+    whole milliseconds.
+    """
+    if (encoder or DEFAULT_JSON_ENCODER) == "orjson" and _orjson is not None:
+        try:
+            option = _orjson.OPT_APPEND_NEWLINE
+            if not compact:
+                option |= _orjson.OPT_INDENT_2
+            rendered = _orjson.dumps(data, option=option)
+        except TypeError:
+            rendered = b""
+        if rendered and rendered.isascii():
+            return rendered
+    if compact:
+        text = json.dumps(data, separators=(",", ":"))
+    else:
+        text = json.dumps(data, indent=2)
+    return (text + "\n").encode("utf-8")
+
+
+def _same_contents(path: Path, rendered: bytes) -> bool:
+    try:
+        return path.stat().st_size == len(rendered) and path.read_bytes() == rendered
+    except OSError:
+        return False
+
+
+def write_json_file(
+    path: Path,
+    data: Dict[str, object],
+    *,
+    dry_run: bool,
+    compact: bool = False,
+) -> bool:
+    """Write ``data`` to ``path`` unless it already holds exactly these bytes.
+
+    Returns whether the file was (or, with ``dry_run``, would be) written.
+    Unchanged outputs keep their mtime.
+    """
+    rendered = render_json(data, compact=compact)
+    if _same_contents(path, rendered):
+        return False
+    if dry_run:
+        print(f"[dry-run] Would write {path}")
+        return True
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(rendered)
+    return True
+
+
+def _indent_rendered(rendered: bytes, prefix: bytes) -> bytes:
+    return rendered.rstrip(b"\n").replace(b"\n", b"\n" + prefix)
+
+
+def write_manifest_stream(
+    path: Path,
+    header: Dict[str, object],
+    artifacts: Iterable[FirmwareArtifact],
+    *,
+    dry_run: bool,
+) -> int:
+    """Write ``manifest.json`` one build entry at a time; returns the entry count.
+
+    Only one entry dict and its rendered bytes are alive at once, so memory
+    does not grow with the number of builds. The bytes are identical to
+    ``write_json_file(path, build_manifest(...))``. The file is written
+    beside ``path`` and moved into place when complete.
+    """
+    if dry_run:
+        print(f"[dry-run] Would write {path}")
+        return sum(1 for _ in artifacts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = path.with_name(path.name + ".tmp")
+    count = 0
+    try:
+        with staging.open("wb") as handle:
+            handle.write(b"{")
+            for key, value in header.items():
+                handle.write(b"\n  " + render_json(key).rstrip(b"\n") + b": ")
+                handle.write(_indent_rendered(render_json(value), b"  ") + b",")
+            handle.write(b'\n  "builds": [')
+            for artifact in artifacts:
+                handle.write(b",\n    " if count else b"\n    ")
+                handle.write(_indent_rendered(render_json(artifact.manifest_entry()), b"    "))
+                count += 1
+            handle.write(b"\n  ]\n}\n" if count else b"]\n}\n")
+        if not (path.exists() and filecmp.cmp(staging, path, shallow=False)):
+            os.replace(staging, path)
+    finally:
+        staging.unlink(missing_ok=True)
+    return count
+
+
+def esp_web_tools_manifest(artifact: FirmwareArtifact) -> Dict[str, object]:
+    return {
+        "name": "Sense360 ESP32 Firmware - Core Module",
+        "version": artifact.metadata.version,
+        "home_assistant_domain": "esphome",
+        "funding_url": "https://sense360store.com/support",
+        "new_install_prompt_erase": True,
+        "new_install_improv_wait_time": 15,
+        "builds": [
+            {
+                "chipFamily": artifact.chip_family,
+                "parts": artifact.part_entries(),
+                "improv": artifact.metadata.improv,
+                "md5": artifact.md5,
+                "sha256": artifact.sha256,
+                "signature": artifact.signature,
+            }
+        ],
+    }
+
+
+def _rebase_path(path: str, from_dir: Path, to_dir: Path) -> str:
+    if "://" in path or path.startswith("/"):
+        return path
+    return Path(os.path.relpath(from_dir / path, to_dir)).as_posix()
+
+
+def rebase_part_paths(manifest: Dict[str, object], from_dir: Path, to_dir: Path) -> Dict[str, object]:
+    """Rewrite an ESP Web Tools manifest's part paths for a copy placed in ``to_dir``.
+
+    ESP Web Tools resolves part paths against the manifest URL, so a manifest
+    written anywhere but its original directory needs its paths rebased.
+    """
+    for build in manifest.get("builds", []):  # type: ignore[union-attr]
+        for part in build.get("parts", []):
+            part["path"] = _rebase_path(str(part["path"]), from_dir, to_dir)
+            for key in ("compressed", "chunks"):
+                if isinstance(part.get(key), dict):
+                    linked = part[key]
+                    linked["path"] = _rebase_path(str(linked["path"]), from_dir, to_dir)
+    return manifest
+
+
+def write_individual_manifests(
+    artifacts: Sequence[FirmwareArtifact],
+    prefix: Path,
+    repo_root: Path,
+    *,
+    dry_run: bool,
+) -> List[Path]:
+    base_dir = (repo_root / prefix.parent).resolve()
+    prefix_name = prefix.name
+    if base_dir.exists():
+        existing = sorted(base_dir.glob(f"{prefix_name}[0-9]*.json"))
+    else:
+        existing = []
+    written: List[Path] = []
+    for index, artifact in enumerate(artifacts):
+        path = base_dir / f"{prefix_name}{index}.json"
+        write_json_file(path, esp_web_tools_manifest(artifact), dry_run=dry_run)
+        written.append(path)
+    current = set(written)
+    for path in existing:
+        if path in current:
+            continue
+        if dry_run:
+            print(f"[dry-run] Would remove {path}")
+        else:
+            path.unlink()
+    return written
+
+
+HISTORY_SHARD_VERSION = 1
+
+
+def write_history_shards(
+    archived: Sequence[FirmwareArtifact],
+    history_dir: Path,
+    repo_root: Path,
+    *,
+    dry_run: bool,
+    prune: bool = True,
+) -> Tuple[Dict[str, Dict[str, object]], List[Path], List[Path]]:
+    """Write builds dropped by the retention policy to per-config history shards.
+
+    Each configuration (or legacy build name) gets ``<name>.json`` listing its
+    archived manifest entries, newest first, and every archived build gets its
+    own ESP Web Tools manifest so it can still be installed. Returns the
+    ``history`` index for manifest.json, the install manifests and the shards
+    written. With ``prune`` stale files in ``history_dir`` are removed.
+    """
+
+    shards: Dict[str, List[FirmwareArtifact]] = {}
+    for artifact in archived:
+        meta = artifact.metadata
+        name = (meta.config_string if meta.is_configuration else None) or meta.name_part
+        shards.setdefault(name, []).append(artifact)
+    index: Dict[str, Dict[str, object]] = {}
+    installs: List[Path] = []
+    shard_paths: List[Path] = []
+    for name, members in sorted(shards.items()):
+        members.sort(key=lambda art: _version_sort_key(art.metadata.version))
+        members.sort(key=lambda art: CHANNEL_ORDER.get(art.metadata.channel, 99))
+        builds = []
+        for artifact in members:
+            install_path = history_dir / (Path(artifact.metadata.normalized_filename()).stem + ".json")
+            write_json_file(
+                install_path,
+                rebase_part_paths(esp_web_tools_manifest(artifact), repo_root, history_dir),
+                dry_run=dry_run,
+            )
+            installs.append(install_path)
+            entry = artifact.manifest_entry()
+            entry["manifest"] = Path(os.path.relpath(install_path, repo_root)).as_posix()
+            builds.append(entry)
+        shard_path = history_dir / f"{_safe_segment(name, 'Sense360')}.json"
+        write_json_file(
+            shard_path,
+            {"version": HISTORY_SHARD_VERSION, "name": name, "builds": builds},
+            dry_run=dry_run,
+        )
+        shard_paths.append(shard_path)
+        index[name] = {
+            "path": Path(os.path.relpath(shard_path, repo_root)).as_posix(),
+            "builds": len(builds),
+        }
+    if prune and history_dir.exists():
+        written = set(installs) | set(shard_paths)
+        for stale in sorted(history_dir.glob("*.json")):
+            if stale in written:
+                continue
+            if dry_run:
+                print(f"[dry-run] Would remove {stale}")
+            else:
+                stale.unlink()
+    return index, installs, shard_paths
+
+
+HASHED_MANIFEST_VERSION = 1
+HASHED_NAME_DIGEST_LENGTH = 16
+_HASHED_NAME_PATTERN = re.compile(r"^.+\.[0-9a-f]{%d}\.json$" % HASHED_NAME_DIGEST_LENGTH)
+
+
+def _hashed_name(name: str, digest: str) -> str:
+    stem, _, suffix = name.rpartition(".")
+    return f"{stem}.{digest[:HASHED_NAME_DIGEST_LENGTH]}.{suffix}"
+
+
+def _write_hashed_copy(data: bytes, name: str, hashed_dir: Path) -> Tuple[Path, str]:
+    digest = hashlib.sha256(data).hexdigest()
+    target = hashed_dir / _hashed_name(name, digest)
+    if not target.exists():
+        staging = target.with_name(target.name + ".tmp")
+        staging.write_bytes(data)
+        os.replace(staging, target)
+    return target, digest
+
+
+def _pointer_generation(pointer_path: Path, repo_root: Path) -> Set[Path]:
+    """Files referenced by an existing pointer, kept for one more publish."""
+
+    try:
+        pointer = json.loads(pointer_path.read_text(encoding="utf-8"))
+        digests_path = (repo_root / pointer["digests"]).resolve()
+        digests = json.loads(digests_path.read_text(encoding="utf-8"))
+        files = digests["files"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return set()
+    referenced = {digests_path}
+    for info in files.values():
+        if isinstance(info, dict) and isinstance(info.get("path"), str):
+            referenced.add((repo_root / info["path"]).resolve())
+    return referenced
+
+
+def publish_hashed_manifests(
+    paths: Sequence[Path],
+    hashed_dir: Path,
+    pointer_path: Path,
+    repo_root: Path,
+    *,
+    dry_run: bool,
+    install_manifests: Collection[Path] = (),
+) -> None:
+    """Publish immutable, content-hashed copies of the written manifests.
+
+    Each file in ``paths`` (manifest.json first) is copied to
+    ``hashed_dir/<name>.<hash>.json``; part paths in the ESP Web Tools
+    manifests listed in ``install_manifests`` are rebased for the new
+    directory. A digest map from the logical path to
+    the hashed copy, its size and an ETag-style digest is stored the same
+    way, and ``pointer_path`` names the hashed manifest and digest map. Only
+    the pointer changes name-for-name between publishes; hashed files from the
+    current and previous publish are kept and older ones are pruned.
+    """
+    if dry_run:
+        print(f"[dry-run] Would publish {len(paths)} hashed manifest(s) to {hashed_dir}")
+        print(f"[dry-run] Would write {pointer_path}")
+        return
+    hashed_dir.mkdir(parents=True, exist_ok=True)
+    keep = _pointer_generation(pointer_path, repo_root)
+    files: Dict[str, Dict[str, object]] = {}
+    for path in paths:
+        data = path.read_bytes()
+        if path in install_manifests and path.parent != hashed_dir:
+            data = render_json(rebase_part_paths(json.loads(data), path.parent, hashed_dir))
+        target, digest = _write_hashed_copy(data, path.name, hashed_dir)
+        keep.add(target.resolve())
+        files[Path(os.path.relpath(path, repo_root)).as_posix()] = {
+            "path": Path(os.path.relpath(target, repo_root)).as_posix(),
+            "size": len(data),
+            "etag": f'"{digest}"',
+        }
+    digest_map = {"version": HASHED_MANIFEST_VERSION, "files": files}
+    digest_bytes = render_json(digest_map)
+    digests_path, _ = _write_hashed_copy(digest_bytes, "digests.json", hashed_dir)
+    keep.add(digests_path.resolve())
+    pointer = {
+        "version": HASHED_MANIFEST_VERSION,
+        "manifest": files[Path(os.path.relpath(paths[0], repo_root)).as_posix()]["path"],
+        "digests": Path(os.path.relpath(digests_path, repo_root)).as_posix(),
+    }
+    write_json_file(pointer_path, pointer, dry_run=False)
+    for stale in sorted(hashed_dir.iterdir()):
+        if _HASHED_NAME_PATTERN.match(stale.name) and stale.resolve() not in keep:
+            stale.unlink()
+
+
+CATALOG_SCHEMA_VERSION = 1
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    config_string TEXT,
+    config_key TEXT,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    version_index TEXT NOT NULL,
+    mounting TEXT,
+    power TEXT,
+    chip_family TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    md5 TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    build_date TEXT NOT NULL,
+    latest INTEGER NOT NULL,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifact_modules (
+    path TEXT NOT NULL REFERENCES artifacts(path) ON DELETE CASCADE,
+    module TEXT NOT NULL,
+    PRIMARY KEY (path, module)
+);
+CREATE INDEX IF NOT EXISTS artifacts_by_config ON artifacts(config_key, channel, version_index);
+CREATE INDEX IF NOT EXISTS artifacts_by_channel ON artifacts(channel, power, mounting);
+CREATE INDEX IF NOT EXISTS artifacts_by_version ON artifacts(version_index);
+CREATE INDEX IF NOT EXISTS modules_by_name ON artifact_modules(module COLLATE NOCASE);
+"""
+_CATALOG_TABLES = ("artifact_modules", "artifacts", "catalog_meta")
+
+
+def catalog_version_index(version: str) -> str:
+    """Text form of :func:`_version_tuple` whose string order is version order.
+
+    Lets ``--since`` run as an indexed range query. Release candidates sort
+    before the matching release, as in the fallback version comparison.
+    """
+    numeric_parts, stability, suffix = _version_tuple(version)
+    padded = (list(numeric_parts) + [0, 0, 0, 0])[: max(4, len(numeric_parts))]
+    return ".".join(f"{part:08d}" for part in padded) + f"~{stability}~{suffix}"
+
+
+def open_catalog(path: Path, *, create: bool = True) -> sqlite3.Connection:
+    """Open (and if needed create or rebuild) the artifact catalog at ``path``.
+
+    A catalog written by a different schema version is dropped and rebuilt on
+    the next update, like the JSON caches.
+    """
+    if not create and not path.exists():
+        raise SystemExit(
+            f"Catalog {path} does not exist; run gen-manifests.py --catalog {path} first."
+        )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        row = conn.execute(
+            "SELECT value FROM catalog_meta WHERE key = 'schema_version'"
+        ).fetchone()
+    except sqlite3.DatabaseError:
+        row = None
+    if row is None or row["value"] != str(CATALOG_SCHEMA_VERSION):
+        if not create:
+            conn.close()
+            raise SystemExit(f"Catalog {path} is from another version; regenerate it.")
+        with conn:
+            for table in _CATALOG_TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.executescript(CATALOG_SCHEMA)
+            conn.execute(
+                "INSERT INTO catalog_meta (key, value) VALUES ('schema_version', ?)",
+                (str(CATALOG_SCHEMA_VERSION),),
+            )
+    return conn
+
+
+def _catalog_row(artifact: FirmwareArtifact, latest: bool) -> Dict[str, object]:
+    meta = artifact.metadata
+    config_string = meta.config_string if meta.is_configuration else None
+    return {
+        "path": artifact.relative_path,
+        "name": config_string or meta.name_part,
+        "config_string": config_string,
+        "config_key": config_string.lower() if config_string else None,
+        "channel": meta.channel,
+        "version": meta.version,
+        "version_index": catalog_version_index(meta.version),
+        "mounting": meta.mounting,
+        "power": meta.power,
+        "chip_family": artifact.chip_family,
+        "file_size": artifact.file_size,
+        "md5": artifact.md5,
+        "sha256": artifact.sha256,
+        "build_date": artifact.build_date,
+        "latest": int(latest),
+        "entry": json.dumps(artifact.manifest_entry(), sort_keys=True),
+    }
+
+
+def update_catalog(
+    conn: sqlite3.Connection,
+    artifacts: Sequence[FirmwareArtifact],
+    latest: Dict[Tuple[object, ...], FirmwareArtifact],
+    *,
+    manifest_version: str,
+) -> Tuple[int, int, int]:
+    """Bring the catalog in line with ``artifacts``; returns (added, updated, removed).
+
+    Only rows whose manifest entry or latest flag changed are rewritten, so an
+    unchanged tree costs one SELECT.
+    """
+    latest_ids = {id(artifact) for artifact in latest.values()}
+    existing = {
+        row["path"]: (row["entry"], row["latest"])
+        for row in conn.execute("SELECT path, entry, latest FROM artifacts")
+    }
+    added = updated = 0
+    seen: Set[str] = set()
+    with conn:
+        for artifact in artifacts:
+            row = _catalog_row(artifact, id(artifact) in latest_ids)
+            path = str(row["path"])
+            seen.add(path)
+            previous = existing.get(path)
+            if previous == (row["entry"], row["latest"]):
+                continue
+            if previous is None:
+                added += 1
+            else:
+                updated += 1
+                conn.execute("DELETE FROM artifacts WHERE path = ?", (path,))
+            columns = ", ".join(row)
+            placeholders = ", ".join(f":{column}" for column in row)
+            conn.execute(f"INSERT INTO artifacts ({columns}) VALUES ({placeholders})", row)
+            conn.executemany(
+                "INSERT OR IGNORE INTO artifact_modules (path, module) VALUES (?, ?)",
+                [(path, module) for module in artifact.metadata.modules],
+            )
+        removed = sorted(set(existing) - seen)
+        conn.executemany("DELETE FROM artifacts WHERE path = ?", [(path,) for path in removed])
+        conn.execute(
+            "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('manifest_version', ?)",
+            (manifest_version,),
+        )
+    return added, updated, len(removed)
+
+
+def query_catalog(
+    conn: sqlite3.Connection,
+    *,
+    config: Optional[str] = None,
+    channel: Optional[str] = None,
+    mounting: Optional[str] = None,
+    power: Optional[str] = None,
+    module: Optional[str] = None,
+    since: Optional[str] = None,
+    latest_only: bool = False,
+) -> List[sqlite3.Row]:
+    """Return catalog rows matching every given filter (case-insensitive)."""
+
+    clauses: List[str] = []
+    params: List[object] = []
+    if config:
+        clauses.append("config_key = ?")
+        params.append(config.lower())
+    if channel:
+        clauses.append("channel = ?")
+        params.append(canonical_channel(channel))
+    if mounting:
+        clauses.append("mounting = ? COLLATE NOCASE")
+        params.append(mounting)
+    if power:
+        clauses.append("power = ? COLLATE NOCASE")
+        params.append(power)
+    if module:
+        clauses.append(
+            "path IN (SELECT path FROM artifact_modules WHERE module = ? COLLATE NOCASE)"
+        )
+        params.append(module)
+    if since:
+        clauses.append("version_index > ?")
+        params.append(catalog_version_index(normalise_version(since)))
+    if latest_only:
+        clauses.append("latest = 1")
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return conn.execute(
+        f"SELECT * FROM artifacts {where} "
+        "ORDER BY lower(name), channel, version_index DESC",
+        params,
+    ).fetchall()
+
+
+def catalog_configs_missing_channel(conn: sqlite3.Connection, channel: str) -> List[str]:
+    """Configurations with no build at all on ``channel``."""
+
+    rows = conn.execute(
+        "SELECT MIN(config_string) AS config_string FROM artifacts "
+        "WHERE config_key IS NOT NULL GROUP BY config_key "
+        "HAVING SUM(channel = ?) = 0 ORDER BY config_key",
+        (canonical_channel(channel),),
+    ).fetchall()
+    return [row["config_string"] for row in rows]
+
+
+def catalog_missing_configs(conn: sqlite3.Connection, configs: Sequence[str]) -> List[str]:
+    """Requested configuration strings that have no build in the catalog."""
+
+    return sorted(
+        config
+        for config in configs
+        if conn.execute(
+            "SELECT 1 FROM artifacts WHERE config_key = ? LIMIT 1", (config.lower(),)
+        ).fetchone()
+        is None
+    )
+
+
+def _format_table(headers: Sequence[str], rows: Sequence[Sequence[str]]) -> str:
+    data = [list(headers)] + [list(row) for row in rows]
+    widths = [max(len(row[i]) for row in data) for i in range(len(headers))]
+    lines = [
+        "  ".join(row[i].ljust(widths[i]) for i in range(len(headers))).rstrip()
+        for row in data
+    ]
+    return "\n".join(lines)
+
+
+SUMMARY_HEADERS = ("Idx", "Device/Config", "Channel", "Version", "Path", "MD5")
+
+
+def _summary_row(index: int, artifact: FirmwareArtifact) -> List[str]:
+    meta = artifact.metadata
+    if meta.is_configuration:
+        device = f"Sense360-{meta.config_string}"
+    else:
+        parts = [meta.model or "Sense360"]
+        if meta.variant:
+            parts.append(meta.variant)
+        device = " ".join(part for part in parts if part).strip()
+        if meta.sensor_addon:
+            device += f" ({meta.sensor_addon})"
+    return [
+        str(index),
+        device,
+        meta.channel,
+        meta.version,
+        artifact.relative_path,
+        artifact.md5,
+    ]
+
+
+def build_summary_table(artifacts: Sequence[FirmwareArtifact]) -> str:
+    return _format_table(
+        SUMMARY_HEADERS,
+        [_summary_row(index, artifact) for index, artifact in enumerate(artifacts)],
+    )
+
+
+def iter_summary_lines(artifacts: Sequence[FirmwareArtifact]) -> Iterator[str]:
+    """Lines of :func:`build_summary_table`, without building all rows at once.
+
+    Rows are derived twice: once to size the columns, then again to print.
+    """
+
+    widths = [len(header) for header in SUMMARY_HEADERS]
+    for index, artifact in enumerate(artifacts):
+        widths = [max(width, len(cell)) for width, cell in zip(widths, _summary_row(index, artifact))]
+    rows = itertools.chain(
+        [list(SUMMARY_HEADERS)],
+        (_summary_row(index, artifact) for index, artifact in enumerate(artifacts)),
+    )
+    for row in rows:
+        yield "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+
+
+def write_summary_stream(
+    artifacts: Sequence[FirmwareArtifact],
+    target: Optional[Path],
+    *,
+    dry_run: bool,
+) -> None:
+    """Print the summary table line by line, copying each line to ``target``."""
+
+    handle = None
+    if target:
+        if dry_run:
+            print(f"[dry-run] Would write summary table to {target}")
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            handle = target.open("w", encoding="utf-8")
+    try:
+        for line in iter_summary_lines(artifacts):
+            print(line)
+            if handle:
+                handle.write(line + "\n")
+    finally:
+        if handle:
+            handle.close()
+
+
+VERIFY_ORPHAN_SUFFIXES = (".bin", DELTA_SUFFIX, COMPRESSED_SUFFIX)
+RESCUE_MANIFEST_PATH = "firmware/rescue/manifest.json"
+DEFAULT_VERIFY_JOBS = min(8, os.cpu_count() or 1)
+
+
+@dataclass
+class ManifestReference:
+    """A file a deployed manifest points at, and the digests it promises."""
+
+    source: str
+    raw_path: str
+    path: Path
+    expected: Dict[str, object]
+    root_relative: bool = False
+
+
+@dataclass
+class VerifyReport:
+    manifests: int = 0
+    files: int = 0
+    hashed: int = 0
+    cached: int = 0
+    dangling: List[str] = field(default_factory=list)
+    stale: List[str] = field(default_factory=list)
+    invalid: List[str] = field(default_factory=list)
+    orphaned: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    def failed(self, *, strict: bool) -> bool:
+        if self.dangling or self.stale or self.invalid:
+            return True
+        return strict and bool(self.orphaned or self.warnings)
+
+
+def _display_path(path: Path, repo_root: Path) -> str:
+    try:
+        return path.relative_to(repo_root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def _reference(
+    item: Dict[str, object],
+    source: str,
+    keys: Sequence[str],
+    base_dir: Path,
+    repo_root: Path,
+    *,
+    path_key: str = "path",
+) -> Iterator[ManifestReference]:
+    raw = item.get(path_key)
+    if not isinstance(raw, str) or "://" in raw:
+        return
+    path = (base_dir / raw).resolve()
+    root_relative = False
+    if base_dir != repo_root and not path.exists() and (repo_root / raw).exists():
+        # ESP Web Tools resolves parts against the manifest URL, not the site root.
+        path, root_relative = (repo_root / raw).resolve(), True
+    expected = {key: item[key] for key in keys if item.get(key) is not None}
+    yield ManifestReference(source, raw, path, expected, root_relative)
+
+
+def build_references(
+    build: Dict[str, object],
+    source: str,
+    base_dir: Path,
+    repo_root: Path,
+) -> Iterator[ManifestReference]:
+    """Files referenced by one build entry of manifest.json or an ESP Web Tools manifest."""
+
+    for index, part in enumerate(build.get("parts") or []):  # type: ignore[union-attr]
+        if not isinstance(part, dict):
+            continue
+        where = f"{source} parts[{index}]"
+        yield from _reference(part, where, ("md5", "sha256"), base_dir, repo_root)
+        if isinstance(part.get("compressed"), dict):
+            yield from _reference(
+                part["compressed"], f"{where} compressed", ("size", "sha256"), base_dir, repo_root
+            )
+        if isinstance(part.get("chunks"), dict):
+            # A chunk reference's "size" is the chunk size, so only the table's presence is checked.
+            yield from _reference(part["chunks"], f"{where} chunks", (), base_dir, repo_root)
+    for index, delta in enumerate(build.get("deltas") or []):  # type: ignore[union-attr]
+        if isinstance(delta, dict):
+            yield from _reference(
+                delta, f"{source} deltas[{index}]", ("size", "sha256"), base_dir, repo_root
+            )
+    notes = build.get("release_notes")
+    if isinstance(notes, dict):
+        yield from _reference(notes, f"{source} release_notes", ("sha256",), base_dir, repo_root)
+        yield from _reference(
+            notes, f"{source} release_notes shard", (), base_dir, repo_root, path_key="shard"
+        )
+
+
+def _load_verified_json(path: Path, repo_root: Path, report: VerifyReport) -> Optional[Dict[str, object]]:
+    shown = _display_path(path, repo_root)
+    try:
+        data = json.loads(path.read_bytes())
+    except FileNotFoundError:
+        report.dangling.append(f"{shown}: manifest is missing")
+        return None
+    except (OSError, ValueError) as exc:
+        report.invalid.append(f"{shown}: {exc}")
+        return None
+    if not isinstance(data, dict):
+        report.invalid.append(f"{shown}: not a JSON object")
+        return None
+    report.manifests += 1
+    return data
+
+
+def collect_manifest_references(
+    manifest_path: Path,
+    prefix: Path,
+    repo_root: Path,
+    extra_manifests: Sequence[Path],
+    report: VerifyReport,
+    *,
+    published: Optional[Dict[str, Path]] = None,
+) -> List[ManifestReference]:
+    """Load manifest.json and every shard, index and ESP Web Tools manifest it names.
+
+    manifest.json, history shards and compatibility build shards carry
+    repository-relative paths; ESP Web Tools manifests are resolved against
+    their own directory. Numbered
+    manifests beyond the build count are reported as orphaned.
+
+    With ``published`` (logical path to hashed copy, from
+    :func:`check_published_manifests`) ``manifest_path`` is the hashed
+    manifest and every file it names is read from its hashed copy, so install
+    manifests resolve their rebased part paths against the hashed directory.
+    """
+
+    def locate(raw: str, source: str) -> Optional[Path]:
+        if published is None:
+            return (repo_root / raw).resolve()
+        logical = Path(os.path.normpath(raw)).as_posix()
+        if logical not in published:
+            report.dangling.append(f"{source}: {raw} is not in the digest map")
+            return None
+        return published[logical]
+
+    references: List[ManifestReference] = []
+    manifest = _load_verified_json(manifest_path, repo_root, report)
+    if manifest is None:
+        return references
+    shown = _display_path(manifest_path, repo_root)
+    builds = [build for build in manifest.get("builds") or [] if isinstance(build, dict)]  # type: ignore[union-attr]
+    for index, build in enumerate(builds):
+        references.extend(build_references(build, f"{shown} builds[{index}]", repo_root, repo_root))
+    prefix_dir = (repo_root / prefix.parent).resolve()
+    numbered = [
+        Path(os.path.relpath(prefix_dir / f"{prefix.name}{index}.json", repo_root)).as_posix()
+        for index in range(len(builds))
+    ]
+    esp_manifests = [path for path in (locate(raw, shown) for raw in numbered) if path is not None]
+    shard_paths: List[str] = []
+    history = manifest.get("history")
+    shard_paths.extend(
+        info["path"]
+        for info in (history.values() if isinstance(history, dict) else [])
+        if isinstance(info, dict) and isinstance(info.get("path"), str)
+    )
+    compat_index = manifest.get("compat_index")
+    if isinstance(compat_index, str):
+        index_path = locate(compat_index, shown)
+        index = _load_verified_json(index_path, repo_root, report) if index_path else None
+        shards = index.get("shards") if index else None
+        if isinstance(shards, dict):
+            shard_paths.extend(path for path in shards.values() if isinstance(path, str))
+    for raw in shard_paths:
+        shard_path = locate(raw, shown)
+        shard = _load_verified_json(shard_path, repo_root, report) if shard_path else None
+        if shard is None:
+            continue
+        shard_shown = _display_path(shard_path, repo_root)  # type: ignore[arg-type]
+        for index, build in enumerate(shard.get("builds") or []):  # type: ignore[union-attr]
+            if not isinstance(build, dict):
+                continue
+            references.extend(build_references(build, f"{shard_shown} builds[{index}]", repo_root, repo_root))
+            if isinstance(build.get("manifest"), str):
+                install_path = locate(build["manifest"], shard_shown)
+                if install_path is not None:
+                    esp_manifests.append(install_path)
+    for path in [*esp_manifests, *extra_manifests]:
+        data = _load_verified_json(path, repo_root, report)
+        if data is None:
+            continue
+        for index, build in enumerate(data.get("builds") or []):  # type: ignore[union-attr]
+            if isinstance(build, dict):
+                source = f"{_display_path(path, repo_root)} builds[{index}]"
+                references.extend(build_references(build, source, path.parent, repo_root))
+    if published is None and prefix_dir.exists():
+        expected = set(esp_manifests[: len(builds)])
+        for path in sorted(prefix_dir.glob(f"{prefix.name}[0-9]*.json")):
+            if path not in expected:
+                report.orphaned.append(_display_path(path, repo_root))
+    return references
+
+
+def check_published_manifests(
+    pointer_path: Path, repo_root: Path, report: VerifyReport
+) -> Optional[Tuple[Path, Dict[str, Path]]]:
+    """Check the generation named by ``manifest-pointer.json``.
+
+    Every digest-map entry must exist with the recorded size and ETag, be
+    named by its own hash, and still match its logical file (install
+    manifests after rebasing their part paths back). Returns the hashed
+    manifest and the map from logical paths to hashed copies, or ``None``
+    when the pointer or digest map cannot be used.
+    """
+
+    pointer = _load_verified_json(pointer_path, repo_root, report)
+    if pointer is None:
+        return None
+    shown = _display_path(pointer_path, repo_root)
+    if pointer.get("version") != HASHED_MANIFEST_VERSION or not all(
+        isinstance(pointer.get(key), str) for key in ("manifest", "digests")
+    ):
+        report.invalid.append(f"{shown}: not a version {HASHED_MANIFEST_VERSION} manifest pointer")
+        return None
+    digests_path = (repo_root / str(pointer["digests"])).resolve()
+    digest_map = _load_verified_json(digests_path, repo_root, report)
+    if digest_map is None:
+        return None
+    digests_shown = _display_path(digests_path, repo_root)
+    files = digest_map.get("files")
+    if not isinstance(files, dict):
+        report.invalid.append(f"{digests_shown}: no files map")
+        return None
+    digest = hashlib.sha256(digests_path.read_bytes()).hexdigest()
+    if digests_path.name != _hashed_name("digests.json", digest):
+        report.stale.append(f"{digests_shown}: content does not match its hashed name")
+    published: Dict[str, Path] = {}
+    for logical, info in sorted(files.items()):
+        if not isinstance(info, dict) or not isinstance(info.get("path"), str):
+            report.invalid.append(f"{digests_shown}: {logical} has no hashed path")
+            continue
+        hashed = (repo_root / info["path"]).resolve()
+        try:
+            data = hashed.read_bytes()
+        except FileNotFoundError:
+            report.dangling.append(f"{digests_shown}: {logical} -> {info['path']}")
+            continue
+        published[logical] = hashed
+        digest = hashlib.sha256(data).hexdigest()
+        if info.get("size") != len(data):
+            report.stale.append(
+                f"{digests_shown}: {info['path']} size is {len(data)}, digest map says {info.get('size')}"
+            )
+        if info.get("etag") != f'"{digest}"' or hashed.name != _hashed_name(Path(logical).name, digest):
+            report.stale.append(f"{digests_shown}: {info['path']} content does not match its hash")
+        logical_path = (repo_root / logical).resolve()
+        try:
+            current = logical_path.read_bytes()
+        except FileNotFoundError:
+            continue
+        if current != data and current != _unrebased(data, hashed.parent, logical_path.parent):
+            report.stale.append(f"{shown}: {logical} differs from its published copy {info['path']}")
+    manifest_path = (repo_root / str(pointer["manifest"])).resolve()
+    if manifest_path not in published.values():
+        report.dangling.append(f"{shown}: {pointer['manifest']} is not in the digest map")
+        return None
+    return manifest_path, published
+
+
+def _unrebased(data: bytes, hashed_dir: Path, logical_dir: Path) -> Optional[bytes]:
+    try:
+        manifest = json.loads(data)
+        return render_json(rebase_part_paths(manifest, hashed_dir, logical_dir))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+def _digest_reference(path: Path, *, image: bool) -> Tuple[Dict[str, object], Optional[str]]:
+    """Digest one referenced file on a worker thread; ESP image errors are returned, not raised."""
+
+    error = None
+    if image:
+        try:
+            return compute_digest_record(path), None
+        except EspImageError as exc:
+            error = f"invalid ESP image: {exc}"
+    md5, sha256, _ = hash_file(path).result()
+    return {"md5": md5, "sha256": sha256}, error
+
+
+def verify_references(
+    references: Sequence[ManifestReference],
+    repo_root: Path,
+    digest_cache: DigestCache,
+    report: VerifyReport,
+    *,
+    jobs: int = DEFAULT_VERIFY_JOBS,
+    rehash: bool = False,
+) -> Set[Path]:
+    """Check every referenced file exists and still has its recorded digests.
+
+    Cache lookups and stores stay on the calling thread; only cache misses are
+    hashed, ``jobs`` at a time. Returns the referenced paths.
+    """
+
+    by_path: Dict[Path, List[ManifestReference]] = {}
+    for reference in references:
+        by_path.setdefault(reference.path, []).append(reference)
+        if reference.root_relative:
+            report.warnings.append(
+                f"{reference.source}: {reference.raw_path} only resolves against the repository root"
+            )
+    report.files = len(by_path)
+    records: Dict[Path, Dict[str, object]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        pending = {}
+        for path, refs in by_path.items():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                report.dangling.extend(f"{ref.source}: {ref.raw_path}" for ref in refs)
+                continue
+            if not any(ref.expected for ref in refs):
+                continue
+            image = path.suffix == ".bin"
+            cached = digest_cache.lookup(path, stat) if image and not rehash else None
+            if cached is not None:
+                report.cached += 1
+                records[path] = cached
+                continue
+            pending[pool.submit(_digest_reference, path, image=image)] = (path, stat, image)
+        for future in as_completed(pending):
+            path, stat, image = pending[future]
+            shown = _display_path(path, repo_root)
+            try:
+                record, error = future.result()
+            except OSError as exc:
+                report.invalid.append(f"{shown}: {exc}")
+                continue
+            report.hashed += 1
+            if error:
+                report.invalid.append(f"{shown}: {error}")
+            elif image:
+                record = digest_cache.store(path, stat, record)
+            records[path] = dict(record, size=stat.st_size)
+    for path, record in records.items():
+        for reference in by_path[path]:
+            for key, value in reference.expected.items():
+                if record.get(key) != value:
+                    report.stale.append(
+                        f"{reference.source}: {reference.raw_path} {key} is {record.get(key)}, "
+                        f"manifest says {value}"
+                    )
+    return set(by_path)
+
+
+def find_orphaned_files(firmware_dir: Path, referenced: Set[Path], repo_root: Path) -> List[str]:
+    """Published binaries, deltas and compressed parts that no manifest references."""
+
+    orphaned = []
+    for root, dirs, files in os.walk(firmware_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = Path(root, name).resolve()
+            if path.suffix in VERIFY_ORPHAN_SUFFIXES and path not in referenced:
+                orphaned.append(_display_path(path, repo_root))
+    return orphaned
+
+
+PARTIAL_INCOMPATIBLE_OPTIONS = (
+    ("retain_versions", "--retain-versions"),
+    ("retain_since", "--retain-since"),
+    ("compat_index", "--compat-index"),
+    ("latest_feed", "--latest-feed"),
+    ("hashed_manifests", "--hashed-manifests"),
+    ("catalog", "--catalog"),
+    ("assert_configs", "--assert-config"),
+    ("watch", "--watch"),
+)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Generate manifest.json and ESP Web Tools manifests from firmware binaries."
+        )
+    )
+    parser.add_argument(
+        "--firmware-dir",
+        default="firmware",
+        help="Directory that stores firmware binaries (default: firmware)",
+    )
+    parser.add_argument(
+        "--repo-root",
+        default=".",
+        help="Repository root used for relative paths (default: current directory)",
+    )
+    parser.add_argument(
+        "--manifest-path",
+        default="manifest.json",
+        help="Path to write manifest.json (default: manifest.json)",
+    )
+    parser.add_argument(
+        "--manifest-prefix",
+        default="firmware-",
+        help="Filename prefix (optionally with directories) for ESP Web Tools manifests.",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Print a summary table of detected firmware builds.",
+    )
+    parser.add_argument(
+        "--summary-file",
+        help="Optional path to write the summary table.",
+    )
+    parser.add_argument(
+        "--allow-empty",
+        action="store_true",
+        help="Do not fail when no firmware binaries are found.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Preview changes without writing files or moving binaries.",
+    )
+    parser.add_argument(
+        "--assert-config",
+        action="append",
+        dest="assert_configs",
+        help=(
+            "Ensure that the specified configuration string exists in the generated "
+            "manifest. Can be provided multiple times or as a comma-separated list."
+        ),
+    )
+    parser.add_argument(
+        "--strict-validate",
+        action="store_true",
+        help=(
+            "Promote manifest-metadata validation findings (description / module / size "
+            "drift) from warnings to build failures."
+        ),
+    )
+    parser.add_argument(
+        "--min-firmware-size",
+        type=int,
+        default=DEFAULT_MIN_FIRMWARE_SIZE_BYTES,
+        help=(
+            "Minimum plausible firmware size in bytes; smaller builds are flagged as "
+            "suspicious. Default: %(default)s. Set to 0 to disable the size check."
+        ),
+    )
+    parser.add_argument(
+        "--size-budget",
+        type=parse_size,
+        help=(
+            "Report the newest build of any configuration and channel that is larger "
+            "than this size, e.g. 1800K or 4M."
+        ),
+    )
+    parser.add_argument(
+        "--size-growth-budget",
+        type=float,
+        metavar="PERCENT",
+        help=(
+            "Report the newest build of any configuration and channel that grew by "
+            "more than PERCENT over its previous version."
+        ),
+    )
+    parser.add_argument(
+        "--strict-size-budget",
+        action="store_true",
+        help="Promote size budget findings from warnings to build failures.",
+    )
+    parser.add_argument(
+        "--size-report",
+        action="store_true",
+        help="Print each build's size, change since its previous version and estimated flash time.",
+    )
+    parser.add_argument(
+        "--flash-estimates",
+        action="store_true",
+        help=(
+            "Add flash_estimate (serial flash and download seconds at typical baud rates "
+            "and link speeds) to each manifest entry."
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help=(
+            "Directory for persistent build caches (digests and derived outputs). "
+            "Unchanged binaries are not re-hashed between runs when set."
+        ),
+    )
+    parser.add_argument(
+        "--trust-embedded-digest",
+        action="store_true",
+        help=(
+            "Reuse cached digests for ESP images whose appended SHA-256 matches a "
+            "cached record, without re-reading the file. Needs a populated "
+            "--cache-dir; binaries without a cached record are always hashed."
+        ),
+    )
+    parser.add_argument(
+        "--dedupe",
+        choices=DEDUPE_MODES,
+        default="off",
+        help=(
+            "Handle byte-identical binaries: 'report' lists them, 'canonical' points "
+            "duplicate manifest entries at one binary path, 'hardlink' replaces "
+            "duplicate files with hardlinks. Default: %(default)s."
+        ),
+    )
+    parser.add_argument(
+        "--release-notes",
+        choices=RELEASE_NOTES_MODES,
+        default="inline",
+        help=(
+            "Ingest release-notes .md files: 'inline' embeds the markdown in each build, "
+            "'shard' groups it into per-configuration files. Parsed features, "
+            "requirements, known issues and changelog are always inlined. "
+            "Default: %(default)s."
+        ),
+    )
+    parser.add_argument(
+        "--release-notes-dir",
+        default="firmware/notes",
+        help="Directory for release-notes shards (default: firmware/notes).",
+    )
+    parser.add_argument(
+        "--deltas",
+        action="store_true",
+        help="Build delta packages between consecutive versions of each build.",
+    )
+    parser.add_argument(
+        "--delta-dir",
+        default="firmware/deltas",
+        help="Directory for delta packages (default: firmware/deltas).",
+    )
+    parser.add_argument(
+        "--delta-min-savings",
+        type=float,
+        default=DEFAULT_DELTA_MIN_SAVINGS,
+        help=(
+            "Minimum fraction of the full image a delta must save to be published. "
+            "Default: %(default)s."
+        ),
+    )
+    parser.add_argument(
+        "--compress-parts",
+        action="store_true",
+        help="Emit a deflate-compressed copy of each part alongside the raw binary.",
+    )
+    parser.add_argument(
+        "--compressed-dir",
+        default="firmware/compressed",
+        help="Directory for compressed parts (default: firmware/compressed).",
+    )
+    parser.add_argument(
+        "--split-parts",
+        action="store_true",
+        help=(
+            "Publish merged full-flash images as bootloader, partition table, "
+            "otadata and app parts at their real offsets, storing identical parts once."
+        ),
+    )
+    parser.add_argument(
+        "--parts-dir",
+        default="firmware/parts",
+        help="Directory for split, content-addressed parts (default: firmware/parts).",
+    )
+    parser.add_argument(
+        "--chunk-digests",
+        action="store_true",
+        help=(
+            "Publish per-chunk SHA-256 tables and a Merkle root for every part, "
+            "computed in the same pass as the whole-file digests."
+        ),
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=(
+            "Chunk size in bytes for --chunk-digests; a multiple of the 4 KiB flash "
+            "sector (default: %(default)s)."
+        ),
+    )
+    parser.add_argument(
+        "--chunk-dir",
+        default="firmware/chunks",
+        help="Directory for chunk tables (default: firmware/chunks).",
+    )
+    parser.add_argument(
+        "--stream-output",
+        action="store_true",
+        help=(
+            "Write manifest.json and the summary table one build at a time, so the "
+            "writers never hold the whole rendering (output is identical)."
+        ),
+    )
+    parser.add_argument(
+        "--only-config",
+        action="append",
+        dest="only_configs",
+        help=(
+            "Only rescan and regenerate builds of this configuration string and merge "
+            "them into the existing manifests. Can be repeated or comma-separated."
+        ),
+    )
+    parser.add_argument(
+        "--only-channel",
+        action="append",
+        dest="only_channels",
+        help=(
+            "Only rescan and regenerate builds on this channel (combined with "
+            "--only-config, both must match). Can be repeated or comma-separated."
+        ),
+    )
+    parser.add_argument(
+        "--change-set",
+        metavar="PATH",
+        help=(
+            "Write a JSON list of the files this run added, changed, removed or moved "
+            "(binaries and generated outputs, with SHA-256 digests) to PATH."
+        ),
+    )
+    parser.add_argument(
+        "--change-set-baseline",
+        metavar="PATH",
+        help=(
+            "Inventory of the files the previous deploy published. --change-set is "
+            "computed against it rather than against the tree this run started from, "
+            "and PATH is then updated with this run's files. Keep it in a CI cache."
+        ),
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and regenerate whenever binaries or release notes change.",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between --watch polls of the firmware tree (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--watch-debounce",
+        type=float,
+        default=0.5,
+        help=(
+            "Seconds the tree must stay unchanged before --watch regenerates "
+            "(default: %(default)s)."
+        ),
+    )
+    parser.add_argument(
+        "--reproducible",
+        action="store_true",
+        help=(
+            "Derive build_date from the app descriptor, git commit time or "
+            "SOURCE_DATE_EPOCH instead of file mtimes, so identical inputs give "
+            "byte-identical manifests."
+        ),
+    )
+    parser.add_argument(
+        "--latest-feed",
+        action="store_true",
+        help="Write a compact latest-version-per-build feed for update polling.",
+    )
+    parser.add_argument(
+        "--latest-feed-path",
+        default="latest.json",
+        help="Path to write the latest-version feed (default: latest.json).",
+    )
+    parser.add_argument(
+        "--compat-index",
+        action="store_true",
+        help="Write a precomputed wizard compatibility index next to manifest.json.",
+    )
+    parser.add_argument(
+        "--compat-index-path",
+        default="compat-index.json",
+        help="Path to write the compatibility index (default: compat-index.json).",
+    )
+    parser.add_argument(
+        "--compat-shard-dir",
+        default="firmware/builds",
+        help=(
+            "Directory for the per-config build shards named by the compatibility "
+            "index (default: firmware/builds)."
+        ),
+    )
+    parser.add_argument(
+        "--hashed-manifests",
+        action="store_true",
+        help=(
+            "Also publish content-hashed manifest copies, a digest map and a "
+            "pointer file so everything but the pointer can be cached forever."
+        ),
+    )
+    parser.add_argument(
+        "--hashed-manifest-dir",
+        default="manifests",
+        help="Directory for content-hashed manifests (default: manifests).",
+    )
+    parser.add_argument(
+        "--manifest-pointer-path",
+        default="manifest-pointer.json",
+        help="Path to write the manifest pointer (default: manifest-pointer.json).",
+    )
+    parser.add_argument(
+        "--retain-versions",
+        type=int,
+        metavar="N",
+        help=(
+            "Keep only the N newest versions of each configuration and channel in "
+            "manifest.json; older builds move to history shards."
+        ),
+    )
+    parser.add_argument(
+        "--retain-since",
+        type=parse_retain_since,
+        metavar="DATE",
+        help=(
+            "Keep builds dated on or after DATE (YYYY-MM-DD) in manifest.json; "
+            "combined with --retain-versions a build is kept if either allows it."
+        ),
+    )
+    parser.add_argument(
+        "--history-dir",
+        default="firmware/history",
+        help="Directory for archived-build history shards (default: firmware/history).",
+    )
+    parser.add_argument(
+        "--catalog",
+        help=(
+            "SQLite artifact catalog to update incrementally after generation; "
+            "read it back with the 'query' subcommand."
+        ),
+    )
+    args = parser.parse_args(argv)
+    if args.retain_versions is not None and args.retain_versions < 1:
+        parser.error("--retain-versions must be at least 1")
+    if args.only_configs or args.only_channels:
+        conflicts = [flag for name, flag in PARTIAL_INCOMPATIBLE_OPTIONS if getattr(args, name)]
+        if conflicts:
+            parser.error(
+                "--only-config/--only-channel cannot be combined with "
+                + ", ".join(conflicts)
+                + "; those outputs need a full regeneration"
+            )
+    if args.watch_interval <= 0 or args.watch_debounce < 0:
+        parser.error("--watch-interval must be positive and --watch-debounce non-negative")
+    if args.size_growth_budget is not None and args.size_growth_budget < 0:
+        parser.error("--size-growth-budget must not be negative")
+    if args.chunk_size <= 0 or args.chunk_size % FLASH_SECTOR_SIZE:
+        parser.error(f"--chunk-size must be a positive multiple of {FLASH_SECTOR_SIZE}")
+    if args.change_set_baseline and not args.change_set:
+        parser.error("--change-set-baseline requires --change-set")
+    if args.split_parts and args.deltas:
+        # Deltas rebuild the merged image, which split builds no longer flash.
+        parser.error("--split-parts cannot be combined with --deltas")
+    return args
+
+
+def parse_query_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="gen-manifests.py query",
+        description="Query the SQLite artifact catalog written by --catalog.",
+    )
+    parser.add_argument("--catalog", required=True, help="Path to the catalog database.")
+    parser.add_argument("--config", help="Configuration string, e.g. Ceiling-POE-AirIQ.")
+    parser.add_argument("--channel", help="Release channel (aliases such as rc are accepted).")
+    parser.add_argument("--mounting", help="Mounting type, e.g. Ceiling.")
+    parser.add_argument("--power", help="Power type, e.g. POE.")
+    parser.add_argument("--module", help="Builds that include this module, e.g. AirIQ.")
+    parser.add_argument("--since", help="Only builds newer than this version.")
+    parser.add_argument(
+        "--latest",
+        action="store_true",
+        help="Only the newest build of each configuration and channel.",
+    )
+    parser.add_argument(
+        "--missing-channel",
+        metavar="CHANNEL",
+        help="List configurations that have no build on CHANNEL.",
+    )
+    parser.add_argument(
+        "--assert-config",
+        action="append",
+        dest="assert_configs",
+        help=(
+            "Fail unless the configuration string has a build (case-insensitive). "
+            "Can be provided multiple times or as a comma-separated list."
+        ),
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    return parser.parse_args(argv)
+
+
+def _split_config_list(values: Optional[Sequence[str]]) -> List[str]:
+    configs: List[str] = []
+    for value in values or []:
+        if value:
+            configs.extend(item.strip() for item in value.split(",") if item.strip())
+    return configs
+
+
+def query_main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_query_args(argv)
+    conn = open_catalog(Path(args.catalog), create=False)
+    try:
+        requested_configs = _split_config_list(args.assert_configs)
+        if requested_configs:
+            missing = catalog_missing_configs(conn, requested_configs)
+            for config in requested_configs:
+                if config not in missing:
+                    print(f"Found: {config}")
+            if missing:
+                print(
+                    "Missing required configuration(s): " + ", ".join(missing),
+                    file=sys.stderr,
+                )
+                return 1
+            print(f"All {len(requested_configs)} required configuration(s) present.")
+            return 0
+        if args.missing_channel:
+            configs = catalog_configs_missing_channel(conn, args.missing_channel)
+            print(json.dumps(configs, indent=2) if args.json else "\n".join(configs))
+            return 0
+        rows = query_catalog(
+            conn,
+            config=args.config,
+            channel=args.channel,
+            mounting=args.mounting,
+            power=args.power,
+            module=args.module,
+            since=args.since,
+            latest_only=args.latest,
+        )
+    finally:
+        conn.close()
+    if args.json:
+        print(json.dumps([dict(json.loads(row["entry"]), path=row["path"]) for row in rows], indent=2))
+    elif rows:
+        print(
+            _format_table(
+                ["Config/Build", "Channel", "Version", "Path", "SHA256"],
+                [
+                    [
+                        row["name"],
+                        row["channel"],
+                        row["version"] + (" *" if row["latest"] else ""),
+                        row["path"],
+                        row["sha256"][:16],
+                    ]
+                    for row in rows
+                ],
+            )
+        )
+    return 0
+
+
+def parse_verify_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="gen-manifests.py verify",
+        description=(
+            "Check that every file referenced by the deployed manifests exists and "
+            "matches its recorded digests, and report unreferenced binaries."
+        ),
+    )
+    parser.add_argument(
         "--repo-root",
         default=".",
         help="Repository root used for relative paths (default: current directory)",
     )
+    parser.add_argument(
+        "--firmware-dir",
+        default="firmware",
+        help="Directory scanned for orphaned binaries (default: firmware)",
+    )
     parser.add_argument(
         "--manifest-path",
         default="manifest.json",
-        help="Path to write manifest.json (default: manifest.json)",
+        help="manifest.json to verify (default: manifest.json)",
     )
     parser.add_argument(
         "--manifest-prefix",
         default="firmware-",
-        help="Filename prefix (optionally with directories) for ESP Web Tools manifests.",
+        help="Prefix of the numbered ESP Web Tools manifests (default: firmware-)",
     )
     parser.add_argument(
-        "--summary",
-        action="store_true",
-        help="Print a summary table of detected firmware builds.",
+        "--manifest-pointer-path",
+        default="manifest-pointer.json",
+        help=(
+            "Manifest pointer whose hashed manifests and digest map are also "
+            "verified, if it exists (default: manifest-pointer.json)"
+        ),
     )
     parser.add_argument(
-        "--summary-file",
-        help="Optional path to write the summary table.",
+        "--manifest",
+        action="append",
+        dest="manifests",
+        help=(
+            "Additional ESP Web Tools manifest to verify. Can be provided multiple "
+            f"times (default: {RESCUE_MANIFEST_PATH})."
+        ),
     )
     parser.add_argument(
-        "--allow-empty",
-        action="store_true",
-        help="Do not fail when no firmware binaries are found.",
+        "--cache-dir",
+        help="Digest cache directory shared with generation; unchanged binaries are not re-read.",
     )
     parser.add_argument(
-        "--dry-run",
+        "--rehash",
         action="store_true",
-        help="Preview changes without writing files or moving binaries.",
+        help="Re-read every binary even if the digest cache has a fresh record.",
     )
     parser.add_argument(
-        "--assert-config",
-        action="append",
-        dest="assert_configs",
-        help=(
-            "Ensure that the specified configuration string exists in the generated "
-            "manifest. Can be provided multiple times or as a comma-separated list."
-        ),
+        "--jobs",
+        type=int,
+        default=DEFAULT_VERIFY_JOBS,
+        help="Files hashed in parallel (default: %(default)s).",
     )
     parser.add_argument(
-        "--strict-validate",
+        "--strict",
         action="store_true",
-        help=(
-            "Promote manifest-metadata validation findings (description / module / size "
-            "drift) from warnings to build failures."
-        ),
-    )
-    parser.add_argument(
-        "--min-firmware-size",
-        type=int,
-        default=DEFAULT_MIN_FIRMWARE_SIZE_BYTES,
-        help=(
-            "Minimum plausible firmware size in bytes; smaller builds are flagged as "
-            "suspicious. Default: %(default)s. Set to 0 to disable the size check."
-        ),
+        help="Also fail on orphaned files and paths that only resolve against the repository root.",
     )
-    return parser.parse_args(argv)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
 
 
-def main(argv: Optional[Sequence[str]] = None) -> int:
-    args = parse_args(argv)
+def verify_main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_verify_args(argv)
+    started = time.perf_counter()
     repo_root = Path(args.repo_root).resolve()
-    firmware_dir = (repo_root / args.firmware_dir).resolve()
-    manifest_path = (repo_root / args.manifest_path).resolve()
-    manifest_prefix = Path(args.manifest_prefix)
-    artifacts = collect_firmware(
-        firmware_dir,
+    cache_dir = (repo_root / args.cache_dir).resolve() if args.cache_dir else None
+    digest_cache = DigestCache(cache_dir / DIGEST_CACHE_FILENAME if cache_dir else None)
+    report = VerifyReport()
+    references = collect_manifest_references(
+        (repo_root / args.manifest_path).resolve(),
+        Path(args.manifest_prefix),
         repo_root,
-        dry_run=args.dry_run,
-        default_channel=DEFAULT_CHANNEL,
+        [(repo_root / path).resolve() for path in args.manifests or [RESCUE_MANIFEST_PATH]],
+        report,
     )
-    if not artifacts:
-        message = f"No firmware binaries found in {firmware_dir}"
-        if args.allow_empty:
-            print(message)
-            return 0
-        raise SystemExit(message)
-    selected, superseded = select_latest_builds(artifacts)
+    pointer_path = (repo_root / args.manifest_pointer_path).resolve()
+    if pointer_path.exists():
+        checked = check_published_manifests(pointer_path, repo_root, report)
+        if checked is not None:
+            hashed_manifest, published = checked
+            references.extend(
+                collect_manifest_references(
+                    hashed_manifest, Path(args.manifest_prefix), repo_root, [], report, published=published
+                )
+            )
+    referenced = verify_references(
+        references, repo_root, digest_cache, report, jobs=args.jobs, rehash=args.rehash
+    )
+    report.orphaned.extend(
+        find_orphaned_files((repo_root / args.firmware_dir).resolve(), referenced, repo_root)
+    )
+    digest_cache.save()
+    elapsed = time.perf_counter() - started
+    failed = report.failed(strict=args.strict)
+    findings = ("dangling", "stale", "invalid", "orphaned", "warnings")
+    if args.json:
+        payload = {key: getattr(report, key) for key in ("manifests", "files", "hashed", "cached")}
+        payload.update({key: sorted(getattr(report, key)) for key in findings})
+        payload.update(seconds=round(elapsed, 3), ok=not failed)
+        print(json.dumps(payload, indent=2))
+        return 1 if failed else 0
+    print(
+        f"Verified {report.files} file(s) referenced by {report.manifests} manifest(s) "
+        f"in {elapsed:.2f}s ({report.hashed} hashed, {report.cached} from cache)."
+    )
+    titles = {
+        "dangling": "Dangling references",
+        "stale": "Stale digests",
+        "invalid": "Invalid files",
+        "orphaned": "Orphaned files",
+        "warnings": "Warnings",
+    }
+    for key in findings:
+        entries = sorted(getattr(report, key))
+        if entries:
+            print(f"{titles[key]} ({len(entries)}):", file=sys.stderr)
+            for entry in entries:
+                print(f"  - {entry}", file=sys.stderr)
+    if failed:
+        print("Manifest verification failed.", file=sys.stderr)
+        return 1
+    print("Manifests verified.")
+    return 0
+
+
+def open_digest_cache(args: argparse.Namespace) -> DigestCache:
+    repo_root = Path(args.repo_root).resolve()
+    cache_dir = (repo_root / args.cache_dir).resolve() if args.cache_dir else None
+    return DigestCache(
+        cache_dir / DIGEST_CACHE_FILENAME if cache_dir else None,
+        trust_embedded_digest=args.trust_embedded_digest,
+        chunk_size=args.chunk_size if args.chunk_digests else None,
+    )
+
+
+def scan_skip_dirs(args: argparse.Namespace) -> List[Path]:
+    """Generated directories whose .bin files are not firmware inputs."""
+
+    return [(Path(args.repo_root).resolve() / args.parts_dir).resolve()]
+
+
+def validate_artifacts(
+    artifacts: Sequence[FirmwareArtifact],
+    *,
+    min_firmware_size: int,
+    strict: bool,
+) -> List[str]:
+    """Run every build validation; hard failures raise, metadata findings are returned."""
+
+    validate_no_deprecated_modules(artifacts)
+    validate_structured_config_consistency(artifacts)
+    findings = validate_manifest_metadata(
+        artifacts,
+        min_firmware_size=min_firmware_size,
+        strict=strict,
+    )
+    findings.extend(validate_no_placeholder_descriptions(artifacts))
+    return findings
+
+
+def process_artifacts(
+    args: argparse.Namespace,
+    artifacts: List[FirmwareArtifact],
+    digest_cache: DigestCache,
+    *,
+    prune: bool = True,
+) -> Tuple[List[FirmwareArtifact], Dict[Tuple[object, ...], FirmwareArtifact]]:
+    """Order, annotate, validate and transform collected artifacts.
+
+    Runs every stage before the outputs are written and returns the ordered
+    artifacts with the newest build per group. ``prune=False`` leaves files
+    in the generated directories that these artifacts no longer reference.
+    """
+    repo_root = Path(args.repo_root).resolve()
+    firmware_dir = (repo_root / args.firmware_dir).resolve()
+    cache_dir = (repo_root / args.cache_dir).resolve() if args.cache_dir else None
+    if args.reproducible:
+        apply_reproducible_build_dates(
+            artifacts,
+            repo_root,
+            source_date_epoch=os.environ.get("SOURCE_DATE_EPOCH"),
+        )
+    selected, superseded, latest = select_latest_builds(artifacts)
     if superseded:
         print("Detected multiple versions of the same firmware; keeping the newest builds.")
         for old, new in superseded:
@@ -1049,51 +4768,153 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
                 f"supersedes {old.metadata.version}"
             )
     ordered = sort_artifacts(selected)
-    validate_no_deprecated_modules(ordered)
-    validate_structured_config_consistency(ordered)
-    metadata_findings = validate_manifest_metadata(
+    ingest_release_notes(
+        ordered,
+        firmware_dir,
+        repo_root,
+        mode=args.release_notes,
+        shard_dir=(repo_root / args.release_notes_dir).resolve(),
+        cache_dir=cache_dir,
+        dry_run=args.dry_run,
+        prune=prune,
+    )
+    metadata_findings = validate_artifacts(
         ordered,
         min_firmware_size=args.min_firmware_size,
         strict=args.strict_validate,
     )
-    metadata_findings.extend(validate_no_placeholder_descriptions(ordered))
     if metadata_findings:
         header = "Manifest metadata validation findings:"
         body = "\n  - " + "\n  - ".join(metadata_findings)
         if args.strict_validate:
             raise SystemExit(header + body)
         print(header + body, file=sys.stderr)
-    manifest = build_manifest(ordered)
-    if not manifest["builds"]:
+    budget_findings = size_budget_findings(
+        ordered,
+        max_size=args.size_budget,
+        max_growth=args.size_growth_budget,
+    )
+    if budget_findings:
+        header = "Firmware size budget exceeded:"
+        body = "\n  - " + "\n  - ".join(budget_findings)
+        if args.strict_size_budget:
+            raise SystemExit(header + body)
+        print(header + body, file=sys.stderr)
+    deduplicate_binaries(ordered, mode=args.dedupe, dry_run=args.dry_run)
+    if args.split_parts:
+        split_multipart_images(
+            ordered,
+            (repo_root / args.parts_dir).resolve(),
+            repo_root,
+            dry_run=args.dry_run,
+            prune=prune,
+        )
+    if args.chunk_digests:
+        publish_chunk_tables(
+            ordered,
+            (repo_root / args.chunk_dir).resolve(),
+            repo_root,
+            digest_cache,
+            dry_run=args.dry_run,
+            prune=prune,
+        )
+    if args.deltas:
+        generate_deltas(
+            ordered,
+            (repo_root / args.delta_dir).resolve(),
+            repo_root,
+            cache_dir=cache_dir,
+            min_savings=args.delta_min_savings,
+            dry_run=args.dry_run,
+            prune=prune,
+        )
+    if args.compress_parts:
+        compress_parts(
+            ordered,
+            (repo_root / args.compressed_dir).resolve(),
+            repo_root,
+            cache_dir=cache_dir,
+            dry_run=args.dry_run,
+            prune=prune,
+        )
+    if args.flash_estimates:
+        annotate_flash_estimates(ordered)
+    if args.size_report:
+        print(build_size_report(ordered))
+    return ordered, latest
+
+
+def generate_outputs(
+    args: argparse.Namespace,
+    artifacts: List[FirmwareArtifact],
+    digest_cache: DigestCache,
+) -> int:
+    """Validate collected artifacts and write every output; returns the exit code.
+
+    Shared by :func:`main` and the streaming sync pipeline in
+    sync-from-releases.py, which builds ``artifacts`` while downloading.
+    """
+    repo_root = Path(args.repo_root).resolve()
+    firmware_dir = (repo_root / args.firmware_dir).resolve()
+    manifest_path = (repo_root / args.manifest_path).resolve()
+    manifest_prefix = Path(args.manifest_prefix)
+    if not artifacts:
+        message = f"No firmware binaries found in {firmware_dir}"
+        if args.allow_empty:
+            print(message)
+            return 0
+        raise SystemExit(message)
+    ordered, latest = process_artifacts(args, artifacts, digest_cache)
+    retained, archived = apply_retention(
+        ordered, keep_versions=args.retain_versions, keep_since=args.retain_since
+    )
+    if archived:
+        print(f"Retention policy moved {len(archived)} older build(s) to history shards.")
+    history, history_install_paths, history_shard_paths = write_history_shards(
+        archived,
+        (repo_root / args.history_dir).resolve(),
+        repo_root,
+        dry_run=args.dry_run,
+        # history_dir is only ours while a retention policy is configured.
+        prune=args.retain_versions is not None or args.retain_since is not None,
+    )
+    compat_index_path = (repo_root / args.compat_index_path).resolve()
+    header = manifest_header(
+        retained,
+        release_notes_indexed=args.release_notes != "off",
+        compat_index=(
+            Path(os.path.relpath(compat_index_path, repo_root)).as_posix()
+            if args.compat_index
+            else None
+        ),
+        history=history,
+    )
+    if not retained:
         message = "Manifest would be empty; aborting."
         if args.allow_empty:
             print(message)
             return 0
         raise SystemExit(message)
-    requested_configs: List[str] = []
-    if args.assert_configs:
-        for value in args.assert_configs:
-            if not value:
-                continue
-            requested_configs.extend(
-                [item.strip() for item in value.split(",") if item.strip()]
-            )
+    requested_configs = _split_config_list(args.assert_configs)
     if args.summary or args.summary_file or requested_configs:
-        table = build_summary_table(ordered)
-        print("\nFirmware summary:\n")
-        print(table)
         summary_path = args.summary_file or os.environ.get("GITHUB_STEP_SUMMARY")
-        if summary_path:
-            summary_target = Path(summary_path)
-            if args.dry_run:
-                print(f"[dry-run] Would write summary table to {summary_target}")
-            else:
-                summary_target.parent.mkdir(parents=True, exist_ok=True)
-                summary_target.write_text(table + "\n", encoding="utf-8")
+        summary_target = Path(summary_path) if summary_path else None
+        print("\nFirmware summary:\n")
+        if args.stream_output:
+            write_summary_stream(retained, summary_target, dry_run=args.dry_run)
+        else:
+            table = build_summary_table(retained)
+            print(table)
+            if summary_target:
+                if args.dry_run:
+                    print(f"[dry-run] Would write summary table to {summary_target}")
+                else:
+                    summary_target.parent.mkdir(parents=True, exist_ok=True)
+                    summary_target.write_text(table + "\n", encoding="utf-8")
     if requested_configs:
         available_configs = {
             artifact.metadata.config_string
-            for artifact in ordered
+            for artifact in retained
             if artifact.metadata.is_configuration and artifact.metadata.config_string
         }
         missing_configs = sorted(
@@ -1106,19 +4927,530 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
                 file=sys.stderr,
             )
             return 1
-    write_json_file(manifest_path, manifest, dry_run=args.dry_run)
-    write_individual_manifests(
-        ordered,
+    if args.stream_output:
+        write_manifest_stream(manifest_path, header, retained, dry_run=args.dry_run)
+    else:
+        write_json_file(
+            manifest_path,
+            {**header, "builds": [artifact.manifest_entry() for artifact in retained]},
+            dry_run=args.dry_run,
+        )
+    if args.latest_feed:
+        write_json_file(
+            (repo_root / args.latest_feed_path).resolve(),
+            build_latest_feed(latest),
+            dry_run=args.dry_run,
+            compact=True,
+        )
+    compat_shard_paths: List[Path] = []
+    if args.compat_index:
+        compat_shards, compat_shard_paths = write_compat_shards(
+            retained,
+            (repo_root / args.compat_shard_dir).resolve(),
+            repo_root,
+            dry_run=args.dry_run,
+        )
+        index_header = {key: value for key, value in header.items() if key != "compat_index"}
+        write_json_file(
+            compat_index_path,
+            build_compat_index(retained, header=index_header, shards=compat_shards),
+            dry_run=args.dry_run,
+        )
+    individual_paths = write_individual_manifests(
+        retained,
         manifest_prefix,
         repo_root,
         dry_run=args.dry_run,
     )
+    if args.hashed_manifests:
+        published = [manifest_path, *individual_paths]
+        if args.compat_index:
+            published.append(compat_index_path)
+            published.extend(compat_shard_paths)
+        published.extend(history_install_paths)
+        published.extend(history_shard_paths)
+        publish_hashed_manifests(
+            published,
+            (repo_root / args.hashed_manifest_dir).resolve(),
+            (repo_root / args.manifest_pointer_path).resolve(),
+            repo_root,
+            dry_run=args.dry_run,
+            install_manifests={*individual_paths, *history_install_paths},
+        )
+    if args.catalog:
+        catalog_path = (repo_root / args.catalog).resolve()
+        if args.dry_run:
+            print(f"[dry-run] Would update catalog {catalog_path}")
+        else:
+            conn = open_catalog(catalog_path)
+            try:
+                added, updated, removed = update_catalog(
+                    conn, ordered, latest, manifest_version=str(header["version"])
+                )
+            finally:
+                conn.close()
+            print(
+                f"Updated catalog {catalog_path}: {added} added, {updated} updated, "
+                f"{removed} removed."
+            )
+    if not args.dry_run:
+        digest_cache.save()
+    print(
+        f"Generated {manifest_path} and {len(retained)} ESP Web Tools manifest file(s) "
+        f"with {len(retained)} build entries."
+    )
+    return 0
+
+
+WATCHED_SUFFIXES = (".bin", ".md")
+
+
+def snapshot_firmware_tree(
+    firmware_dir: Path, skip_dirs: Sequence[Path] = ()
+) -> Dict[str, Tuple[int, int]]:
+    """``(mtime_ns, size)`` of every binary and release-notes file under ``firmware_dir``."""
+
+    snapshot: Dict[str, Tuple[int, int]] = {}
+    skipped = {str(skip_dir) for skip_dir in skip_dirs}
+    for root, dirs, files in os.walk(firmware_dir):
+        dirs[:] = [name for name in dirs if os.path.join(root, name) not in skipped]
+        for name in files:
+            if not name.endswith(WATCHED_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (info.st_mtime_ns, info.st_size)
+    return snapshot
+
+
+def watch(args: argparse.Namespace, digest_cache: DigestCache) -> int:
+    """Regenerate the outputs whenever binaries or release notes change, until interrupted.
+
+    The tree is polled every ``--watch-interval`` seconds. A change starts a
+    cycle once the tree has been quiet for ``--watch-debounce`` seconds, so a
+    burst of copies regenerates once. The digest cache stays in memory, so
+    only added or modified binaries are hashed, and outputs whose bytes did
+    not change are not rewritten.
+    """
+    repo_root = Path(args.repo_root).resolve()
+    firmware_dir = (repo_root / args.firmware_dir).resolve()
+    skip_dirs = scan_skip_dirs(args)
+    previous: Optional[Dict[str, Tuple[int, int]]] = None
+    cycle = 0
+    print(f"Watching {firmware_dir} for firmware changes (Ctrl+C to stop).")
+    try:
+        while True:
+            current = snapshot_firmware_tree(firmware_dir, skip_dirs)
+            if current != previous:
+                if previous is not None:
+                    while True:
+                        time.sleep(args.watch_debounce)
+                        settled = snapshot_firmware_tree(firmware_dir, skip_dirs)
+                        if settled == current:
+                            break
+                        current = settled
+                before = previous or {}
+                added = current.keys() - before.keys()
+                removed = before.keys() - current.keys()
+                changed = {path for path in current.keys() & before.keys() if current[path] != before[path]}
+                cycle += 1
+                started = time.perf_counter()
+                misses = digest_cache.misses
+                try:
+                    outputs = snapshot_outputs(args) if args.change_set else None
+                    artifacts = collect_firmware(
+                        firmware_dir,
+                        repo_root,
+                        dry_run=args.dry_run,
+                        default_channel=DEFAULT_CHANNEL,
+                        digest_cache=digest_cache,
+                        skip_dirs=skip_dirs,
+                    )
+                    returncode = generate_outputs(args, artifacts, digest_cache)
+                    if outputs is not None:
+                        write_change_set(args, outputs, digest_cache)
+                except SystemExit as exc:
+                    print(f"Regeneration failed: {exc.code}", file=sys.stderr)
+                    returncode = 1
+                except OSError as exc:
+                    # A binary removed or renamed mid-cycle, typically while
+                    # firmware is still being copied in; the next poll sees it.
+                    print(f"Regeneration failed: {exc}", file=sys.stderr)
+                    returncode = 1
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                print(
+                    f"[watch] cycle {cycle}: {len(added)} added, {len(changed)} changed, "
+                    f"{len(removed)} removed; {digest_cache.misses - misses} file(s) hashed; "
+                    f"{'done' if returncode == 0 else 'failed'} in {elapsed_ms:.0f} ms"
+                )
+                previous = current
+            time.sleep(args.watch_interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    return 0
+
+
+CHANGE_SET_VERSION = 1
+ChangeSetSnapshot = Dict[str, Tuple[int, int, int, int]]
+
+
+def snapshot_outputs(args: argparse.Namespace) -> ChangeSetSnapshot:
+    """``(size, mtime_ns, dev, ino)`` of every file a run may create, move or remove.
+
+    Covers the firmware tree (binaries and every generated directory under
+    it) and the manifests, feeds and hashed copies written at the site root.
+    Keys are paths relative to the repository root.
+    """
+
+    repo_root = Path(args.repo_root).resolve()
+    excluded = {
+        (repo_root / path).resolve() for path in (args.change_set, args.change_set_baseline) if path
+    }
+    prefix = Path(args.manifest_prefix)
+    candidates: List[Path] = [
+        repo_root / args.manifest_path,
+        repo_root / args.latest_feed_path,
+        repo_root / args.compat_index_path,
+        repo_root / args.manifest_pointer_path,
+    ]
+    prefix_dir = repo_root / prefix.parent
+    if prefix_dir.is_dir():
+        candidates.extend(prefix_dir.glob(f"{prefix.name}[0-9]*.json"))
+    for tree in (repo_root / args.firmware_dir, repo_root / args.hashed_manifest_dir):
+        for root, _, files in os.walk(tree):
+            candidates.extend(Path(root, name) for name in files if not name.endswith(".tmp"))
+    snapshot: ChangeSetSnapshot = {}
+    for path in candidates:
+        path = path.resolve()
+        if path in excluded:
+            continue
+        try:
+            info = path.stat()
+        except FileNotFoundError:
+            continue
+        key = Path(os.path.relpath(path, repo_root)).as_posix()
+        snapshot[key] = (info.st_size, info.st_mtime_ns, info.st_dev, info.st_ino)
+    return snapshot
+
+
+def _content_sha256(path: Path, digest_cache: DigestCache) -> str:
+    record = digest_cache.lookup(path) if path.suffix == ".bin" else None
+    if record is not None:
+        return str(record["sha256"])
+    return hash_file(path).result()[1]
+
+
+def build_change_set(
+    before: ChangeSetSnapshot,
+    after: ChangeSetSnapshot,
+    repo_root: Path,
+    digest_cache: DigestCache,
+) -> Dict[str, object]:
+    """Files added, changed, removed or moved between two :func:`snapshot_outputs` calls.
+
+    A removed and an added path sharing an inode were renamed (for example a
+    binary normalised by :func:`collect_firmware`) and are reported as one
+    move. Outputs are only rewritten when their bytes change, so a changed
+    size or mtime means changed content.
+    """
+
+    removed = {path: before[path] for path in before.keys() - after.keys()}
+    moved_from = {(dev, ino): path for path, (_, _, dev, ino) in removed.items()}
+
+    def described(path: str) -> Dict[str, object]:
+        return {
+            "path": path,
+            "size": after[path][0],
+            "sha256": _content_sha256(repo_root / path, digest_cache),
+        }
+
+    added: List[Dict[str, object]] = []
+    moved: List[Dict[str, object]] = []
+    for path in sorted(after.keys() - before.keys()):
+        source = moved_from.pop(after[path][2:], None)
+        if source is None:
+            added.append(described(path))
+        else:
+            moved.append({"from": source, **described(path)})
+    changed = [
+        described(path)
+        for path in sorted(after.keys() & before.keys())
+        if after[path] != before[path]
+    ]
+    return {
+        "version": CHANGE_SET_VERSION,
+        "added": added,
+        "changed": changed,
+        "removed": [{"path": path} for path in sorted(moved_from.values())],
+        "moved": moved,
+    }
+
+
+def build_baseline_change_set(
+    baseline: Dict[str, object],
+    after: ChangeSetSnapshot,
+    repo_root: Path,
+    digest_cache: DigestCache,
+) -> Tuple[Dict[str, object], Dict[str, object]]:
+    """Compare the files a run left behind with a stored inventory of the last deploy.
+
+    A fresh checkout lacks every output that is deployed but not committed,
+    so in CI the stat snapshot taken before the run says nothing about what
+    changed for clients. The inventory maps paths to ``size`` and ``sha256``;
+    a removed and an added path with the same digest are reported as a move.
+    Returns the change set and the inventory of ``after`` to store for the
+    next run.
+    """
+
+    inventory: Dict[str, object] = {
+        path: {"size": after[path][0], "sha256": _content_sha256(repo_root / path, digest_cache)}
+        for path in sorted(after)
+    }
+    removed = sorted(baseline.keys() - inventory.keys())
+    moved_from: Dict[str, List[str]] = {}
+    for path in removed:
+        entry = baseline[path]
+        if isinstance(entry, dict):
+            moved_from.setdefault(str(entry.get("sha256")), []).append(path)
+
+    added: List[Dict[str, object]] = []
+    moved: List[Dict[str, object]] = []
+    for path in sorted(inventory.keys() - baseline.keys()):
+        described = {"path": path, **inventory[path]}  # type: ignore[dict-item]
+        sources = moved_from.get(described["sha256"])  # type: ignore[arg-type]
+        if sources:
+            source = sources.pop(0)
+            removed.remove(source)
+            moved.append({"from": source, **described})
+        else:
+            added.append(described)
+    changed = [
+        {"path": path, **inventory[path]}  # type: ignore[dict-item]
+        for path in sorted(inventory.keys() & baseline.keys())
+        if inventory[path] != baseline[path]
+    ]
+    change_set = {
+        "version": CHANGE_SET_VERSION,
+        "added": added,
+        "changed": changed,
+        "removed": [{"path": path} for path in removed],
+        "moved": moved,
+    }
+    return change_set, inventory
+
+
+def write_change_set(
+    args: argparse.Namespace,
+    before: ChangeSetSnapshot,
+    digest_cache: DigestCache,
+) -> None:
+    """Write the ``--change-set`` file for a run that started from ``before``.
+
+    With ``--change-set-baseline`` the run is compared with the stored
+    inventory instead, and the inventory is then replaced by this run's files.
+    """
+    repo_root = Path(args.repo_root).resolve()
+    after = snapshot_outputs(args)
+    if args.change_set_baseline:
+        baseline_path = (repo_root / args.change_set_baseline).resolve()
+        if not baseline_path.exists():
+            print(f"No change set baseline at {baseline_path}; listing every file as added.")
+        baseline = _load_json_cache(baseline_path, CHANGE_SET_VERSION)
+        change_set, inventory = build_baseline_change_set(baseline, after, repo_root, digest_cache)
+        if args.dry_run:
+            print(f"[dry-run] Would update {baseline_path}")
+        else:
+            _save_json_cache(baseline_path, CHANGE_SET_VERSION, inventory)
+    else:
+        change_set = build_change_set(before, after, repo_root, digest_cache)
+    target = (repo_root / args.change_set).resolve()
+    write_json_file(target, change_set, dry_run=args.dry_run)
+    counts = ", ".join(
+        f"{len(change_set[status])} {status}"  # type: ignore[arg-type]
+        for status in ("added", "changed", "removed", "moved")
+    )
+    print(f"Change set: {counts} -> {target}")
+
+
+def build_scope(
+    configs: Sequence[str], channels: Sequence[str]
+) -> Callable[[Optional[str], str], bool]:
+    """Matcher for ``--only-config`` / ``--only-channel`` over (config string, channel).
+
+    Config strings compare case-insensitively and channels by their canonical
+    name; legacy builds (no config string) never match ``--only-config``.
+    """
+    wanted_configs = {config.lower() for config in configs}
+    wanted_channels = {canonical_channel(channel) for channel in channels}
+
+    def matches(config_string: Optional[str], channel: str) -> bool:
+        if wanted_configs and (config_string or "").lower() not in wanted_configs:
+            return False
+        return not wanted_channels or canonical_channel(channel) in wanted_channels
+
+    return matches
+
+
+def partial_derived_outputs(args: argparse.Namespace, existing: Dict[str, object]) -> List[str]:
+    """Outputs of an earlier full run that a partial run cannot keep in step.
+
+    History shards, the compatibility index, the latest feed and the hashed
+    manifest pointer are all derived from every build, so merging scoped
+    builds into ``manifest.json`` alone would leave them describing the old
+    catalog.
+    """
+    repo_root = Path(args.repo_root).resolve()
+    derived: List[str] = []
+    if existing.get("history"):
+        derived.append("history shards")
+    if existing.get("compat_index"):
+        derived.append("a compatibility index")
+    for option, label in (
+        (args.latest_feed_path, "a latest feed"),
+        (args.manifest_pointer_path, "a manifest pointer"),
+    ):
+        path = (repo_root / option).resolve()
+        if path.is_file():
+            derived.append(f"{label} ({_display_path(path, repo_root)})")
+    return derived
+
+
+def generate_partial_outputs(
+    args: argparse.Namespace,
+    artifacts: List[FirmwareArtifact],
+    digest_cache: DigestCache,
+    scope: Callable[[Optional[str], str], bool],
+) -> int:
+    """Regenerate the builds in ``scope`` and merge them into the existing outputs.
+
+    ``artifacts`` holds only the binaries in scope. Every manifest.json entry
+    outside the scope is kept byte for byte, and an untouched build's
+    firmware-N.json is only rewritten when a scoped change shifts its index.
+    Stale generated files are left for the next full run to prune. Trees with
+    any :func:`partial_derived_outputs` are refused.
+    """
+    repo_root = Path(args.repo_root).resolve()
+    manifest_path = (repo_root / args.manifest_path).resolve()
+    manifest_prefix = Path(args.manifest_prefix)
+    if not manifest_path.is_file():
+        raise SystemExit(
+            f"{manifest_path} does not exist; run a full regeneration before using "
+            "--only-config/--only-channel."
+        )
+    try:
+        existing = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as exc:
+        raise SystemExit(f"Unable to read {manifest_path}: {exc}") from exc
+    builds = existing.get("builds") if isinstance(existing, dict) else None
+    if not isinstance(builds, list):
+        raise SystemExit(f"{manifest_path} has no builds list; run a full regeneration.")
+    derived = partial_derived_outputs(args, existing)
+    if derived:
+        raise SystemExit(
+            "--only-config/--only-channel cannot update a tree with "
+            + ", ".join(derived)
+            + "; a partial run would leave them stale, so run a full regeneration"
+        )
+    ordered, _ = process_artifacts(args, artifacts, digest_cache, prune=False)
+
+    # (index in the existing manifest, entry, artifact) - untouched builds
+    # have no artifact, regenerated ones no previous index.
+    kept = [
+        (index, entry, None)
+        for index, entry in enumerate(builds)
+        if not scope(entry.get("config_string"), str(entry.get("channel", "")))
+    ]
+    fresh = [(None, artifact.manifest_entry(), artifact) for artifact in ordered]
+    merged = sorted(kept + fresh, key=lambda item: entry_sort_key(item[1]))
+    if not merged:
+        message = "Manifest would be empty; aborting."
+        if args.allow_empty:
+            print(message)
+            return 0
+        raise SystemExit(message)
+    if args.summary and ordered:
+        print("\nFirmware summary (regenerated builds):\n")
+        print(build_summary_table(ordered))
+    manifest = dict(existing)
+    manifest["version"] = newest_manifest_version(
+        (str(entry.get("channel", "")), str(entry.get("version", ""))) for _, entry, _ in merged
+    )
+    manifest["builds"] = [entry for _, entry, _ in merged]
+    write_json_file(manifest_path, manifest, dry_run=args.dry_run)
+
+    base_dir = (repo_root / manifest_prefix.parent).resolve()
+
+    def individual(index: int) -> Path:
+        return base_dir / f"{manifest_prefix.name}{index}.json"
+
+    # Read every shifted manifest before writing, since targets overlap sources.
+    shifted: Dict[int, Dict[str, object]] = {}
+    for new_index, (old_index, _, artifact) in enumerate(merged):
+        if artifact is None and old_index != new_index:
+            source = individual(old_index)
+            if not source.is_file():
+                raise SystemExit(f"{source} is missing; run a full regeneration.")
+            shifted[new_index] = json.loads(source.read_text(encoding="utf-8"))
+    rewritten = 0
+    for new_index, (_, _, artifact) in enumerate(merged):
+        if artifact is not None:
+            data = esp_web_tools_manifest(artifact)
+        elif new_index in shifted:
+            data = shifted[new_index]
+        else:
+            continue
+        rewritten += write_json_file(individual(new_index), data, dry_run=args.dry_run)
+    for stale in sorted(base_dir.glob(f"{manifest_prefix.name}[0-9]*.json")):
+        suffix = stale.stem[len(manifest_prefix.name) :]
+        if suffix.isdigit() and int(suffix) >= len(merged):
+            if args.dry_run:
+                print(f"[dry-run] Would remove {stale}")
+            else:
+                stale.unlink()
+    if not args.dry_run:
+        digest_cache.save()
     print(
-        f"Generated {manifest_path} and {len(ordered)} ESP Web Tools manifest file(s) "
-        f"with {len(ordered)} build entries."
+        f"Regenerated {len(fresh)} build(s) in scope, kept {len(kept)} unchanged; "
+        f"{rewritten} ESP Web Tools manifest file(s) rewritten."
     )
     return 0
 
 
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["query"]:
+        return query_main(argv[1:])
+    if argv[:1] == ["verify"]:
+        return verify_main(argv[1:])
+    args = parse_args(argv)
+    repo_root = Path(args.repo_root).resolve()
+    digest_cache = open_digest_cache(args)
+    if args.watch:
+        return watch(args, digest_cache)
+    only_configs = _split_config_list(args.only_configs)
+    only_channels = _split_config_list(args.only_channels)
+    scope = build_scope(only_configs, only_channels) if only_configs or only_channels else None
+    outputs = snapshot_outputs(args) if args.change_set else None
+    artifacts = collect_firmware(
+        (repo_root / args.firmware_dir).resolve(),
+        repo_root,
+        dry_run=args.dry_run,
+        default_channel=DEFAULT_CHANNEL,
+        digest_cache=digest_cache,
+        skip_dirs=scan_skip_dirs(args),
+        scope=scope,
+    )
+    if scope:
+        returncode = generate_partial_outputs(args, artifacts, digest_cache, scope)
+    else:
+        returncode = generate_outputs(args, artifacts, digest_cache)
+    if outputs is not None:
+        write_change_set(args, outputs, digest_cache)
+    return returncode
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Benchmark the JSON output layer of gen-manifests.py on large synthetic catalogs.
+
+Builds a catalog of synthetic artifacts in memory, then times rendering
+manifest.json plus one firmware-N.json per build with every available
+encoder, both in memory and written to a scratch directory. The baseline is
+the previous ``json.dump`` straight onto a file handle. Each encoder's
+files are compared byte for byte with the baseline output. ``--memory``
+also compares peak allocations of the buffered and streamed manifest.json
+writers.
+
+Usage:
+    python scripts/json-output-bench.py --builds 5000
+    python scripts/json-output-bench.py --builds 2000 --repeat 5 --unicode-notes
+    python scripts/json-output-bench.py --builds 20000 --memory
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import io
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+SPEC = importlib.util.spec_from_file_location("gen_manifests", SCRIPT_DIR / "gen-manifests.py")
+if SPEC is None or SPEC.loader is None:  # pragma: no cover - import guard
+    raise ImportError("Unable to load scripts/gen-manifests.py.")
+gen_manifests = importlib.util.module_from_spec(SPEC)
+sys.modules[SPEC.name] = gen_manifests
+SPEC.loader.exec_module(gen_manifests)
+ORIGINAL_WRITER = gen_manifests.write_json_file
+
+POWER_OPTIONS = ("USB", "POE", "PWR")
+MODULE_OPTIONS = ("AirIQ", "VentIQ", "Fan")
+
+
+def synthetic_artifacts(count: int, *, unicode_notes: bool) -> List[object]:
+    artifacts = []
+    for index in range(count):
+        power = POWER_OPTIONS[index % len(POWER_OPTIONS)]
+        module = MODULE_OPTIONS[(index // len(POWER_OPTIONS)) % len(MODULE_OPTIONS)]
+        config = f"Ceiling-{power}-{module}"
+        version = f"{index // 9}.{index % 9}.0"
+        metadata = gen_manifests.FirmwareMetadata(
+            name_part=config,
+            version=version,
+            channel="stable" if index % 2 else "beta",
+            is_configuration=True,
+            config_string=config,
+            core_type=None,
+            mounting="Ceiling",
+            power=power,
+            modules=[module],
+            model=None,
+            variant=None,
+            sensor_addon=None,
+            description=f"Sense360 {config} v{version}",
+            features=[f"Feature {n}" for n in range(4)],
+            hardware_requirements=["Sense360 Core Ceiling"],
+        )
+        seed = f"{index:064x}"
+        notes = "Release notes — “quoted” ✓" if unicode_notes else "Release notes"
+        artifacts.append(
+            gen_manifests.FirmwareArtifact(
+                path=Path(metadata.normalized_filename()),
+                metadata=metadata,
+                relative_path=f"firmware/configurations/{metadata.normalized_filename()}",
+                chip_family="ESP32-S3",
+                md5=seed[:32],
+                sha256=seed,
+                signature="A" * 43 + "=",
+                file_size=1_500_000 + index,
+                build_date="2025-01-01T00:00:00+00:00",
+                changelog=["Fixed a bug", "Improved stability"],
+                release_notes={"path": "notes.md", "sha256": seed, "markdown": f"# {notes}\n"},
+            )
+        )
+    return artifacts
+
+
+def legacy_render(data: Dict[str, object], *, compact: bool = False) -> bytes:
+    """The previous writer's output: json.dump onto a text handle, chunk by chunk."""
+
+    handle = io.StringIO()
+    if compact:
+        json.dump(data, handle, separators=(",", ":"))
+    else:
+        json.dump(data, handle, indent=2)
+    handle.write("\n")
+    return handle.getvalue().encode("utf-8")
+
+
+def legacy_write(path: Path, data: Dict[str, object], *, dry_run: bool, compact: bool = False) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as handle:
+        if compact:
+            json.dump(data, handle, separators=(",", ":"))
+        else:
+            json.dump(data, handle, indent=2)
+        handle.write("\n")
+
+
+def best_of(repeat: int, run: Callable[[int], None]) -> float:
+    best = float("inf")
+    for attempt in range(repeat):
+        started = time.perf_counter()
+        run(attempt)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def measure(
+    artifacts: Sequence[object],
+    scratch: Path,
+    render: Callable[[Dict[str, object]], bytes],
+    writer: Callable[..., None],
+    repeat: int,
+) -> Tuple[float, float, Dict[str, bytes]]:
+    """Return (serialise seconds, end-to-end write seconds, written files)."""
+
+    def serialise(_: int) -> None:
+        render(gen_manifests.build_manifest(artifacts))
+        for artifact in artifacts:
+            render(gen_manifests.esp_web_tools_manifest(artifact))
+
+    def write(attempt: int) -> None:
+        root = scratch / str(attempt)
+        gen_manifests.write_json_file = writer
+        try:
+            gen_manifests.write_json_file(
+                root / "manifest.json", gen_manifests.build_manifest(artifacts), dry_run=False
+            )
+            gen_manifests.write_individual_manifests(artifacts, Path("firmware-"), root, dry_run=False)
+        finally:
+            gen_manifests.write_json_file = ORIGINAL_WRITER
+
+    serialise_seconds = best_of(repeat, serialise)
+    write_seconds = best_of(repeat, write)
+    output = {path.name: path.read_bytes() for path in sorted((scratch / "0").glob("*.json"))}
+    return serialise_seconds, write_seconds, output
+
+
+def peak_manifest_memory(artifacts: Sequence[object], scratch: Path) -> Tuple[int, int, bool]:
+    """Peak bytes allocated writing manifest.json buffered vs streamed, and whether they match."""
+
+    header = gen_manifests.manifest_header(artifacts)
+    buffered_path = scratch / "buffered.json"
+    streamed_path = scratch / "streamed.json"
+
+    def peak(run: Callable[[], None]) -> int:
+        tracemalloc.start()
+        try:
+            run()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    buffered = peak(
+        lambda: gen_manifests.write_json_file(
+            buffered_path, gen_manifests.build_manifest(artifacts), dry_run=False
+        )
+    )
+    streamed = peak(
+        lambda: gen_manifests.write_manifest_stream(streamed_path, header, artifacts, dry_run=False)
+    )
+    return buffered, streamed, buffered_path.read_bytes() == streamed_path.read_bytes()
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark gen-manifests.py JSON output on a synthetic catalog."
+    )
+    parser.add_argument("--builds", type=int, default=5000, help="Builds in the catalog (default: 5000).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per writer; the best is reported (default: 3).")
+    parser.add_argument(
+        "--unicode-notes",
+        action="store_true",
+        help="Put non-ASCII text in the release notes (exercises the stdlib fallback).",
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="Also report peak memory of the buffered and streamed manifest.json writers.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    artifacts = synthetic_artifacts(args.builds, unicode_notes=args.unicode_notes)
+    candidates: List[Tuple[str, Callable[[Dict[str, object]], bytes], Callable[..., None]]] = [
+        ("json.dump (previous)", legacy_render, legacy_write)
+    ]
+    encoders = [name for name in gen_manifests.JSON_ENCODERS if name == "stdlib" or gen_manifests._orjson]
+    if "orjson" not in encoders:
+        print("orjson is not installed; only the stdlib encoder is measured.")
+    for name in encoders:
+
+        def render(data: Dict[str, object], name: str = name) -> bytes:
+            return gen_manifests.render_json(data, encoder=name)
+
+        def writer(path: Path, data: Dict[str, object], *, dry_run: bool, compact: bool = False, name: str = name) -> None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(gen_manifests.render_json(data, compact=compact, encoder=name))
+
+        candidates.append((name, render, writer))
+
+    repeat = max(1, args.repeat)
+    results = []
+    baseline: Optional[Dict[str, bytes]] = None
+    for label, render, writer in candidates:
+        with tempfile.TemporaryDirectory(prefix="webflash-json-bench-") as scratch:
+            serialise_seconds, write_seconds, output = measure(
+                artifacts, Path(scratch), render, writer, repeat
+            )
+        if baseline is None:
+            baseline = output
+        results.append((label, serialise_seconds, write_seconds, output == baseline))
+
+    print(f"{args.builds} builds: manifest.json + {args.builds} firmware-N.json, best of {repeat}")
+    print(f"  {'writer':<22} {'serialise':>10} {'write':>10}  output")
+    for label, serialise_seconds, write_seconds, identical in results:
+        print(
+            f"  {label:<22} {serialise_seconds * 1000:7.1f} ms {write_seconds * 1000:7.1f} ms  "
+            f"{'identical' if identical else 'DIFFERS'}"
+        )
+    identical_outputs = all(identical for *_, identical in results)
+    if args.memory:
+        with tempfile.TemporaryDirectory(prefix="webflash-json-bench-") as scratch:
+            buffered, streamed, same = peak_manifest_memory(artifacts, Path(scratch))
+        print("  manifest.json peak allocations:")
+        print(f"    buffered  {buffered / 1e6:8.1f} MB")
+        print(f"    streamed  {streamed / 1e6:8.1f} MB  {'identical' if same else 'DIFFERS'}")
+        identical_outputs = identical_outputs and same
+    return 0 if identical_outputs else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Keep gen-manifests.py warm for local firmware testing.
+
+``serve`` loads gen-manifests once, keeps the digest cache and an in-memory
+artifact catalog between requests, and answers newline-delimited JSON
+requests on a Unix socket:
+
+- ``regenerate`` rescans the firmware tree and rewrites the outputs. Only
+  binaries whose size or mtime changed are hashed again, and if nothing under
+  the firmware directory (or the manifest itself) changed since the last run,
+  no outputs are rewritten at all. Pass ``force`` to rewrite anyway.
+- ``validate`` runs the build validations without writing anything.
+- ``query`` filters the catalog like ``gen-manifests.py query``. It answers
+  from the builds as of the last ``regenerate``.
+- ``stats`` reports request counts and latency percentiles per command.
+- ``shutdown`` stops the daemon.
+
+Each response carries the request's ``elapsed_ms``. ``send`` is a small client
+for the same protocol. Arguments after ``--`` are passed to gen-manifests.
+
+Usage:
+    python scripts/manifest-daemon.py serve --socket /tmp/webflash.sock -- --summary
+    python scripts/manifest-daemon.py send --socket /tmp/webflash.sock regenerate
+    python scripts/manifest-daemon.py send --socket /tmp/webflash.sock query --config Ceiling-POE-AirIQ
+    python scripts/manifest-daemon.py send --socket /tmp/webflash.sock stats
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+SPEC = importlib.util.spec_from_file_location("gen_manifests", SCRIPT_DIR / "gen-manifests.py")
+if SPEC is None or SPEC.loader is None:  # pragma: no cover - import guard
+    raise ImportError("Unable to load scripts/gen-manifests.py.")
+gen_manifests = importlib.util.module_from_spec(SPEC)
+sys.modules[SPEC.name] = gen_manifests
+SPEC.loader.exec_module(gen_manifests)
+
+COMMANDS = ("regenerate", "validate", "query", "stats", "shutdown")
+QUERY_FILTERS = ("config", "channel", "mounting", "power", "module", "since")
+LATENCY_WINDOW = 1024
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+def _percentile(samples: Sequence[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class ManifestDaemon:
+    """Request handlers sharing one warm digest cache and artifact catalog."""
+
+    def __init__(self, gen_args: argparse.Namespace) -> None:
+        self.args = gen_args
+        self.repo_root = Path(gen_args.repo_root).resolve()
+        self.firmware_dir = (self.repo_root / gen_args.firmware_dir).resolve()
+        self.manifest_path = (self.repo_root / gen_args.manifest_path).resolve()
+        self.digest_cache = gen_manifests.open_digest_cache(gen_args)
+        self.catalog = gen_manifests.open_catalog(Path(":memory:"))
+        self.builds = 0
+        self._signature: Optional[Tuple[Tuple[str, int, int], ...]] = None
+        self.started = time.monotonic()
+        self.latency: Dict[str, Deque[float]] = {}
+        self.counts: Dict[str, int] = collections.Counter()
+        self.errors: Dict[str, int] = collections.Counter()
+
+    def _tree_signature(self) -> Tuple[Tuple[str, int, int], ...]:
+        """(path, mtime_ns, size) of every file the outputs depend on or include."""
+
+        entries = []
+        paths = [self.manifest_path]
+        if self.firmware_dir.exists():
+            paths.extend(self.firmware_dir.rglob("*"))
+        for path in paths:
+            try:
+                info = path.stat()
+            except FileNotFoundError:
+                continue
+            if stat.S_ISREG(info.st_mode):
+                entries.append((str(path), info.st_mtime_ns, info.st_size))
+        return tuple(sorted(entries))
+
+    def _collect(self) -> List["gen_manifests.FirmwareArtifact"]:
+        return gen_manifests.collect_firmware(
+            self.firmware_dir,
+            self.repo_root,
+            dry_run=self.args.dry_run,
+            default_channel=gen_manifests.DEFAULT_CHANNEL,
+            digest_cache=self.digest_cache,
+            skip_dirs=gen_manifests.scan_skip_dirs(self.args),
+        )
+
+    def regenerate(self, request: Dict[str, object]) -> Dict[str, object]:
+        signature = self._tree_signature()
+        if not request.get("force") and signature == self._signature:
+            return {"ok": True, "changed": False, "builds": self.builds}
+        misses = self.digest_cache.misses
+        artifacts = self._collect()
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            returncode = gen_manifests.generate_outputs(self.args, artifacts, self.digest_cache)
+        selected, _, latest = gen_manifests.select_latest_builds(artifacts)
+        ordered = gen_manifests.sort_artifacts(selected)
+        gen_manifests.update_catalog(
+            self.catalog,
+            ordered,
+            latest,
+            manifest_version=gen_manifests.determine_manifest_version(ordered),
+        )
+        self.builds = len(ordered)
+        # Fingerprint the tree as this run left it, outputs included, so the
+        # next request only regenerates after something else changes it.
+        self._signature = (
+            self._tree_signature() if returncode == 0 and not self.args.dry_run else None
+        )
+        return {
+            "ok": returncode == 0,
+            "changed": True,
+            "returncode": returncode,
+            "builds": self.builds,
+            "hashed": self.digest_cache.misses - misses,
+            "log": log.getvalue(),
+        }
+
+    def validate(self, request: Dict[str, object]) -> Dict[str, object]:
+        selected, _, _ = gen_manifests.select_latest_builds(self._collect())
+        ordered = gen_manifests.sort_artifacts(selected)
+        with contextlib.redirect_stdout(io.StringIO()):
+            gen_manifests.ingest_release_notes(
+                ordered,
+                self.firmware_dir,
+                self.repo_root,
+                mode=self.args.release_notes,
+                shard_dir=(self.repo_root / self.args.release_notes_dir).resolve(),
+                cache_dir=(
+                    (self.repo_root / self.args.cache_dir).resolve() if self.args.cache_dir else None
+                ),
+                dry_run=True,
+            )
+        findings = gen_manifests.validate_artifacts(
+            ordered,
+            min_firmware_size=self.args.min_firmware_size,
+            strict=self.args.strict_validate,
+        )
+        return {
+            "ok": not (findings and self.args.strict_validate),
+            "builds": len(ordered),
+            "findings": findings,
+        }
+
+    def query(self, request: Dict[str, object]) -> Dict[str, object]:
+        assert_configs = gen_manifests._split_config_list(
+            [str(value) for value in request.get("assert_configs") or []]
+        )
+        if assert_configs:
+            missing = gen_manifests.catalog_missing_configs(self.catalog, assert_configs)
+            return {"ok": not missing, "missing": missing}
+        if request.get("missing_channel"):
+            return {
+                "ok": True,
+                "configs": gen_manifests.catalog_configs_missing_channel(
+                    self.catalog, str(request["missing_channel"])
+                ),
+            }
+        filters = {key: request.get(key) for key in QUERY_FILTERS}
+        rows = gen_manifests.query_catalog(
+            self.catalog, latest_only=bool(request.get("latest")), **filters
+        )
+        return {
+            "ok": True,
+            "builds": [
+                dict(json.loads(row["entry"]), path=row["path"], latest=bool(row["latest"]))
+                for row in rows
+            ],
+        }
+
+    def stats(self, request: Dict[str, object]) -> Dict[str, object]:
+        commands = {}
+        for command, samples in sorted(self.latency.items()):
+            commands[command] = {
+                "count": self.counts[command],
+                "errors": self.errors[command],
+                "mean_ms": round(sum(samples) / len(samples), 3),
+                "p50_ms": round(_percentile(samples, 0.5), 3),
+                "p95_ms": round(_percentile(samples, 0.95), 3),
+                "max_ms": round(max(samples), 3),
+            }
+        return {
+            "ok": True,
+            "uptime_s": round(time.monotonic() - self.started, 1),
+            "builds": self.builds,
+            "digest_cache": {"hits": self.digest_cache.hits, "misses": self.digest_cache.misses},
+            "commands": commands,
+        }
+
+    def handle(self, request: Dict[str, object]) -> Dict[str, object]:
+        command = request.get("command")
+        started = time.perf_counter()
+        response: Dict[str, object]
+        if command == "shutdown":
+            response = {"ok": True}
+        elif command not in COMMANDS:
+            response = {
+                "ok": False,
+                "error": f"Unknown command {command!r}; expected one of {', '.join(COMMANDS)}.",
+            }
+        else:
+            try:
+                response = getattr(self, str(command))(request)
+            except SystemExit as exc:
+                response = {"ok": False, "error": str(exc.code)}
+            except Exception as exc:  # noqa: BLE001 - report and keep serving
+                traceback.print_exc()
+                response = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        key = str(command) if command in COMMANDS else "invalid"
+        self.counts[key] += 1
+        if not response.get("ok"):
+            self.errors[key] += 1
+        self.latency.setdefault(key, collections.deque(maxlen=LATENCY_WINDOW)).append(elapsed_ms)
+        response["command"] = command
+        response["elapsed_ms"] = round(elapsed_ms, 3)
+        return response
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        server: "DaemonServer" = self.server  # type: ignore[assignment]
+        while True:
+            line = self.rfile.readline(MAX_REQUEST_BYTES)
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as exc:
+                response: Dict[str, object] = {"ok": False, "error": f"Invalid request: {exc}"}
+                request = {}
+            else:
+                response = server.daemon.handle(request)
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+            if request.get("command") == "shutdown":
+                # shutdown() waits for serve_forever, which is running this handler.
+                threading.Thread(target=server.shutdown, daemon=True).start()
+                return
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """Serves one connection at a time, so requests never overlap."""
+
+    def __init__(self, socket_path: Path, daemon: ManifestDaemon) -> None:
+        self.daemon = daemon
+        super().__init__(str(socket_path), _RequestHandler)
+        os.chmod(socket_path, 0o600)
+
+
+def _claim_socket(socket_path: Path) -> None:
+    """Remove a stale socket file, refusing to replace a live daemon's socket."""
+
+    if not socket_path.exists() and not socket_path.is_symlink():
+        return
+    if not stat.S_ISSOCK(socket_path.lstat().st_mode):
+        raise SystemExit(f"{socket_path} exists and is not a socket.")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            socket_path.unlink()
+            return
+    raise SystemExit(f"A daemon is already listening on {socket_path}.")
+
+
+def serve(socket_path: Path, gen_args: argparse.Namespace) -> int:
+    daemon = ManifestDaemon(gen_args)
+    warmup = daemon.handle({"command": "regenerate"})
+    if not warmup.get("ok"):
+        print(warmup.get("log") or "", end="")
+        raise SystemExit(f"Initial regeneration failed: {warmup.get('error', 'see output above')}")
+    print(
+        f"Generated {warmup['builds']} build(s) in {warmup['elapsed_ms']:.0f} ms; "
+        f"listening on {socket_path}"
+    )
+    _claim_socket(socket_path)
+    server = DaemonServer(socket_path, daemon)
+    try:
+        server.serve_forever(poll_interval=0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+        daemon.catalog.close()
+    return 0
+
+
+def send(socket_path: Path, request: Dict[str, object], *, timeout: float = 300.0) -> Dict[str, object]:
+    """Send one request and return the decoded response."""
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        try:
+            client.connect(str(socket_path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            raise SystemExit(f"No daemon is listening on {socket_path}.") from None
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with client.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise SystemExit(f"The daemon on {socket_path} closed the connection without replying.")
+    return json.loads(line)
+
+
+def _print_response(response: Dict[str, object]) -> None:
+    command = response.get("command")
+    if response.get("log"):
+        print(str(response["log"]), end="")
+    if response.get("error"):
+        print(f"error: {response['error']}", file=sys.stderr)
+    if command == "regenerate" and response.get("ok"):
+        state = "regenerated" if response.get("changed") else "unchanged"
+        hashed = f", {response['hashed']} file(s) hashed" if response.get("changed") else ""
+        print(f"{state}: {response['builds']} build(s){hashed}")
+    elif command == "validate":
+        for finding in response.get("findings") or []:
+            print(f"  - {finding}")
+        if "builds" in response:
+            print(f"validated {response['builds']} build(s)")
+    elif command == "query":
+        if "missing" in response:
+            missing = response["missing"]
+            print("Missing: " + ", ".join(missing) if missing else "All configurations present.")
+        elif "configs" in response:
+            print("\n".join(response["configs"]))  # type: ignore[arg-type]
+        elif response.get("builds"):
+            print(
+                gen_manifests._format_table(
+                    ["Config/Build", "Channel", "Version", "Path"],
+                    [
+                        [
+                            str(build.get("config_string") or build.get("model") or ""),
+                            str(build.get("channel", "")),
+                            str(build.get("version", "")) + (" *" if build.get("latest") else ""),
+                            str(build["path"]),
+                        ]
+                        for build in response["builds"]  # type: ignore[union-attr]
+                    ],
+                )
+            )
+    elif command == "stats" and response.get("ok"):
+        commands: Dict[str, Dict[str, object]] = response["commands"]  # type: ignore[assignment]
+        print(
+            f"uptime {response['uptime_s']}s, {response['builds']} build(s), digest cache "
+            f"{response['digest_cache']['hits']} hit(s) / {response['digest_cache']['misses']} miss(es)"  # type: ignore[index]
+        )
+        if commands:
+            print(
+                gen_manifests._format_table(
+                    ["Command", "Count", "Errors", "Mean ms", "p50 ms", "p95 ms", "Max ms"],
+                    [
+                        [name] + [str(values[key]) for key in ("count", "errors", "mean_ms", "p50_ms", "p95_ms", "max_ms")]
+                        for name, values in commands.items()
+                    ],
+                )
+            )
+    print(f"({response.get('elapsed_ms')} ms)")
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve gen-manifests.py requests from a warm process over a Unix socket."
+    )
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Run the daemon in the foreground.")
+    serve_parser.add_argument("--socket", required=True, help="Unix socket path to listen on.")
+
+    send_parser = subparsers.add_parser("send", help="Send one request to a running daemon.")
+    send_parser.add_argument("--socket", required=True, help="Unix socket path of the daemon.")
+    send_parser.add_argument("command", choices=COMMANDS)
+    send_parser.add_argument("--force", action="store_true", help="regenerate: rewrite outputs even if nothing changed.")
+    for name in QUERY_FILTERS:
+        send_parser.add_argument(f"--{name}", help=f"query: filter by {name}.")
+    send_parser.add_argument("--latest", action="store_true", help="query: newest builds only.")
+    send_parser.add_argument("--missing-channel", metavar="CHANNEL", help="query: configurations with no build on CHANNEL.")
+    send_parser.add_argument(
+        "--assert-config",
+        action="append",
+        dest="assert_configs",
+        help="query: fail unless the configuration has a build (repeatable or comma-separated).",
+    )
+    send_parser.add_argument("--json", action="store_true", help="Print the raw JSON response.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    gen_argv: List[str] = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, gen_argv = argv[:split], argv[split + 1 :]
+    args = parse_args(argv)
+    socket_path = Path(args.socket)
+    if args.mode == "serve":
+        return serve(socket_path, gen_manifests.parse_args(gen_argv))
+    request: Dict[str, object] = {"command": args.command}
+    if args.command == "regenerate":
+        request["force"] = args.force
+    elif args.command == "query":
+        request.update({name: getattr(args, name) for name in QUERY_FILTERS if getattr(args, name)})
+        request["latest"] = args.latest
+        if args.missing_channel:
+            request["missing_channel"] = args.missing_channel
+        if args.assert_configs:
+            request["assert_configs"] = args.assert_configs
+    response = send(socket_path, request)
+    if args.json:
+        print(json.dumps(response, indent=2))
+    else:
+        _print_response(response)
+    return 0 if response.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the parts of the GitHub releases API used by
+sync-from-releases.py, for offline testing and benchmarking.
+
+Serves one repository with one release of synthetic firmware assets:
+
+    GET /repos/<owner>/<repo>/releases/<id>            (first page of assets only)
+    GET /repos/<owner>/<repo>/releases/tags/<tag>
+    GET /repos/<owner>/<repo>/releases/<id>/assets?per_page=&page=   (Link pagination)
+    GET /repos/<owner>/<repo>/releases/assets/<asset_id>
+        JSON metadata, or a 302 to /downloads/... for application/octet-stream
+    GET /downloads/<asset_id>/<name>
+
+API responses carry X-RateLimit-* headers and fail with 403 once the budget
+is spent. Latency and random 5xx errors can be injected, and individual
+assets can be made to fail or truncate.
+
+Usage:
+    python scripts/mock-releases-server.py --port 8765 --assets 300
+    python scripts/sync-from-releases.py --api-url http://127.0.0.1:8765 \\
+        --repo sense360store/WebFlash --tag v9.0.0 --target-dir /tmp/firmware
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_REPO = "sense360store/WebFlash"
+DEFAULT_TAG = "v9.0.0"
+DEFAULT_RELEASE_ID = 1
+DEFAULT_ASSET_SIZE = 1536 * 1024
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+# Only the first page of assets is embedded in the release object, so
+# clients have to page through /assets for the rest.
+EMBEDDED_ASSETS = DEFAULT_PER_PAGE
+# Fixed timestamps keep --reproducible syncs against the mock stable.
+PUBLISHED_AT = "2026-01-15T09:00:00Z"
+SYNTHETIC_BLOCK_SIZE = 64 * 1024
+SYNTHETIC_CONFIGS = (
+    "Ceiling-POE-AirIQ",
+    "Ceiling-POE-VentIQ",
+    "Ceiling-PWR-AirIQ",
+    "Ceiling-USB",
+    "Ceiling-USB-AirIQ",
+    "Ceiling-USB-Fan",
+    "Ceiling-Voice-POE-AirIQ",
+    "Ceiling-Voice-USB",
+)
+
+
+@dataclass
+class MockAsset:
+    asset_id: int
+    name: str
+    size: int
+
+    def block(self) -> bytes:
+        # Deterministic, incompressible content: one 64 KiB block per asset,
+        # repeated, so hundreds of assets cost no memory up front.
+        seed = hashlib.sha256(f"{self.asset_id}:{self.name}".encode("utf-8")).digest()
+        block = bytearray(random.Random(seed).randbytes(SYNTHETIC_BLOCK_SIZE))
+        # gen-manifests probes 0x0, 0x1000 and 0x10000 for the ESP image
+        # magic; keep those clear so synthetic assets are plain blobs.
+        block[0] = block[0x1000] = 0
+        return bytes(block)
+
+
+@dataclass
+class MockConfig:
+    repo: str = DEFAULT_REPO
+    tag: str = DEFAULT_TAG
+    release_id: int = DEFAULT_RELEASE_ID
+    prerelease: bool = False
+    assets: List[MockAsset] = field(default_factory=list)
+    latency: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: int = 5000
+    fail_assets: Set[str] = field(default_factory=set)
+    truncate_assets: Set[str] = field(default_factory=set)
+    seed: int = 0
+
+
+def synthetic_assets(count: int, size: int) -> List[MockAsset]:
+    """Return ``count`` uniquely named assets that parse as WebFlash firmware."""
+
+    assets: List[MockAsset] = []
+    for index in range(count):
+        config = SYNTHETIC_CONFIGS[index % len(SYNTHETIC_CONFIGS)]
+        version = f"9.{index // len(SYNTHETIC_CONFIGS)}.0"
+        name = f"Sense360-{config}-v{version}-stable.bin"
+        assets.append(MockAsset(asset_id=1000 + index, name=name, size=size))
+    return assets
+
+
+class MockState:
+    """Request counters shared by handler threads."""
+
+    def __init__(self, config: MockConfig) -> None:
+        self.config = config
+        self.assets_by_id = {str(asset.asset_id): asset for asset in config.assets}
+        self.lock = threading.Lock()
+        self.random = random.Random(config.seed)
+        self.api_requests = 0
+        self.downloads = 0
+        self.bytes_sent = 0
+        self.errors_injected = 0
+        self.reset_at = int(time.time()) + 3600
+
+    def take_api_request(self) -> int:
+        with self.lock:
+            self.api_requests += 1
+            return self.config.rate_limit - self.api_requests
+
+    def should_fail(self) -> bool:
+        if self.config.error_rate <= 0:
+            return False
+        with self.lock:
+            failed = self.random.random() < self.config.error_rate
+            if failed:
+                self.errors_injected += 1
+            return failed
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "api_requests": self.api_requests,
+                "downloads": self.downloads,
+                "bytes_sent": self.bytes_sent,
+                "errors_injected": self.errors_injected,
+            }
+
+
+class MockReleasesHandler(BaseHTTPRequestHandler):
+    server_version = "MockGitHubReleases/1.0"
+    protocol_version = "HTTP/1.1"
+    state: MockState
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - stdlib signature
+        pass
+
+    # -- helpers ---------------------------------------------------------
+    def _base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _asset_json(self, asset: MockAsset) -> Dict[str, object]:
+        base = self._base_url()
+        return {
+            "id": asset.asset_id,
+            "name": asset.name,
+            "size": asset.size,
+            "content_type": "application/octet-stream",
+            "state": "uploaded",
+            "created_at": PUBLISHED_AT,
+            "updated_at": PUBLISHED_AT,
+            "url": f"{base}/repos/{self.state.config.repo}/releases/assets/{asset.asset_id}",
+            "browser_download_url": f"{base}/downloads/{asset.asset_id}/{asset.name}",
+        }
+
+    def _release_json(self) -> Dict[str, object]:
+        config = self.state.config
+        base = self._base_url()
+        return {
+            "id": config.release_id,
+            "tag_name": config.tag,
+            "name": config.tag,
+            "prerelease": config.prerelease,
+            "draft": False,
+            "published_at": PUBLISHED_AT,
+            "assets_url": f"{base}/repos/{config.repo}/releases/{config.release_id}/assets",
+            "assets": [self._asset_json(asset) for asset in config.assets[:EMBEDDED_ASSETS]],
+        }
+
+    def _send_json(self, status: int, payload: object, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _rate_limit_headers(self, remaining: int) -> Dict[str, str]:
+        limit = self.state.config.rate_limit
+        return {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(max(remaining, 0)),
+            "X-RateLimit-Used": str(min(limit - remaining, limit)),
+            "X-RateLimit-Reset": str(self.state.reset_at),
+            "X-RateLimit-Resource": "core",
+        }
+
+    # -- routing ---------------------------------------------------------
+    def do_GET(self) -> None:  # noqa: N802 - stdlib naming
+        if self.state.config.latency:
+            time.sleep(self.state.config.latency)
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        download = re.fullmatch(r"/downloads/(\d+)/[^/]+", path)
+        if download:
+            self._serve_download(download.group(1))
+            return
+        self._serve_api(path, parse_qs(parts.query))
+
+    def _serve_api(self, path: str, query: Dict[str, List[str]]) -> None:
+        config = self.state.config
+        remaining = self.state.take_api_request()
+        headers = self._rate_limit_headers(remaining)
+        if remaining < 0:
+            self._send_json(
+                403,
+                {
+                    "message": "API rate limit exceeded (mock)",
+                    "documentation_url": "https://docs.github.com/rest/overview/rate-limits-for-the-rest-api",
+                },
+                headers,
+            )
+            return
+        if self.state.should_fail():
+            self._send_json(502, {"message": "Server Error (injected)"}, headers)
+            return
+        prefix = f"/repos/{config.repo}/releases"
+        if path in (f"{prefix}/{config.release_id}", f"{prefix}/tags/{config.tag}"):
+            self._send_json(200, self._release_json(), headers)
+            return
+        if path == f"{prefix}/{config.release_id}/assets":
+            self._serve_asset_page(query, headers)
+            return
+        asset_match = re.fullmatch(re.escape(prefix) + r"/assets/(\d+)", path)
+        if asset_match:
+            asset = self.state.assets_by_id.get(asset_match.group(1))
+            if asset is None:
+                self._send_json(404, {"message": "Not Found"}, headers)
+                return
+            if "application/octet-stream" in (self.headers.get("Accept") or ""):
+                headers["Location"] = f"{self._base_url()}/downloads/{asset.asset_id}/{asset.name}"
+                headers["Content-Length"] = "0"
+                self.send_response(302)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                return
+            self._send_json(200, self._asset_json(asset), headers)
+            return
+        self._send_json(404, {"message": "Not Found"}, headers)
+
+    def _serve_asset_page(self, query: Dict[str, List[str]], headers: Dict[str, str]) -> None:
+        assets = self.state.config.assets
+        try:
+            per_page = min(int(query.get("per_page", [DEFAULT_PER_PAGE])[0]), MAX_PER_PAGE)
+            page = max(int(query.get("page", ["1"])[0]), 1)
+        except ValueError:
+            self._send_json(422, {"message": "Validation Failed"}, headers)
+            return
+        per_page = max(per_page, 1)
+        last_page = max((len(assets) + per_page - 1) // per_page, 1)
+        start = (page - 1) * per_page
+        links: List[str] = []
+        base = f"{self._base_url()}/repos/{self.state.config.repo}/releases/{self.state.config.release_id}/assets"
+        if page < last_page:
+            links.append(f'<{base}?per_page={per_page}&page={page + 1}>; rel="next"')
+            links.append(f'<{base}?per_page={per_page}&page={last_page}>; rel="last"')
+        if page > 1:
+            links.append(f'<{base}?per_page={per_page}&page=1>; rel="first"')
+            links.append(f'<{base}?per_page={per_page}&page={page - 1}>; rel="prev"')
+        if links:
+            headers["Link"] = ", ".join(links)
+        page_assets = assets[start : start + per_page]
+        self._send_json(200, [self._asset_json(asset) for asset in page_assets], headers)
+
+    def _serve_download(self, asset_id: str) -> None:
+        asset = self.state.assets_by_id.get(asset_id)
+        if asset is None:
+            self._send_json(404, {"message": "Not Found"})
+            return
+        if asset.name in self.state.config.fail_assets or self.state.should_fail():
+            self._send_json(503, {"message": "Service Unavailable (injected)"})
+            return
+        # A truncated asset advertises its full length but closes early,
+        # like a dropped CDN connection.
+        sent_size = asset.size // 2 if asset.name in self.state.config.truncate_assets else asset.size
+        block = asset.block()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(asset.size))
+        self.send_header("Content-Disposition", f"attachment; filename={asset.name}")
+        if sent_size < asset.size:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        remaining = sent_size
+        while remaining > 0:
+            chunk = block[: min(remaining, len(block))]
+            self.wfile.write(chunk)
+            remaining -= len(chunk)
+        with self.state.lock:
+            self.state.downloads += 1
+            self.state.bytes_sent += sent_size
+
+
+def start_server(
+    config: MockConfig,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> Tuple[ThreadingHTTPServer, MockState, threading.Thread]:
+    """Start the mock on a background thread; ``port=0`` picks a free port."""
+
+    state = MockState(config)
+    handler = type("BoundMockReleasesHandler", (MockReleasesHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="mock-releases", daemon=True)
+    thread.start()
+    return server, state, thread
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        repo=args.repo,
+        tag=args.tag,
+        release_id=args.release_id,
+        prerelease=args.prerelease,
+        assets=synthetic_assets(args.assets, args.asset_size),
+        latency=args.latency_ms / 1000.0,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        fail_assets=set(args.fail_asset or []),
+        truncate_assets=set(args.truncate_asset or []),
+        seed=args.seed,
+    )
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--repo", default=DEFAULT_REPO, help=f"Repository to serve (default: {DEFAULT_REPO}).")
+    parser.add_argument("--tag", default=DEFAULT_TAG, help=f"Release tag (default: {DEFAULT_TAG}).")
+    parser.add_argument(
+        "--release-id",
+        type=int,
+        default=DEFAULT_RELEASE_ID,
+        help=f"Release id (default: {DEFAULT_RELEASE_ID}).",
+    )
+    parser.add_argument("--prerelease", action="store_true", help="Mark the release as a prerelease.")
+    parser.add_argument("--assets", type=int, default=100, help="Number of synthetic assets (default: 100).")
+    parser.add_argument(
+        "--asset-size",
+        type=int,
+        default=DEFAULT_ASSET_SIZE,
+        help=f"Size of each asset in bytes (default: {DEFAULT_ASSET_SIZE}).",
+    )
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0.0,
+        help="Delay added to every request, in milliseconds (default: 0).",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Probability of an injected 5xx on any request (default: 0).",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=5000,
+        help="API requests allowed before 403 rate-limit responses (default: 5000).",
+    )
+    parser.add_argument("--fail-asset", action="append", help="Asset name whose download always fails.")
+    parser.add_argument("--truncate-asset", action="append", help="Asset name whose download is cut short.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for injected errors (default: 0).")
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve a local stand-in for the GitHub releases API."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Port (default: 8765).")
+    add_mock_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    server, state, thread = start_server(config_from_args(args), args.host, args.port)
+    host, port = server.server_address[:2]
+    print(
+        f"Serving {len(state.config.assets)} asset(s) for {args.repo}@{args.tag} "
+        f"on http://{host}:{port} (Ctrl+C to stop)"
+    )
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        print(json.dumps(state.snapshot()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -38,6 +38,71 @@ async function fetchManifest() {
     }
 }
 
+/** @type {Object|null} Cached latest-version feed */
+let cachedLatestFeed = null;
+
+/**
+ * Fetches the compact latest-version feed (latest.json) written by
+ * gen-manifests.py --latest-feed. Resolves to null when it is not published.
+ * @returns {Promise<Object|null>}
+ */
+async function fetchLatestFeed() {
+    if (cachedLatestFeed) {
+        return cachedLatestFeed;
+    }
+
+    try {
+        const response = await fetch('./latest.json', { cache: 'no-cache' });
+        if (!response.ok) {
+            return null;
+        }
+        const feed = await response.json();
+        cachedLatestFeed = feed && typeof feed.builds === 'object' ? feed : null;
+        return cachedLatestFeed;
+    } catch (error) {
+        console.warn('[changelog] Latest-version feed unavailable:', error);
+        return null;
+    }
+}
+
+/**
+ * Reads the newest versions from the latest-version feed without downloading
+ * the full manifest.
+ * @param {string} [configString] - Configuration string
+ * @returns {Promise<{versions: string[], latestStableVersion: string|null}|null>}
+ *   Latest version per channel for the configuration (newest first) and the
+ *   newest stable version overall, or null when the feed is unavailable.
+ */
+export async function getLatestVersionsFromFeed(configString = null) {
+    const feed = await fetchLatestFeed();
+    if (!feed) {
+        return null;
+    }
+
+    const normalizedConfig = configString ? configString.toLowerCase() : null;
+    const versions = new Set();
+    let latestStableVersion = null;
+
+    for (const [name, channels] of Object.entries(feed.builds)) {
+        for (const [channel, entry] of Object.entries(channels || {})) {
+            if (!entry?.version) {
+                continue;
+            }
+            if (normalizedConfig && name.toLowerCase() === normalizedConfig) {
+                versions.add(entry.version);
+            }
+            if (channel === 'stable' && compareVersions(entry.version, latestStableVersion) > 0) {
+                latestStableVersion = entry.version;
+            }
+        }
+    }
+
+    return {
+        versions: Array.from(versions).sort((a, b) => compareVersions(b, a)),
+        latestStableVersion
+    };
+}
+
 /**
  * Gets all unique versions from the manifest, sorted by version number descending.
  * @returns {Promise<ChangelogEntry[]>}
@@ -206,10 +271,11 @@ export function formatDate(dateString) {
 }
 
 /**
- * Clears the cached manifest (useful for testing or forcing refresh).
+ * Clears the cached manifest and feed (useful for testing or forcing refresh).
  */
 export function clearCache() {
     cachedManifest = null;
+    cachedLatestFeed = null;
 }
 
 export const __testHooks = Object.freeze({
@@ -4,7 +4,12 @@
  * @module services/update-checker
  */
 
-import { compareVersions, getVersionsForConfig, getLatestVersion } from './changelog.js';
+import {
+    compareVersions,
+    getVersionsForConfig,
+    getLatestVersion,
+    getLatestVersionsFromFeed
+} from './changelog.js';
 
 /**
  * @typedef {Object} UpdateCheckResult
@@ -12,7 +17,7 @@ import { compareVersions, getVersionsForConfig, getLatestVersion } from './chang
  * @property {string|null} currentVersion - Currently installed version
  * @property {string|null} latestVersion - Latest available version
  * @property {string|null} latestStableVersion - Latest stable version
- * @property {string[]} availableVersions - All available versions
+ * @property {string[]} availableVersions - All available versions (latest per channel when read from latest.json)
  * @property {string} channel - Detected channel of current version
  * @property {string} message - Human-readable status message
  */
@@ -43,13 +48,20 @@ export async function checkForUpdates(deviceInfo, configString = null) {
     result.currentVersion = deviceInfo.firmwareVersion;
 
     try {
-        // Get available versions for this configuration
-        if (configString) {
-            result.availableVersions = await getVersionsForConfig(configString);
-        }
+        // Prefer the small latest-version feed; fall back to the full manifest
+        const feedVersions = await getLatestVersionsFromFeed(configString);
+        if (feedVersions) {
+            result.availableVersions = feedVersions.versions;
+            result.latestStableVersion = feedVersions.latestStableVersion;
+        } else {
+            // Get available versions for this configuration
+            if (configString) {
+                result.availableVersions = await getVersionsForConfig(configString);
+            }
 
-        // Get the latest stable version overall
-        result.latestStableVersion = await getLatestVersion('stable');
+            // Get the latest stable version overall
+            result.latestStableVersion = await getLatestVersion('stable');
+        }
 
         // Determine the latest version to compare against
         if (result.availableVersions.length > 0) {
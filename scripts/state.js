@@ -4,6 +4,8 @@ import { MODULE_REQUIREMENT_MATRIX, getModuleMatrixEntry, getModuleVariantEntry
 import { parseConfigParams, mapToWizardConfiguration } from './utils/url-config.js';
 import { recordFlashStart, recordFlashSuccess, recordFlashError, exportFlashHistoryText } from './utils/flash-history.js';
 import { copyTextToClipboard } from './utils/copy-to-clipboard.js';
+import { fetchManifestAsset, fetchManifestResponse, resolveManifestAsset } from './utils/manifest-pointer.js';
+import { loadCompatIndex, loadConfigBuilds } from './utils/compat-index.js';
 // Import error logging service early to capture all errors including manifest load failures
 import './services/error-log.js';
 
@@ -663,6 +665,9 @@ let manifestLoadError = null;
 let manifestBuildsWithIndex = [];
 let manifestConfigStringLookup = new Map();
 let manifestAvailabilityIndex = new Map();
+// Set when the wizard runs from the compatibility index; build entries are
+// then fetched per configuration instead of coming from manifest.json.
+let manifestCompatIndex = null;
 
 const SIGNATURE_SALT_TEXT = 'Sense360 Firmware Signing Salt v1';
 const signatureSaltBytes = typeof TextEncoder !== 'undefined'
@@ -963,13 +968,30 @@ function buildModuleComboKey(state) {
         .join('|');
 }
 
-function buildManifestContext(manifest) {
+function applyCompatIndex(index) {
+    Object.entries(index.bases).forEach(([baseKey, base]) => {
+        const modules = {};
+        MODULE_KEYS.forEach(moduleKey => {
+            modules[moduleKey] = new Set(base?.modules?.[moduleKey] || []);
+        });
+        manifestAvailabilityIndex.set(baseKey, {
+            modules,
+            combos: new Set(Object.keys(base?.combos || {}))
+        });
+    });
+}
+
+function buildManifestContext(manifest, compatIndex = null) {
     manifestBuildsWithIndex = [];
     manifestConfigStringLookup = new Map();
     manifestAvailabilityIndex = new Map();
 
     const builds = Array.isArray(manifest?.builds) ? manifest.builds : [];
 
+    if (compatIndex) {
+        applyCompatIndex(compatIndex);
+    }
+
     builds.forEach((build, index) => {
         const buildWithIndex = { ...build, manifestIndex: index };
         buildWithIndex.firmwareId = getFirmwareId(buildWithIndex);
@@ -982,6 +1004,10 @@ function buildManifestContext(manifest) {
             }
             manifestConfigStringLookup.get(configString).push(buildWithIndex);
 
+            if (compatIndex) {
+                return;
+            }
+
             const parsedState = parseConfigStringState(configString);
             if (parsedState) {
                 const baseKey = buildBaseKey(parsedState);
@@ -1010,6 +1036,15 @@ function buildManifestContext(manifest) {
 
 }
 
+async function loadIndexedConfigBuilds(configString) {
+    const entries = await loadConfigBuilds(manifestCompatIndex, configString);
+    return entries.map(entry => {
+        const buildWithIndex = { ...entry, manifestIndex: entry.build };
+        buildWithIndex.firmwareId = getFirmwareId(buildWithIndex);
+        return buildWithIndex;
+    });
+}
+
 function isManifestReady() {
     return manifestData !== null;
 }
@@ -1039,14 +1074,24 @@ async function loadManifestData(options = {}) {
             throw error;
         }
         try {
-            const response = await fetch('manifest.json', { cache: 'no-store' });
+            const compatIndex = await loadCompatIndex({ forceReload });
+            if (compatIndex && !compatIndex.legacy_builds) {
+                manifestCompatIndex = compatIndex;
+                manifestData = compatIndex.manifest;
+                manifestLoadError = null;
+                buildManifestContext(null, compatIndex);
+                return manifestData;
+            }
+            // Legacy builds are only listed in manifest.json.
+            const response = await fetchManifestResponse('manifest.json');
             if (!response.ok) {
                 throw new Error(`Manifest request failed with status ${response.status}`);
             }
             const data = await response.json();
+            manifestCompatIndex = null;
             manifestData = data;
             manifestLoadError = null;
-            buildManifestContext(data);
+            buildManifestContext(data, compatIndex);
             return data;
         } catch (error) {
             if (attempt < maxRetries) {
@@ -3530,6 +3575,7 @@ function createFirmwareCardHtml(firmware, { configString = '', contextKey = 'pri
     const firmwareName = getFirmwareDisplayName(firmware, configString);
     const fileSize = Number(firmware.file_size);
     const sizeLabel = Number.isFinite(fileSize) && fileSize > 0 ? `${(fileSize / 1024).toFixed(1)} KB` : '';
+    const flashTimeLabel = formatFlashEstimate(firmware);
     const buildDate = firmware.build_date ? new Date(firmware.build_date) : null;
     const buildDateLabel = buildDate && !Number.isNaN(buildDate.getTime()) ? buildDate.toLocaleDateString() : '';
     const releaseNotesId = `${firmware.firmwareId}-release-notes-${contextKey}`;
@@ -3542,6 +3588,9 @@ function createFirmwareCardHtml(firmware, { configString = '', contextKey = 'pri
     if (sizeLabel) {
         metaParts.push(`<span class="firmware-size">${escapeHtml(sizeLabel)}</span>`);
     }
+    if (flashTimeLabel) {
+        metaParts.push(`<span class="firmware-flash-time">${escapeHtml(flashTimeLabel)}</span>`);
+    }
     if (buildDateLabel) {
         metaParts.push(`<span class="firmware-date">${escapeHtml(buildDateLabel)}</span>`);
     }
@@ -3552,6 +3601,25 @@ function createFirmwareCardHtml(firmware, { configString = '', contextKey = 'pri
         </a>
     `);
 
+    const buildHistory = getBuildHistoryInfo(firmware);
+    const buildHistoryId = `${firmware.firmwareId}-history-${contextKey}`;
+    if (buildHistory) {
+        metaParts.push(`
+            <a href="#" class="release-notes-link build-history-link" data-build-history-id="${escapeHtml(buildHistoryId)}" data-history-path="${escapeHtml(buildHistory.path)}" onclick="toggleBuildHistory(event)">
+                Older Versions (${escapeHtml(String(buildHistory.builds ?? ''))})
+            </a>
+        `);
+    }
+    const buildHistoryHtml = buildHistory
+        ? `
+            <div class="release-notes-section build-history-section" id="${escapeHtml(buildHistoryId)}" data-loaded="false" style="display: none;">
+                <div class="build-history-content">
+                    <div class="loading">Loading older versions...</div>
+                </div>
+            </div>
+        `
+        : '';
+
     const metadataBlock = metadataHtml
         ? `
             <div class="firmware-metadata">
@@ -3583,7 +3651,7 @@ function createFirmwareCardHtml(firmware, { configString = '', contextKey = 'pri
                     ${descriptionHtml}
                 </div>
                 <div class="firmware-actions">
-                    <esp-web-install-button manifest="firmware-${manifestIndex}.json" data-firmware-id="${escapeHtml(firmware.firmwareId)}" data-webflash-install>
+                    <esp-web-install-button manifest="${escapeHtml(resolveManifestAsset(`firmware-${manifestIndex}.json`))}" data-firmware-id="${escapeHtml(firmware.firmwareId)}" data-webflash-install>
                         <button slot="activate" class="btn btn-primary" data-firmware-id="${escapeHtml(firmware.firmwareId)}">
                             Install Firmware
                         </button>
@@ -3609,6 +3677,7 @@ function createFirmwareCardHtml(firmware, { configString = '', contextKey = 'pri
                     <div class="loading">Loading release notes...</div>
                 </div>
             </div>
+            ${buildHistoryHtml}
         </div>
     `;
 }
@@ -4192,7 +4261,10 @@ async function findCompatibleFirmware() {
     try {
         await loadManifestData();
 
-        const { configGroups, modelBuckets } = groupBuildsByConfig(manifestBuildsWithIndex);
+        const builds = manifestCompatIndex
+            ? await loadIndexedConfigBuilds(configString)
+            : manifestBuildsWithIndex;
+        const { configGroups, modelBuckets } = groupBuildsByConfig(builds);
         const sortedBuilds = sortBuildsByChannelAndVersion(configGroups.get(configString) || []);
 
         const bucketMap = new Map();
@@ -4284,6 +4356,117 @@ async function toggleReleaseNotes(event) {
     }
 }
 
+// esptool-js opens the ROM loader at 115200 baud and ESP Web Tools installs
+// without raising it, so that is the default rate shown on firmware cards.
+// Pages served with a different installer can set it with
+// <meta name="webflash-flash-baud" content="921600">.
+const DEFAULT_FLASH_ESTIMATE_BAUD = 115200;
+const FLASH_ESTIMATE_BAUD_META_NAME = 'webflash-flash-baud';
+// UART 8N1 framing: a start and a stop bit around every byte.
+const UART_BITS_PER_BYTE = 10;
+
+function getFlashEstimateBaud() {
+    const meta = typeof document !== 'undefined'
+        ? document.querySelector(`meta[name="${FLASH_ESTIMATE_BAUD_META_NAME}"]`)
+        : null;
+    const baud = Number.parseInt(meta?.getAttribute('content') ?? '', 10);
+    return Number.isFinite(baud) && baud > 0 ? baud : DEFAULT_FLASH_ESTIMATE_BAUD;
+}
+
+function formatFlashEstimate(firmware) {
+    const estimate = firmware?.flash_estimate;
+    const baud = getFlashEstimateBaud();
+    // The generator's --flash-estimates records whole milliseconds for common
+    // rates; other rates are derived from the transfer size.
+    let milliseconds = Number(estimate?.serial_ms?.[String(baud)]);
+    if (!Number.isFinite(milliseconds)) {
+        milliseconds = Number(estimate?.transfer_bytes) * UART_BITS_PER_BYTE * 1000 / baud;
+    }
+    if (!Number.isFinite(milliseconds) || milliseconds <= 0) {
+        return '';
+    }
+    const seconds = milliseconds / 1000;
+    return seconds < 90 ? `~${Math.ceil(seconds)} s to flash` : `~${Math.round(seconds / 60)} min to flash`;
+}
+
+// Builds dropped from manifest.json by the generator's retention policy are
+// listed per configuration in history shards, fetched only when opened.
+function getBuildHistoryInfo(firmware) {
+    const key = firmware?.config_string;
+    const entry = key ? manifestData?.history?.[key] : null;
+    return entry && typeof entry.path === 'string' ? entry : null;
+}
+
+const buildHistoryShardCache = new Map();
+
+function loadBuildHistoryShard(shardPath) {
+    if (!buildHistoryShardCache.has(shardPath)) {
+        const request = fetchManifestAsset(shardPath).then(response => {
+            if (!response.ok) {
+                throw new Error(`Build history request failed with status ${response.status}`);
+            }
+            return response.json();
+        });
+        request.catch(() => buildHistoryShardCache.delete(shardPath));
+        buildHistoryShardCache.set(shardPath, request);
+    }
+    return buildHistoryShardCache.get(shardPath);
+}
+
+function createBuildHistoryItemHtml(build) {
+    const channelInfo = getChannelDisplayInfo(build.channel);
+    const buildDate = build.build_date ? new Date(build.build_date) : null;
+    const buildDateLabel = buildDate && !Number.isNaN(buildDate.getTime()) ? buildDate.toLocaleDateString() : '';
+    const versionLabel = `v${build.version}`;
+    return `
+        <li class="build-history-item">
+            <span class="firmware-version">${escapeHtml(versionLabel)}</span>
+            <span class="firmware-channel-tag is-${escapeHtml(channelInfo.key)}">${escapeHtml(channelInfo.label)}</span>
+            ${buildDateLabel ? `<span class="firmware-date">${escapeHtml(buildDateLabel)}</span>` : ''}
+            <esp-web-install-button manifest="${escapeHtml(resolveManifestAsset(build.manifest))}">
+                <button slot="activate" class="btn btn-secondary btn-small">Install ${escapeHtml(versionLabel)}</button>
+            </esp-web-install-button>
+        </li>
+    `;
+}
+
+async function loadBuildHistory(historySection, shardPath) {
+    const contentContainer = historySection.querySelector('.build-history-content');
+    if (!contentContainer) {
+        return;
+    }
+    try {
+        const shard = await loadBuildHistoryShard(shardPath);
+        const builds = Array.isArray(shard?.builds)
+            ? shard.builds.filter(build => build && typeof build.manifest === 'string')
+            : [];
+        contentContainer.innerHTML = builds.length > 0
+            ? `<ul class="build-history-list">${builds.map(createBuildHistoryItemHtml).join('')}</ul>`
+            : '<p class="no-notes">No older versions are available.</p>';
+        historySection.dataset.loaded = 'true';
+    } catch (error) {
+        console.warn('Failed to load build history', error);
+        contentContainer.innerHTML = '<p class="no-notes">Older versions could not be loaded.</p>';
+    }
+}
+
+async function toggleBuildHistory(event) {
+    event.preventDefault();
+    const link = event.currentTarget;
+    const historySection = link?.dataset.buildHistoryId
+        ? document.getElementById(link.dataset.buildHistoryId)
+        : null;
+    if (!historySection) {
+        return;
+    }
+
+    const isHidden = historySection.style.display === 'none' || historySection.style.display === '';
+    historySection.style.display = isHidden ? 'block' : 'none';
+    if (isHidden && historySection.dataset.loaded !== 'true') {
+        await loadBuildHistory(historySection, link.dataset.historyPath);
+    }
+}
+
 function buildReleaseNotesPathFromPart(partPath, channel) {
     if (!partPath) {
         return '';
@@ -4315,6 +4498,42 @@ function buildReleaseNotesPathFromPart(partPath, channel) {
     return `firmware/previews/${fileNameWithChannel}`;
 }
 
+const releaseNotesShardCache = new Map();
+
+async function fetchReleaseNotesMarkdown(notesPath) {
+    const response = await fetch(notesPath);
+    return response.ok ? response.text() : null;
+}
+
+function loadReleaseNotesShard(shardPath) {
+    if (!releaseNotesShardCache.has(shardPath)) {
+        const request = fetch(shardPath).then(response => {
+            if (!response.ok) {
+                throw new Error(`Release notes shard request failed with status ${response.status}`);
+            }
+            return response.json();
+        });
+        request.catch(() => releaseNotesShardCache.delete(shardPath));
+        releaseNotesShardCache.set(shardPath, request);
+    }
+    return releaseNotesShardCache.get(shardPath);
+}
+
+async function resolveManifestReleaseNotes(firmware) {
+    const notes = firmware.release_notes;
+    if (typeof notes.markdown === 'string') {
+        return notes.markdown;
+    }
+    if (typeof notes.shard === 'string' && notes.shard) {
+        const shard = await loadReleaseNotesShard(notes.shard);
+        const markdown = shard ? shard[firmware.version] : null;
+        if (typeof markdown === 'string') {
+            return markdown;
+        }
+    }
+    return typeof notes.path === 'string' && notes.path ? fetchReleaseNotesMarkdown(notes.path) : null;
+}
+
 async function loadReleaseNotes({ notesSection, firmwareId }) {
     if (!notesSection) {
         return;
@@ -4345,19 +4564,26 @@ async function loadReleaseNotes({ notesSection, firmwareId }) {
         ? firmware.parts[0].path
         : '';
 
-    const notesPath = buildReleaseNotesPathFromPart(primaryPartPath, firmware.channel);
+    // Manifests generated with release-notes ingestion carry the notes (or a
+    // shard reference) per build and flag that builds without them have none.
+    const hasManifestNotes = Boolean(firmware.release_notes) && typeof firmware.release_notes === 'object';
+    const notesIndexed = manifestData?.release_notes_indexed === true;
+    const notesPath = hasManifestNotes || notesIndexed
+        ? ''
+        : buildReleaseNotesPathFromPart(primaryPartPath, firmware.channel);
 
-    if (!notesPath) {
+    if (!hasManifestNotes && !notesPath) {
         showFallbackMessage(channelInfo.notesFallback);
         notesSection.dataset.loaded = 'true';
         return;
     }
 
     try {
-        const response = await fetch(notesPath);
+        const markdown = hasManifestNotes
+            ? await resolveManifestReleaseNotes(firmware)
+            : await fetchReleaseNotesMarkdown(notesPath);
 
-        if (response.ok) {
-            const markdown = await response.text();
+        if (typeof markdown === 'string') {
             const lines = markdown.split('\n');
             const fragment = document.createDocumentFragment();
 
@@ -4824,6 +5050,7 @@ window.previousStep = previousStep;
 window.downloadFirmware = downloadFirmware;
 window.copyFirmwareUrl = copyFirmwareUrl;
 window.toggleReleaseNotes = toggleReleaseNotes;
+window.toggleBuildHistory = toggleBuildHistory;
 window.openHomeAssistantIntegrations = openHomeAssistantIntegrations;
 
 export const __testHooks = Object.freeze({
@@ -4847,6 +5074,7 @@ export const __testHooks = Object.freeze({
     copyDiagnosticsBundle,
     parseConfigStringState,
     formatConfigSegment,
+    formatFlashEstimate,
     MODULE_VARIANT_LABELS
 });
 
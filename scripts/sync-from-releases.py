@@ -5,25 +5,54 @@ Synchronise firmware binaries from the latest GitHub release assets.
 Downloads *.bin assets, applies the naming convention expected by WebFlash,
 and stores them under ./firmware before manifest generation.
 
+With --store DIR downloads land once in a content-addressed asset store
+(reusable as a CI cache) and firmware/ is populated from it by reflink,
+hardlink or copy. The store is trimmed to --store-max-bytes, least recently
+used objects first.
+
+With --generate the manifests are built in the same run: assets are hashed
+while they download and queued as firmware artifacts, the existing tree is
+scanned in parallel, and gen-manifests' validation and output stages run as
+soon as the last download completes. Arguments after ``--`` are passed to
+gen-manifests.
+
+With --archive PATH firmware comes from local zip/tar bundles instead: members
+are streamed straight to their canonical paths and hashed on the way, and
+members whose content is already in place are not rewritten.
+
 Usage:
     python scripts/sync-from-releases.py --repo owner/name --release-id 123456
     python scripts/sync-from-releases.py --tag v1.2.3
+    python scripts/sync-from-releases.py --tag v1.2.3 --generate -- --summary
+    python scripts/sync-from-releases.py --tag v1.2.3 --store ~/.cache/webflash-assets --store-max-bytes 2G
+    python scripts/sync-from-releases.py --archive build-farm.tar.gz --cache-dir .cache/gen-manifests
 """
 
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
+import errno
 import fnmatch
 import importlib.util
 import json
 import os
 import shutil
 import sys
+import tarfile
 import tempfile
+import time
 import urllib.error
 import urllib.request
-from pathlib import Path
-from typing import List, Optional, Sequence
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None  # type: ignore[assignment]
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 GEN_MANIFESTS_PATH = SCRIPT_DIR / "gen-manifests.py"
@@ -31,12 +60,201 @@ SPEC = importlib.util.spec_from_file_location("gen_manifests", GEN_MANIFESTS_PAT
 if SPEC is None or SPEC.loader is None:  # pragma: no cover - import guard
     raise ImportError("Unable to load scripts/gen-manifests.py for shared helpers.")
 gen_manifests = importlib.util.module_from_spec(SPEC)
+# dataclasses looks the defining module up in sys.modules while the module
+# executes, so it has to be registered first.
+sys.modules[SPEC.name] = gen_manifests
 SPEC.loader.exec_module(gen_manifests)
 
 USER_AGENT = "sense360-webflash-ci/1.0"
+DEFAULT_API_URL = "https://api.github.com"
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# Largest page the GitHub API allows for release assets.
+ASSET_PAGE_SIZE = 100
+DEFAULT_JOBS = 4
+STORE_INDEX_FILENAME = "index.json"
+STORE_INDEX_VERSION = 1
+STORE_LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+# Linux FICLONE ioctl: share the source file's extents copy-on-write.
+FICLONE = 0x40049409
 
 
-def github_json(url: str, token: Optional[str] = None) -> dict:
+def _install_file(source: Path, target: Path) -> None:
+    """Move ``source`` to ``target`` atomically, copying across filesystems."""
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.replace(source, target)
+        return
+    except OSError as exc:
+        if exc.errno != errno.EXDEV:
+            raise
+    partial = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        shutil.copyfile(source, partial)
+        os.replace(partial, target)
+    finally:
+        partial.unlink(missing_ok=True)
+    source.unlink()
+
+
+class AssetStore:
+    """Content-addressed store of downloaded release assets.
+
+    Objects are read-only files at ``objects/<sha256[:2]>/<sha256>``. Assets
+    are found by the ``sha256:`` digest in the release listing or, when the
+    listing has none, through ``index.json``, which maps an asset's id,
+    update time and size to the digest of its bytes. The index also records
+    when each object was last used, for least-recently-used eviction; object
+    mtimes are left alone because hardlinked firmware files share them.
+    """
+
+    def __init__(self, root: Path, *, link_mode: str = "auto") -> None:
+        self.root = root
+        self.objects_dir = root / "objects"
+        self.index_path = root / STORE_INDEX_FILENAME
+        self.link_mode = link_mode
+        entries = gen_manifests._load_json_cache(self.index_path, STORE_INDEX_VERSION)
+        assets, used = entries.get("assets"), entries.get("used")
+        self.assets: Dict[str, str] = assets if isinstance(assets, dict) else {}
+        self.used: Dict[str, float] = used if isinstance(used, dict) else {}
+        self.hits = 0
+        self.added = 0
+        self.links: Dict[str, int] = {}
+
+    @staticmethod
+    def asset_key(asset: dict) -> Optional[str]:
+        if asset.get("id") is None:
+            return None
+        return f"{asset['id']}:{asset.get('updated_at') or ''}:{asset.get('size') or ''}"
+
+    @staticmethod
+    def listed_digest(asset: dict) -> Optional[str]:
+        algorithm, _, value = str(asset.get("digest") or "").partition(":")
+        value = value.lower()
+        if algorithm != "sha256" or len(value) != 64:
+            return None
+        return value
+
+    def object_path(self, sha256: str) -> Path:
+        return self.objects_dir / sha256[:2] / sha256
+
+    def lookup(self, asset: dict) -> Optional[Path]:
+        """The stored object for ``asset``, marked as just used, if present."""
+
+        sha256 = self.listed_digest(asset) or self.assets.get(self.asset_key(asset) or "")
+        if not isinstance(sha256, str):
+            return None
+        path = self.object_path(sha256)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return None
+        if isinstance(asset.get("size"), int) and size != asset["size"]:
+            return None
+        self.used[sha256] = time.time()
+        self.hits += 1
+        return path
+
+    def add(self, download: Path, sha256: str, asset: dict) -> Path:
+        """Move a finished download into the store and return its object."""
+
+        listed = self.listed_digest(asset)
+        if listed and listed != sha256:
+            raise SystemExit(
+                f"Asset '{asset.get('name')}' has SHA-256 {sha256}, but the release lists {listed}."
+            )
+        target = self.object_path(sha256)
+        if target.exists():
+            download.unlink()
+        else:
+            download.chmod(0o444)
+            _install_file(download, target)
+            self.added += 1
+        self.used[sha256] = time.time()
+        key = self.asset_key(asset)
+        if key:
+            self.assets[key] = sha256
+        return target
+
+    def link(self, source: Path, target: Path) -> None:
+        """Place a copy of object ``source`` at ``target`` as cheaply as possible.
+
+        ``auto`` tries a reflink, then a hardlink, then a copy. Hardlinked
+        files share the object's read-only mode.
+        """
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        partial.unlink(missing_ok=True)
+        attempts = {
+            "auto": ("reflink", "hardlink"),
+            "reflink": ("reflink",),
+            "hardlink": ("hardlink",),
+            "copy": (),
+        }[self.link_mode]
+        method = "copy"
+        for candidate in attempts:
+            try:
+                if candidate == "reflink":
+                    if fcntl is None:
+                        continue
+                    with source.open("rb") as src, partial.open("wb") as dst:
+                        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                else:
+                    os.link(source, partial)
+            except OSError:
+                partial.unlink(missing_ok=True)
+                continue
+            method = candidate
+            break
+        else:
+            shutil.copyfile(source, partial)
+        os.replace(partial, target)
+        self.links[method] = self.links.get(method, 0) + 1
+
+    def evict(self, max_bytes: Optional[int]) -> Tuple[int, int]:
+        """Delete least recently used objects until the store fits ``max_bytes``.
+
+        Index entries for missing objects are dropped either way. Returns the
+        number of objects and bytes removed.
+        """
+        objects = []
+        if self.objects_dir.exists():
+            for path in self.objects_dir.glob("*/*"):
+                info = path.stat()
+                last_used = self.used.get(path.name, info.st_mtime)
+                objects.append((last_used, info.st_size, path))
+        total = sum(size for _, size, _ in objects)
+        removed = freed = 0
+        for _, size, path in sorted(objects):
+            if max_bytes is None or total <= max_bytes:
+                break
+            path.unlink()
+            total -= size
+            removed += 1
+            freed += size
+        present = {path.name for _, _, path in objects if path.exists()}
+        self.assets = {key: sha256 for key, sha256 in self.assets.items() if sha256 in present}
+        self.used = {sha256: used for sha256, used in self.used.items() if sha256 in present}
+        return removed, freed
+
+    def close(self, max_bytes: Optional[int] = None) -> None:
+        """Apply the size limit, save the index and report what the run reused."""
+
+        removed, freed = self.evict(max_bytes)
+        gen_manifests._save_json_cache(
+            self.index_path, STORE_INDEX_VERSION, {"assets": self.assets, "used": self.used}
+        )
+        links = ", ".join(f"{count} {method}" for method, count in sorted(self.links.items()))
+        print(
+            f"Asset store {self.root}: {self.hits} reused, {self.added} added"
+            + (f"; linked {links}" if links else "")
+            + (f"; evicted {removed} object(s), {freed / 1e6:.1f} MB" if removed else "")
+        )
+
+
+def _github_get(url: str, token: Optional[str] = None) -> Tuple[object, Optional[str]]:
+    """GET a JSON API resource; returns the payload and the ``rel="next"`` link."""
+
     request = urllib.request.Request(
         url,
         headers={
@@ -49,10 +267,37 @@ def github_json(url: str, token: Optional[str] = None) -> dict:
     with urllib.request.urlopen(request) as response:
         charset = response.headers.get_content_charset() or "utf-8"
         payload = response.read().decode(charset)
-    return json.loads(payload)
+        link_header = response.headers.get("Link") or ""
+    next_url = None
+    for link in link_header.split(","):
+        target, _, params = link.partition(";")
+        if 'rel="next"' in params:
+            next_url = target.strip().strip("<>")
+    return json.loads(payload), next_url
+
+
+def github_json(url: str, token: Optional[str] = None) -> dict:
+    return _github_get(url, token)[0]  # type: ignore[return-value]
 
 
-def download_asset(url: str, dest: Path, token: Optional[str] = None) -> None:
+def github_list(url: str, token: Optional[str] = None) -> List[dict]:
+    """Every item of a paginated list endpoint, following ``Link`` headers."""
+
+    items: List[dict] = []
+    next_url: Optional[str] = url
+    while next_url:
+        page, next_url = _github_get(next_url, token)
+        items.extend(page)  # type: ignore[arg-type]
+    return items
+
+
+def download_asset(
+    url: str,
+    dest: Path,
+    token: Optional[str] = None,
+    *,
+    accumulator: Optional["gen_manifests.DigestAccumulator"] = None,
+) -> None:
     request = urllib.request.Request(
         url,
         headers={
@@ -63,13 +308,27 @@ def download_asset(url: str, dest: Path, token: Optional[str] = None) -> None:
     if token:
         request.add_header("Authorization", f"Bearer {token}")
     with urllib.request.urlopen(request) as response, dest.open("wb") as handle:
-        shutil.copyfileobj(response, handle)
+        expected = response.headers.get("Content-Length")
+        received = 0
+        for chunk in iter(lambda: response.read(DOWNLOAD_CHUNK_SIZE), b""):
+            if accumulator is not None:
+                accumulator.update(chunk)
+            handle.write(chunk)
+            received += len(chunk)
+    if expected is not None and received < int(expected):
+        raise urllib.error.ContentTooShortError(
+            f"received {received} of {expected} bytes", b""
+        )
 
 
 def fetch_release(
-    repo: str, release_id: Optional[int], tag: Optional[str], token: Optional[str]
+    repo: str,
+    release_id: Optional[int],
+    tag: Optional[str],
+    token: Optional[str],
+    api_url: str = DEFAULT_API_URL,
 ) -> dict:
-    base = f"https://api.github.com/repos/{repo}/releases"
+    base = f"{api_url.rstrip('/')}/repos/{repo}/releases"
     if release_id is not None:
         url = f"{base}/{release_id}"
     elif tag:
@@ -77,11 +336,61 @@ def fetch_release(
     else:
         raise SystemExit("A release id or tag is required to sync firmware assets.")
     try:
-        return github_json(url, token)
+        release = github_json(url, token)
+        # The release object may list only some assets; the assets endpoint
+        # pages through all of them.
+        if release.get("assets_url"):
+            release["assets"] = github_list(
+                f"{release['assets_url']}?per_page={ASSET_PAGE_SIZE}", token
+            )
     except urllib.error.HTTPError as exc:  # pragma: no cover - API failure
         raise SystemExit(
             f"Failed to load release metadata ({exc.code} {exc.reason})"
         ) from exc
+    return release
+
+
+def asset_source_date(asset: dict) -> Optional[int]:
+    """The asset's ``updated_at`` as epoch seconds, if the API listed one."""
+
+    stamp = asset.get("updated_at")
+    if not isinstance(stamp, str) or not stamp:
+        return None
+    try:
+        parsed = datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def plan_assets(
+    release: dict, firmware_dir: Path, pattern: str
+) -> List[Tuple[str, str, Path, dict]]:
+    """Return ``(name, url, target_path, asset)`` for every release asset to sync."""
+
+    fallback_channel = "preview" if release.get("prerelease") else "stable"
+    planned: List[Tuple[str, str, Path, dict]] = []
+    for asset in release.get("assets", []) or []:
+        name = asset.get("name") or ""
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+        if not name.lower().endswith(".bin"):
+            continue
+        asset_url = asset.get("url")
+        if not asset_url:
+            continue
+        try:
+            metadata = gen_manifests.parse_firmware_metadata(
+                Path(name), default_channel=fallback_channel
+            )
+        except ValueError as exc:
+            raise SystemExit(
+                f"Unable to parse firmware asset '{name}': {exc}"
+            ) from exc
+        planned.append((name, asset_url, metadata.target_path(firmware_dir), asset))
+    return planned
 
 
 def sync_assets(
@@ -90,52 +399,340 @@ def sync_assets(
     token: Optional[str],
     pattern: str,
     dry_run: bool,
+    store: Optional[AssetStore] = None,
 ) -> List[Path]:
-    assets = release.get("assets", []) or []
-    if not assets:
+    if not release.get("assets"):
         print("Release does not contain any assets.")
         return []
     firmware_dir.mkdir(parents=True, exist_ok=True)
-    fallback_channel = "preview" if release.get("prerelease") else "stable"
     downloaded: List[Path] = []
     with tempfile.TemporaryDirectory() as tmp_dir:
         tmp_dir_path = Path(tmp_dir)
-        for asset in assets:
-            name = asset.get("name") or ""
-            if not fnmatch.fnmatch(name, pattern):
-                continue
-            if not name.lower().endswith(".bin"):
-                continue
-            asset_url = asset.get("url")
-            if not asset_url:
-                continue
-            try:
-                metadata = gen_manifests.parse_firmware_metadata(
-                    Path(name), default_channel=fallback_channel
-                )
-            except ValueError as exc:
-                raise SystemExit(
-                    f"Unable to parse firmware asset '{name}': {exc}"
-                ) from exc
-            target_path = metadata.target_path(firmware_dir)
+        for name, asset_url, target_path, asset in plan_assets(release, firmware_dir, pattern):
+            stored = store.lookup(asset) if store else None
             if dry_run:
-                print(f"[dry-run] Would download {name} → {target_path}")
+                source = "copy from the asset store" if stored else "download"
+                print(f"[dry-run] Would {source} {name} → {target_path}")
+                downloaded.append(target_path)
+                continue
+            if store and stored:
+                store.link(stored, target_path)
+                print(f"Reused {name} → {target_path}")
                 downloaded.append(target_path)
                 continue
             temp_path = tmp_dir_path / name
+            accumulator = gen_manifests.DigestAccumulator() if store else None
             try:
-                download_asset(asset_url, temp_path, token)
+                download_asset(asset_url, temp_path, token, accumulator=accumulator)
             except urllib.error.HTTPError as exc:  # pragma: no cover - network failure
                 raise SystemExit(
                     f"Failed to download asset '{name}': {exc.code} {exc.reason}"
                 ) from exc
-            target_path.parent.mkdir(parents=True, exist_ok=True)
-            shutil.move(str(temp_path), target_path)
+            except urllib.error.ContentTooShortError as exc:  # pragma: no cover - network failure
+                raise SystemExit(f"Download of asset '{name}' was cut short: {exc.reason}") from exc
+            if store and accumulator:
+                store.link(store.add(temp_path, accumulator.result()[1], asset), target_path)
+            else:
+                target_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(temp_path), target_path)
             print(f"Downloaded {name} → {target_path}")
             downloaded.append(target_path)
     return downloaded
 
 
+def _download_and_hash(
+    name: str,
+    url: str,
+    staging_dir: Path,
+    token: Optional[str],
+    chunk_size: Optional[int] = None,
+) -> Tuple[Path, "gen_manifests.DigestAccumulator"]:
+    # ".part" keeps in-flight downloads out of gen-manifests' *.bin scan.
+    staging_path = staging_dir / f"{name}.part"
+    accumulator = gen_manifests.DigestAccumulator(chunk_size, inspect_image=True)
+    try:
+        download_asset(url, staging_path, token, accumulator=accumulator)
+    except urllib.error.HTTPError as exc:  # pragma: no cover - network failure
+        raise SystemExit(
+            f"Failed to download asset '{name}': {exc.code} {exc.reason}"
+        ) from exc
+    except urllib.error.ContentTooShortError as exc:  # pragma: no cover - network failure
+        raise SystemExit(f"Download of asset '{name}' was cut short: {exc.reason}") from exc
+    return staging_path, accumulator
+
+
+def sync_and_generate(
+    release: dict,
+    gen_args: argparse.Namespace,
+    token: Optional[str],
+    pattern: str,
+    jobs: int = DEFAULT_JOBS,
+    store: Optional[AssetStore] = None,
+) -> int:
+    """Download release assets and generate manifests as one overlapping pipeline.
+
+    Downloads run on worker threads and are hashed as the bytes arrive. The
+    main thread meanwhile builds artifacts for the binaries already in the
+    tree, then moves each finished download into place and turns it into an
+    artifact from the streamed digests. Validation and output run once the
+    last download has been consumed. Assets already in ``store`` are linked
+    into the tree before the scan and not downloaded.
+    """
+    repo_root = Path(gen_args.repo_root).resolve()
+    firmware_dir = (repo_root / gen_args.firmware_dir).resolve()
+    # Taken before anything is linked or downloaded, so synced binaries count
+    # as changes of this run.
+    outputs = gen_manifests.snapshot_outputs(gen_args) if gen_args.change_set else None
+    planned = plan_assets(release, firmware_dir, pattern)
+    # Synced binaries are not committed, so --reproducible dates them by the
+    # asset rather than by whatever commit the workflow checked out.
+    source_dates = {
+        target_path.resolve(): asset_source_date(asset) for _, _, target_path, asset in planned
+    }
+    digest_cache = gen_manifests.open_digest_cache(gen_args)
+    if gen_args.dry_run:
+        for name, _, target_path, asset in planned:
+            source = "copy from the asset store" if store and store.lookup(asset) else "download"
+            print(f"[dry-run] Would {source} {name} → {target_path}")
+        artifacts = gen_manifests.collect_firmware(
+            firmware_dir,
+            repo_root,
+            dry_run=True,
+            digest_cache=digest_cache,
+            skip_dirs=gen_manifests.scan_skip_dirs(gen_args),
+        )
+        for artifact in artifacts:
+            artifact.source_date = source_dates.get(artifact.path.resolve())
+        return _generate(gen_args, artifacts, digest_cache, outputs)
+    firmware_dir.mkdir(parents=True, exist_ok=True)
+    if store:
+        pending = []
+        for name, url, target_path, asset in planned:
+            stored = store.lookup(asset)
+            if stored:
+                store.link(stored, target_path)
+                print(f"Reused {name} → {target_path}")
+            else:
+                pending.append((name, url, target_path, asset))
+        # Reused assets are now ordinary files for collect_firmware.
+        planned = pending
+    replaced = {target_path.resolve() for _, _, target_path, _ in planned}
+    with tempfile.TemporaryDirectory(prefix=".sync-", dir=firmware_dir) as tmp_dir:
+        staging_dir = Path(tmp_dir)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            futures = {
+                pool.submit(
+                    _download_and_hash, name, url, staging_dir, token, digest_cache.chunk_size
+                ): (name, target_path, asset)
+                for name, url, target_path, asset in planned
+            }
+            try:
+                artifacts = gen_manifests.collect_firmware(
+                    firmware_dir,
+                    repo_root,
+                    digest_cache=digest_cache,
+                    exclude=replaced,
+                    skip_dirs=gen_manifests.scan_skip_dirs(gen_args),
+                )
+                for future in concurrent.futures.as_completed(futures):
+                    name, target_path, asset = futures[future]
+                    staging_path, accumulator = future.result()
+                    if store:
+                        stored = store.add(staging_path, accumulator.result()[1], asset)
+                        store.link(stored, target_path)
+                    else:
+                        target_path.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(staging_path, target_path)
+                    try:
+                        digest_cache.record_streamed(target_path, accumulator)
+                    except gen_manifests.EspImageError as exc:
+                        raise SystemExit(f"Invalid ESP image {target_path}: {exc}") from exc
+                    artifacts.append(
+                        gen_manifests.build_artifact(
+                            target_path,
+                            firmware_dir,
+                            repo_root,
+                            digest_cache=digest_cache,
+                        )
+                    )
+                    print(f"Downloaded {name} → {target_path}")
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    print(f"Synced {len(planned)} firmware file(s) into {firmware_dir}")
+    artifacts.sort(key=lambda artifact: artifact.path)
+    for artifact in artifacts:
+        artifact.source_date = source_dates.get(artifact.path.resolve())
+    return _generate(gen_args, artifacts, digest_cache, outputs)
+
+
+def _generate(
+    gen_args: argparse.Namespace,
+    artifacts: List["gen_manifests.FirmwareArtifact"],
+    digest_cache: "gen_manifests.DigestCache",
+    outputs: Optional["gen_manifests.ChangeSetSnapshot"],
+) -> int:
+    returncode = gen_manifests.generate_outputs(gen_args, artifacts, digest_cache)
+    if outputs is not None:
+        gen_manifests.write_change_set(gen_args, outputs, digest_cache)
+    return returncode
+
+
+def iter_archive_members(archive: Path) -> Iterator[Tuple[str, int, BinaryIO]]:
+    """Yield ``(name, size, stream)`` for every regular file in a zip or tar bundle.
+
+    Members are decompressed as they are read, in archive order; nothing is
+    extracted. Tar bundles (plain, gzip, bzip2 or xz) are read in streaming
+    mode, so each stream is only valid until the next member is requested.
+    """
+    try:
+        if zipfile.is_zipfile(archive):
+            with zipfile.ZipFile(archive) as bundle:
+                for info in bundle.infolist():
+                    if info.is_dir():
+                        continue
+                    with bundle.open(info) as stream:
+                        yield info.filename, info.file_size, stream
+            return
+        with tarfile.open(archive, mode="r|*") as bundle:
+            for member in bundle:
+                stream = bundle.extractfile(member) if member.isfile() else None
+                if stream is not None:
+                    yield member.name, member.size, stream
+    except (OSError, zipfile.BadZipFile, tarfile.TarError) as exc:
+        raise SystemExit(f"Unable to read archive {archive}: {exc}") from exc
+
+
+def _open_staging(partial: Path, existing: Optional[BinaryIO], matched: int) -> BinaryIO:
+    staging = partial.open("wb")
+    if existing is not None and matched:
+        existing.seek(0)
+        staging.write(existing.read(matched))
+    return staging
+
+
+def stream_into(
+    source: BinaryIO,
+    target: Path,
+    accumulator: "gen_manifests.DigestAccumulator",
+) -> bool:
+    """Copy ``source`` to ``target`` while hashing it; return whether ``target`` was written.
+
+    The incoming bytes are compared with any existing ``target`` as they
+    arrive. If it already holds them nothing is written, so its mtime, inode
+    and digest cache record stay valid. At the first difference a staging
+    file is started from the matching prefix and replaces ``target`` at the
+    end.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    existing = target.open("rb") if target.is_file() else None
+    staging: Optional[BinaryIO] = None
+    matched = 0
+    try:
+        for chunk in iter(lambda: source.read(DOWNLOAD_CHUNK_SIZE), b""):
+            accumulator.update(chunk)
+            if staging is None and existing is not None and existing.read(len(chunk)) == chunk:
+                matched += len(chunk)
+                continue
+            if staging is None:
+                staging = _open_staging(partial, existing, matched)
+            staging.write(chunk)
+        if staging is None:
+            if existing is not None and not existing.read(1):
+                return False
+            staging = _open_staging(partial, existing, matched)
+        staging.close()
+    except BaseException:
+        if staging is not None:
+            staging.close()
+            partial.unlink(missing_ok=True)
+        raise
+    finally:
+        if existing is not None:
+            existing.close()
+    os.replace(partial, target)
+    return True
+
+
+def ingest_archives(
+    archives: Sequence[Path],
+    firmware_dir: Path,
+    pattern: str,
+    digest_cache: "gen_manifests.DigestCache",
+    *,
+    dry_run: bool,
+) -> Tuple[List[Path], int]:
+    """Stream the firmware members of local bundles into their canonical paths.
+
+    Members are matched by file name against ``pattern`` (directories inside
+    the bundle are ignored) and written to ``metadata.target_path`` with
+    :func:`stream_into`. Their digests, computed in the same pass, go to
+    ``digest_cache`` so gen-manifests does not read them again. Returns the
+    files written and the number of members whose content was already there.
+    """
+    written: List[Path] = []
+    unchanged = 0
+    for archive in archives:
+        for member_name, _, stream in iter_archive_members(archive):
+            name = PurePosixPath(member_name).name
+            if not name.lower().endswith(".bin") or not fnmatch.fnmatch(name, pattern):
+                continue
+            try:
+                metadata = gen_manifests.parse_firmware_metadata(Path(name))
+            except ValueError as exc:
+                raise SystemExit(
+                    f"Unable to parse firmware '{member_name}' in {archive}: {exc}"
+                ) from exc
+            target_path = metadata.target_path(firmware_dir)
+            if dry_run:
+                print(f"[dry-run] Would ingest {name} → {target_path}")
+                written.append(target_path)
+                continue
+            accumulator = gen_manifests.DigestAccumulator(
+                digest_cache.chunk_size, inspect_image=True
+            )
+            changed = stream_into(stream, target_path, accumulator)
+            if changed or digest_cache.lookup(target_path) is None:
+                try:
+                    digest_cache.record_streamed(target_path, accumulator)
+                except gen_manifests.EspImageError as exc:
+                    raise SystemExit(f"Invalid ESP image {target_path}: {exc}") from exc
+            if changed:
+                print(f"Ingested {name} → {target_path}")
+                written.append(target_path)
+            else:
+                print(f"Unchanged {name}")
+                unchanged += 1
+    return written, unchanged
+
+
+def ingest_and_generate(
+    archives: Sequence[Path],
+    gen_args: argparse.Namespace,
+    pattern: str,
+) -> int:
+    """Ingest local bundles, then generate manifests with the digests already cached."""
+
+    repo_root = Path(gen_args.repo_root).resolve()
+    firmware_dir = (repo_root / gen_args.firmware_dir).resolve()
+    digest_cache = gen_manifests.open_digest_cache(gen_args)
+    outputs = gen_manifests.snapshot_outputs(gen_args) if gen_args.change_set else None
+    written, unchanged = ingest_archives(
+        archives, firmware_dir, pattern, digest_cache, dry_run=gen_args.dry_run
+    )
+    print(f"Ingested {len(written)} firmware file(s) into {firmware_dir}; {unchanged} unchanged")
+    artifacts = gen_manifests.collect_firmware(
+        firmware_dir,
+        repo_root,
+        dry_run=gen_args.dry_run,
+        digest_cache=digest_cache,
+        skip_dirs=gen_manifests.scan_skip_dirs(gen_args),
+    )
+    return _generate(gen_args, artifacts, digest_cache, outputs)
+
+
 def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Synchronise firmware binaries from GitHub release assets."
@@ -157,6 +754,13 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
         "--token",
         help="GitHub token with permission to read release assets. Defaults to GITHUB_TOKEN.",
     )
+    parser.add_argument(
+        "--api-url",
+        help=(
+            "GitHub API base URL. Defaults to GITHUB_API_URL, then "
+            f"{DEFAULT_API_URL}."
+        ),
+    )
     parser.add_argument(
         "--target-dir",
         default="firmware",
@@ -172,18 +776,136 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
         action="store_true",
         help="Preview downloads without saving files.",
     )
-    return parser.parse_args(argv)
+    parser.add_argument(
+        "--generate",
+        action="store_true",
+        help=(
+            "Generate manifests in the same run, overlapping downloads, hashing "
+            "and scanning. Arguments after -- are passed to gen-manifests."
+        ),
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Concurrent downloads with --generate (default: {DEFAULT_JOBS}).",
+    )
+    parser.add_argument(
+        "--archive",
+        action="append",
+        dest="archives",
+        metavar="PATH",
+        help=(
+            "Ingest firmware from a local zip or tar bundle instead of a GitHub "
+            "release. Can be provided multiple times."
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help=(
+            "gen-manifests digest cache directory. Digests computed while ingesting "
+            "bundles are saved there so manifest generation does not re-hash them."
+        ),
+    )
+    parser.add_argument(
+        "--store",
+        help=(
+            "Content-addressed asset store directory, for example a CI cache path. "
+            "Assets already in it are not downloaded again."
+        ),
+    )
+    parser.add_argument(
+        "--store-max-bytes",
+        type=gen_manifests.parse_size,
+        help="Evict least recently used store objects beyond this size, e.g. 2G.",
+    )
+    parser.add_argument(
+        "--store-link",
+        choices=STORE_LINK_MODES,
+        default="auto",
+        help=(
+            "How firmware files are created from store objects: auto tries reflink, "
+            "then hardlink, then copy (default: auto)."
+        ),
+    )
+    args = parser.parse_args(argv)
+    if args.archives and (args.release_id is not None or args.tag or args.store):
+        parser.error("--archive cannot be combined with --release-id, --tag or --store")
+    return args
 
 
 def main(argv: Optional[Sequence[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    gen_argv: List[str] = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, gen_argv = argv[:split], argv[split + 1 :]
     args = parse_args(argv)
+    if args.archives:
+        return _ingest(args, gen_argv)
     repo = args.repo or os.environ.get("GITHUB_REPOSITORY")
     if not repo:
         raise SystemExit(
             "Repository must be provided via --repo or the GITHUB_REPOSITORY environment variable."
         )
     token = args.token or os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
-    release = fetch_release(repo, args.release_id, args.tag, token)
+    api_url = args.api_url or os.environ.get("GITHUB_API_URL") or DEFAULT_API_URL
+    release = fetch_release(repo, args.release_id, args.tag, token, api_url)
+    store = AssetStore(Path(args.store).expanduser(), link_mode=args.store_link) if args.store else None
+    try:
+        return _sync(args, release, token, store, gen_argv)
+    finally:
+        if store and not args.dry_run:
+            store.close(args.store_max_bytes)
+
+
+def _gen_args(args: argparse.Namespace, gen_argv: List[str]) -> argparse.Namespace:
+    # Arguments after -- come last so they win over the sync options.
+    return gen_manifests.parse_args(
+        ["--firmware-dir", args.target_dir]
+        + (["--cache-dir", args.cache_dir] if args.cache_dir else [])
+        + gen_argv
+        + (["--dry-run"] if args.dry_run else [])
+    )
+
+
+def _ingest(args: argparse.Namespace, gen_argv: List[str]) -> int:
+    archives = [Path(archive).expanduser() for archive in args.archives]
+    pattern = args.pattern or "*.bin"
+    if args.generate:
+        return ingest_and_generate(archives, _gen_args(args, gen_argv), pattern)
+    firmware_dir = Path(args.target_dir).resolve()
+    cache_dir = Path(args.cache_dir).resolve() if args.cache_dir else None
+    digest_cache = gen_manifests.DigestCache(
+        cache_dir / gen_manifests.DIGEST_CACHE_FILENAME if cache_dir else None
+    )
+    written, unchanged = ingest_archives(
+        archives, firmware_dir, pattern, digest_cache, dry_run=args.dry_run
+    )
+    if args.dry_run:
+        print(f"[dry-run] Would ingest {len(written)} firmware file(s) into {firmware_dir}")
+        return 0
+    digest_cache.save()
+    print(f"Ingested {len(written)} firmware file(s) into {firmware_dir}; {unchanged} unchanged")
+    return 0
+
+
+def _sync(
+    args: argparse.Namespace,
+    release: dict,
+    token: Optional[str],
+    store: Optional[AssetStore],
+    gen_argv: List[str],
+) -> int:
+    if args.generate:
+        return sync_and_generate(
+            release,
+            _gen_args(args, gen_argv),
+            token,
+            args.pattern or "*.bin",
+            jobs=args.jobs,
+            store=store,
+        )
     firmware_dir = Path(args.target_dir).resolve()
     downloaded = sync_assets(
         release,
@@ -191,6 +913,7 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         token,
         args.pattern or "*.bin",
         args.dry_run,
+        store,
     )
     if downloaded:
         if args.dry_run:
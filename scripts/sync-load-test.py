@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Measure sync-from-releases throughput against the local mock releases API.
+
+Starts scripts/mock-releases-server.py in-process and times
+``fetch_release`` plus ``sync_assets`` (or the ``--generate`` pipeline with
+``--pipeline``) downloading into a scratch directory. The run reports assets
+per second and MB/s, and checks that every synced file has the size the
+release advertised. Injected latency, errors and truncated downloads show
+how the sync fails: a clean SystemExit message is reported as "failed",
+anything else as "crashed". The exit status is non-zero unless the outcome
+is "ok". ``--store`` syncs through a content-addressed asset store; run
+twice with the same directory to time a warm cache.
+
+Usage:
+    python scripts/sync-load-test.py --assets 300 --asset-size 1572864
+    python scripts/sync-load-test.py --assets 200 --latency-ms 20 --pipeline --jobs 8
+    python scripts/sync-load-test.py --assets 300 --store /tmp/webflash-store
+    python scripts/sync-load-test.py --assets 50 --truncate-asset \\
+        Sense360-Ceiling-USB-v9.0.0-stable.bin
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+
+def _load_script(module_name: str, filename: str):
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / filename)
+    if spec is None or spec.loader is None:  # pragma: no cover - import guard
+        raise ImportError(f"Unable to load scripts/{filename}.")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+mock_server = _load_script("mock_releases_server", "mock-releases-server.py")
+sync_from_releases = _load_script("sync_from_releases", "sync-from-releases.py")
+
+
+def run_load_test(args: argparse.Namespace) -> Dict[str, object]:
+    config = mock_server.config_from_args(args)
+    server, state, _ = mock_server.start_server(config)
+    host, port = server.server_address[:2]
+    api_url = f"http://{host}:{port}"
+    expected = {asset.name: asset.size for asset in config.assets}
+    result: Dict[str, object] = {
+        "mode": "pipeline" if args.pipeline else "sync_assets",
+        "assets": len(config.assets),
+        "asset_size": args.asset_size,
+        "latency_ms": args.latency_ms,
+        "error_rate": args.error_rate,
+    }
+    store = (
+        sync_from_releases.AssetStore(Path(args.store), link_mode=args.store_link)
+        if args.store
+        else None
+    )
+    try:
+        with tempfile.TemporaryDirectory(prefix="webflash-sync-load-") as scratch:
+            repo_root = Path(scratch)
+            firmware_dir = repo_root / "firmware"
+            started = time.perf_counter()
+            try:
+                release = sync_from_releases.fetch_release(
+                    config.repo, config.release_id, None, None, api_url
+                )
+                if args.pipeline:
+                    gen_args = sync_from_releases.gen_manifests.parse_args(
+                        ["--repo-root", scratch, "--firmware-dir", "firmware", "--allow-empty"]
+                    )
+                    sync_from_releases.sync_and_generate(
+                        release, gen_args, None, "*.bin", jobs=args.jobs, store=store
+                    )
+                else:
+                    sync_from_releases.sync_assets(
+                        release, firmware_dir, None, "*.bin", False, store
+                    )
+                result["outcome"] = "ok"
+            except SystemExit as exc:
+                result["outcome"] = "failed"
+                result["error"] = str(exc.code)
+            except Exception as exc:  # noqa: BLE001 - a crash is the finding
+                result["outcome"] = "crashed"
+                result["error"] = f"{type(exc).__name__}: {exc}"
+            elapsed = time.perf_counter() - started
+            synced = {path.name: path.stat().st_size for path in firmware_dir.rglob("*.bin")}
+    finally:
+        server.shutdown()
+        server.server_close()
+        if store:
+            store.close()
+            result["store"] = {"reused": store.hits, "added": store.added, "links": store.links}
+    mismatched = sorted(
+        name for name, size in synced.items() if expected.get(name) not in (None, size)
+    )
+    total_bytes = sum(synced.values())
+    result.update(
+        {
+            "seconds": round(elapsed, 3),
+            "synced": len(synced),
+            "bytes": total_bytes,
+            "assets_per_second": round(len(synced) / elapsed, 1) if elapsed else None,
+            "mb_per_second": round(total_bytes / elapsed / 1e6, 1) if elapsed else None,
+            "size_mismatches": mismatched,
+            "server": state.snapshot(),
+        }
+    )
+    if mismatched and result["outcome"] == "ok":
+        result["outcome"] = "corrupt"
+    return result
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Load-test sync-from-releases.py against the local mock releases API."
+    )
+    mock_server.add_mock_arguments(parser)
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Time the sync --generate pipeline instead of sync_assets.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=sync_from_releases.DEFAULT_JOBS,
+        help="Concurrent downloads for --pipeline (default: %(default)s).",
+    )
+    parser.add_argument("--store", help="Sync through a content-addressed asset store in this directory.")
+    parser.add_argument(
+        "--store-link",
+        choices=sync_from_releases.STORE_LINK_MODES,
+        default="auto",
+        help="How synced files are created from store objects (default: auto).",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    # Keep per-asset progress lines out of the JSON on stdout.
+    with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+        result = run_load_test(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(
+            f"\n{result['mode']}: {result['outcome']} - {result['synced']}/{result['assets']} "
+            f"asset(s), {result['bytes'] / 1e6:.1f} MB in {result['seconds']}s "
+            f"({result['assets_per_second']} assets/s, {result['mb_per_second']} MB/s)"
+        )
+        if result.get("error"):
+            print(f"  error: {result['error']}")
+        if result["size_mismatches"]:
+            print("  size mismatches: " + ", ".join(result["size_mismatches"]))
+        print(f"  server: {json.dumps(result['server'])}")
+        if "store" in result:
+            print(f"  store: {json.dumps(result['store'])}")
+    return 0 if result["outcome"] == "ok" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+/**
+ * Loads the compatibility index written by `gen-manifests.py --compat-index`
+ * and the per-config build shards it names.
+ *
+ * Pages opt in with `<meta name="webflash-compat-index" content="compat-index.json">`.
+ * The index is fetched from that fixed path without loading manifest.json
+ * first; it carries the manifest header, so full build entries are only
+ * fetched (one shard per config) once a configuration is chosen. Without
+ * the meta tag, or when the index cannot be used, callers fall back to
+ * scanning manifest.json.
+ */
+
+import { fetchManifestAsset } from './manifest-pointer.js';
+
+const COMPAT_INDEX_META_NAME = 'webflash-compat-index';
+
+let indexRequest = null;
+const shardRequests = new Map();
+
+function getCompatIndexPath() {
+    if (typeof document === 'undefined') {
+        return null;
+    }
+    const meta = document.querySelector(`meta[name="${COMPAT_INDEX_META_NAME}"]`);
+    const content = meta?.getAttribute('content')?.trim();
+    return content || null;
+}
+
+function isUsableIndex(index) {
+    return Boolean(
+        index
+        && typeof index.bases === 'object'
+        && typeof index.configs === 'object'
+        && typeof index.shards === 'object'
+        && index.manifest
+        && typeof index.manifest === 'object'
+    );
+}
+
+async function requestCompatIndex() {
+    const indexPath = getCompatIndexPath();
+    if (!indexPath || typeof fetch !== 'function') {
+        return null;
+    }
+    try {
+        const response = await fetchManifestAsset(indexPath);
+        if (!response.ok) {
+            throw new Error(`Compatibility index request failed with status ${response.status}`);
+        }
+        const index = await response.json();
+        return isUsableIndex(index) ? index : null;
+    } catch (error) {
+        console.warn('Compatibility index unavailable, using manifest.json', error);
+        return null;
+    }
+}
+
+/**
+ * Loads the compatibility index once per page (or again on `forceReload`).
+ * @param {{forceReload?: boolean}} [options]
+ * @returns {Promise<object|null>} The index, or null when the page has not
+ *     opted in or the index is missing or from an older generator
+ */
+function loadCompatIndex({ forceReload = false } = {}) {
+    if (!indexRequest || forceReload) {
+        indexRequest = requestCompatIndex();
+        shardRequests.clear();
+    }
+    return indexRequest;
+}
+
+/**
+ * Fetches the full manifest entries for one configuration.
+ * @param {object} index - Index returned by loadCompatIndex()
+ * @param {string} configString - Config string, matched case-insensitively
+ * @returns {Promise<Array<object>>} Entries in manifest order, each with its
+ *     `build` index into manifest.json
+ */
+function loadConfigBuilds(index, configString) {
+    const shardPath = index?.shards?.[String(configString ?? '').toLowerCase()];
+    if (typeof shardPath !== 'string' || !shardPath) {
+        return Promise.resolve([]);
+    }
+    if (!shardRequests.has(shardPath)) {
+        const request = fetchManifestAsset(shardPath).then(async response => {
+            if (!response.ok) {
+                throw new Error(`Build shard request failed with status ${response.status}`);
+            }
+            const shard = await response.json();
+            return Array.isArray(shard?.builds) ? shard.builds : [];
+        });
+        request.catch(() => shardRequests.delete(shardPath));
+        shardRequests.set(shardPath, request);
+    }
+    return shardRequests.get(shardPath);
+}
+
+export { loadCompatIndex, loadConfigBuilds };
@@ -0,0 +1,117 @@
+/**
+ * Resolves the content-hashed manifests published by
+ * `gen-manifests.py --hashed-manifests`.
+ *
+ * Pages opt in with `<meta name="webflash-manifest-pointer" content="manifest-pointer.json">`.
+ * Only the pointer is fetched uncached; the hashed manifest and digest map it
+ * names are immutable. Without the meta tag, or when the pointer cannot be
+ * loaded, callers fall back to the plain `manifest.json`.
+ */
+
+const MANIFEST_POINTER_META_NAME = 'webflash-manifest-pointer';
+
+let digestMap = null;
+let pointerRequest = null;
+let digestMapRequest = null;
+
+function getManifestPointerPath() {
+    if (typeof document === 'undefined') {
+        return null;
+    }
+    const meta = document.querySelector(`meta[name="${MANIFEST_POINTER_META_NAME}"]`);
+    const content = meta?.getAttribute('content')?.trim();
+    return content || null;
+}
+
+function normalizeLogicalPath(path) {
+    return String(path ?? '').replace(/^\.\//, '');
+}
+
+async function loadManifestPointer() {
+    const pointerPath = getManifestPointerPath();
+    if (!pointerPath || typeof fetch !== 'function') {
+        return null;
+    }
+    try {
+        const response = await fetch(pointerPath, { cache: 'no-store' });
+        if (!response.ok) {
+            return null;
+        }
+        const pointer = await response.json();
+        return pointer && typeof pointer.manifest === 'string' ? pointer : null;
+    } catch (error) {
+        console.warn('Manifest pointer unavailable, using manifest.json', error);
+        return null;
+    }
+}
+
+async function loadDigestMap(digestsPath) {
+    if (typeof digestsPath !== 'string' || !digestsPath) {
+        return null;
+    }
+    try {
+        const response = await fetch(digestsPath);
+        const digests = response.ok ? await response.json() : null;
+        return digests && typeof digests.files === 'object' ? digests.files : null;
+    } catch (error) {
+        console.warn('Manifest digest map unavailable', error);
+        return null;
+    }
+}
+
+/**
+ * Starts (or reuses) the pointer request and the digest map load behind it.
+ * @param {boolean} refresh - Re-fetch the pointer even if one was loaded
+ * @returns {Promise<object|null>}
+ */
+function requestManifestPointer(refresh) {
+    if (refresh || !pointerRequest) {
+        pointerRequest = loadManifestPointer();
+        digestMapRequest = pointerRequest.then(async pointer => {
+            digestMap = pointer ? await loadDigestMap(pointer.digests) : null;
+            return digestMap;
+        });
+    }
+    return pointerRequest;
+}
+
+/**
+ * Fetches the manifest, preferring the hashed copy named by the pointer.
+ * @param {string} [fallbackPath='manifest.json'] - Plain manifest path
+ * @returns {Promise<Response>}
+ */
+async function fetchManifestResponse(fallbackPath = 'manifest.json') {
+    const pointer = await requestManifestPointer(true);
+    if (!pointer) {
+        return fetch(fallbackPath, { cache: 'no-store' });
+    }
+    const [response] = await Promise.all([fetch(pointer.manifest), digestMapRequest]);
+    return response;
+}
+
+/**
+ * Maps a logical manifest path (for example `firmware-3.json`) to its hashed
+ * copy when one was published, otherwise returns the path unchanged.
+ * @param {string} path - Logical path relative to the site root
+ * @returns {string}
+ */
+function resolveManifestAsset(path) {
+    const entry = digestMap?.[normalizeLogicalPath(path)];
+    return typeof entry?.path === 'string' ? entry.path : path;
+}
+
+/**
+ * Fetches a manifest-side asset, using the immutable hashed copy if known.
+ * Loads the pointer first when nothing has yet, so assets such as the
+ * compatibility index can be fetched without the manifest.
+ * @param {string} path - Logical path relative to the site root
+ * @returns {Promise<Response>}
+ */
+async function fetchManifestAsset(path) {
+    requestManifestPointer(false);
+    await digestMapRequest;
+    const resolved = resolveManifestAsset(path);
+    return resolved === path ? fetch(path, { cache: 'no-store' }) : fetch(resolved);
+}
+
+export { fetchManifestAsset, fetchManifestResponse, resolveManifestAsset };
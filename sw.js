@@ -45,9 +45,11 @@ const SCRIPT_MODULES = [
     './scripts/layout/option-info-popover.js',
     './scripts/layout/state-summary.js',
     './scripts/utils/channel-alias.js',
+    './scripts/utils/compat-index.js',
     './scripts/utils/copy-to-clipboard.js',
     './scripts/utils/escape-html.js',
     './scripts/utils/flash-history.js',
+    './scripts/utils/manifest-pointer.js',
     './scripts/utils/preset-storage.js',
     './scripts/utils/url-config.js'
 ];
@@ -130,8 +132,13 @@ self.addEventListener('fetch', (event) => {
         return;
     }
 
-    // For manifest.json, use network-first to get latest firmware list
-    if (url.pathname.endsWith('manifest.json')) {
+    // For manifest.json and the files that point at, summarise or split it,
+    // use network-first to get latest firmware list
+    if (url.pathname.endsWith('manifest.json')
+        || url.pathname.endsWith('manifest-pointer.json')
+        || url.pathname.endsWith('latest.json')
+        || url.pathname.endsWith('compat-index.json')
+        || url.pathname.includes('/firmware/builds/')) {
         event.respondWith(
             fetch(event.request)
                 .then((response) => {
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from helpers import gen_manifests, mock_releases_server, sync_from_releases
+
+
+@pytest.fixture
+def gen():
+    return gen_manifests
+
+
+@pytest.fixture
+def sync():
+    return sync_from_releases
+
+
+@pytest.fixture
+def repo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """An empty site root; relative output paths resolve against it."""
+
+    (tmp_path / "firmware" / "configurations").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    monkeypatch.delenv("GITHUB_STEP_SUMMARY", raising=False)
+    return tmp_path
+
+
+@pytest.fixture
+def releases() -> Iterator:
+    """Start the mock releases API for a list of assets; yields ``(api_url, state)``."""
+
+    servers = []
+
+    def start(assets, **options):
+        config = mock_releases_server.MockConfig(assets=list(assets), **options)
+        server, state, _ = mock_releases_server.start_server(config)
+        servers.append(server)
+        host, port = server.server_address[:2]
+        return f"http://{host}:{port}", state
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,154 @@
+"""Loaders and fixture builders shared by the build-script tests."""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import json
+import os
+import struct
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = REPO_ROOT / "scripts"
+
+
+def load_script(filename: str, module_name: str) -> ModuleType:
+    """Import a hyphenated script from scripts/ under ``module_name``."""
+
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / filename)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    # dataclasses resolves the defining module through sys.modules.
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# sync-from-releases.py loads its own copy of gen-manifests.py and registers
+# it as ``gen_manifests``; share that copy so both scripts see one module.
+sync_from_releases = load_script("sync-from-releases.py", "sync_from_releases")
+gen_manifests = sync_from_releases.gen_manifests
+mock_releases_server = load_script("mock-releases-server.py", "mock_releases_server")
+# manifest-daemon.py registers a second copy as ``gen_manifests``; put the
+# shared copy back so later imports keep resolving to it.
+manifest_daemon = load_script("manifest-daemon.py", "manifest_daemon")
+sys.modules["gen_manifests"] = gen_manifests
+
+
+def esp_image(
+    payload: bytes,
+    *,
+    chip_id: int = 9,
+    hash_appended: bool = True,
+    app_version: Optional[str] = None,
+) -> bytes:
+    """A single-segment ESP-IDF image with a valid checksum (and appended SHA-256)."""
+
+    if app_version is not None:
+        payload = (
+            struct.pack(
+                "<II8s32s32s16s16s32s32s",
+                gen_manifests.ESP_APP_DESC_MAGIC,
+                0,
+                b"",
+                app_version.encode(),
+                b"sense360",
+                b"12:00:00",
+                b"Jan  1 2026",
+                b"v5.1",
+                bytes(32),
+            )
+            + payload
+        )
+    image = bytearray(
+        struct.pack(
+            "<BBBBIB3sHBHH4sB",
+            gen_manifests.ESP_IMAGE_MAGIC,
+            1,
+            2,
+            0x20,
+            0x40080000,
+            0xEE,
+            b"\0\0\0",
+            chip_id,
+            0,
+            0,
+            0xFFFF,
+            b"\0" * 4,
+            1 if hash_appended else 0,
+        )
+    )
+    image += struct.pack("<II", 0x3FFB0000, len(payload)) + payload
+    checksum = gen_manifests.ESP_CHECKSUM_SEED
+    for byte in payload:
+        checksum ^= byte
+    image += b"\0" * (15 - len(image) % 16)
+    image.append(checksum)
+    if hash_appended:
+        image += hashlib.sha256(image).digest()
+    return bytes(image)
+
+
+DEFAULT_PARTITIONS: Sequence[Tuple[int, int, int, int, str]] = (
+    (1, 0x02, 0x9000, 0x5000, "nvs"),
+    (1, 0x00, 0xE000, 0x2000, "otadata"),
+    (0, 0x10, 0x10000, 0x140000, "app0"),
+    (0, 0x11, 0x150000, 0x140000, "app1"),
+)
+
+
+def partition_table(entries: Iterable[Tuple[int, int, int, int, str]] = DEFAULT_PARTITIONS) -> bytes:
+    return b"".join(
+        gen_manifests.PARTITION_ENTRY.pack(
+            gen_manifests.PARTITION_MAGIC, kind, subtype, offset, size, label.encode().ljust(16, b"\0"), 0
+        )
+        for kind, subtype, offset, size, label in entries
+    )
+
+
+def merged_image(
+    app_payload: bytes,
+    *,
+    bootloader_payload: bytes = b"BOOT" * 64,
+    app_version: Optional[str] = None,
+) -> bytes:
+    """An ESP32 factory image: bootloader at 0x1000, partition table, app at 0x10000."""
+
+    image = bytearray(b"\xff" * gen_manifests.ESP_APP_OFFSET)
+    bootloader = esp_image(bootloader_payload, chip_id=0)
+    image[0x1000 : 0x1000 + len(bootloader)] = bootloader
+    table = partition_table()
+    offset = gen_manifests.PARTITION_TABLE_OFFSET
+    image[offset : offset + len(table)] = table
+    return bytes(image) + esp_image(app_payload, chip_id=0, app_version=app_version)
+
+
+def random_firmware(size: int) -> bytes:
+    """Incompressible bytes that never start with the ESP image magic byte."""
+
+    return b"\x00" + os.urandom(size - 1)
+
+
+def write_firmware(root: Path, name: str, data: bytes, subdir: str = "configurations") -> Path:
+    path = root / "firmware" / subdir / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def firmware_name(config: str, version: str, channel: str = "stable") -> str:
+    return f"Sense360-{config}-v{version}-{channel}.bin"
+
+
+def run_gen(root: Path, *argv: str) -> int:
+    return gen_manifests.main(["--repo-root", str(root), *argv])
+
+
+def read_json(path: Path) -> Dict[str, object]:
+    return json.loads(path.read_text(encoding="utf-8"))
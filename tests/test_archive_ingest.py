@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from helpers import firmware_name, random_firmware, read_json, run_gen
+
+MEMBERS = {
+    "build/out/" + firmware_name("Ceiling-USB", "1.0.0"): random_firmware(70_000),
+    firmware_name("Ceiling-POE-AirIQ", "1.1.0", "beta"): random_firmware(5000),
+    "build/README.txt": b"not firmware",
+    "build/bootloader.elf": b"\x7fELF",
+}
+
+
+def _zip(path, members):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        for name, data in members.items():
+            bundle.writestr(name, data)
+    return path
+
+
+def _tar(path, members):
+    with tarfile.open(path, "w:gz") as bundle:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            bundle.addfile(info, io.BytesIO(data))
+    return path
+
+
+@pytest.fixture(params=[("bundle.zip", _zip), ("bundle.tar.gz", _tar)], ids=["zip", "tar"])
+def bundle(request, tmp_path_factory):
+    name, build = request.param
+    return build(tmp_path_factory.mktemp("farm") / name, MEMBERS)
+
+
+def _installed(repo):
+    return {path.name: path.read_bytes() for path in (repo / "firmware").rglob("*.bin")}
+
+
+def test_members_are_streamed_to_their_canonical_paths(sync, repo, bundle, capsys):
+    assert sync.main(["--archive", str(bundle)]) == 0
+
+    assert _installed(repo) == {
+        firmware_name("Ceiling-USB", "1.0.0"): MEMBERS["build/out/" + firmware_name("Ceiling-USB", "1.0.0")],
+        firmware_name("Ceiling-POE-AirIQ", "1.1.0", "beta"): MEMBERS[firmware_name("Ceiling-POE-AirIQ", "1.1.0", "beta")],
+    }
+    assert (repo / "firmware" / "configurations" / firmware_name("Ceiling-USB", "1.0.0")).exists()
+    assert "Ingested 2 firmware file(s)" in capsys.readouterr().out
+    assert not list((repo / "firmware").rglob("*.tmp"))
+
+
+def test_unchanged_members_are_not_rewritten(sync, repo, bundle, capsys):
+    assert sync.main(["--archive", str(bundle)]) == 0
+    before = {path: path.stat() for path in (repo / "firmware").rglob("*.bin")}
+    capsys.readouterr()
+
+    assert sync.main(["--archive", str(bundle)]) == 0
+
+    assert "Ingested 0 firmware file(s) into" in capsys.readouterr().out
+    for path, stat in before.items():
+        assert (path.stat().st_ino, path.stat().st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns)
+
+
+def test_ingested_digests_are_reused_by_gen_manifests(gen, sync, repo, bundle, monkeypatch):
+    assert sync.main(["--archive", str(bundle), "--cache-dir", ".cache"]) == 0
+
+    monkeypatch.setattr(gen, "compute_digest_record", pytest.fail)
+    assert run_gen(repo, "--cache-dir", ".cache") == 0
+    assert len(read_json(repo / "manifest.json")["builds"]) == 2
+
+
+def test_generate_builds_manifests_in_the_same_run(sync, repo, bundle):
+    assert sync.main(["--archive", str(bundle), "--generate", "--", "--change-set", "change-set.json"]) == 0
+
+    builds = read_json(repo / "manifest.json")["builds"]
+    assert sorted(build["config_string"] for build in builds) == ["Ceiling-POE-AirIQ", "Ceiling-USB"]
+    added = [entry["path"] for entry in read_json(repo / "change-set.json")["added"]]
+    assert "firmware/configurations/" + firmware_name("Ceiling-USB", "1.0.0") in added
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        (b"a" * 300_000, b"a" * 150_000 + b"b" + b"a" * 149_999),
+        (b"a" * 300_000, b"a" * 200_000),
+        (b"a" * 200_000, b"a" * 300_000),
+        (b"", b"payload"),
+    ],
+    ids=["differs-midway", "shorter", "longer", "empty"],
+)
+def test_stream_into_rewrites_from_the_first_difference(gen, sync, tmp_path, old, new):
+    target = tmp_path / "firmware.bin"
+    target.write_bytes(old)
+    accumulator = gen.DigestAccumulator(gen.DEFAULT_CHUNK_SIZE)
+
+    assert sync.stream_into(io.BytesIO(new), target, accumulator) is True
+
+    assert target.read_bytes() == new
+    assert accumulator.result()[1] == hashlib.sha256(new).hexdigest()
+    assert [path.name for path in tmp_path.iterdir()] == ["firmware.bin"]
+
+
+def test_stream_into_leaves_identical_files_alone(gen, sync, tmp_path):
+    target = tmp_path / "firmware.bin"
+    target.write_bytes(b"payload" * 1000)
+    inode = target.stat().st_ino
+    accumulator = gen.DigestAccumulator(gen.DEFAULT_CHUNK_SIZE)
+
+    assert sync.stream_into(io.BytesIO(b"payload" * 1000), target, accumulator) is False
+    assert target.stat().st_ino == inode
+
+
+def test_unreadable_bundles_and_names_are_rejected(sync, repo, tmp_path_factory):
+    farm = tmp_path_factory.mktemp("farm")
+    broken = farm / "broken.tar.gz"
+    broken.write_bytes(b"not an archive")
+    with pytest.raises(SystemExit, match="Unable to read archive"):
+        sync.main(["--archive", str(broken)])
+
+    odd = _zip(farm / "odd.zip", {"firmware.bin": random_firmware(4096)})
+    with pytest.raises(SystemExit, match="Unable to parse firmware 'firmware.bin'"):
+        sync.main(["--archive", str(odd)])
+
+
+def test_archives_cannot_be_combined_with_release_options(sync, tmp_path):
+    with pytest.raises(SystemExit):
+        sync.parse_args(["--archive", str(tmp_path / "a.zip"), "--store", str(tmp_path / "store")])
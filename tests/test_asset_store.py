@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+
+from helpers import gen_manifests, mock_releases_server, read_json
+
+
+def _release(sync, api_url):
+    config = mock_releases_server.MockConfig()
+    return sync.fetch_release(config.repo, config.release_id, None, None, api_url)
+
+
+def _add(store, data: bytes, asset):
+    download = store.root / f"{asset['id']}.download"
+    download.parent.mkdir(parents=True, exist_ok=True)
+    download.write_bytes(data)
+    return store.add(download, hashlib.sha256(data).hexdigest(), asset)
+
+
+def test_a_second_sync_links_from_the_store(sync, repo, releases, tmp_path):
+    assets = mock_releases_server.synthetic_assets(3, 8192)
+    api_url, state = releases(assets)
+    firmware_dir = repo / "firmware"
+
+    first = sync.AssetStore(tmp_path / "store")
+    sync.sync_assets(_release(sync, api_url), firmware_dir, None, "*.bin", False, store=first)
+    first.close()
+    downloads = state.downloads
+    for path in firmware_dir.rglob("*.bin"):
+        path.unlink()
+
+    second = sync.AssetStore(tmp_path / "store")
+    paths = sync.sync_assets(_release(sync, api_url), firmware_dir, None, "*.bin", False, store=second)
+
+    assert state.downloads == downloads == 3
+    assert (second.hits, second.added) == (3, 0)
+    for asset, path in zip(assets, sorted(paths, key=lambda item: item.name)):
+        data = path.read_bytes()
+        assert len(data) == asset.size
+        assert second.object_path(hashlib.sha256(data).hexdigest()).exists()
+
+
+def test_the_pipeline_reuses_stored_assets(sync, repo, releases, tmp_path):
+    api_url, state = releases(mock_releases_server.synthetic_assets(2, 8192))
+    gen_args = gen_manifests.parse_args(["--repo-root", str(repo), "--firmware-dir", "firmware"])
+
+    store = sync.AssetStore(tmp_path / "store")
+    assert sync.sync_and_generate(_release(sync, api_url), gen_args, None, "*.bin", store=store) == 0
+    store.close()
+    manifest = read_json(repo / "manifest.json")
+
+    store = sync.AssetStore(tmp_path / "store")
+    assert sync.sync_and_generate(_release(sync, api_url), gen_args, None, "*.bin", store=store) == 0
+
+    assert state.downloads == 2
+    assert store.hits == 2
+    assert read_json(repo / "manifest.json")["builds"] == manifest["builds"]
+
+
+def test_a_listed_digest_must_match_the_download(sync, tmp_path):
+    store = sync.AssetStore(tmp_path / "store")
+    with pytest.raises(SystemExit, match="the release lists"):
+        _add(store, b"payload", {"id": 7, "name": "a.bin", "digest": "sha256:" + "0" * 64})
+
+
+def test_lookup_prefers_the_listed_digest_and_checks_the_size(sync, tmp_path):
+    data = b"payload" * 100
+    store = sync.AssetStore(tmp_path / "store")
+    stored = _add(store, data, {"id": 1, "name": "a.bin"})
+    digest = hashlib.sha256(data).hexdigest()
+
+    assert store.lookup({"id": 99, "digest": f"sha256:{digest.upper()}"}) == stored
+    assert store.lookup({"id": 1, "name": "a.bin"}) == stored
+    assert store.lookup({"id": 1, "name": "a.bin", "size": len(data) + 1}) is None
+    assert store.lookup({"id": 2}) is None
+
+
+@pytest.mark.parametrize("link_mode, shares_inode", [("hardlink", True), ("copy", False)])
+def test_link_modes(sync, tmp_path, link_mode, shares_inode):
+    store = sync.AssetStore(tmp_path / "store", link_mode=link_mode)
+    stored = _add(store, b"payload", {"id": 1})
+    target = tmp_path / "firmware" / "a.bin"
+
+    store.link(stored, target)
+
+    assert target.read_bytes() == b"payload"
+    assert (target.stat().st_ino == stored.stat().st_ino) is shares_inode
+    assert store.links == {link_mode: 1}
+
+
+def test_eviction_drops_least_recently_used_objects(sync, tmp_path):
+    root = tmp_path / "store"
+    store = sync.AssetStore(root)
+    old = _add(store, b"a" * 1000, {"id": 1})
+    new = _add(store, b"b" * 1000, {"id": 2})
+    store.used[old.name] = 1.0
+
+    store.close(max_bytes=1500)
+
+    assert not old.exists() and new.exists()
+    reopened = sync.AssetStore(root)
+    assert reopened.lookup({"id": 2}) == new
+    assert reopened.lookup({"id": 1}) is None
+    assert list(reopened.assets.values()) == [new.name]
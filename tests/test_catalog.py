@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from helpers import firmware_name, run_gen, write_firmware
+
+
+@pytest.fixture
+def catalog(repo, capsys):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.1.0"), b"\x02" * 4096)
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0", "beta"), b"\x03" * 4096)
+    path = repo / "catalog.sqlite"
+    assert run_gen(repo, "--catalog", str(path)) == 0
+    capsys.readouterr()
+    return path
+
+
+def _query(gen, capsys, catalog, *argv):
+    assert gen.main(["query", "--catalog", str(catalog), "--json", *argv]) == 0
+    return [(row["config_string"], row["channel"], row["version"]) for row in json.loads(capsys.readouterr().out)]
+
+
+def test_query_filters(gen, capsys, catalog):
+    assert sorted(_query(gen, capsys, catalog, "--module", "airiq")) == [
+        ("Ceiling-POE-AirIQ", "stable", "1.0.0"),
+        ("Ceiling-POE-AirIQ", "stable", "1.1.0"),
+    ]
+    assert _query(gen, capsys, catalog, "--latest", "--config", "ceiling-poe-airiq") == [
+        ("Ceiling-POE-AirIQ", "stable", "1.1.0")
+    ]
+    assert _query(gen, capsys, catalog, "--channel", "rc") == [("Ceiling-USB", "beta", "1.0.0")]
+    assert _query(gen, capsys, catalog, "--since", "1.0.0") == [("Ceiling-POE-AirIQ", "stable", "1.1.0")]
+
+
+def test_missing_channel_and_assert_config(gen, capsys, catalog):
+    assert gen.main(["query", "--catalog", str(catalog), "--missing-channel", "stable"]) == 0
+    assert capsys.readouterr().out.split() == ["Ceiling-USB"]
+
+    assert gen.main(["query", "--catalog", str(catalog), "--assert-config", "ceiling-usb,Ceiling-POE-AirIQ"]) == 0
+    assert gen.main(["query", "--catalog", str(catalog), "--assert-config", "Ceiling-PWR-AirIQ"]) == 1
+    assert "Missing required configuration(s): Ceiling-PWR-AirIQ" in capsys.readouterr().err
+
+
+def test_catalog_updates_incrementally(gen, capsys, repo, catalog):
+    (repo / "firmware" / "configurations" / firmware_name("Ceiling-USB", "1.0.0", "beta")).unlink()
+    write_firmware(repo, firmware_name("Ceiling-PWR-AirIQ", "2.0.0"), b"\x04" * 4096)
+
+    assert run_gen(repo, "--catalog", str(catalog)) == 0
+
+    assert "1 added, 0 updated, 1 removed" in capsys.readouterr().out
+    assert sorted(_query(gen, capsys, catalog, "--latest")) == [
+        ("Ceiling-POE-AirIQ", "stable", "1.1.0"),
+        ("Ceiling-PWR-AirIQ", "stable", "2.0.0"),
+    ]
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import os
+import shutil
+
+import pytest
+
+from helpers import firmware_name, gen_manifests, mock_releases_server, read_json, run_gen, write_firmware
+
+STAMP = 1_767_225_600
+PUBLISH = ("--hashed-manifests", "--retain-versions", "1", "--latest-feed")
+
+
+def _write(repo, config, version, data):
+    path = write_firmware(repo, firmware_name(config, version), data)
+    os.utime(path, (STAMP, STAMP))
+    return path
+
+
+def _paths(change_set, status):
+    return [entry["path"] for entry in change_set[status]]
+
+
+@pytest.fixture
+def cache(tmp_path_factory):
+    return tmp_path_factory.mktemp("ci-cache")
+
+
+def _run(repo, cache, *argv):
+    assert run_gen(
+        repo,
+        *PUBLISH,
+        "--change-set", str(cache / "change-set.json"),
+        "--change-set-baseline", str(cache / "baseline.json"),
+        *argv,
+    ) == 0
+    return read_json(cache / "change-set.json")
+
+
+def test_without_a_baseline_only_the_runs_own_changes_are_listed(repo, cache):
+    binary = _write(repo, "Ceiling-USB", "1.0.0", b"\x01" * 4096)
+    change_set = cache / "change-set.json"
+    assert run_gen(repo, "--change-set", str(change_set)) == 0
+    assert _paths(read_json(change_set), "added") == ["firmware-0.json", "manifest.json"]
+
+    assert run_gen(repo, "--change-set", str(change_set)) == 0
+    assert read_json(change_set) == {"version": 1, "added": [], "changed": [], "removed": [], "moved": []}
+
+    binary.write_bytes(b"\x02" * 4096)
+    assert run_gen(repo, "--change-set", str(change_set)) == 0
+    # The binary changed before the run; only the manifests describing it changed during it.
+    assert _paths(read_json(change_set), "changed") == ["firmware-0.json", "manifest.json"]
+
+
+def test_a_fresh_checkout_matching_the_last_deploy_has_no_changes(repo, cache):
+    _write(repo, "Ceiling-USB", "1.0.0", b"\x01" * 4096)
+    _write(repo, "Ceiling-USB", "1.1.0", b"\x02" * 4096)
+
+    first = _run(repo, cache)
+    assert first["changed"] == first["removed"] == first["moved"] == []
+    assert "manifest-pointer.json" in _paths(first, "added")
+
+    # A CI checkout has none of the deployed outputs that are not committed.
+    shutil.rmtree(repo / "manifests")
+    shutil.rmtree(repo / "firmware" / "history")
+    for name in ("manifest-pointer.json", "latest.json"):
+        (repo / name).unlink()
+
+    assert _run(repo, cache) == {"version": 1, "added": [], "changed": [], "removed": [], "moved": []}
+
+
+def test_changes_are_measured_against_the_stored_inventory(repo, cache):
+    _write(repo, "Ceiling-USB", "1.0.0", b"\x01" * 4096)
+    dropped = _write(repo, "Wall-USB", "1.0.0", b"\x02" * 4096)
+    _run(repo, cache)
+    baseline = read_json(cache / "baseline.json")["entries"]
+
+    dropped.unlink()
+    _write(repo, "Ceiling-USB", "1.1.0", b"\x03" * 4096)
+    change_set = _run(repo, cache)
+
+    assert "firmware/configurations/" + firmware_name("Ceiling-USB", "1.1.0") in _paths(change_set, "added")
+    assert "firmware/configurations/" + dropped.name in _paths(change_set, "removed")
+    assert "manifest.json" in _paths(change_set, "changed")
+    for entry in change_set["changed"]:
+        assert entry["sha256"] != baseline[entry["path"]]["sha256"]
+    assert read_json(cache / "baseline.json")["entries"].keys() == {
+        *baseline.keys() - set(_paths(change_set, "removed")),
+        *_paths(change_set, "added"),
+    }
+
+
+def test_a_path_with_the_same_digest_is_a_move(gen, repo):
+    binary = _write(repo, "Ceiling-USB", "1.0.0", b"\x01" * 4096)
+    key = "firmware/configurations/" + binary.name
+    after = {key: (4096, 0, 0, 0)}
+    digest_cache = gen.DigestCache(None)
+    sha256 = gen._content_sha256(binary, digest_cache)
+
+    change_set, inventory = gen.build_baseline_change_set(
+        {"firmware/old.bin": {"size": 4096, "sha256": sha256}}, after, repo, digest_cache
+    )
+
+    assert change_set["moved"] == [{"from": "firmware/old.bin", "path": key, "size": 4096, "sha256": sha256}]
+    assert change_set["added"] == change_set["removed"] == []
+    assert inventory == {key: {"size": 4096, "sha256": sha256}}
+
+
+def test_release_syncs_write_the_change_set(sync, repo, releases, cache):
+    api_url, _ = releases(mock_releases_server.synthetic_assets(2, 8192))
+    config = mock_releases_server.MockConfig()
+    release = sync.fetch_release(config.repo, config.release_id, None, None, api_url)
+    gen_args = gen_manifests.parse_args(
+        ["--repo-root", str(repo), "--firmware-dir", "firmware", "--change-set", str(cache / "change-set.json")]
+    )
+
+    assert sync.sync_and_generate(release, gen_args, None, "*.bin") == 0
+
+    added = _paths(read_json(cache / "change-set.json"), "added")
+    binaries = [path for path in added if path.endswith(".bin")]
+    assert len(binaries) == 2
+    assert "manifest.json" in added
+
+
+def test_a_baseline_needs_a_change_set(repo):
+    with pytest.raises(SystemExit):
+        run_gen(repo, "--change-set-baseline", "baseline.json")
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import hashlib
+import os
+
+import pytest
+
+from helpers import firmware_name, merged_image, random_firmware, read_json, run_gen, write_firmware
+
+CHUNK = 4096
+
+
+def _leaves(data: bytes, size: int = CHUNK):
+    return [hashlib.sha256(data[start : start + size]).digest() for start in range(0, len(data), size)]
+
+
+def _check_table(repo, part, data):
+    reference = part["chunks"]
+    table = read_json(repo / reference["path"])
+    leaves = _leaves(data)
+    assert table["sha256"] == [leaf.hex() for leaf in leaves]
+    assert table["root"] == reference["root"]
+    assert (reference["size"], reference["count"]) == (CHUNK, len(leaves))
+    assert reference["path"] == f"firmware/chunks/{part['sha256']}-{CHUNK}.json"
+
+
+def test_merkle_root_pairs_leaves_and_carries_the_odd_one_up(gen):
+    a, b, c = (hashlib.sha256(bytes([value])).digest() for value in range(3))
+    ab = hashlib.sha256(b"\x01" + a + b).digest()
+    assert gen.merkle_root([a]) == a
+    assert gen.merkle_root([a, b, c]) == hashlib.sha256(b"\x01" + ab + c).digest()
+    assert gen.merkle_root([]) == hashlib.sha256(b"").digest()
+
+
+@pytest.mark.parametrize("step", [1, 1000, CHUNK, 3 * CHUNK + 5])
+def test_chunk_table_does_not_depend_on_how_data_is_fed(gen, step):
+    data = os.urandom(3 * CHUNK + 100)
+    accumulator = gen.DigestAccumulator(CHUNK)
+    for start in range(0, len(data), step):
+        accumulator.update(data[start : start + step])
+    table = accumulator.chunk_table()
+    assert table["sha256"] == [leaf.hex() for leaf in _leaves(data)]
+    assert table["root"] == gen.merkle_root(_leaves(data)).hex()
+
+
+def test_single_part_builds_reference_their_table(repo):
+    data = random_firmware(2 * CHUNK + 7)
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), data)
+
+    assert run_gen(repo, "--chunk-digests", "--chunk-size", str(CHUNK)) == 0
+
+    build = read_json(repo / "manifest.json")["builds"][0]
+    _check_table(repo, build["parts"][0], data)
+    assert read_json(repo / "firmware-0.json")["builds"][0]["parts"] == build["parts"]
+
+
+def test_split_parts_get_their_own_tables(repo):
+    image = merged_image(os.urandom(3 * CHUNK), app_version="1.0.0")
+    merged_sha = hashlib.sha256(image).hexdigest()
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), image)
+    stale = repo / "firmware" / "chunks" / f"{'0' * 64}-{CHUNK}.json"
+    stale.parent.mkdir(parents=True)
+    stale.write_text("{}\n", encoding="utf-8")
+
+    assert run_gen(repo, "--split-parts", "--chunk-digests", "--chunk-size", str(CHUNK)) == 0
+
+    parts = read_json(repo / "manifest.json")["builds"][0]["parts"]
+    assert len(parts) == 4
+    for part in parts:
+        _check_table(repo, part, (repo / part["path"]).read_bytes())
+    tables = sorted(path.name for path in (repo / "firmware" / "chunks").iterdir())
+    assert tables == sorted(f"{part['sha256']}-{CHUNK}.json" for part in parts)
+    assert not any(name.startswith(merged_sha) for name in tables)
+
+
+def test_split_parts_combine_chunks_and_compression(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), merged_image(b"\x00" * (2 * CHUNK)))
+
+    assert run_gen(repo, "--split-parts", "--chunk-digests", "--chunk-size", str(CHUNK), "--compress-parts") == 0
+
+    for part in read_json(repo / "manifest.json")["builds"][0]["parts"]:
+        assert set(part) >= {"chunks", "compressed"}
+        _check_table(repo, part, (repo / part["path"]).read_bytes())
+
+
+def test_chunk_size_must_align_with_flash_sectors(repo):
+    with pytest.raises(SystemExit):
+        run_gen(repo, "--chunk-digests", "--chunk-size", "5000")
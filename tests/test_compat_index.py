@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from helpers import firmware_name, read_json, run_gen, write_firmware
+
+
+def test_index_carries_the_header_and_per_config_shards(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.1.0", "beta"), b"\x02" * 4096)
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), b"\x03" * 4096)
+
+    assert run_gen(repo, "--compat-index") == 0
+
+    manifest = read_json(repo / "manifest.json")
+    index = read_json(repo / "compat-index.json")
+    assert manifest["compat_index"] == "compat-index.json"
+    assert index["manifest"] == {
+        key: value for key, value in manifest.items() if key not in ("builds", "compat_index")
+    }
+    assert index["legacy_builds"] == 0
+    assert index["shards"] == {
+        "ceiling-poe-airiq": "firmware/builds/ceiling-poe-airiq.json",
+        "ceiling-usb": "firmware/builds/ceiling-usb.json",
+    }
+    for key, path in index["shards"].items():
+        shard = read_json(repo / path)
+        assert shard["config"] == key
+        for entry in shard["builds"]:
+            assert {**manifest["builds"][entry["build"]], "build": entry["build"]} == entry
+        for channel in index["configs"][key].values():
+            assert channel["build"] in {entry["build"] for entry in shard["builds"]}
+    assert len(read_json(repo / index["shards"]["ceiling-poe-airiq"])["builds"]) == 2
+
+
+def test_stale_shards_are_pruned(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    removed = write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), b"\x03" * 4096)
+    assert run_gen(repo, "--compat-index") == 0
+
+    removed.unlink()
+    assert run_gen(repo, "--compat-index") == 0
+
+    shard_dir = repo / "firmware" / "builds"
+    assert sorted(path.name for path in shard_dir.iterdir()) == ["ceiling-poe-airiq.json"]
+    assert list(read_json(repo / "compat-index.json")["shards"]) == ["ceiling-poe-airiq"]
+
+
+def test_legacy_builds_are_counted_but_not_sharded(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    write_firmware(repo, firmware_name("MS-S3", "1.0.0"), b"\x04" * 4096, subdir="legacy")
+
+    assert run_gen(repo, "--compat-index") == 0
+
+    index = read_json(repo / "compat-index.json")
+    assert index["legacy_builds"] == 1
+    assert list(index["shards"]) == ["ceiling-poe-airiq"]
+
+
+def test_shards_are_published_with_the_hashed_manifests(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+
+    assert run_gen(repo, "--compat-index", "--hashed-manifests") == 0
+
+    pointer = read_json(repo / "manifest-pointer.json")
+    files = read_json(repo / pointer["digests"])["files"]
+    assert "compat-index.json" in files
+    assert "firmware/builds/ceiling-poe-airiq.json" in files
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import hashlib
+import zlib
+
+from helpers import firmware_name, random_firmware, read_json, run_gen, write_firmware
+
+
+def test_compressible_parts_get_a_deflate_copy(repo):
+    data = b"\x00\x01" * 32768
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), data)
+
+    assert run_gen(repo, "--compress-parts") == 0
+
+    part = read_json(repo / "manifest.json")["builds"][0]["parts"][0]
+    compressed = part["compressed"]
+    blob = (repo / compressed["path"]).read_bytes()
+    assert compressed["encoding"] == "deflate"
+    assert (len(blob), hashlib.sha256(blob).hexdigest()) == (compressed["size"], compressed["sha256"])
+    assert zlib.decompress(blob) == data
+    install = read_json(repo / "firmware-0.json")
+    assert install["builds"][0]["parts"][0]["compressed"] == compressed
+
+
+def test_incompressible_parts_are_left_alone(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), random_firmware(16384))
+
+    assert run_gen(repo, "--compress-parts") == 0
+
+    assert "compressed" not in read_json(repo / "manifest.json")["builds"][0]["parts"][0]
+
+
+def test_identical_binaries_share_one_compressed_file(gen, repo):
+    data = b"\x07" * 65536
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), data)
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0", "beta"), data)
+
+    assert run_gen(repo, "--compress-parts") == 0
+
+    paths = {
+        build["parts"][0]["compressed"]["path"] for build in read_json(repo / "manifest.json")["builds"]
+    }
+    assert len(paths) == 1
+    assert len(list((repo / "firmware" / "compressed").glob(f"*{gen.COMPRESSED_SUFFIX}"))) == 1
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import json
+import os
+
+from helpers import firmware_name, read_json, run_gen, write_firmware
+
+
+def test_digest_cache_reuses_records_across_runs(gen, repo):
+    path = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    cache_path = repo / ".cache" / gen.DIGEST_CACHE_FILENAME
+
+    cold = gen.DigestCache(cache_path)
+    record = cold.record(path)
+    cold.save()
+    assert (cold.hits, cold.misses) == (0, 1)
+
+    warm = gen.DigestCache(cache_path)
+    assert warm.record(path)["sha256"] == record["sha256"]
+    assert (warm.hits, warm.misses) == (1, 0)
+
+
+def test_digest_cache_misses_when_file_changes(gen, repo):
+    path = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    cache = gen.DigestCache(repo / ".cache" / gen.DIGEST_CACHE_FILENAME)
+    first = cache.record(path)
+    path.write_bytes(b"\x02" * 4097)
+    second = cache.record(path)
+    assert second["sha256"] != first["sha256"]
+    assert cache.misses == 2
+
+
+def test_hardlinked_binaries_are_hashed_once(gen, repo):
+    first = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x03" * 4096)
+    second = first.with_name(firmware_name("Ceiling-POE-AirIQ", "1.0.0", "beta"))
+    os.link(first, second)
+    cache = gen.DigestCache()
+    assert cache.record(first) is cache.record(second)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_canonical_dedupe_points_duplicates_at_one_binary(repo):
+    data = b"\x04" * 4096
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), data)
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0", "beta"), data)
+
+    assert run_gen(repo, "--dedupe", "canonical") == 0
+
+    builds = read_json(repo / "manifest.json")["builds"]
+    paths = {part["path"] for build in builds for part in build["parts"]}
+    assert paths == {"firmware/configurations/" + firmware_name("Ceiling-POE-AirIQ", "1.0.0")}
+    assert len(builds) == 2
+
+
+def test_canonical_dedupe_removes_duplicates_from_the_published_tree(gen, repo, capsys):
+    data = b"\x04" * 4096
+    stable = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), data)
+    beta = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0", "beta"), data)
+    (repo / "firmware" / "rescue").mkdir()
+    (repo / "firmware" / "rescue" / "manifest.json").write_text('{"name": "Rescue", "builds": []}\n', encoding="utf-8")
+
+    assert run_gen(repo, "--dedupe", "canonical", "--dry-run") == 0
+    assert beta.exists()
+    assert run_gen(repo, "--dedupe", "canonical") == 0
+
+    assert stable.exists() and not beta.exists()
+    capsys.readouterr()
+    assert gen.main(["verify", "--repo-root", str(repo), "--strict", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out)["orphaned"] == []
+
+
+def test_hardlink_dedupe_collapses_identical_files(repo):
+    data = b"\x05" * 4096
+    stable = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), data)
+    beta = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0", "beta"), data)
+
+    assert run_gen(repo, "--dedupe", "hardlink") == 0
+
+    assert os.path.samefile(stable, beta)
+    assert stable.read_bytes() == data
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import hashlib
+
+from helpers import firmware_name, random_firmware, read_json, run_gen, write_firmware
+
+
+def test_delta_round_trip(gen):
+    source = bytes(range(256)) * 64
+    target = source[:4000] + b"patched" + source[4000:] + b"tail"
+    delta = gen.compute_delta(source, target)
+    assert delta.startswith(gen.DELTA_MAGIC)
+    assert len(delta) < len(target) // 4
+    assert gen.apply_delta(source, delta) == target
+
+
+def test_deltas_link_consecutive_versions(repo):
+    base = random_firmware(64 * 1024)
+    for index, version in enumerate(("1.0.0", "1.1.0", "1.2.0")):
+        data = base[: 1024 * (index + 1)] + bytes([index]) * 512 + base[1024 * (index + 1) :]
+        write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", version), data)
+
+    assert run_gen(repo, "--deltas") == 0
+
+    builds = {build["version"]: build for build in read_json(repo / "manifest.json")["builds"]}
+    assert "deltas" not in builds["1.0.0"]
+    assert [delta["from_version"] for delta in builds["1.1.0"]["deltas"]] == ["1.0.0"]
+    assert [delta["from_version"] for delta in builds["1.2.0"]["deltas"]] == ["1.1.0"]
+    delta = builds["1.2.0"]["deltas"][0]
+    assert delta["from_sha256"] == builds["1.1.0"]["sha256"]
+    blob = (repo / delta["path"]).read_bytes()
+    assert (len(blob), hashlib.sha256(blob).hexdigest()) == (delta["size"], delta["sha256"])
+
+
+def test_deltas_that_save_too_little_are_skipped(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), random_firmware(8192))
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.1.0"), random_firmware(8192))
+
+    assert run_gen(repo, "--deltas") == 0
+
+    assert all("deltas" not in build for build in read_json(repo / "manifest.json")["builds"])
+    assert not list((repo / "firmware" / "deltas").glob("*"))
+
+
+def test_stale_deltas_are_pruned(gen, repo):
+    base = random_firmware(32 * 1024)
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), base)
+    newer = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.1.0"), base + b"more")
+    assert run_gen(repo, "--deltas") == 0
+    delta_dir = repo / "firmware" / "deltas"
+    assert len(list(delta_dir.glob(f"*{gen.DELTA_SUFFIX}"))) == 1
+
+    newer.unlink()
+    assert run_gen(repo, "--deltas") == 0
+    assert not list(delta_dir.glob(f"*{gen.DELTA_SUFFIX}"))
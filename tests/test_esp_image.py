@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+
+import pytest
+
+from helpers import esp_image, firmware_name, merged_image, read_json, run_gen, write_firmware
+
+IMAGES = {
+    "app": esp_image(os.urandom(5000), app_version="1.0.0"),
+    "no-digest": esp_image(os.urandom(3000), hash_appended=False),
+    "merged": merged_image(os.urandom(9000), app_version="1.0.0"),
+    "trailing-data": esp_image(os.urandom(2000)) + b"\0" * 64,
+    "not-an-image": b"Sense360 placeholder\n" * 8,
+}
+
+
+def _corrupt(data: bytes, offset: int) -> bytes:
+    flipped = bytearray(data)
+    flipped[offset] ^= 0xFF
+    return bytes(flipped)
+
+
+BROKEN = {
+    "checksum": _corrupt(IMAGES["app"], 200),
+    "appended-digest": _corrupt(IMAGES["app"], len(IMAGES["app"]) - 1),
+    "truncated": IMAGES["app"][:1000],
+    "merged-app": _corrupt(IMAGES["merged"], 0x10000 + 500),
+}
+
+
+def _streamed(gen, data: bytes, step: int):
+    accumulator = gen.DigestAccumulator(inspect_image=True)
+    for start in range(0, len(data), step):
+        accumulator.update(data[start : start + step])
+    assert accumulator.result()[1] == hashlib.sha256(data).hexdigest()
+    return accumulator.image()
+
+
+APP_DESCRIPTOR = {
+    "version": "1.0.0",
+    "project_name": "sense360",
+    "compile_time": "12:00:00",
+    "compile_date": "Jan  1 2026",
+    "idf_version": "v5.1",
+    "elf_sha256": "00" * 32,
+}
+
+
+def _expected(name):
+    data = IMAGES[name]
+    header = {"offset": 0, "chip_id": 9, "chip_family": "ESP32-S3", "entry_point": 0x40080000, "segment_count": 1}
+    if name == "app":
+        return {**header, "end": len(data), "appended_sha256": data[-32:].hex(), "app": APP_DESCRIPTOR, "whole_file": True}
+    if name == "no-digest":
+        return {**header, "end": len(data), "appended_sha256": None, "app": None, "whole_file": True}
+    if name == "merged":
+        bootloader = esp_image(b"BOOT" * 64, chip_id=0)
+        return {
+            **header,
+            "offset": 0x1000,
+            "chip_id": 0,
+            "chip_family": "ESP32",
+            "end": 0x1000 + len(bootloader),
+            "appended_sha256": bootloader[-32:].hex(),
+            "app": APP_DESCRIPTOR,
+            "whole_file": False,
+        }
+    if name == "trailing-data":
+        return {**header, "end": len(data) - 64, "appended_sha256": data[-96:-64].hex(), "app": None, "whole_file": False}
+    return None
+
+
+@pytest.mark.parametrize("name", sorted(IMAGES))
+@pytest.mark.parametrize("step", [1, 7, 4096, 1 << 20])
+def test_streamed_inspection_reports_the_image_layout(gen, name, step):
+    assert _streamed(gen, IMAGES[name], step) == _expected(name)
+
+
+@pytest.mark.parametrize("name", sorted(IMAGES))
+def test_header_inspection_reports_the_same_layout(gen, tmp_path, name):
+    path = tmp_path / "image.bin"
+    path.write_bytes(IMAGES[name])
+    assert gen.inspect_firmware_image(path) == _expected(name)
+
+
+@pytest.mark.parametrize(
+    "name, message",
+    [
+        ("checksum", "segment checksum mismatch"),
+        ("appended-digest", "appended SHA-256 does not match the image"),
+        ("truncated", "segment at 0x20 runs past the end of the file"),
+        ("merged-app", "segment checksum mismatch"),
+    ],
+)
+@pytest.mark.parametrize("step", [1, 4096])
+def test_streamed_inspection_rejects_corrupt_images(gen, name, message, step):
+    with pytest.raises(gen.EspImageError, match=re.escape(message)):
+        _streamed(gen, BROKEN[name], step)
+
+
+def test_header_inspection_only_rejects_structural_damage(gen, tmp_path):
+    path = tmp_path / "image.bin"
+    path.write_bytes(BROKEN["checksum"])
+    assert gen.inspect_firmware_image(path)["end"] == len(BROKEN["checksum"])
+    path.write_bytes(BROKEN["truncated"])
+    with pytest.raises(gen.EspImageError, match="runs past the end of the file"):
+        gen.inspect_firmware_image(path)
+
+
+def test_a_miss_reads_the_binary_once(gen, repo, monkeypatch):
+    path = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), IMAGES["merged"])
+    monkeypatch.setattr(gen, "inspect_firmware_image", pytest.fail)
+    record = gen.compute_digest_record(path)
+    assert record["sha256"] == hashlib.sha256(IMAGES["merged"]).hexdigest()
+    assert record["image"]["app"]["version"] == "1.0.0"
+
+
+def test_chip_family_comes_from_the_image_header(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), esp_image(os.urandom(4096), chip_id=5))
+    assert run_gen(repo) == 0
+    assert read_json(repo / "manifest.json")["builds"][0]["chipFamily"] == "ESP32-C3"
+
+
+def test_corrupt_images_fail_the_run(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), BROKEN["checksum"])
+    with pytest.raises(SystemExit, match="segment checksum mismatch"):
+        run_gen(repo)
+
+
+def test_trusted_embedded_digest_skips_rehashing_after_a_touch(gen, repo, monkeypatch):
+    path = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), IMAGES["app"])
+    cache_path = repo / ".cache" / gen.DIGEST_CACHE_FILENAME
+    cold = gen.DigestCache(cache_path, trust_embedded_digest=True)
+    cold.record(path)
+    cold.save()
+    assert cold.misses == 1
+
+    os.utime(path, ns=(0, 0))
+    monkeypatch.setattr(gen, "compute_digest_record", pytest.fail)
+    warm = gen.DigestCache(cache_path, trust_embedded_digest=True)
+    assert warm.record(path)["sha256"] == hashlib.sha256(IMAGES["app"]).hexdigest()
+    assert (warm.hits, warm.misses) == (1, 0)
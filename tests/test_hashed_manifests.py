@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+from helpers import firmware_name, read_json, run_gen, write_firmware
+
+
+def _publish(repo):
+    assert run_gen(repo, "--hashed-manifests") == 0
+    pointer = read_json(repo / "manifest-pointer.json")
+    return pointer, read_json(repo / pointer["digests"])["files"]
+
+
+def test_pointer_names_content_hashed_copies(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+
+    pointer, files = _publish(repo)
+
+    assert pointer["manifest"] == files["manifest.json"]["path"]
+    assert (repo / pointer["manifest"]).read_bytes() == (repo / "manifest.json").read_bytes()
+    assert set(files) == {"manifest.json", "firmware-0.json"}
+    for info in files.values():
+        data = (repo / info["path"]).read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        assert info["path"].startswith("manifests/")
+        assert digest[:16] in info["path"]
+        assert (info["size"], info["etag"]) == (len(data), f'"{digest}"')
+
+
+def test_hashed_install_manifests_point_at_the_binaries(repo):
+    binary = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+
+    _, files = _publish(repo)
+
+    hashed = repo / files["firmware-0.json"]["path"]
+    part = read_json(hashed)["builds"][0]["parts"][0]
+    assert (hashed.parent / part["path"]).resolve() == binary.resolve()
+
+
+def test_rebase_part_paths_covers_linked_files(gen, tmp_path):
+    manifest = {
+        "builds": [
+            {
+                "parts": [
+                    {
+                        "path": "firmware/app.bin",
+                        "compressed": {"path": "firmware/compressed/app.bin.deflate"},
+                        "chunks": {"path": "firmware/chunks/app.json"},
+                    }
+                ]
+            }
+        ]
+    }
+
+    part = gen.rebase_part_paths(manifest, tmp_path, tmp_path / "manifests")["builds"][0]["parts"][0]
+
+    assert part["path"] == "../firmware/app.bin"
+    assert part["compressed"]["path"] == "../firmware/compressed/app.bin.deflate"
+    assert part["chunks"]["path"] == "../firmware/chunks/app.json"
+
+
+def test_previous_publish_is_kept_for_one_generation(repo):
+    binary = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    first, _ = _publish(repo)
+    binary.write_bytes(b"\x02" * 4096)
+    second, _ = _publish(repo)
+    binary.write_bytes(b"\x03" * 4096)
+    third, _ = _publish(repo)
+
+    assert not (repo / first["manifest"]).exists()
+    assert not (repo / first["digests"]).exists()
+    for pointer in (second, third):
+        assert (repo / pointer["manifest"]).exists()
+        assert (repo / pointer["digests"]).exists()
+    assert {path.name for path in Path(repo / "manifests").glob("manifest.*.json")} == {
+        Path(second["manifest"]).name,
+        Path(third["manifest"]).name,
+    }
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+from helpers import firmware_name, merged_image, run_gen, write_firmware
+
+DOCUMENTS = {
+    "nested": {"builds": [{"parts": [{"offset": 65536, "md5": "ab"}], "improv": True}], "empty": {}, "none": None},
+    "empty-containers": {"list": [], "dict": {}, "nested": [[], {}]},
+    "large-integers": {"size": 2**53 + 1, "negative": -(2**40)},
+    "escapes": {"path": 'firmware/"quoted"\\name\t.bin', "control": "\x01\x1f"},
+    "non-ascii": {"description": "Détecteur de CO\u2082"},
+}
+
+
+def _outputs(root):
+    return {
+        path.relative_to(root).as_posix(): path.read_bytes()
+        for path in sorted(root.rglob("*.json"))
+        if ".cache" not in path.parts
+    }
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("name", sorted(DOCUMENTS))
+def test_stdlib_rendering_matches_json_dumps(gen, name, compact):
+    options = {"separators": (",", ":")} if compact else {"indent": 2}
+    expected = (json.dumps(DOCUMENTS[name], **options) + "\n").encode()
+    assert gen.render_json(DOCUMENTS[name], compact=compact, encoder="stdlib") == expected
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("name", sorted(DOCUMENTS))
+def test_orjson_rendering_is_byte_identical(gen, name, compact):
+    pytest.importorskip("orjson")
+    stdlib = gen.render_json(DOCUMENTS[name], compact=compact, encoder="stdlib")
+    assert gen.render_json(DOCUMENTS[name], compact=compact, encoder="orjson") == stdlib
+
+
+def test_generated_outputs_do_not_depend_on_the_encoder(gen, tmp_path, monkeypatch):
+    pytest.importorskip("orjson")
+    merged, plain = merged_image(os.urandom(5000)), os.urandom(4096)
+    trees = {}
+    for encoder in gen.JSON_ENCODERS:
+        root = tmp_path / encoder
+        for path in (
+            write_firmware(root, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), merged),
+            write_firmware(root, firmware_name("Ceiling-USB", "1.1.0", "beta"), plain),
+        ):
+            os.utime(path, (1_767_225_600, 1_767_225_600))
+        monkeypatch.setattr(gen, "DEFAULT_JSON_ENCODER", encoder)
+        assert run_gen(root, "--split-parts", "--compat-index", "--latest-feed", "--hashed-manifests") == 0
+        trees[encoder] = _outputs(root)
+    assert trees["orjson"] == trees["stdlib"]
+
+
+def test_unchanged_outputs_are_not_rewritten(gen, tmp_path):
+    path = tmp_path / "manifest.json"
+    assert gen.write_json_file(path, DOCUMENTS["nested"], dry_run=False) is True
+    os.utime(path, ns=(0, 0))
+
+    assert gen.write_json_file(path, DOCUMENTS["nested"], dry_run=False) is False
+    assert path.stat().st_mtime_ns == 0
+    assert gen.write_json_file(path, DOCUMENTS["empty-containers"], dry_run=False) is True
+    assert json.loads(path.read_text()) == DOCUMENTS["empty-containers"]
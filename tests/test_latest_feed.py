@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import hashlib
+import os
+
+from helpers import firmware_name, read_json, run_gen, write_firmware
+
+
+def test_feed_lists_the_newest_build_per_channel(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    newest = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.1.0"), b"\x02" * 4096)
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.2.0-beta", "beta"), b"\x03" * 4096)
+
+    assert run_gen(repo, "--latest-feed") == 0
+
+    feed = read_json(repo / "latest.json")
+    channels = feed["builds"]["Ceiling-POE-AirIQ"]
+    assert list(channels) == ["stable", "beta"]
+    assert channels["stable"] == {
+        "version": "1.1.0",
+        "sha256": hashlib.sha256(newest.read_bytes()).hexdigest(),
+        "size": 4096,
+        "path": "firmware/configurations/" + newest.name,
+    }
+    assert channels["beta"]["version"] == "1.2.0-beta"
+
+
+def test_feed_only_changes_when_a_newer_build_ships(repo):
+    current = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.1.0"), b"\x02" * 4096)
+    assert run_gen(repo, "--latest-feed") == 0
+    before = (repo / "latest.json").read_bytes()
+    assert b"\n " not in before.strip()
+
+    os.utime(current, (1_000_000, 1_000_000))
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    assert run_gen(repo, "--latest-feed") == 0
+    assert (repo / "latest.json").read_bytes() == before
+
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.2.0"), b"\x03" * 4096)
+    assert run_gen(repo, "--latest-feed") == 0
+    assert read_json(repo / "latest.json")["builds"]["Ceiling-POE-AirIQ"]["stable"]["version"] == "1.2.0"
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from helpers import firmware_name, manifest_daemon, read_json, write_firmware
+
+
+def _daemon(repo, *argv):
+    return manifest_daemon.ManifestDaemon(
+        manifest_daemon.gen_manifests.parse_args(["--repo-root", str(repo), *argv])
+    )
+
+
+@pytest.fixture
+def populated(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.1.0"), b"\x02" * 4096)
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0", "beta"), b"\x03" * 4096)
+    return repo
+
+
+def test_regenerate_only_rehashes_what_changed(populated):
+    daemon = _daemon(populated)
+
+    first = daemon.handle({"command": "regenerate"})
+    assert (first["ok"], first["changed"], first["builds"], first["hashed"]) == (True, True, 3, 3)
+    assert len(read_json(populated / "manifest.json")["builds"]) == 3
+
+    assert daemon.handle({"command": "regenerate"})["changed"] is False
+
+    binary = populated / "firmware" / "configurations" / firmware_name("Ceiling-USB", "1.0.0", "beta")
+    binary.write_bytes(b"\x04" * 8192)
+    touched = daemon.handle({"command": "regenerate"})
+    assert (touched["changed"], touched["hashed"]) == (True, 1)
+    sizes = {build["config_string"]: build["file_size"] for build in read_json(populated / "manifest.json")["builds"]}
+    assert sizes["Ceiling-USB"] == 8192
+
+    forced = daemon.handle({"command": "regenerate", "force": True})
+    assert (forced["changed"], forced["hashed"]) == (True, 0)
+
+
+def test_a_deleted_manifest_is_regenerated(populated):
+    daemon = _daemon(populated)
+    daemon.handle({"command": "regenerate"})
+    (populated / "manifest.json").unlink()
+
+    assert daemon.handle({"command": "regenerate"})["changed"] is True
+    assert (populated / "manifest.json").exists()
+
+
+def test_query_answers_from_the_last_regeneration(populated):
+    daemon = _daemon(populated)
+    daemon.handle({"command": "regenerate"})
+
+    everything = daemon.handle({"command": "query", "config": "Ceiling-POE-AirIQ"})
+    assert sorted(build["version"] for build in everything["builds"]) == ["1.0.0", "1.1.0"]
+    latest = daemon.handle({"command": "query", "config": "Ceiling-POE-AirIQ", "latest": True})
+    assert [(build["version"], build["latest"]) for build in latest["builds"]] == [("1.1.0", True)]
+    assert daemon.handle({"command": "query", "missing_channel": "beta"})["configs"] == ["Ceiling-POE-AirIQ"]
+
+    missing = daemon.handle({"command": "query", "assert_configs": ["Ceiling-USB,Wall-USB"]})
+    assert (missing["ok"], missing["missing"]) == (False, ["Wall-USB"])
+
+
+def test_validate_reports_findings_without_writing(populated):
+    daemon = _daemon(populated, "--strict-validate")
+
+    response = daemon.handle({"command": "validate"})
+
+    assert response["ok"] is False
+    assert response["builds"] == 3
+    assert any("plausible-firmware threshold" in finding for finding in response["findings"])
+    assert not (populated / "manifest.json").exists()
+
+
+def test_stats_count_requests_and_errors(populated):
+    daemon = _daemon(populated)
+    daemon.handle({"command": "regenerate"})
+    daemon.handle({"command": "regenerate"})
+    assert daemon.handle({"command": "reticulate"})["ok"] is False
+
+    stats = daemon.handle({"command": "stats"})
+
+    assert stats["builds"] == 3
+    assert stats["digest_cache"]["misses"] == 3
+    assert {name: (values["count"], values["errors"]) for name, values in stats["commands"].items()} == {
+        "invalid": (1, 1),
+        "regenerate": (2, 0),
+    }
+    regenerate = stats["commands"]["regenerate"]
+    assert regenerate["p50_ms"] <= regenerate["p95_ms"] <= regenerate["max_ms"]
+
+
+def test_serve_answers_over_the_socket_and_cleans_up(populated, tmp_path, capsys):
+    socket_path = tmp_path / "daemon.sock"
+    gen_args = manifest_daemon.gen_manifests.parse_args(["--repo-root", str(populated)])
+    server = threading.Thread(target=manifest_daemon.serve, args=(socket_path, gen_args))
+    server.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not socket_path.exists():
+            assert time.monotonic() < deadline, "daemon did not start"
+            time.sleep(0.01)
+
+        assert manifest_daemon.send(socket_path, {"command": "regenerate"})["changed"] is False
+        capsys.readouterr()
+        assert manifest_daemon.main(["send", "--socket", str(socket_path), "query", "--config", "Ceiling-USB"]) == 0
+        assert "Ceiling-USB" in capsys.readouterr().out
+        assert manifest_daemon.send(socket_path, {"command": "shutdown"})["ok"] is True
+    finally:
+        server.join(timeout=10)
+    assert not server.is_alive()
+    assert not socket_path.exists()
+    with pytest.raises(SystemExit, match="No daemon"):
+        manifest_daemon.send(socket_path, {"command": "stats"})
+
+
+def test_an_existing_non_socket_file_is_not_replaced(tmp_path):
+    path = tmp_path / "daemon.sock"
+    path.write_text("not a socket", encoding="utf-8")
+
+    with pytest.raises(SystemExit, match="not a socket"):
+        manifest_daemon._claim_socket(path)
+    assert path.read_text(encoding="utf-8") == "not a socket"
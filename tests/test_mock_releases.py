@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+from helpers import SCRIPTS_DIR, mock_releases_server
+
+
+def test_fetch_release_pages_through_every_asset(sync, releases):
+    assets = mock_releases_server.synthetic_assets(250, 1024)
+    api_url, state = releases(assets)
+    config = mock_releases_server.MockConfig()
+
+    release = sync.fetch_release(config.repo, None, config.tag, None, api_url)
+
+    assert [asset["name"] for asset in release["assets"]] == [asset.name for asset in assets]
+    # The release itself, then three pages of 100.
+    assert state.snapshot()["api_requests"] == 4
+
+
+def _load_test(*argv):
+    return subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / "sync-load-test.py"), "--assets", "6", "--asset-size", "4096", *argv],
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_load_test_exits_zero_only_when_the_sync_succeeds():
+    assert _load_test().returncode == 0
+
+    failed = _load_test("--fail-asset", "Sense360-Ceiling-USB-v9.0.0-stable.bin")
+    assert failed.returncode == 1
+    assert "sync_assets: failed" in failed.stdout
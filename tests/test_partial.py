@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from helpers import firmware_name, run_gen, write_firmware
+
+STAMP = 1_767_225_600
+
+
+def _write(repo, config, version, data, channel="stable"):
+    path = write_firmware(repo, firmware_name(config, version, channel), data)
+    os.utime(path, (STAMP, STAMP))
+    return path
+
+
+def _outputs(repo):
+    return {path.name: path.read_bytes() for path in sorted(repo.glob("*.json"))}
+
+
+@pytest.fixture
+def generated(repo):
+    _write(repo, "Ceiling-POE-AirIQ", "1.0.0", b"\x01" * 4096)
+    _write(repo, "Ceiling-USB", "1.0.0", b"\x02" * 4096)
+    _write(repo, "Wall-USB", "1.0.0", b"\x03" * 4096)
+    assert run_gen(repo) == 0
+    return repo
+
+
+def test_scoped_builds_merge_like_a_full_run(generated, capsys):
+    _write(generated, "Ceiling-USB", "1.1.0", b"\x04" * 4096, "beta")
+    _write(generated, "Ceiling-USB", "1.0.0", b"\x05" * 8192)
+    os.utime(generated / "firmware-0.json", ns=(0, 0))
+    capsys.readouterr()
+
+    assert run_gen(generated, "--only-config", "ceiling-usb") == 0
+
+    assert "Regenerated 2 build(s) in scope, kept 2 unchanged" in capsys.readouterr().out
+    # Builds sorted ahead of the scope keep their install manifest untouched.
+    assert (generated / "firmware-0.json").stat().st_mtime_ns == 0
+    partial = _outputs(generated)
+    assert run_gen(generated) == 0
+    assert _outputs(generated) == partial
+    assert len(partial) == 5
+
+
+def test_channel_scope_keeps_other_channels(generated):
+    _write(generated, "Ceiling-USB", "1.1.0", b"\x04" * 4096, "beta")
+    assert run_gen(generated) == 0
+    (generated / "firmware" / "configurations" / firmware_name("Ceiling-USB", "1.1.0", "beta")).unlink()
+
+    assert run_gen(generated, "--only-config", "Ceiling-USB", "--only-channel", "beta") == 0
+
+    partial = _outputs(generated)
+    assert "firmware-3.json" not in partial
+    assert run_gen(generated) == 0
+    assert _outputs(generated) == partial
+
+
+@pytest.mark.parametrize(
+    "full_run, message",
+    [
+        (("--retain-versions", "1"), "history shards"),
+        (("--compat-index",), "a compatibility index"),
+        (("--latest-feed",), "a latest feed (latest.json)"),
+        (("--hashed-manifests",), "a manifest pointer (manifest-pointer.json)"),
+    ],
+)
+def test_trees_with_derived_outputs_are_refused(repo, full_run, message):
+    _write(repo, "Ceiling-USB", "1.0.0", b"\x01" * 4096)
+    _write(repo, "Ceiling-USB", "1.1.0", b"\x02" * 4096)
+    assert run_gen(repo, *full_run) == 0
+    before = _outputs(repo)
+    _write(repo, "Ceiling-USB", "1.2.0", b"\x03" * 4096)
+
+    with pytest.raises(SystemExit) as refused:
+        run_gen(repo, "--only-config", "Ceiling-USB")
+
+    assert message in str(refused.value.code)
+    assert _outputs(repo) == before
+
+
+def test_a_partial_run_needs_an_existing_manifest(repo):
+    _write(repo, "Ceiling-USB", "1.0.0", b"\x01" * 4096)
+    with pytest.raises(SystemExit, match="run a full regeneration"):
+        run_gen(repo, "--only-config", "Ceiling-USB")
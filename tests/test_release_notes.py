@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from helpers import firmware_name, read_json, run_gen, write_firmware
+
+NOTES = """# Sense360 Ceiling-POE-AirIQ v1.0.0 (stable)
+
+**Release Date**: 2026-03-01
+
+## Features
+- CO2 and VOC monitoring
+
+## Hardware Requirements
+- PoE switch (802.3af)
+
+## Known Issues
+- Fan curve resets after OTA
+
+## Changelog
+- First stable release
+"""
+
+
+def _write_notes(repo, version="1.0.0"):
+    binary = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", version), b"\x01" * 4096)
+    binary.with_name(f"Sense360-Ceiling-POE-AirIQ-v{version}-stable.md").write_text(NOTES, encoding="utf-8")
+
+
+def test_inline_notes_populate_the_build_entry(repo):
+    _write_notes(repo)
+
+    assert run_gen(repo) == 0
+
+    manifest = read_json(repo / "manifest.json")
+    build = manifest["builds"][0]
+    assert manifest["release_notes_indexed"] is True
+    assert build["features"] == ["CO2 and VOC monitoring"]
+    assert build["hardware_requirements"] == ["PoE switch (802.3af)"]
+    assert build["known_issues"] == ["Fan curve resets after OTA"]
+    assert build["changelog"] == ["First stable release"]
+    assert build["release_notes"]["release_date"] == "2026-03-01"
+    assert build["release_notes"]["markdown"] == NOTES
+
+
+def test_shard_mode_groups_markdown_and_prunes_stale_shards(repo):
+    _write_notes(repo, "1.0.0")
+    _write_notes(repo, "1.1.0")
+    notes_dir = repo / "firmware" / "notes"
+    notes_dir.mkdir(parents=True)
+    (notes_dir / "Ceiling-USB-stable.json").write_text("{}\n", encoding="utf-8")
+
+    assert run_gen(repo, "--release-notes", "shard") == 0
+
+    builds = read_json(repo / "manifest.json")["builds"]
+    shard = builds[0]["release_notes"]["shard"]
+    assert {build["release_notes"]["shard"] for build in builds} == {shard}
+    assert "markdown" not in builds[0]["release_notes"]
+    assert read_json(repo / shard) == {"1.0.0": NOTES, "1.1.0": NOTES}
+    assert sorted(path.name for path in notes_dir.iterdir()) == ["Ceiling-POE-AirIQ-stable.json"]
+
+
+def test_inline_mode_leaves_the_notes_directory_alone(repo):
+    _write_notes(repo)
+    notes_dir = repo / "firmware" / "notes"
+    notes_dir.mkdir(parents=True)
+    kept = notes_dir / "Ceiling-POE-AirIQ-stable.json"
+    kept.write_text("{}\n", encoding="utf-8")
+
+    assert run_gen(repo) == 0
+    assert run_gen(repo, "--release-notes", "off") == 0
+
+    assert kept.exists()
+
+
+def test_history_directory_is_left_alone_without_retention(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    history_dir = repo / "firmware" / "history"
+    history_dir.mkdir(parents=True)
+    kept = history_dir / "Ceiling-POE-AirIQ.json"
+    kept.write_text("{}\n", encoding="utf-8")
+
+    assert run_gen(repo) == 0
+
+    assert kept.exists()
+    assert "history" not in read_json(repo / "manifest.json")
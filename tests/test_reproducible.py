@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from helpers import esp_image, firmware_name, read_json, run_gen, write_firmware
+
+
+def test_build_date_comes_from_the_app_descriptor(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), esp_image(b"\0" * 512, app_version="1.0.0"))
+
+    assert run_gen(repo, "--reproducible") == 0
+
+    assert read_json(repo / "manifest.json")["builds"][0]["build_date"].startswith("2026-01-01T12:00:00")
+
+
+def test_source_date_epoch_is_the_last_resort(repo, monkeypatch):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+
+    with pytest.raises(SystemExit, match="No reproducible build date"):
+        run_gen(repo, "--reproducible")
+
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    assert run_gen(repo, "--reproducible") == 0
+    assert read_json(repo / "manifest.json")["builds"][0]["build_date"].startswith("2023-11-14T22:13:20")
+
+
+def test_output_is_byte_identical_after_a_touch(repo, monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    binary = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    assert run_gen(repo, "--reproducible") == 0
+    before = (repo / "manifest.json").read_bytes(), (repo / "firmware-0.json").read_bytes()
+
+    os.utime(binary, (1_000_000, 1_000_000))
+    assert run_gen(repo, "--reproducible") == 0
+
+    assert ((repo / "manifest.json").read_bytes(), (repo / "firmware-0.json").read_bytes()) == before
+
+
+def test_release_asset_dates_win_over_source_date_epoch(gen, sync, repo, monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    binary = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    artifacts = gen.collect_firmware(repo / "firmware", repo)
+    artifacts[0].source_date = sync.asset_source_date({"updated_at": "2026-03-01T08:30:00Z"})
+
+    gen.apply_reproducible_build_dates(artifacts, repo, source_date_epoch="1700000000")
+
+    assert artifacts[0].path == binary
+    assert artifacts[0].build_date.startswith("2026-03-01T08:30:00")
+
+
+@pytest.mark.parametrize("asset", [{}, {"updated_at": ""}, {"updated_at": "yesterday"}])
+def test_assets_without_a_usable_timestamp_have_no_source_date(sync, asset):
+    assert sync.asset_source_date(asset) is None
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+
+from helpers import firmware_name, read_json, run_gen, write_firmware
+
+VERSIONS = ("1.0.0", "1.1.0", "1.2.0", "1.3.0")
+
+
+def _write_versions(repo):
+    paths = {}
+    for index, version in enumerate(VERSIONS):
+        path = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", version), bytes([index + 1]) * 4096)
+        # One day apart, oldest first, so --retain-since has something to cut.
+        stamp = 1_767_225_600 + index * 86_400
+        os.utime(path, (stamp, stamp))
+        paths[version] = path
+    return paths
+
+
+def test_retain_versions_moves_older_builds_to_history(repo):
+    paths = _write_versions(repo)
+
+    assert run_gen(repo, "--retain-versions", "2") == 0
+
+    manifest = read_json(repo / "manifest.json")
+    assert [build["version"] for build in manifest["builds"]] == ["1.3.0", "1.2.0"]
+    history = manifest["history"]["Ceiling-POE-AirIQ"]
+    assert history == {"path": "firmware/history/Ceiling-POE-AirIQ.json", "builds": 2}
+    shard = read_json(repo / history["path"])
+    assert [build["version"] for build in shard["builds"]] == ["1.1.0", "1.0.0"]
+    for build in shard["builds"]:
+        install = repo / build["manifest"]
+        part = read_json(install)["builds"][0]["parts"][0]
+        assert (install.parent / part["path"]).resolve() == paths[build["version"]].resolve()
+    assert sorted(path.name for path in (repo / "firmware-0.json").parent.glob("firmware-*.json")) == [
+        "firmware-0.json",
+        "firmware-1.json",
+    ]
+
+
+def test_retain_since_keeps_recent_builds(repo):
+    _write_versions(repo)
+
+    assert run_gen(repo, "--retain-since", "2026-01-03") == 0
+
+    assert [build["version"] for build in read_json(repo / "manifest.json")["builds"]] == ["1.3.0", "1.2.0"]
+
+
+def test_the_newest_build_is_always_kept(repo):
+    _write_versions(repo)
+
+    assert run_gen(repo, "--retain-since", "2030-01-01") == 0
+
+    assert [build["version"] for build in read_json(repo / "manifest.json")["builds"]] == ["1.3.0"]
+
+
+def test_history_shards_follow_the_policy(repo):
+    paths = _write_versions(repo)
+    assert run_gen(repo, "--retain-versions", "2") == 0
+    for version in ("1.0.0", "1.1.0"):
+        paths[version].unlink()
+
+    assert run_gen(repo, "--retain-versions", "2") == 0
+
+    assert "history" not in read_json(repo / "manifest.json")
+    assert not list((repo / "firmware" / "history").glob("*.json"))
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from helpers import firmware_name, read_json, run_gen, write_firmware
+
+
+def _estimates(repo):
+    return {build["version"]: build["flash_estimate"] for build in read_json(repo / "manifest.json")["builds"]}
+
+
+def _floats(value):
+    if isinstance(value, float):
+        return [value]
+    if isinstance(value, dict):
+        return [item for child in value.values() for item in _floats(child)]
+    if isinstance(value, list):
+        return [item for child in value for item in _floats(child)]
+    return []
+
+
+def test_flash_estimates_are_whole_milliseconds_rounded_up(repo):
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), b"\x01" * 100_001)
+
+    assert run_gen(repo, "--flash-estimates") == 0
+
+    estimate = _estimates(repo)["1.0.0"]
+    assert estimate == {
+        "transfer_bytes": 100_001,
+        "serial_ms": {"115200": 8681, "460800": 2171, "921600": 1086},
+        "download_ms": {"3g": 501, "4g": 67, "broadband": 17},
+    }
+    assert _floats(read_json(repo / "manifest.json")) == []
+
+
+def test_estimates_render_identically_under_both_encoders(gen, repo, monkeypatch):
+    pytest.importorskip("orjson")
+    path = write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), b"\x01" * 333_333)
+    os.utime(path, (1_767_225_600, 1_767_225_600))
+    outputs = {}
+    for encoder in ("stdlib", "orjson"):
+        monkeypatch.setattr(gen, "DEFAULT_JSON_ENCODER", encoder)
+        (repo / "manifest.json").unlink(missing_ok=True)
+        assert run_gen(repo, "--flash-estimates") == 0
+        outputs[encoder] = (repo / "manifest.json").read_bytes()
+
+    assert outputs["stdlib"] == outputs["orjson"]
+
+
+@pytest.mark.parametrize(
+    "milliseconds, expected",
+    [(40, "40 ms"), (999, "999 ms"), (1000, "1 s"), (8681, "9 s"), (89_000, "89 s"), (90_000, "1.5 min")],
+)
+def test_durations_are_formatted_for_the_size_report(gen, milliseconds, expected):
+    assert gen._format_duration(milliseconds) == expected
+
+
+def test_the_size_report_shows_growth_and_flash_times(repo, capsys):
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), b"\x01" * 100_000)
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.1.0"), b"\x02" * 110_000)
+    capsys.readouterr()
+
+    assert run_gen(repo, "--size-report") == 0
+
+    rows = {line.split()[2]: line for line in capsys.readouterr().out.splitlines() if line.startswith("Ceiling-USB")}
+    assert sorted(rows) == ["1.0.0", "1.1.0"]
+    assert "new" in rows["1.0.0"]
+    assert all(column in rows["1.1.0"] for column in ("+10.0% (+10000 B)", "10 s", "1 s", "74 ms"))
+
+
+def test_budgets_are_reported_without_failing_by_default(repo, capsys):
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), b"\x01" * 100_000)
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.1.0"), b"\x02" * 120_000)
+
+    assert run_gen(repo, "--size-growth-budget", "10") == 0
+
+    assert "grew 20.0% (+20000 bytes) since 1.0.0" in capsys.readouterr().err
+    assert (repo / "manifest.json").exists()
+
+
+def test_strict_budgets_fail_the_run(repo):
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), b"\x01" * 100_000)
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.1.0"), b"\x02" * 120_000)
+
+    with pytest.raises(SystemExit, match="exceeds the size budget of 102400 bytes"):
+        run_gen(repo, "--size-budget", "100K", "--strict-size-budget")
+    with pytest.raises(SystemExit, match=r"grew 20\.0% \(\+20000 bytes\) since 1\.0\.0; the budget is 10%"):
+        run_gen(repo, "--size-growth-budget", "10", "--strict-size-budget")
+    assert run_gen(repo, "--size-budget", "1M", "--size-growth-budget", "25", "--strict-size-budget") == 0
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+import zlib
+
+import pytest
+
+from helpers import esp_image, firmware_name, merged_image, read_json, run_gen, write_firmware
+
+
+def _reassemble(repo, parts, size):
+    flash = bytearray(b"\xff" * size)
+    for part in parts:
+        data = (repo / part["path"]).read_bytes()
+        flash[part["offset"] : part["offset"] + len(data)] = data
+    return bytes(flash)
+
+
+def test_merged_images_split_into_shared_parts(repo):
+    first = merged_image(os.urandom(6000), app_version="1.0.0")
+    second = merged_image(os.urandom(7000), app_version="1.1.0")
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), first)
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.1.0"), second)
+
+    assert run_gen(repo, "--split-parts") == 0
+
+    builds = {build["version"]: build for build in read_json(repo / "manifest.json")["builds"]}
+    for version, image in (("1.0.0", first), ("1.1.0", second)):
+        parts = builds[version]["parts"]
+        assert [(part["role"], part["offset"]) for part in parts] == [
+            ("bootloader", 0x1000),
+            ("partitions", 0x8000),
+            ("otadata", 0xE000),
+            ("app", 0x10000),
+        ]
+        assert _reassemble(repo, parts, len(image)) == image
+    shared = [part["path"] for part in builds["1.0.0"]["parts"][:3]]
+    assert shared == [part["path"] for part in builds["1.1.0"]["parts"][:3]]
+    assert len(list((repo / "firmware" / "parts").iterdir())) == 5
+
+
+def test_plain_and_dirty_images_keep_one_part(repo):
+    dirty = bytearray(merged_image(os.urandom(4000)))
+    dirty[0x9000] = 0  # NVS data the parts would not reproduce
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), bytes(dirty))
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), esp_image(os.urandom(4000)))
+
+    assert run_gen(repo, "--split-parts") == 0
+
+    for build in read_json(repo / "manifest.json")["builds"]:
+        assert [part["offset"] for part in build["parts"]] == [0]
+        assert "role" not in build["parts"][0]
+
+
+def test_split_parts_are_compressed_individually(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), merged_image(b"\x00" * 8000))
+
+    assert run_gen(repo, "--split-parts", "--compress-parts") == 0
+
+    build = read_json(repo / "manifest.json")["builds"][0]
+    assert "compressed" not in build
+    compressed = [part for part in build["parts"] if "compressed" in part]
+    assert {part["role"] for part in compressed} == {"bootloader", "partitions", "otadata", "app"}
+    for part in compressed:
+        blob = (repo / part["compressed"]["path"]).read_bytes()
+        assert zlib.decompress(blob) == (repo / part["path"]).read_bytes()
+    names = {path.name for path in (repo / "firmware" / "compressed").iterdir()}
+    assert names == {f"{part['sha256']}.deflate" for part in compressed}
+
+
+def test_split_parts_refuse_deltas(repo):
+    with pytest.raises(SystemExit):
+        run_gen(repo, "--split-parts", "--deltas")
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from helpers import firmware_name, merged_image, random_firmware, run_gen, write_firmware
+
+NOTES = "# Sense360 Ceiling-POE-AirIQ v1.0.0 (stable)\n\n## Features\n- Détection CO₂\n"
+
+
+def _populate(root, images):
+    for name, data in images.items():
+        path = write_firmware(root, name, data)
+        os.utime(path, (1_767_225_600, 1_767_225_600))
+    notes = root / "firmware" / "configurations" / "Sense360-Ceiling-POE-AirIQ-v1.0.0-stable.md"
+    notes.write_text(NOTES, encoding="utf-8")
+
+
+def _outputs(root):
+    return {
+        path.relative_to(root).as_posix(): path.read_bytes()
+        for path in sorted(root.rglob("*"))
+        if path.is_file() and path.suffix in (".json", ".md") and "firmware" not in path.parts
+    }
+
+
+@pytest.mark.parametrize("extra", [(), ("--split-parts", "--compat-index", "--retain-versions", "1")])
+def test_streamed_outputs_match_buffered_outputs(tmp_path, capsys, extra):
+    images = {
+        firmware_name("Ceiling-POE-AirIQ", "1.0.0"): merged_image(os.urandom(5000)),
+        firmware_name("Ceiling-POE-AirIQ", "0.9.0"): random_firmware(4096),
+        firmware_name("Ceiling-USB", "1.1.0", "beta"): random_firmware(4096),
+    }
+    results = {}
+    for mode in ("buffered", "streamed"):
+        root = tmp_path / mode
+        _populate(root, images)
+        argv = ["--summary-file", str(root / "summary.md"), *extra]
+        if mode == "streamed":
+            argv.append("--stream-output")
+        capsys.readouterr()
+        assert run_gen(root, *argv) == 0
+        table = capsys.readouterr().out.split("Firmware summary:")[1].split("Generated ")[0]
+        results[mode] = (_outputs(root), table)
+    assert results["streamed"] == results["buffered"]
+    outputs, table = results["streamed"]
+    assert {"manifest.json", "firmware-0.json", "summary.md"} <= set(outputs)
+    assert "Ceiling-USB" in table
+
+
+def test_an_empty_build_list_renders_like_the_stdlib(gen, tmp_path):
+    path = tmp_path / "manifest.json"
+    header = {"version": 1, "nested": {"list": []}}
+    assert gen.write_manifest_stream(path, header, [], dry_run=False) == 0
+    assert path.read_bytes() == gen.render_json({**header, "builds": []})
+
+
+def test_a_failed_stream_leaves_the_previous_manifest(gen, tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_bytes(b"previous\n")
+
+    def artifacts():
+        raise OSError("disk went away")
+        yield
+
+    with pytest.raises(OSError):
+        gen.write_manifest_stream(path, {"version": 1}, artifacts(), dry_run=False)
+    assert path.read_bytes() == b"previous\n"
+    assert sorted(item.name for item in tmp_path.iterdir()) == ["manifest.json"]
+
+
+def test_an_unchanged_stream_keeps_the_file(gen, tmp_path):
+    path = tmp_path / "manifest.json"
+    gen.write_manifest_stream(path, {"version": 1}, [], dry_run=False)
+    os.utime(path, ns=(0, 0))
+    gen.write_manifest_stream(path, {"version": 1}, [], dry_run=False)
+    assert path.stat().st_mtime_ns == 0
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import pytest
+
+from helpers import firmware_name, gen_manifests, mock_releases_server, read_json, run_gen, write_firmware
+
+
+def _assets(count=4, size=8192):
+    return mock_releases_server.synthetic_assets(count, size)
+
+
+def _release(sync, api_url):
+    config = mock_releases_server.MockConfig()
+    return sync.fetch_release(config.repo, config.release_id, None, None, api_url)
+
+
+def _without_dates(manifest):
+    return {**manifest, "builds": [{**build, "build_date": None} for build in manifest["builds"]]}
+
+
+def test_pipeline_matches_sync_then_generate(sync, repo, releases, tmp_path_factory):
+    api_url, _ = releases(_assets())
+    write_firmware(repo, firmware_name("Rescue", "1.0.0"), b"\x05" * 4096)
+    gen_args = gen_manifests.parse_args(["--repo-root", str(repo), "--firmware-dir", "firmware"])
+
+    assert sync.sync_and_generate(_release(sync, api_url), gen_args, None, "*.bin", jobs=3) == 0
+    streamed = read_json(repo / "manifest.json")
+
+    other = tmp_path_factory.mktemp("two-step")
+    write_firmware(other, firmware_name("Rescue", "1.0.0"), b"\x05" * 4096)
+    sync.sync_assets(_release(sync, api_url), other / "firmware", None, "*.bin", False)
+    assert run_gen(other) == 0
+
+    assert len(streamed["builds"]) == 5
+    assert _without_dates(streamed) == _without_dates(read_json(other / "manifest.json"))
+
+
+def test_streamed_digests_are_cached(sync, repo, releases, monkeypatch):
+    api_url, _ = releases(_assets(2))
+    gen_args = gen_manifests.parse_args(
+        ["--repo-root", str(repo), "--firmware-dir", "firmware", "--cache-dir", ".cache"]
+    )
+    assert sync.sync_and_generate(_release(sync, api_url), gen_args, None, "*.bin") == 0
+
+    monkeypatch.setattr(gen_manifests, "compute_digest_record", pytest.fail)
+    assert run_gen(repo, "--cache-dir", ".cache") == 0
+
+
+def test_failed_download_aborts_without_partial_files(sync, repo, releases):
+    assets = _assets(3)
+    api_url, _ = releases(assets, fail_assets={assets[1].name})
+    gen_args = gen_manifests.parse_args(["--repo-root", str(repo), "--firmware-dir", "firmware"])
+
+    with pytest.raises(SystemExit, match="Failed to download asset"):
+        sync.sync_and_generate(_release(sync, api_url), gen_args, None, "*.bin")
+
+    assert not list((repo / "firmware").rglob("*.part"))
+    assert not (repo / "manifest.json").exists()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+from helpers import firmware_name, merged_image, random_firmware, read_json, run_gen, write_firmware
+
+PUBLISH = ("--hashed-manifests", "--compat-index", "--retain-versions", "1", "--split-parts")
+
+
+def _verify(gen, repo, capsys, *argv):
+    rescue = repo / "firmware" / "rescue" / "manifest.json"
+    if not rescue.exists():
+        rescue.parent.mkdir(parents=True)
+        rescue.write_text('{"name": "Rescue", "builds": []}\n', encoding="utf-8")
+    capsys.readouterr()
+    code = gen.main(["verify", "--repo-root", str(repo), "--json", *argv])
+    return code, json.loads(capsys.readouterr().out)
+
+
+def _published(repo, logical):
+    pointer = read_json(repo / "manifest-pointer.json")
+    return repo / read_json(repo / pointer["digests"])["files"][logical]["path"]
+
+
+@pytest.fixture
+def published(repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), merged_image(os.urandom(5000)))
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.1.0"), merged_image(os.urandom(5000)))
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), random_firmware(4096))
+    assert run_gen(repo, *PUBLISH) == 0
+    return repo
+
+
+def test_a_fresh_publish_verifies(gen, published, capsys):
+    code, report = _verify(gen, published, capsys)
+
+    assert (code, report["ok"]) == (0, True)
+    assert report["dangling"] == report["stale"] == report["warnings"] == []
+    # Live and hashed copies of: manifest, 2 install manifests, history
+    # shard, its install manifest, compat index and 2 shards; plus the
+    # pointer, digest map and rescue manifest.
+    assert report["manifests"] == 2 * 8 + 3
+
+
+def test_a_binary_changed_after_publishing_is_stale_in_both_generations(gen, published, capsys):
+    binary = published / "firmware" / "configurations" / firmware_name("Ceiling-USB", "1.0.0")
+    binary.write_bytes(random_firmware(4096))
+
+    code, report = _verify(gen, published, capsys)
+
+    assert code == 1
+    assert any(entry.startswith("manifest.json builds") for entry in report["stale"])
+    assert any(entry.startswith("manifests/manifest.") for entry in report["stale"])
+
+
+def test_hashed_install_manifests_resolve_against_their_own_directory(gen, published, capsys):
+    hashed = _published(published, "firmware-0.json")
+    data = read_json(hashed)
+    data["builds"][0]["parts"][0]["path"] = "firmware/parts/missing.bin"
+    hashed.write_text(json.dumps(data), encoding="utf-8")
+
+    code, report = _verify(gen, published, capsys)
+
+    assert code == 1
+    assert any(hashed.name in entry and "missing.bin" in entry for entry in report["dangling"])
+    assert any(hashed.name in entry and "does not match its hash" in entry for entry in report["stale"])
+
+
+def test_missing_shards_and_stale_pointers_are_reported(gen, published, capsys):
+    _published(published, "firmware/builds/ceiling-usb.json").unlink()
+    index = published / "compat-index.json"
+    index.write_text(index.read_text(encoding="utf-8").replace('"legacy_builds": 0', '"legacy_builds": 1'))
+
+    code, report = _verify(gen, published, capsys)
+
+    assert code == 1
+    assert any("firmware/builds/ceiling-usb.json ->" in entry for entry in report["dangling"])
+    assert any("firmware/builds/ceiling-usb.json is not in the digest map" in entry for entry in report["dangling"])
+    assert any("compat-index.json differs from its published copy" in entry for entry in report["stale"])
+
+
+def test_compat_shards_are_verified_without_a_pointer(gen, repo, capsys):
+    write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), random_firmware(4096))
+    assert run_gen(repo, "--compat-index") == 0
+    shard = repo / "firmware" / "builds" / "ceiling-usb.json"
+    data = read_json(shard)
+    data["builds"][0]["parts"][0]["sha256"] = "0" * 64
+    shard.write_text(json.dumps(data), encoding="utf-8")
+
+    code, report = _verify(gen, repo, capsys)
+
+    assert code == 1
+    assert [entry.split(" ")[0] for entry in report["stale"]] == ["firmware/builds/ceiling-usb.json"]
+
+
+def test_an_unreadable_pointer_is_invalid(gen, published, capsys):
+    (published / "manifest-pointer.json").write_text('{"version": 99}', encoding="utf-8")
+
+    code, report = _verify(gen, published, capsys)
+
+    assert code == 1
+    assert report["invalid"] == ["manifest-pointer.json: not a version 1 manifest pointer"]
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import re
+
+from helpers import firmware_name, read_json, run_gen, write_firmware
+
+
+def _watch(gen, repo, monkeypatch, steps):
+    """Run --watch, performing one step per sleep and stopping after the last."""
+
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if not steps:
+            raise KeyboardInterrupt
+        steps.pop(0)()
+
+    monkeypatch.setattr(gen.time, "sleep", sleep)
+    assert run_gen(repo, "--watch", "--watch-interval", "1", "--watch-debounce", "0.25") == 0
+    return sleeps
+
+
+def _cycles(output):
+    return re.findall(r"\[watch\] cycle \d+: (\d+) added, (\d+) changed, (\d+) removed; (\d+) file\(s\) hashed; (\w+)", output)
+
+
+def test_a_burst_of_copies_regenerates_once(gen, repo, monkeypatch, capsys):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    steps = [
+        lambda: write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), b"\x02" * 4096),
+        lambda: write_firmware(repo, firmware_name("Wall-USB", "1.0.0"), b"\x03" * 4096),
+        lambda: None,
+        lambda: None,
+    ]
+
+    sleeps = _watch(gen, repo, monkeypatch, steps)
+
+    output = capsys.readouterr().out
+    assert _cycles(output) == [("1", "0", "0", "1", "done"), ("2", "0", "0", "2", "done")]
+    assert sleeps == [1.0, 0.25, 0.25, 1.0, 1.0]
+    assert "Stopped watching." in output
+    assert len(read_json(repo / "manifest.json")["builds"]) == 3
+
+
+def test_changes_and_removals_rehash_only_what_changed(gen, repo, monkeypatch, capsys):
+    keep = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    drop = write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), b"\x02" * 4096)
+    steps = [lambda: (keep.write_bytes(b"\x04" * 8192), drop.unlink()), lambda: None]
+
+    _watch(gen, repo, monkeypatch, steps)
+
+    assert _cycles(capsys.readouterr().out) == [("2", "0", "0", "2", "done"), ("0", "1", "1", "1", "done")]
+    builds = read_json(repo / "manifest.json")["builds"]
+    assert [(build["config_string"], build["file_size"]) for build in builds] == [("Ceiling-POE-AirIQ", 8192)]
+    assert not (repo / "firmware-1.json").exists()
+
+
+def test_a_failed_cycle_keeps_watching(gen, repo, monkeypatch, capsys):
+    good = write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    bad = repo / "firmware" / "configurations" / firmware_name("Ceiling-USB", "1.0.0")
+    steps = [
+        lambda: bad.write_bytes(b"\xe9" + b"\x00" * 4095),
+        lambda: None,
+        lambda: bad.unlink(),
+        lambda: None,
+    ]
+
+    _watch(gen, repo, monkeypatch, steps)
+
+    captured = capsys.readouterr()
+    assert [cycle[-1] for cycle in _cycles(captured.out)] == ["done", "failed", "done"]
+    assert "Regeneration failed" in captured.err
+    assert [build["config_string"] for build in read_json(repo / "manifest.json")["builds"]] == ["Ceiling-POE-AirIQ"]
+    assert good.exists()
+
+
+def test_a_file_removed_mid_cycle_keeps_watching(gen, repo, monkeypatch, capsys):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    vanishing = write_firmware(repo, firmware_name("Ceiling-USB", "1.0.0"), b"\x02" * 4096)
+    record = gen.DigestCache.record
+
+    def record_after_removal(self, path, *args, **kwargs):
+        if path == vanishing and vanishing.exists():
+            vanishing.unlink()
+        return record(self, path, *args, **kwargs)
+
+    monkeypatch.setattr(gen.DigestCache, "record", record_after_removal)
+
+    _watch(gen, repo, monkeypatch, [lambda: None, lambda: None])
+
+    captured = capsys.readouterr()
+    assert [cycle[-1] for cycle in _cycles(captured.out)] == ["failed", "done"]
+    assert "Regeneration failed: [Errno 2]" in captured.err
+    assert "Stopped watching." in captured.out
+    assert [build["config_string"] for build in read_json(repo / "manifest.json")["builds"]] == ["Ceiling-POE-AirIQ"]
+
+
+def test_snapshots_skip_generated_directories(gen, repo):
+    write_firmware(repo, firmware_name("Ceiling-POE-AirIQ", "1.0.0"), b"\x01" * 4096)
+    write_firmware(repo, "bootloader-0123.bin", b"\x02" * 16, subdir="parts")
+    (repo / "firmware" / "configurations" / "notes.txt").write_text("ignored", encoding="utf-8")
+
+    args = gen.parse_args(["--repo-root", str(repo)])
+    snapshot = gen.snapshot_firmware_tree(repo / "firmware", gen.scan_skip_dirs(args))
+
+    assert [path.rsplit("/", 1)[1] for path in snapshot] == [firmware_name("Ceiling-POE-AirIQ", "1.0.0")]